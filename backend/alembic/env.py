@@ -12,14 +12,7 @@ from app.core.config import settings
 from app.core.database import Base
 
 # Importar todos los modelos para que estén disponibles para autogenerate
-from app.models.user import User
-from app.models.item import Item
-from app.models.category import Category
-from app.models.exchange import Exchange
-from app.models.message import Message
-from app.models.notification import Notification
-from app.models.rating import Rating
-from app.models.user_session import UserSession
+import app.models  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -25,11 +25,14 @@ def upgrade() -> None:
     op.execute("UPDATE users SET reward_points = 0 WHERE reward_points IS NULL")
     op.execute("UPDATE users SET reward_tier = 'Bronce' WHERE reward_tier IS NULL")
 
-    op.alter_column('users', 'reward_points', server_default=None)
-    op.alter_column('users', 'reward_tier', server_default=None)
+    # batch: SQLite no admite ALTER COLUMN (recrea la tabla); en PostgreSQL es un ALTER normal
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('reward_points', server_default=None)
+        batch_op.alter_column('reward_tier', server_default=None)
 
 
 def downgrade() -> None:
-    op.drop_column('users', 'reward_tier')
-    op.drop_column('users', 'reward_points')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('reward_tier')
+        batch_op.drop_column('reward_points')
 
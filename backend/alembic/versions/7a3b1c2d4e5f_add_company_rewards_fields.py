@@ -19,17 +19,26 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
+    # En una base de datos nueva ``companies`` aún no existe: la crea
+    # f3b5d7e9a1c2 con estas columnas
+    if not sa.inspect(op.get_bind()).has_table('companies'):
+        return
+
     op.add_column('companies', sa.Column('reward_points', sa.Integer(), nullable=False, server_default='0'))
     op.add_column('companies', sa.Column('reward_tier', sa.String(length=20), nullable=False, server_default='Bronce'))
 
     op.execute("UPDATE companies SET reward_points = 0 WHERE reward_points IS NULL")
     op.execute("UPDATE companies SET reward_tier = 'Bronce' WHERE reward_tier IS NULL")
 
-    op.alter_column('companies', 'reward_points', server_default=None)
-    op.alter_column('companies', 'reward_tier', server_default=None)
+    with op.batch_alter_table('companies') as batch_op:
+        batch_op.alter_column('reward_points', server_default=None)
+        batch_op.alter_column('reward_tier', server_default=None)
 
 
 def downgrade() -> None:
-    op.drop_column('companies', 'reward_tier')
-    op.drop_column('companies', 'reward_points')
+    if not sa.inspect(op.get_bind()).has_table('companies'):
+        return
+    with op.batch_alter_table('companies') as batch_op:
+        batch_op.drop_column('reward_tier')
+        batch_op.drop_column('reward_points')
 
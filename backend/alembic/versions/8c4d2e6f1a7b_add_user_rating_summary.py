@@ -0,0 +1,88 @@
+"""Add user rating summary tables
+
+Revision ID: 8c4d2e6f1a7b
+Revises: 7a3b1c2d4e5f
+Create Date: 2026-10-19 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4d2e6f1a7b'
+down_revision: Union[str, Sequence[str], None] = '7a3b1c2d4e5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DIMENSIONS = ("overall", "communication", "punctuality", "item_condition", "friendliness")
+STARS = range(1, 6)
+
+
+def upgrade() -> None:
+    columns = [
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('recommend_yes', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('recommend_no', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('given_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('given_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    ]
+    for dim in DIMENSIONS:
+        columns.append(sa.Column(f'{dim}_count', sa.Integer(), nullable=False, server_default='0'))
+        columns.append(sa.Column(f'{dim}_sum', sa.Float(), nullable=False, server_default='0'))
+        for star in STARS:
+            columns.append(sa.Column(f'{dim}_{star}', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'user_rating_summary',
+        *columns,
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table(
+        'user_rating_daily',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Float(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # Rellenar desde las calificaciones existentes
+    received = ["rated_id",
+                "SUM(CASE WHEN would_exchange_again = 1 THEN 1 ELSE 0 END)",
+                "SUM(CASE WHEN would_exchange_again = 0 THEN 1 ELSE 0 END)"]
+    names = ["user_id", "recommend_yes", "recommend_no"]
+    for dim in DIMENSIONS:
+        col = f"{dim}_rating"
+        received += [f"COUNT({col})", f"COALESCE(SUM({col}), 0)"]
+        names += [f"{dim}_count", f"{dim}_sum"]
+        for star in STARS:
+            received.append(f"SUM(CASE WHEN ROUND({col}) = {star} THEN 1 ELSE 0 END)")
+            names.append(f"{dim}_{star}")
+    op.execute(
+        f"INSERT INTO user_rating_summary ({', '.join(names)}) "
+        f"SELECT {', '.join(received)} FROM ratings GROUP BY rated_id"
+    )
+    op.execute(
+        "INSERT INTO user_rating_summary (user_id, given_count, given_sum) "
+        "SELECT rater_id, COUNT(*), SUM(overall_rating) FROM ratings WHERE rater_id IS NOT NULL GROUP BY rater_id "
+        "ON CONFLICT (user_id) DO UPDATE SET given_count = excluded.given_count, given_sum = excluded.given_sum"
+    )
+    op.execute(
+        "INSERT INTO user_rating_daily (user_id, day, count, total) "
+        "SELECT rated_id, date(created_at), COUNT(*), SUM(overall_rating) FROM ratings GROUP BY rated_id, date(created_at)"
+    )
+    op.execute(
+        "UPDATE users SET reputation_score = COALESCE(("
+        "SELECT overall_sum / overall_count FROM user_rating_summary s "
+        "WHERE s.user_id = users.id AND s.overall_count > 0), 0)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_rating_daily')
+    op.drop_table('user_rating_summary')
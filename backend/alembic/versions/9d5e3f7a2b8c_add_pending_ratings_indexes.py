@@ -0,0 +1,34 @@
+"""Add pending ratings indexes
+
+Revision ID: 9d5e3f7a2b8c
+Revises: 8c4d2e6f1a7b
+Create Date: 2026-10-19 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d5e3f7a2b8c'
+down_revision: Union[str, Sequence[str], None] = '8c4d2e6f1a7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COMPLETED = sa.text("status = 'COMPLETED'")
+
+
+def upgrade() -> None:
+    op.create_index('ix_ratings_rater_exchange', 'ratings', ['rater_id', 'exchange_id'], unique=False)
+    op.create_index('ix_exchanges_completed_requester', 'exchanges', ['requester_id'], unique=False,
+                    postgresql_where=COMPLETED, sqlite_where=COMPLETED)
+    op.create_index('ix_exchanges_completed_owner', 'exchanges', ['owner_id'], unique=False,
+                    postgresql_where=COMPLETED, sqlite_where=COMPLETED)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exchanges_completed_owner', table_name='exchanges')
+    op.drop_index('ix_exchanges_completed_requester', table_name='exchanges')
+    op.drop_index('ix_ratings_rater_exchange', table_name='ratings')
@@ -0,0 +1,39 @@
+"""Create admin_users
+
+``admin_users`` (administradores adicionales a ADMIN_EMAILS) sólo la creaba
+``create_all`` al arrancar y faltó en f3b5d7e9a1c2. Las bases de datos que ya
+la tienen se saltan.
+
+Revision ID: a4c6e8f0b2d3
+Revises: f3b5d7e9a1c2
+Create Date: 2026-10-19 09:12:41.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e8f0b2d3'
+down_revision: Union[str, Sequence[str], None] = 'f3b5d7e9a1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('admin_users'):
+        return
+    op.create_table('admin_users',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', name='uq_admin_users_user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('admin_users')
@@ -0,0 +1,43 @@
+"""Add category hierarchy columns and cache versions
+
+Revision ID: ab6e4f8c3d9e
+Revises: 9d5e3f7a2b8c
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab6e4f8c3d9e'
+down_revision: Union[str, Sequence[str], None] = '9d5e3f7a2b8c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('categories') as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.UUID(), nullable=True))
+        batch_op.add_column(sa.Column('level', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_foreign_key('fk_categories_parent_id_categories', 'categories', ['parent_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_categories_parent_id'), ['parent_id'], unique=False)
+
+    op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cache_versions')
+    with op.batch_alter_table('categories') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_categories_parent_id'))
+        batch_op.drop_constraint('fk_categories_parent_id_categories', type_='foreignkey')
+        batch_op.drop_column('level')
+        batch_op.drop_column('parent_id')
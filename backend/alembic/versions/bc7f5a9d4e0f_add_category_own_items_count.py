@@ -0,0 +1,47 @@
+"""Add own items count to categories and roll up items_count
+
+Revision ID: bc7f5a9d4e0f
+Revises: ab6e4f8c3d9e
+Create Date: 2026-10-19 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bc7f5a9d4e0f'
+down_revision: Union[str, Sequence[str], None] = 'ab6e4f8c3d9e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('categories', sa.Column('own_items_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Ítems publicados (activos y disponibles) de cada categoría
+    op.execute(
+        "UPDATE categories SET own_items_count = ("
+        "SELECT COUNT(*) FROM items i "
+        "WHERE i.category_id = categories.id AND i.is_active AND i.status = 'AVAILABLE')"
+    )
+    # items_count incluye las subcategorías
+    op.execute(
+        "WITH RECURSIVE subtree(root_id, id) AS ("
+        "SELECT id, id FROM categories "
+        "UNION ALL "
+        "SELECT subtree.root_id, c.id FROM categories c JOIN subtree ON c.parent_id = subtree.id) "
+        "UPDATE categories SET items_count = ("
+        "SELECT COALESCE(SUM(d.own_items_count), 0) FROM subtree "
+        "JOIN categories d ON d.id = subtree.id WHERE subtree.root_id = categories.id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE categories SET items_count = ("
+        "SELECT COUNT(*) FROM items i WHERE i.category_id = categories.id AND i.is_active)"
+    )
+    op.drop_column('categories', 'own_items_count')
@@ -0,0 +1,62 @@
+"""Add jobs and job_runs tables for the persisted scheduler
+
+Revision ID: cd8a6b0e5f1a
+Revises: bc7f5a9d4e0f
+Create Date: 2026-10-19 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd8a6b0e5f1a'
+down_revision: Union[str, Sequence[str], None] = 'bc7f5a9d4e0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobs',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('schedule', sa.String(length=100), nullable=False),
+        sa.Column('enabled', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('next_run_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('lease_owner', sa.String(length=100), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_status', sa.String(length=20), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.create_index('ix_jobs_next_run_at', 'jobs', ['next_run_at'])
+
+    op.create_table(
+        'job_runs',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('job_name', sa.String(length=100), nullable=False),
+        sa.Column('worker', sa.String(length=100), nullable=False),
+        sa.Column('attempt', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_job_runs_job_started', 'job_runs', ['job_name', 'started_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_runs_job_started', table_name='job_runs')
+    op.drop_table('job_runs')
+    op.drop_index('ix_jobs_next_run_at', table_name='jobs')
+    op.drop_table('jobs')
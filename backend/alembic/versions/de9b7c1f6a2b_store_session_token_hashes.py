@@ -0,0 +1,68 @@
+"""Store a SHA-256 hash of the refresh token instead of full session tokens
+
+Revision ID: de9b7c1f6a2b
+Revises: cd8a6b0e5f1a
+Create Date: 2026-10-19 15:00:00
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'de9b7c1f6a2b'
+down_revision: Union[str, Sequence[str], None] = 'cd8a6b0e5f1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# company_sessions no está en la migración inicial: sólo se toca si existe
+TABLES = ('user_sessions', 'company_sessions')
+
+
+def _existing_tables():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    return [table for table in TABLES if table in tables]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table in _existing_tables():
+        op.add_column(table, sa.Column('refresh_token_hash', sa.String(length=64), nullable=True))
+
+        # Las sesiones existentes siguen pudiendo renovarse
+        rows = bind.execute(sa.text(f"SELECT id, refresh_token FROM {table}")).all()
+        if rows:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET refresh_token_hash = :hash WHERE id = :id"),
+                [{"id": row.id, "hash": hashlib.sha256(row.refresh_token.encode()).hexdigest()} for row in rows]
+            )
+
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('refresh_token_hash', existing_type=sa.String(length=64), nullable=False)
+            batch_op.drop_index(f'ix_{table}_access_token')
+            batch_op.drop_index(f'ix_{table}_refresh_token')
+            batch_op.drop_column('access_token')
+            batch_op.drop_column('refresh_token')
+            batch_op.create_index(f'ix_{table}_refresh_token_hash', ['refresh_token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    # Los tokens completos no se pueden recuperar: las sesiones quedan revocadas
+    for table in _existing_tables():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('access_token', sa.String(length=500), nullable=True))
+            batch_op.add_column(sa.Column('refresh_token', sa.String(length=500), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET access_token = 'revoked:' || refresh_token_hash, "
+            f"refresh_token = refresh_token_hash, is_active = false, is_revoked = true"
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_refresh_token_hash')
+            batch_op.drop_column('refresh_token_hash')
+            batch_op.alter_column('access_token', existing_type=sa.String(length=500), nullable=False)
+            batch_op.alter_column('refresh_token', existing_type=sa.String(length=500), nullable=False)
+            batch_op.create_index(f'ix_{table}_access_token', ['access_token'], unique=True)
+            batch_op.create_index(f'ix_{table}_refresh_token', ['refresh_token'], unique=True)
@@ -0,0 +1,27 @@
+"""Add (created_at, id) indexes for the paginated admin listings
+
+Revision ID: ef1d3a9c8b4e
+Revises: de9b7c1f6a2b
+Create Date: 2026-10-19 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ef1d3a9c8b4e'
+down_revision: Union[str, Sequence[str], None] = 'de9b7c1f6a2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_items_created_at_id', 'items', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_items_created_at_id', table_name='items')
+    op.drop_index('ix_users_created_at_id', table_name='users')
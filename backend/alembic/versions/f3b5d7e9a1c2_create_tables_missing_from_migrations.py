@@ -0,0 +1,384 @@
+"""Create tables missing from migrations
+
+Hasta ahora estas tablas sólo las creaba ``create_all`` al arrancar la
+aplicación. Las bases de datos existentes ya las tienen (se saltan); en una
+nueva se crean aquí, con el esquema actual de los modelos.
+
+Revision ID: f3b5d7e9a1c2
+Revises: ef1d3a9c8b4e
+Create Date: 2026-10-19 00:53:07.080251
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b5d7e9a1c2'
+down_revision: Union[str, Sequence[str], None] = 'ef1d3a9c8b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tipos enumerados nuevos; en PostgreSQL varias tablas comparten el mismo tipo,
+# así que se crea una vez aparte y las columnas no lo vuelven a crear
+_ENUM_VALUES = {
+    'communityactortype': ('USER', 'COMPANY'),
+    'posttype': ('SUCCESS_STORY', 'TIP', 'GENERAL', 'QUESTION', 'ANNOUNCEMENT'),
+    'communitymediatype': ('NONE', 'IMAGE', 'VIDEO'),
+    'deliverymethod': ('PICKUP', 'DELIVERY', 'SHIPPING', 'DIGITAL', 'ON_SITE'),
+    'contributionstatus': ('DRAFT', 'ACTIVE', 'COMPLETED', 'CANCELLED'),
+}
+_ENUMS = {
+    name: sa.Enum(*values, name=name).with_variant(
+        postgresql.ENUM(*values, name=name, create_type=False), 'postgresql'
+    )
+    for name, values in _ENUM_VALUES.items()
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    if bind.dialect.name == 'postgresql':
+        for name, values in _ENUM_VALUES.items():
+            postgresql.ENUM(*values, name=name).create(bind, checkfirst=True)
+
+    if 'community_counter_deltas' not in existing:
+        op.create_table('community_counter_deltas',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('target', sa.String(length=10), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('field', sa.String(length=30), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_community_counter_deltas_target', 'community_counter_deltas', ['target', 'post_id', 'field'], unique=False)
+
+    if 'community_feed_posts' not in existing:
+        op.create_table('community_feed_posts',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('author_type', _ENUMS['communityactortype'], nullable=False),
+        sa.Column('author_id', sa.UUID(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('post_type', _ENUMS['posttype'], nullable=False),
+        sa.Column('media_type', _ENUMS['communitymediatype'], nullable=False),
+        sa.Column('media_url', sa.String(length=500), nullable=True),
+        sa.Column('likes_count', sa.Integer(), nullable=False),
+        sa.Column('comments_count', sa.Integer(), nullable=False),
+        sa.Column('shares_count', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_community_feed_posts_author_id'), 'community_feed_posts', ['author_id'], unique=False)
+        op.create_index(op.f('ix_community_feed_posts_author_type'), 'community_feed_posts', ['author_type'], unique=False)
+        op.create_index(op.f('ix_community_feed_posts_id'), 'community_feed_posts', ['id'], unique=False)
+        op.create_index(op.f('ix_community_feed_posts_post_type'), 'community_feed_posts', ['post_type'], unique=False)
+
+    if 'companies' not in existing:
+        op.create_table('companies',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('company_name', sa.String(length=100), nullable=False),
+        sa.Column('tax_id', sa.String(length=50), nullable=True),
+        sa.Column('industry', sa.String(length=100), nullable=True),
+        sa.Column('company_size', sa.String(length=50), nullable=True),
+        sa.Column('website', sa.String(length=255), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('bio', sa.Text(), nullable=True),
+        sa.Column('logo_url', sa.String(length=500), nullable=True),
+        sa.Column('contact_name', sa.String(length=100), nullable=True),
+        sa.Column('contact_position', sa.String(length=100), nullable=True),
+        sa.Column('contact_email', sa.String(length=255), nullable=True),
+        sa.Column('contact_phone', sa.String(length=20), nullable=True),
+        sa.Column('address', sa.String(length=500), nullable=True),
+        sa.Column('city', sa.String(length=100), nullable=True),
+        sa.Column('state', sa.String(length=100), nullable=True),
+        sa.Column('country', sa.String(length=100), nullable=True),
+        sa.Column('postal_code', sa.String(length=20), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('is_verified', sa.Boolean(), nullable=False),
+        sa.Column('email_verified', sa.Boolean(), nullable=False),
+        sa.Column('phone_verified', sa.Boolean(), nullable=False),
+        sa.Column('collaboration_type', sa.String(length=50), nullable=True),
+        sa.Column('reputation_score', sa.Float(), nullable=False),
+        sa.Column('total_exchanges', sa.Integer(), nullable=False),
+        sa.Column('successful_exchanges', sa.Integer(), nullable=False),
+        sa.Column('reward_points', sa.Integer(), nullable=False),
+        sa.Column('reward_tier', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_companies_email'), 'companies', ['email'], unique=True)
+        op.create_index(op.f('ix_companies_id'), 'companies', ['id'], unique=False)
+        op.create_index(op.f('ix_companies_username'), 'companies', ['username'], unique=True)
+
+    if 'contribution_categories' not in existing:
+        op.create_table('contribution_categories',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('icon', sa.String(length=50), nullable=True),
+        sa.Column('color', sa.String(length=7), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('sort_order', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+        op.create_index(op.f('ix_contribution_categories_id'), 'contribution_categories', ['id'], unique=False)
+
+    if 'feed_timelines' not in existing:
+        op.create_table('feed_timelines',
+        sa.Column('key', sa.String(length=120), nullable=False),
+        sa.Column('built_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+        )
+
+    if 'reward_events' not in existing:
+        op.create_table('reward_events',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('actor_id', sa.UUID(), nullable=False),
+        sa.Column('actor_type', sa.String(length=10), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('points_delta', sa.Integer(), nullable=False),
+        sa.Column('points_total', sa.Integer(), nullable=False),
+        sa.Column('tier_before', sa.String(length=20), nullable=True),
+        sa.Column('tier_after', sa.String(length=20), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('meta', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_reward_events_actor_id'), 'reward_events', ['actor_id'], unique=False)
+        op.create_index(op.f('ix_reward_events_id'), 'reward_events', ['id'], unique=False)
+
+    if 'rewards' not in existing:
+        op.create_table('rewards',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.String(length=1000), nullable=True),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('points_cost', sa.Integer(), nullable=False),
+        sa.Column('tier_required', sa.String(length=20), nullable=True),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('starts_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('ends_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_rewards_id'), 'rewards', ['id'], unique=False)
+
+    if 'community_feed_comments' not in existing:
+        op.create_table('community_feed_comments',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('actor_type', _ENUMS['communityactortype'], nullable=False),
+        sa.Column('actor_id', sa.UUID(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['community_feed_posts.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_community_feed_comments_actor_id'), 'community_feed_comments', ['actor_id'], unique=False)
+        op.create_index(op.f('ix_community_feed_comments_actor_type'), 'community_feed_comments', ['actor_type'], unique=False)
+        op.create_index(op.f('ix_community_feed_comments_id'), 'community_feed_comments', ['id'], unique=False)
+        op.create_index(op.f('ix_community_feed_comments_post_id'), 'community_feed_comments', ['post_id'], unique=False)
+
+    if 'community_feed_likes' not in existing:
+        op.create_table('community_feed_likes',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('actor_type', _ENUMS['communityactortype'], nullable=False),
+        sa.Column('actor_id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['community_feed_posts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('post_id', 'actor_type', 'actor_id', name='uq_feed_like_post_actor')
+        )
+        op.create_index(op.f('ix_community_feed_likes_actor_id'), 'community_feed_likes', ['actor_id'], unique=False)
+        op.create_index(op.f('ix_community_feed_likes_actor_type'), 'community_feed_likes', ['actor_type'], unique=False)
+        op.create_index(op.f('ix_community_feed_likes_id'), 'community_feed_likes', ['id'], unique=False)
+        op.create_index(op.f('ix_community_feed_likes_post_id'), 'community_feed_likes', ['post_id'], unique=False)
+
+    if 'community_posts' not in existing:
+        op.create_table('community_posts',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('author_id', sa.UUID(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('post_type', _ENUMS['posttype'], nullable=False),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('likes_count', sa.Integer(), nullable=False),
+        sa.Column('comments_count', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('is_pinned', sa.Boolean(), nullable=False),
+        sa.Column('is_approved', sa.Boolean(), nullable=False),
+        sa.Column('moderated_by', sa.UUID(), nullable=True),
+        sa.Column('moderation_notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['moderated_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_community_posts_author_id'), 'community_posts', ['author_id'], unique=False)
+        op.create_index(op.f('ix_community_posts_id'), 'community_posts', ['id'], unique=False)
+        op.create_index(op.f('ix_community_posts_post_type'), 'community_posts', ['post_type'], unique=False)
+
+    if 'company_sessions' not in existing:
+        op.create_table('company_sessions',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('company_id', sa.UUID(), nullable=False),
+        sa.Column('refresh_token_hash', sa.String(length=64), nullable=False),
+        sa.Column('device_info', sa.Text(), nullable=True),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('country', sa.String(length=100), nullable=True),
+        sa.Column('city', sa.String(length=100), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('is_revoked', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('last_activity', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_company_sessions_company_id'), 'company_sessions', ['company_id'], unique=False)
+        op.create_index(op.f('ix_company_sessions_id'), 'company_sessions', ['id'], unique=False)
+        op.create_index(op.f('ix_company_sessions_is_active'), 'company_sessions', ['is_active'], unique=False)
+        op.create_index(op.f('ix_company_sessions_refresh_token_hash'), 'company_sessions', ['refresh_token_hash'], unique=True)
+
+    if 'contributions' not in existing:
+        op.create_table('contributions',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('company_id', sa.UUID(), nullable=False),
+        sa.Column('category_id', sa.UUID(), nullable=False),
+        sa.Column('quantity', sa.String(length=100), nullable=True),
+        sa.Column('estimated_value', sa.Float(), nullable=True),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('destination', sa.Text(), nullable=True),
+        sa.Column('delivery_method', _ENUMS['deliverymethod'], nullable=False),
+        sa.Column('delivery_address', sa.Text(), nullable=True),
+        sa.Column('delivery_instructions', sa.Text(), nullable=True),
+        sa.Column('available_from', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('available_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('status', _ENUMS['contributionstatus'], nullable=False),
+        sa.Column('is_recurring', sa.Boolean(), nullable=False),
+        sa.Column('recurrence_pattern', sa.String(length=50), nullable=True),
+        sa.Column('views_count', sa.Integer(), nullable=False),
+        sa.Column('interested_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['contribution_categories.id'], ),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_contributions_id'), 'contributions', ['id'], unique=False)
+
+    if 'feed_timeline_entries' not in existing:
+        op.create_table('feed_timeline_entries',
+        sa.Column('timeline_key', sa.String(length=120), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['community_feed_posts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['timeline_key'], ['feed_timelines.key'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('timeline_key', 'post_id')
+        )
+        op.create_index(op.f('ix_feed_timeline_entries_post_id'), 'feed_timeline_entries', ['post_id'], unique=False)
+        op.create_index('ix_feed_timeline_entries_rank', 'feed_timeline_entries', ['timeline_key', 'score', 'post_id'], unique=False)
+
+    if 'community_post_comments' not in existing:
+        op.create_table('community_post_comments',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('author_id', sa.UUID(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['post_id'], ['community_posts.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_community_post_comments_author_id'), 'community_post_comments', ['author_id'], unique=False)
+        op.create_index(op.f('ix_community_post_comments_id'), 'community_post_comments', ['id'], unique=False)
+        op.create_index(op.f('ix_community_post_comments_post_id'), 'community_post_comments', ['post_id'], unique=False)
+
+    if 'community_post_likes' not in existing:
+        op.create_table('community_post_likes',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['community_posts.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_community_post_likes_id'), 'community_post_likes', ['id'], unique=False)
+        op.create_index(op.f('ix_community_post_likes_post_id'), 'community_post_likes', ['post_id'], unique=False)
+        op.create_index(op.f('ix_community_post_likes_user_id'), 'community_post_likes', ['user_id'], unique=False)
+
+    if 'contribution_images' not in existing:
+        op.create_table('contribution_images',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('contribution_id', sa.UUID(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('original_filename', sa.String(length=255), nullable=True),
+        sa.Column('file_path', sa.String(length=500), nullable=False),
+        sa.Column('file_size', sa.Integer(), nullable=True),
+        sa.Column('mime_type', sa.String(length=100), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('is_primary', sa.Boolean(), nullable=False),
+        sa.Column('sort_order', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['contribution_id'], ['contributions.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_contribution_images_id'), 'contribution_images', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('contribution_images')
+    op.drop_table('community_post_likes')
+    op.drop_table('community_post_comments')
+    op.drop_table('feed_timeline_entries')
+    op.drop_table('contributions')
+    op.drop_table('company_sessions')
+    op.drop_table('community_posts')
+    op.drop_table('community_feed_likes')
+    op.drop_table('community_feed_comments')
+    op.drop_table('rewards')
+    op.drop_table('reward_events')
+    op.drop_table('feed_timelines')
+    op.drop_table('contribution_categories')
+    op.drop_table('companies')
+    op.drop_table('community_feed_posts')
+    op.drop_table('community_counter_deltas')
+    if op.get_bind().dialect.name == 'postgresql':
+        for name in _ENUMS:
+            postgresql.ENUM(name=name).drop(op.get_bind(), checkfirst=True)
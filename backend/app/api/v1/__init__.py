@@ -13,7 +13,6 @@ from .company_auth import router as company_auth_router
 from .contributions import router as contributions_router
 from .stats import router as stats_router
 from .admin import router as admin_router
-from .admin import router as admin_router
 
 api_router = APIRouter()
 
@@ -95,9 +94,3 @@ api_router.include_router(
     prefix="/admin",
     tags=["admin"]
 )
-
-api_router.include_router(
-    admin_router,
-    prefix="/admin",
-    tags=["admin"]
-)
\ No newline at end of file
@@ -1,44 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from uuid import UUID
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.replicas import get_read_db
 from app.core.dependencies import require_admin, require_owner_admin, validate_uuid
+from app.core.exports import ExportFormat, stream_export
+from app.core.listing import ListingSpec
+from app.core.responses import TrustedJSONResponse
+from app.core.scheduler import scheduler
+from app.core.profiling import profiler, Profile, ProfilerBusyError
+from app.core.security import create_profiling_token
 from app.models.user import User
 from app.models.admin_user import AdminUser
 from app.models.item import Item, ItemStatus
-from app.schemas.user import UserListItem, UserResponse, UserUpdate
+from app.models.job import Job, JobRun
+from app.schemas.user import UserResponse, UserUpdate
 from app.schemas.item import ItemListItem, ItemStatusUpdate
-from app.schemas.admin import AdminRoleUpdate
+from app.services import category_counts, moderation
+from app.services.exports import DATASETS
+from app.schemas.admin import (
+    AdminRoleUpdate,
+    ProfileFormat,
+    ProfileMode,
+    ProfileTokenRequest,
+    ProfileTokenResponse,
+    ProfileListResponse,
+    JobResponse,
+    JobRunResponse,
+    ListingFormat,
+    AdminListingPage,
+    AdminBulkUserAction,
+    AdminBulkItemAction,
+    AdminBulkResult
+)
 
 router = APIRouter()
 
 
-@router.get('/users', response_model=list[UserListItem])
+async def _listing(
+    spec: ListingSpec,
+    db: AsyncSession,
+    params: dict,
+    fields: Optional[str],
+    cursor: Optional[str],
+    page_size: int,
+    format: ListingFormat,
+    gzip: bool
+):
+    selected = spec.fields(fields)
+    conditions = spec.conditions(params, cursor)
+    if format == "ndjson":
+        # Revisión masiva: todas las filas filtradas (desde el cursor, si lo hay) en streaming
+        return stream_export(spec.export(selected), "ndjson", conditions, compress=gzip)
+    return TrustedJSONResponse(await spec.page(db, selected, conditions, page_size))
+
+
+@router.get('/users', response_model=AdminListingPage)
 async def list_users(
+    q: Optional[str] = Query(None, max_length=100),
+    is_active: Optional[bool] = None,
+    city: Optional[str] = Query(None, max_length=100),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_reputation: Optional[float] = None,
+    max_reputation: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Columnas separadas por comas"),
+    cursor: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=500),
+    format: ListingFormat = Query("json"),
+    gzip: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db),
+    admin: User = Depends(require_admin)
+):
+    """Listar usuarios por fecha de alta, paginado por cursor y con filtros (admin)"""
+    params = {
+        "q": q, "is_active": is_active, "city": city,
+        "created_from": created_from, "created_to": created_to,
+        "min_reputation": min_reputation, "max_reputation": max_reputation,
+    }
+    return await _listing(moderation.USERS, db, params, fields, cursor, page_size, format, gzip)
+
+
+@router.post('/users/bulk', response_model=AdminBulkResult)
+async def bulk_update_users(
+    bulk: AdminBulkUserAction,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
-    """Listar usuarios (admin)"""
-    result = await db.execute(select(User))
-    users = result.scalars().all()
-    # Mapear a esquema UserListItem
-    response = []
-    for u in users:
-        response.append(UserListItem(
-            id=u.id,
-            username=u.username,
-            first_name=u.first_name,
-            last_name=u.last_name,
-            full_name=u.full_name,
-            avatar_url=u.avatar_url,
-            city=u.city,
-            is_active=u.is_active,
-            reputation_score=u.reputation_score,
-            total_exchanges=u.total_exchanges
-        ))
-    return response
+    """Activar o desactivar muchos usuarios a la vez (admin)"""
+    ids = list(dict.fromkeys(bulk.ids))
+    active = bulk.action == "activate"
+    if not active and admin.id in ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No puedes desactivar tu propia cuenta")
+    changed = await moderation.set_users_active(db, ids, active)
+    await db.commit()
+    return AdminBulkResult(requested=len(ids), updated=len(changed), ids=changed)
 
 
 @router.get('/users/{user_id}', response_model=UserResponse)
@@ -155,30 +218,48 @@ async def update_user_admin_role(
         return {"message": "Privilegios de administrador revocados"}
 
 
-@router.get('/items', response_model=list[ItemListItem])
+@router.get('/items', response_model=AdminListingPage)
 async def list_items_admin(
+    q: Optional[str] = Query(None, max_length=100),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    is_active: Optional[bool] = None,
+    owner_id: Optional[UUID] = None,
+    category_id: Optional[UUID] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Columnas separadas por comas"),
+    cursor: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=500),
+    format: ListingFormat = Query("json"),
+    gzip: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db),
+    admin: User = Depends(require_admin)
+):
+    """Listar ítems por fecha de publicación, paginado por cursor y con filtros (admin)"""
+    params = {
+        "q": q, "status": status_filter, "is_active": is_active,
+        "owner_id": owner_id, "category_id": category_id,
+        "created_from": created_from, "created_to": created_to,
+    }
+    return await _listing(moderation.ITEMS, db, params, fields, cursor, page_size, format, gzip)
+
+
+@router.post('/items/bulk', response_model=AdminBulkResult)
+async def bulk_update_items(
+    bulk: AdminBulkItemAction,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
-    """Listar ítems (admin)"""
-    result = await db.execute(select(Item))
-    items = result.scalars().all()
-    response = []
-    for it in items:
-        response.append(ItemListItem(
-            id=it.id,
-            title=it.title,
-            slug=str(it.id),
-            condition=it.condition,
-            status=it.status,
-            view_count=it.views_count,
-            interest_count=it.exchange_requests_count,
-            owner_id=it.owner_id,
-            category_id=it.category_id,
-            created_at=it.created_at,
-            updated_at=it.updated_at
-        ))
-    return response
+    """Activar, desactivar o cambiar el estado de muchos ítems a la vez (admin)"""
+    ids = list(dict.fromkeys(bulk.ids))
+    if bulk.action == "set_status":
+        if bulk.status is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Falta el estado a aplicar")
+        changed = await moderation.update_items(db, ids, status=bulk.status)
+    else:
+        changed = await moderation.update_items(db, ids, is_active=bulk.action == "activate")
+    await db.commit()
+    return AdminBulkResult(requested=len(ids), updated=len(changed), ids=changed)
 
 
 @router.patch('/items/{item_id}/status', response_model=ItemListItem)
@@ -195,7 +276,9 @@ async def update_item_status_admin(
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ítem no encontrado")
     if status_update.status:
+        before = category_counts.snapshot(item)
         item.status = status_update.status
+        await category_counts.apply(db, before, category_counts.snapshot(item))
     await db.commit()
     await db.refresh(item)
     return ItemListItem(
@@ -227,7 +310,9 @@ async def update_item_status_admin_put(
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ítem no encontrado")
     if status_update.status:
+        before = category_counts.snapshot(item)
         item.status = status_update.status
+        await category_counts.apply(db, before, category_counts.snapshot(item))
     await db.commit()
     await db.refresh(item)
     return ItemListItem(
@@ -242,4 +327,147 @@ async def update_item_status_admin_put(
         category_id=item.category_id,
         created_at=item.created_at,
         updated_at=item.updated_at
-    )
\ No newline at end of file
+    )
+
+@router.get('/export/{dataset}')
+async def export_dataset(
+    dataset: str,
+    format: ExportFormat = Query("csv"),
+    gzip: bool = Query(False),
+    admin: User = Depends(require_admin)
+):
+    """Exportar categorías, ítems, intercambios o contribuciones en streaming (admin)"""
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exportación no disponible. Opciones: {', '.join(DATASETS)}"
+        )
+    return stream_export(spec, format, compress=gzip)
+
+
+@router.get('/jobs', response_model=list[JobResponse])
+async def list_jobs(
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Listar las tareas periódicas y su estado (admin)"""
+    jobs = (await db.execute(select(Job).order_by(Job.name))).scalars().all()
+    return [
+        JobResponse(
+            name=job.name,
+            schedule=job.schedule,
+            enabled=job.enabled,
+            registered=job.name in scheduler.jobs,
+            next_run_at=job.next_run_at,
+            attempts=job.attempts,
+            lease_owner=job.lease_owner,
+            lease_expires_at=job.lease_expires_at,
+            last_started_at=job.last_started_at,
+            last_finished_at=job.last_finished_at,
+            last_status=job.last_status,
+            last_error=job.last_error
+        )
+        for job in jobs
+    ]
+
+
+@router.get('/jobs/{name}/runs', response_model=list[JobRunResponse])
+async def list_job_runs(
+    name: str,
+    limit: int = Query(20, ge=1, le=200),
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Últimas ejecuciones de una tarea (admin)"""
+    runs = await db.execute(
+        select(JobRun).where(JobRun.job_name == name).order_by(JobRun.started_at.desc()).limit(limit)
+    )
+    return runs.scalars().all()
+
+
+@router.post('/jobs/{name}/run', status_code=status.HTTP_202_ACCEPTED)
+async def run_job(
+    name: str,
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Programar una tarea para su ejecución inmediata (admin)"""
+    if name not in scheduler.jobs or not await scheduler.trigger(db, name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarea no encontrada")
+    await db.commit()
+    return {"message": "Tarea programada", "name": name}
+
+
+def _render_profile(profile: Profile, format: ProfileFormat):
+    if format == "collapsed":
+        return PlainTextResponse(profile.to_collapsed())
+    return JSONResponse(profile.to_speedscope())
+
+
+def _require_profiling_enabled():
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfilado deshabilitado")
+
+
+@router.post('/profiling/capture')
+async def capture_profile(
+    seconds: float = Query(5, gt=0),
+    mode: ProfileMode = Query("wall"),
+    format: ProfileFormat = Query("speedscope"),
+    admin: User = Depends(require_admin)
+):
+    """Capturar un perfil por muestreo de este worker durante N segundos (admin)"""
+    _require_profiling_enabled()
+    if seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {settings.PROFILING_MAX_SECONDS} segundos por captura"
+        )
+    try:
+        sampler = profiler.begin(mode, f"worker captura {seconds}s")
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profiler.finish(sampler)
+    return _render_profile(profile, format)
+
+
+@router.post('/profiling/token', response_model=ProfileTokenResponse)
+async def create_profile_token(
+    token_request: ProfileTokenRequest,
+    admin: User = Depends(require_admin)
+):
+    """Emitir un token para perfilar peticiones individuales con la cabecera X-Profile (admin)"""
+    _require_profiling_enabled()
+    token = create_profiling_token(token_request.mode)
+    return ProfileTokenResponse(
+        token=token,
+        mode=token_request.mode,
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=settings.PROFILING_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+@router.get('/profiling/results', response_model=ProfileListResponse)
+async def list_profiles(
+    admin: User = Depends(require_admin)
+):
+    """Listar los perfiles capturados recientemente en este worker (admin)"""
+    _require_profiling_enabled()
+    return ProfileListResponse(active=profiler.is_active, profiles=profiler.list())
+
+
+@router.get('/profiling/results/{profile_id}')
+async def get_profile(
+    profile_id: str,
+    format: ProfileFormat = Query("speedscope"),
+    admin: User = Depends(require_admin)
+):
+    """Descargar un perfil capturado (admin)"""
+    _require_profiling_enabled()
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado en este worker")
+    return _render_profile(profile, format)
@@ -6,18 +6,20 @@ from typing import Optional
 from datetime import datetime, timedelta
 import traceback
 import logging
+import uuid
 
-from app.core.database import get_db
+from app.core.database import get_db, get_uow
 from app.core.security import (
     verify_password,
-    create_access_token,
-    create_refresh_token,
+    create_session_tokens,
     verify_token,
     get_password_hash,
     create_password_reset_token
 )
 from app.utils.email import send_email
-from app.core.dependencies import get_current_user, get_optional_current_user
+from app.core.dependencies import get_current_user, get_optional_current_user, get_current_session_id
+from app.core.activity import tracker as activity
+from app.core.revocation import revoked_sessions
 from app.core.config import settings
 from app.models.admin_user import AdminUser
 from app.models.user import User
@@ -61,7 +63,7 @@ def get_client_info(request: Request) -> dict:
 async def register(
     user_data: RegisterRequest,
     request: Request,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Registrar un nuevo usuario"""
     logger = logging.getLogger(__name__)
@@ -104,25 +106,25 @@ async def register(
         )
         
         db.add(new_user)
-        await db.commit()
+        await db.flush()
         await db.refresh(new_user)
         
         # Crear tokens
-        access_token = create_access_token(data={"sub": str(new_user.id)})
-        refresh_token = create_refresh_token(data={"sub": str(new_user.id)})
+        session_id = uuid.uuid4()
+        access_token, refresh_token = create_session_tokens(str(new_user.id), session_id)
         
         # Crear sesión
         client_info = get_client_info(request)
         session = UserSession.create_session(
             user_id=new_user.id,
-            access_token=access_token,
             refresh_token=refresh_token,
+            session_id=session_id,
             user_agent=client_info["user_agent"],
             ip_address=client_info["ip_address"]
         )
         
         db.add(session)
-        await db.commit()
+        await db.flush()
         await db.refresh(session)
         
         # Preparar respuesta
@@ -169,10 +171,11 @@ async def register(
             "session_info": session_info
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en registro de usuario: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
-        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error interno del servidor: {str(e)}"
@@ -204,15 +207,15 @@ async def login(
         )
     
     # Crear tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    session_id = uuid.uuid4()
+    access_token, refresh_token = create_session_tokens(str(user.id), session_id)
     
     # Crear sesión
     client_info = get_client_info(request)
     session = UserSession.create_session(
         user_id=user.id,
-        access_token=access_token,
         refresh_token=refresh_token,
+        session_id=session_id,
         user_agent=client_info["user_agent"],
         ip_address=client_info["ip_address"]
     )
@@ -221,6 +224,7 @@ async def login(
     db.add(session)
     await db.commit()
     await db.refresh(session)
+    activity.record_user(user.id, session.id)
     
     # Preparar respuesta
     user_dict = {
@@ -260,8 +264,8 @@ async def refresh_token(
     
     try:
         # Verificar refresh token
-        payload = verify_token(refresh_data.refresh_token)
-        user_id = payload.get("sub")
+        payload = verify_token(refresh_data.refresh_token, "refresh")
+        user_id = payload.get("sub") if payload else None
         
         if not user_id:
             raise HTTPException(
@@ -269,31 +273,28 @@ async def refresh_token(
                 detail="Token inválido"
             )
         
-        # Buscar sesión activa
-        session = UserSession.find_by_refresh_token(db, refresh_data.refresh_token)
-        if not session or not session.is_valid:
+        # Buscar sesión activa (por la huella del refresh token)
+        session = await UserSession.find_by_refresh_token(db, refresh_data.refresh_token)
+        if not session or not session.is_valid or str(session.user_id) != user_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Sesión inválida o expirada"
             )
         
         # Buscar usuario
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, session.user_id)
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Usuario no encontrado o inactivo"
             )
         
-        # Crear nuevos tokens
-        new_access_token = create_access_token(data={"sub": str(user.id)})
-        new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
+        # Crear nuevos tokens de la misma sesión
+        new_access_token, new_refresh_token = create_session_tokens(str(user.id), session.id)
         
         # Actualizar sesión
-        session.access_token = new_access_token
-        session.refresh_token = new_refresh_token
-        session.update_last_activity()
-        db.commit()
+        session.rotate(new_refresh_token)
+        await db.commit()
         
         user_dict = {
             "id": str(user.id),
@@ -323,20 +324,26 @@ async def refresh_token(
 async def logout(
     logout_data: LogoutRequest,
     current_user: User = Depends(get_current_user),
+    session_id: Optional[uuid.UUID] = Depends(get_current_session_id),
     db: AsyncSession = Depends(get_db)
 ):
-    """Cerrar sesión"""
+    """Cerrar sesión (sus tokens de acceso dejan de valer de inmediato)"""
     
     if logout_data.logout_all_devices:
         # Revocar todas las sesiones del usuario
-        UserSession.revoke_all_user_sessions(db, current_user.id)
+        revoked = await UserSession.revoke_all_user_sessions(db, current_user.id)
     else:
-        # Revocar solo la sesión actual
-        if logout_data.refresh_token:
-            session = UserSession.find_by_refresh_token(db, logout_data.refresh_token)
-            if session:
-                session.revoke()
-                db.commit()
+        # Revocar solo la sesión actual: la del token o, en tokens sin sesión, la del refresh token
+        session = await db.get(UserSession, session_id) if session_id else None
+        if session is None and logout_data.refresh_token:
+            session = await UserSession.find_by_refresh_token(db, logout_data.refresh_token)
+        revoked = []
+        if session and session.user_id == current_user.id and session.is_active:
+            session.revoke()
+            revoked.append(session.id)
+    
+    await revoked_sessions.revoke(db, revoked)
+    await db.commit()
     
     return {"message": "Sesión cerrada exitosamente"}
 
@@ -465,18 +472,23 @@ async def check_email_availability(
 @router.get("/sessions", response_model=ActiveSessionsResponse)
 async def get_active_sessions(
     current_user: User = Depends(get_current_user),
+    session_id: Optional[uuid.UUID] = Depends(get_current_session_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Obtener sesiones activas del usuario"""
     
-    sessions = UserSession.get_user_active_sessions(db, current_user.id)
+    sessions = await UserSession.get_user_active_sessions(db, current_user.id)
     
-    session_info_list = [session.to_dict() for session in sessions]
+    session_info_list = []
+    for session in sessions:
+        info = session.to_dict()
+        info["is_current"] = session.id == session_id
+        session_info_list.append(info)
     
     return ActiveSessionsResponse(
         sessions=session_info_list,
         total_sessions=len(sessions),
-        current_session_id=sessions[0].id if sessions else None
+        current_session_id=session_id if session_id else (sessions[0].id if sessions else None)
     )
 
 
@@ -488,10 +500,11 @@ async def revoke_session(
 ):
     """Revocar una sesión específica"""
     
-    session = db.query(UserSession).filter(
+    result = await db.execute(select(UserSession).where(
         UserSession.id == revoke_data.session_id,
         UserSession.user_id == current_user.id
-    ).first()
+    ))
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
@@ -500,7 +513,8 @@ async def revoke_session(
         )
     
     session.revoke()
-    db.commit()
+    await revoked_sessions.revoke(db, [session.id])
+    await db.commit()
     
     return {"message": "Sesión revocada exitosamente"}
 
@@ -509,6 +523,7 @@ async def revoke_session(
 async def change_password(
     password_data: PasswordChangeRequest,
     current_user: User = Depends(get_current_user),
+    session_id: Optional[uuid.UUID] = Depends(get_current_session_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Cambiar contraseña del usuario autenticado"""
@@ -525,9 +540,10 @@ async def change_password(
     current_user.updated_at = datetime.utcnow()
     
     # Revocar todas las sesiones excepto la actual
-    UserSession.revoke_all_user_sessions(db, current_user.id)
+    revoked = await UserSession.revoke_all_user_sessions(db, current_user.id, except_session_id=session_id)
+    await revoked_sessions.revoke(db, revoked)
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Contraseña cambiada exitosamente"}
 
@@ -609,11 +625,12 @@ async def reset_password(
     payload = verify_token(reset_data.token, token_type="password_reset")
     if not payload or payload.get("email") != reset_data.email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token inválido")
-    user = db.query(User).filter(User.email == reset_data.email).first()
+    user = (await db.execute(select(User).where(User.email == reset_data.email))).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
     user.hashed_password = get_password_hash(reset_data.new_password)
     user.updated_at = datetime.utcnow()
-    UserSession.revoke_all_user_sessions(db, user.id)
-    db.commit()
+    revoked = await UserSession.revoke_all_user_sessions(db, user.id)
+    await revoked_sessions.revoke(db, revoked)
+    await db.commit()
     return {"message": "Contraseña restablecida exitosamente"}
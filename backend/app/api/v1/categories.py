@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, case, and_, update, bindparam
+from slugify import slugify
 from typing import Optional, List
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.core.database import get_db
+from app.core.replicas import get_read_db
+from app.core.exports import ExportFormat, stream_export
+from app.core.http_cache import check_not_modified
 from app.core.dependencies import (
     get_current_user, 
     get_current_active_user,
@@ -16,6 +20,7 @@ from app.core.dependencies import (
 from app.models.user import User
 from app.models.category import Category
 from app.models.item import Item, ItemStatus
+from app.models.exchange import Exchange, ExchangeStatus
 from app.schemas.category import (
     CategoryCreate,
     CategoryUpdate,
@@ -24,6 +29,7 @@ from app.schemas.category import (
     PopularCategory,
     CategoryStats,
     CategoryDetailResponse,
+    CategoryBreadcrumb,
     CategorySearchParams,
     CategorySearchResponse,
     CategoryReorderRequest,
@@ -31,10 +37,10 @@ from app.schemas.category import (
     ImportResponse,
     CategorySlugCheck,
     SlugAvailabilityResponse,
-    CategoryHierarchy,
-    CategoryExportFormat,
-    CategoryExportResponse
+    CategoryHierarchy
 )
+from app.services import category_counts, exports
+from app.services.category_tree import MAX_LEVEL, CategoryNode, CategoryTree, category_tree
 
 router = APIRouter()
 
@@ -43,7 +49,7 @@ router = APIRouter()
 async def get_categories(
     search_params: CategorySearchParams = Depends(),
     current_user: Optional[User] = Depends(get_optional_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Obtener lista de categorías"""
     
@@ -129,152 +135,175 @@ async def get_categories(
 @router.get("/popular", response_model=List[PopularCategory])
 async def get_popular_categories(
     limit: int = Query(10, ge=1, le=50),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Obtener categorías más populares"""
     
-    categories = db.query(Category).filter(
-        Category.is_active == True,
-        Category.item_count > 0
-    ).order_by(
-        Category.item_count.desc()
-    ).limit(limit).all()
-    
-    popular_categories = []
-    for category in categories:
-        # Calcular tendencia (comparar con el mes anterior)
-        # TODO: Implementar cálculo real de tendencia
-        trend = "up"  # Simulado por ahora
-        
-        popular_categories.append(PopularCategory(
+    month_ago = datetime.utcnow() - timedelta(days=30)
+    recent_items = (
+        select(func.count(Item.id))
+        .where(
+            Item.category_id == Category.id,
+            Item.is_active == True,
+            Item.status == ItemStatus.AVAILABLE,
+            Item.created_at >= month_ago
+        )
+        .scalar_subquery()
+    )
+    
+    result = await db.execute(
+        select(Category, recent_items)
+        .where(Category.is_active == True, Category.items_count > 0)
+        .order_by(Category.items_count.desc())
+        .limit(limit)
+    )
+    
+    return [
+        PopularCategory(
             id=category.id,
             name=category.name,
             slug=category.slug,
             icon=category.icon,
             color=category.color,
-            item_count=category.item_count,
-            trend=trend,
-            growth_percentage=5.2  # Simulado
-        ))
-    
-    return popular_categories
+            image_url=category.image_url,
+            item_count=category.items_count,
+            recent_items_count=recent_items_count
+        )
+        for category, recent_items_count in result
+    ]
 
 
 @router.get("/hierarchy", response_model=List[CategoryHierarchy])
-async def get_category_hierarchy(
-    db: AsyncSession = Depends(get_db)
-):
-    """Obtener jerarquía completa de categorías"""
-    
-    # Obtener categorías raíz
-    root_categories = db.query(Category).filter(
-        Category.parent_id.is_(None),
-        Category.is_active == True
-    ).order_by(Category.sort_order.asc()).all()
-    
-    def build_hierarchy(category: Category) -> CategoryHierarchy:
-        # Obtener subcategorías
-        children = db.query(Category).filter(
-            Category.parent_id == category.id,
-            Category.is_active == True
-        ).order_by(Category.sort_order.asc()).all()
-        
-        return CategoryHierarchy(
-            id=category.id,
-            name=category.name,
-            slug=category.slug,
-            icon=category.icon,
-            color=category.color,
-            level=category.level,
-            item_count=category.item_count,
-            children=[build_hierarchy(child) for child in children]
+async def get_category_hierarchy(request: Request):
+    """Obtener jerarquía completa de categorías (desde el árbol en memoria)"""
+    
+    tree = await category_tree.get()
+    check_not_modified(request, tree.hierarchy_etag)
+    return Response(
+        content=tree.hierarchy_json,
+        media_type="application/json",
+        headers={"ETag": tree.hierarchy_etag}
+    )
+
+
+def _list_item(node: CategoryNode) -> CategoryListItem:
+    return CategoryListItem(
+        id=node.id,
+        name=node.name,
+        slug=node.slug,
+        icon=node.icon,
+        color=node.color,
+        image_url=node.image_url,
+        item_count=node.item_count,
+        is_active=node.is_active,
+        sort_order=node.sort_order
+    )
+
+
+async def _category_stats(db: AsyncSession, category_id: UUID) -> CategoryStats:
+    """Estadísticas de ítems e intercambios de una categoría"""
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    in_category = Item.category_id == category_id
+    
+    totals = (await db.execute(
+        select(
+            func.count(Item.id),
+            func.coalesce(func.sum(case((and_(Item.is_active == True, Item.status == ItemStatus.AVAILABLE), 1), else_=0)), 0),
+            func.avg(Item.estimated_value),
+            func.coalesce(func.sum(case((Item.created_at >= week_ago, 1), else_=0)), 0)
+        ).where(in_category)
+    )).one()
+    
+    most_common_condition = (await db.execute(
+        select(Item.condition)
+        .where(in_category)
+        .group_by(Item.condition)
+        .order_by(func.count().desc())
+        .limit(1)
+    )).scalar()
+    
+    exchanges = (await db.execute(
+        select(
+            func.coalesce(func.sum(case((Exchange.status == ExchangeStatus.COMPLETED, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Exchange.status == ExchangeStatus.PENDING, 1), else_=0)), 0)
         )
-    
-    return [build_hierarchy(category) for category in root_categories]
+        .join(Item, Item.id == Exchange.requested_item_id)
+        .where(in_category)
+    )).one()
+    
+    return CategoryStats(
+        total_items=totals[0],
+        active_items=totals[1],
+        completed_exchanges=exchanges[0],
+        pending_exchanges=exchanges[1],
+        average_item_value=float(totals[2]) if totals[2] is not None else None,
+        most_common_condition=most_common_condition.value if most_common_condition else None,
+        recent_activity=totals[3]
+    )
 
 
 @router.get("/{category_id}", response_model=CategoryDetailResponse)
 async def get_category(
     category_id: str,
-    current_user: Optional[User] = Depends(get_optional_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Obtener detalles de una categoría"""
+    """Obtener detalles de una categoría por id o por slug"""
     
-    category = db.query(Category).filter(Category.id == category_id).first()
+    tree = await category_tree.get()
+    node = tree.resolve(category_id)
     
-    if not category:
+    if not node or not node.is_active:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Categoría no encontrada"
         )
     
-    # Si no es admin, solo mostrar categorías activas
-    if not (current_user and current_user.is_admin) and not category.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Categoría no encontrada"
+    # Ítems recientes disponibles de la categoría
+    recent_result = await db.execute(
+        select(Item.id, Item.title, Item.condition, Item.estimated_value, Item.created_at)
+        .where(
+            Item.category_id == node.id,
+            Item.status == ItemStatus.AVAILABLE,
+            Item.is_active == True
         )
-    
-    # Obtener categoría padre
-    parent_category = None
-    if category.parent_id:
-        parent_category = db.query(Category).filter(
-            Category.id == category.parent_id
-        ).first()
-    
-    # Obtener subcategorías
-    subcategories = db.query(Category).filter(
-        Category.parent_id == category_id,
-        Category.is_active == True
-    ).order_by(Category.sort_order.asc()).all()
-    
-    # Obtener ítems recientes de la categoría
-    recent_items = db.query(Item).filter(
-        Item.category_id == category_id,
-        Item.status == ItemStatus.AVAILABLE,
-        Item.is_available_for_exchange == True
-    ).order_by(Item.created_at.desc()).limit(6).all()
-    
-    # Calcular estadísticas
-    total_items = db.query(Item).filter(
-        Item.category_id == category_id,
-        Item.status == ItemStatus.AVAILABLE
-    ).count()
-    
-    available_items = db.query(Item).filter(
-        Item.category_id == category_id,
-        Item.status == ItemStatus.AVAILABLE,
-        Item.is_active == True
-    ).count()
-    
-    # Calcular valor promedio
-    avg_value_result = db.query(
-        db.func.avg(Item.estimated_value)
-    ).filter(
-        Item.category_id == category_id,
-        Item.status == ItemStatus.AVAILABLE,
-        Item.estimated_value.isnot(None)
-    ).scalar()
-    
-    avg_value = float(avg_value_result) if avg_value_result else None
-    
-    stats = CategoryStats(
-        total_items=total_items,
-        available_items=available_items,
-        average_value=avg_value,
-        subcategories_count=len(subcategories)
+        .order_by(Item.created_at.desc())
+        .limit(6)
     )
+    recent_items = [
+        {
+            "id": str(item_id),
+            "title": title,
+            "condition": condition.value if condition else None,
+            "estimated_value": estimated_value,
+            "created_at": created_at.isoformat() if created_at else None
+        }
+        for item_id, title, condition, estimated_value, created_at in recent_result
+    ]
     
     return CategoryDetailResponse(
-        **category.__dict__,
-        parent_category=parent_category,
-        subcategories=subcategories,
+        **node.as_dict(),
+        path=[CategoryBreadcrumb(id=a.id, name=a.name, slug=a.slug) for a in tree.path(node.id)],
+        subcategories=[_list_item(child) for child in tree.children(node.id)],
         recent_items=recent_items,
-        stats=stats
+        stats=await _category_stats(db, node.id)
     )
 
 
+def _parent_or_404(tree: CategoryTree, parent_id: UUID) -> CategoryNode:
+    parent = tree.get(parent_id)
+    if not parent or not parent.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Categoría padre no encontrada"
+        )
+    if parent.level + 1 > MAX_LEVEL:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Máximo 4 niveles de categorías permitidos"
+        )
+    return parent
+
+
 @router.post("/", response_model=CategoryResponse)
 async def create_category(
     category_data: CategoryCreate,
@@ -283,58 +312,36 @@ async def create_category(
 ):
     """Crear una nueva categoría (solo administradores)"""
     
-    # Verificar que el slug es único
-    existing_category = db.query(Category).filter(
-        Category.slug == category_data.slug
-    ).first()
+    tree = await category_tree.get()
+    slug = category_data.slug or slugify(category_data.name)
     
-    if existing_category:
+    # Verificar que el slug es único
+    if tree.by_slug(slug):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe una categoría con ese slug"
         )
     
     # Verificar categoría padre si se especifica
-    parent_category = None
     level = 0
-    
     if category_data.parent_id:
-        parent_category = db.query(Category).filter(
-            Category.id == category_data.parent_id,
-            Category.is_active == True
-        ).first()
-        
-        if not parent_category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Categoría padre no encontrada"
-            )
-        
-        level = parent_category.level + 1
-        
-        # Limitar profundidad máxima
-        if level > 3:  # Máximo 4 niveles (0, 1, 2, 3)
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Máximo 4 niveles de categorías permitidos"
-            )
+        level = _parent_or_404(tree, category_data.parent_id).level + 1
     
-    # Obtener siguiente orden de clasificación
-    max_order = db.query(db.func.max(Category.sort_order)).filter(
-        Category.parent_id == category_data.parent_id
-    ).scalar() or 0
+    # Siguiente orden de clasificación entre sus hermanos
+    siblings = tree.children(category_data.parent_id, active_only=False)
+    max_order = max((sibling.sort_order for sibling in siblings), default=0)
     
-    # Crear la categoría
     new_category = Category(
-        **category_data.dict(),
+        **category_data.dict(exclude={"slug", "sort_order"}),
+        slug=slug,
         level=level,
-        sort_order=max_order + 1,
-        created_by=current_user.id
+        sort_order=max_order + 1
     )
     
     db.add(new_category)
-    db.commit()
-    db.refresh(new_category)
+    await category_tree.changed(db)
+    await db.commit()
+    await db.refresh(new_category)
     
     return new_category
 
@@ -342,7 +349,7 @@ async def create_category(
 @router.put("/{category_id}", response_model=CategoryResponse)
 async def update_category(
     category_update: CategoryUpdate,
-    category_id: str,
+    category_id: UUID,
     current_user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
@@ -357,67 +364,65 @@ async def update_category(
             detail="Categoría no encontrada"
         )
     
+    tree = await category_tree.get()
+    
     # Verificar slug único si se está cambiando
     if category_update.slug and category_update.slug != category.slug:
-        result = await db.execute(
-            select(Category).where(
-                Category.slug == category_update.slug,
-                Category.id != category_id
-            )
-        )
-        existing_category = result.scalar_one_or_none()
-        
-        if existing_category:
+        existing = tree.by_slug(category_update.slug)
+        if existing and existing.id != category_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe una categoría con ese slug"
             )
     
     # Verificar categoría padre si se está cambiando
-    if category_update.parent_id is not None:
-        if category_update.parent_id == category_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Una categoría no puede ser padre de sí misma"
-            )
-        
-        if category_update.parent_id:
-            result = await db.execute(
-                select(Category).where(
-                    Category.id == category_update.parent_id,
-                    Category.is_active == True
-                )
-            )
-            parent_category = result.scalar_one_or_none()
-            
-            if not parent_category:
+    update_data = category_update.dict(exclude_unset=True)
+    if "parent_id" in update_data and update_data["parent_id"] != category.parent_id:
+        parent_id = update_data["parent_id"]
+        if parent_id is None:
+            category.level = 0
+        else:
+            if parent_id == category_id:
                 raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Categoría padre no encontrada"
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Una categoría no puede ser padre de sí misma"
                 )
             
             # Verificar que no se cree un ciclo
-            async def check_cycle(parent_id: UUID, target_id: UUID) -> bool:
-                if parent_id == target_id:
-                    return True
-                result = await db.execute(select(Category).where(Category.id == parent_id))
-                parent = result.scalar_one_or_none()
-                if parent and parent.parent_id:
-                    return await check_cycle(parent.parent_id, target_id)
-                return False
-            
-            if await check_cycle(category_update.parent_id, category_id):
+            if tree.is_descendant(parent_id, category_id):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="No se puede crear un ciclo en la jerarquía de categorías"
                 )
+            category.level = _parent_or_404(tree, parent_id).level + 1
+        
+        # El subárbol cambia de nivel con la categoría
+        shift = category.level - tree.get(category_id).level if tree.get(category_id) else 0
+        descendants = tree.descendant_ids(category_id)
+        if shift and descendants:
+            deepest = max(tree.get(d).level for d in descendants) + shift
+            if deepest > MAX_LEVEL:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Máximo 4 niveles de categorías permitidos"
+                )
+            await db.execute(
+                update(Category)
+                .where(Category.id.in_(descendants))
+                .values(level=Category.level + shift)
+                .execution_options(synchronize_session=False)
+            )
+        
+        # Los ítems del subárbol pasan de los ancestros anteriores a los nuevos
+        new_ancestors = (parent_id, *tree.ancestors.get(parent_id, ())) if parent_id else ()
+        await category_counts.moved(db, category.items_count, tree.ancestors.get(category_id, ()), new_ancestors)
     
     # Actualizar campos
-    update_data = category_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(category, field, value)
     
     category.updated_at = datetime.utcnow()
+    await category_tree.changed(db)
     await db.commit()
     await db.refresh(category)
     
@@ -426,13 +431,14 @@ async def update_category(
 
 @router.delete("/{category_id}")
 async def delete_category(
-    category_id: str,
+    category_id: UUID,
     current_user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """Eliminar una categoría (solo administradores)"""
     
-    category = db.query(Category).filter(Category.id == category_id).first()
+    result = await db.execute(select(Category).where(Category.id == category_id))
+    category = result.scalar_one_or_none()
     
     if not category:
         raise HTTPException(
@@ -441,10 +447,12 @@ async def delete_category(
         )
     
     # Verificar que no tiene ítems activos
-    active_items = db.query(Item).filter(
-        Item.category_id == category_id,
-        Item.status == ItemStatus.AVAILABLE
-    ).count()
+    active_items = (await db.execute(
+        select(func.count(Item.id)).where(
+            Item.category_id == category_id,
+            Item.status == ItemStatus.AVAILABLE
+        )
+    )).scalar() or 0
     
     if active_items > 0:
         raise HTTPException(
@@ -453,10 +461,8 @@ async def delete_category(
         )
     
     # Verificar que no tiene subcategorías activas
-    active_subcategories = db.query(Category).filter(
-        Category.parent_id == category_id,
-        Category.is_active == True
-    ).count()
+    tree = await category_tree.get()
+    active_subcategories = len(tree.children(category_id))
     
     if active_subcategories > 0:
         raise HTTPException(
@@ -468,7 +474,8 @@ async def delete_category(
     category.is_active = False
     category.updated_at = datetime.utcnow()
     
-    db.commit()
+    await category_tree.changed(db)
+    await db.commit()
     
     return {"message": "Categoría eliminada exitosamente"}
 
@@ -481,16 +488,18 @@ async def reorder_categories(
 ):
     """Reordenar categorías (solo administradores)"""
     
-    # Actualizar orden de las categorías
-    for order_data in reorder_data.category_orders:
-        category = db.query(Category).filter(
-            Category.id == order_data["id"]
-        ).first()
-        
-        if category:
-            category.sort_order = order_data["sort_order"]
+    # Un solo UPDATE ejecutado por lotes para todas las categorías
+    table = Category.__table__
+    await db.execute(
+        update(table).where(table.c.id == bindparam("b_id")).values(sort_order=bindparam("b_sort_order")),
+        [
+            {"b_id": UUID(str(order_data["id"])), "b_sort_order": order_data["sort_order"]}
+            for order_data in reorder_data.category_orders
+        ]
+    )
     
-    db.commit()
+    await category_tree.changed(db)
+    await db.commit()
     
     return {"message": "Orden de categorías actualizado"}
 
@@ -498,36 +507,31 @@ async def reorder_categories(
 @router.post("/check-slug", response_model=SlugAvailabilityResponse)
 async def check_slug_availability(
     slug_check: CategorySlugCheck,
-    current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_admin)
 ):
-    """Verificar disponibilidad de slug"""
+    """Verificar disponibilidad del slug generado a partir de un nombre"""
     
-    existing_category = db.query(Category).filter(
-        Category.slug == slug_check.slug
-    )
+    tree = await category_tree.get()
     
-    # Excluir la categoría actual si se está editando
-    if slug_check.exclude_id:
-        existing_category = existing_category.filter(
-            Category.id != slug_check.exclude_id
-        )
+    def taken(slug: str) -> bool:
+        existing = tree.by_slug(slug)
+        return existing is not None and existing.id != slug_check.exclude_id
     
-    is_available = existing_category.first() is None
-    
-    suggestions = []
-    if not is_available:
-        # Generar sugerencias de slug
-        base_slug = slug_check.slug
-        for i in range(1, 6):
-            suggested_slug = f"{base_slug}-{i}"
-            if not db.query(Category).filter(Category.slug == suggested_slug).first():
-                suggestions.append(suggested_slug)
+    base_slug = slugify(slug_check.name)
+    if not taken(base_slug):
+        return SlugAvailabilityResponse(
+            available=True,
+            suggested_slug=base_slug,
+            message="Slug disponible"
+        )
     
+    suffix = 1
+    while taken(f"{base_slug}-{suffix}"):
+        suffix += 1
     return SlugAvailabilityResponse(
-        slug=slug_check.slug,
-        is_available=is_available,
-        suggestions=suggestions
+        available=False,
+        suggested_slug=f"{base_slug}-{suffix}",
+        message="El slug ya está en uso"
     )
 
 
@@ -621,55 +625,52 @@ async def import_default_categories(
         }
     ]
     
-    created_count = 0
+    if import_data.categories_to_import:
+        wanted = set(import_data.categories_to_import)
+        default_categories = [c for c in default_categories if c["name"] in wanted]
+    
+    # Todas las categorías existentes por slug, con una sola consulta
+    slugs = [c["slug"] for c in default_categories]
+    slugs += [sub["slug"] for c in default_categories for sub in c.get("subcategories", [])]
+    result = await db.execute(select(Category).where(Category.slug.in_(slugs)))
+    existing_by_slug = {category.slug: category for category in result.scalars()}
+    
+    imported_count = 0
     skipped_count = 0
     
     try:
-        for cat_data in default_categories:
-            # Verificar si ya existe
-            existing = db.query(Category).filter(
-                Category.slug == cat_data["slug"]
-            ).first()
+        for position, cat_data in enumerate(default_categories):
+            fields = {k: v for k, v in cat_data.items() if k != "subcategories"}
+            existing = existing_by_slug.get(cat_data["slug"])
             
             if existing and not import_data.overwrite_existing:
                 skipped_count += 1
-                continue
-            
-            if existing and import_data.overwrite_existing:
+                parent_category = existing
+            elif existing:
                 # Actualizar existente
-                for field, value in cat_data.items():
-                    if field != "subcategories":
-                        setattr(existing, field, value)
+                for field, value in fields.items():
+                    setattr(existing, field, value)
                 existing.updated_at = datetime.utcnow()
                 parent_category = existing
+                imported_count += 1
             else:
                 # Crear nueva
-                parent_category = Category(
-                    name=cat_data["name"],
-                    slug=cat_data["slug"],
-                    description=cat_data["description"],
-                    icon=cat_data["icon"],
-                    color=cat_data["color"],
-                    level=0,
-                    sort_order=created_count,
-                    created_by=current_user.id
-                )
+                parent_category = Category(**fields, level=0, sort_order=position)
                 db.add(parent_category)
-                created_count += 1
+                imported_count += 1
             
-            db.commit()
-            db.refresh(parent_category)
+            # Asignar id sin confirmar para enlazar las subcategorías
+            await db.flush()
             
             # Crear subcategorías
             for i, subcat_data in enumerate(cat_data.get("subcategories", [])):
-                existing_sub = db.query(Category).filter(
-                    Category.slug == subcat_data["slug"]
-                ).first()
+                existing_sub = existing_by_slug.get(subcat_data["slug"])
                 
                 if existing_sub and not import_data.overwrite_existing:
+                    skipped_count += 1
                     continue
                 
-                if existing_sub and import_data.overwrite_existing:
+                if existing_sub:
                     existing_sub.parent_id = parent_category.id
                     existing_sub.name = subcat_data["name"]
                     existing_sub.icon = subcat_data["icon"]
@@ -677,92 +678,44 @@ async def import_default_categories(
                     existing_sub.sort_order = i
                     existing_sub.updated_at = datetime.utcnow()
                 else:
-                    subcategory = Category(
-                        name=subcat_data["name"],
-                        slug=subcat_data["slug"],
-                        icon=subcat_data["icon"],
+                    db.add(Category(
+                        **subcat_data,
                         parent_id=parent_category.id,
                         level=1,
-                        sort_order=i,
-                        created_by=current_user.id
-                    )
-                    db.add(subcategory)
-                    created_count += 1
+                        sort_order=i
+                    ))
+                imported_count += 1
         
-        db.commit()
+        await category_tree.changed(db)
+        await db.commit()
         
         return ImportResponse(
             success=True,
-            message=f"Importación completada. {created_count} categorías creadas/actualizadas, {skipped_count} omitidas.",
-            created_count=created_count,
+            message=f"Importación completada. {imported_count} categorías creadas/actualizadas, {skipped_count} omitidas.",
+            imported_count=imported_count,
             skipped_count=skipped_count
         )
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error durante la importación: {str(e)}"
         )
 
 
-@router.get("/export/{format}", response_model=CategoryExportResponse)
+@router.get("/export/{format}")
 async def export_categories(
-    format: str,
-    current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    format: ExportFormat,
+    include_inactive: bool = Query(False),
+    gzip: bool = Query(False),
+    current_user: User = Depends(require_admin)
 ):
-    """Exportar categorías (solo administradores)"""
-    
-    # Validar formato
-    try:
-        format_enum = CategoryExportFormat(format)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Formato de exportación no válido"
-        )
-    
-    categories = db.query(Category).filter(
-        Category.is_active == True
-    ).order_by(Category.level.asc(), Category.sort_order.asc()).all()
-    
-    if format_enum == CategoryExportFormat.JSON:
-        # Exportar como JSON
-        export_data = []
-        for category in categories:
-            export_data.append({
-                "id": str(category.id),
-                "name": category.name,
-                "slug": category.slug,
-                "description": category.description,
-                "icon": category.icon,
-                "color": category.color,
-                "parent_id": str(category.parent_id) if category.parent_id else None,
-                "level": category.level,
-                "sort_order": category.sort_order,
-                "item_count": category.item_count,
-                "is_active": category.is_active,
-                "created_at": category.created_at.isoformat(),
-                "updated_at": category.updated_at.isoformat() if category.updated_at else None
-            })
-        
-        return CategoryExportResponse(
-            format=format,
-            data=export_data,
-            filename=f"categories_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json",
-            total_records=len(export_data)
-        )
-    
-    elif format_enum == CategoryExportFormat.CSV:
-        # TODO: Implementar exportación CSV
-        raise HTTPException(
-            status_code=status.HTTP_501_NOT_IMPLEMENTED,
-            detail="Exportación CSV no implementada aún"
-        )
+    """Exportar categorías en CSV, NDJSON o JSON, en streaming (solo administradores)
+
+    ``json`` conserva el sobre ``{format, filename, data, total_records}``.
+    """
     
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Formato de exportación no válido"
-        )
\ No newline at end of file
+    conditions = [] if include_inactive else [Category.is_active == True]
+    filename = f"categories_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    return stream_export(exports.CATEGORIES, format, conditions, compress=gzip, filename=filename)
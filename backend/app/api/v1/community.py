@@ -1,12 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, and_, literal
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from datetime import datetime, timedelta
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 import math
 
 from app.core.database import get_db
+from app.core.replicas import get_read_db
+from app.core.loaders import Loaders, get_loaders
+from app.core.responses import TrustedJSONResponse
 from app.models import (
     User,
     Company,
@@ -29,15 +32,19 @@ from app.schemas import (
     PostResponse, LikeResponse, PostAuthor,
     FeedPostCreate, FeedPostList, FeedPost,
     FeedCommentCreate, FeedCommentList, FeedComment,
-    ToggleLikeResponse, ShareResponse, FeedAuthor, ActorType, MediaType
+    ToggleLikeResponse, ShareResponse, FeedAuthor, ActorType, MediaType,
+    FeedTimelinePage, LeaderboardRank, MyLeaderboardResponse
 )
+from app.schemas.community import PostType as FeedPostType
 from app.core.dependencies import get_current_user, get_optional_current_user, get_current_actor, get_optional_actor, CurrentActor
+from app.services import counters, feed_timeline
+from app.services.leaderboard import leaderboard, scope_key as leaderboard_scope
 
 router = APIRouter()
 
 @router.get("/stats", response_model=CommunityStatsResponse)
 async def get_community_stats(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Obtener estadísticas generales de la comunidad"""
     
@@ -74,38 +81,37 @@ async def get_community_stats(
 @router.get("/top-users", response_model=TopUsersResponse)
 async def get_top_users(
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    """Obtener los usuarios más activos de la comunidad"""
+    """Obtener los usuarios más activos de la comunidad (global, por ciudad o por país)"""
     
-    # Consulta para obtener usuarios con sus estadísticas
-    query = (
-        select(
-            User.id,
-            User.username,
-            User.first_name,
-            User.last_name,
-            User.avatar_url,
-            User.city,
-            User.country,
-            User.created_at,
-            func.count(Exchange.id).label('exchanges'),
-            func.coalesce(func.avg(Rating.overall_rating), 0).label('rating')
-        )
-        .select_from(User)
-        .outerjoin(Exchange, (Exchange.requester_id == User.id) | (Exchange.owner_id == User.id))
-        .outerjoin(Rating, Rating.rated_id == User.id)
-        .where(User.is_active == True)
-        .group_by(User.id, User.username, User.first_name, User.last_name, User.avatar_url, User.city, User.country, User.created_at)
-        .order_by(desc('exchanges'), desc('rating'))
-        .limit(limit)
-    )
+    if limit < 1 or limit > 100:
+        limit = 10
     
-    result = await db.execute(query)
-    users_data = result.all()
+    # Clasificación precalculada: intercambios completados y puntos de recompensa
+    ranking = await leaderboard.top(db, leaderboard_scope(city, country), limit)
+    user_ids = [user_id for user_id, _, _ in ranking]
+    users = await loaders.users.load_many(user_ids)
+    
+    # Calificación media sólo de los usuarios mostrados
+    ratings = {}
+    if user_ids:
+        ratings_result = await db.execute(
+            select(Rating.rated_id, func.avg(Rating.overall_rating))
+            .where(Rating.rated_id.in_(user_ids))
+            .group_by(Rating.rated_id)
+        )
+        ratings = dict(ratings_result.all())
     
     top_users = []
-    for user in users_data:
+    for user_id, exchanges, _ in ranking:
+        user = users.get(user_id)
+        if not user:
+            continue
+        rating = ratings.get(user_id)
         full_name = f"{user.first_name} {user.last_name}".strip() if user.first_name or user.last_name else user.username
         top_users.append(TopUser(
             id=str(user.id),
@@ -113,8 +119,8 @@ async def get_top_users(
             username=user.username,
             avatar=user.avatar_url or '/api/placeholder/60/60',
             location=f"{user.city}, {user.country}" if user.city and user.country else user.city or user.country or "Ubicación no especificada",
-            total_exchanges=user.exchanges or 0,
-            rating=round(float(user.rating), 1) if user.rating else 0.0,
+            total_exchanges=exchanges,
+            rating=round(float(rating), 1) if rating else 0.0,
             join_date=user.created_at.strftime('%Y-%m-%d')
         ))
     
@@ -123,12 +129,30 @@ async def get_top_users(
         total=len(top_users)
     )
 
+@router.get("/top-users/me", response_model=MyLeaderboardResponse)
+async def get_my_leaderboard_rank(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Posición del usuario actual en la clasificación global, de su ciudad y de su país"""
+    
+    async def rank_in(scope):
+        found = await leaderboard.rank(db, scope, current_user.id)
+        return LeaderboardRank(scope=scope, **found) if found else None
+    
+    return MyLeaderboardResponse(
+        global_rank=await rank_in(leaderboard_scope()),
+        city_rank=await rank_in(leaderboard_scope(city=current_user.city)) if current_user.city else None,
+        country_rank=await rank_in(leaderboard_scope(country=current_user.country)) if current_user.country else None
+    )
+
 @router.get("/posts", response_model=CommunityPostList)
 async def get_community_posts(
     page: int = 1,
     limit: int = 10,
     post_type: PostType = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Obtener posts de la comunidad con paginación"""
     
@@ -170,15 +194,13 @@ async def get_community_posts(
     # Obtener posts con paginación
     posts_result = await db.execute(query.offset(offset).limit(limit))
     posts = posts_result.scalars().all()
+    live_counts = await counters.read_counts(db, "post", [post.id for post in posts])
+    authors = await loaders.users.load_many(post.author_id for post in posts)
     
     # Convertir a esquemas con información del autor
     posts_data = []
     for post in posts:
-        # Obtener información del autor
-        author_result = await db.execute(
-            select(User).where(User.id == post.author_id)
-        )
-        author = author_result.scalar_one_or_none()
+        author = authors.get(post.author_id)
         
         if author:
             author_data = PostAuthor(
@@ -197,8 +219,8 @@ async def get_community_posts(
                 content=post.content,
                 post_type=post.post_type,
                 image_url=post.image_url,
-                likes_count=post.likes_count,
-                comments_count=post.comments_count,
+                likes_count=live_counts[post.id]["likes_count"],
+                comments_count=live_counts[post.id]["comments_count"],
                 is_active=post.is_active,
                 is_pinned=post.is_pinned,
                 created_at=post.created_at,
@@ -283,14 +305,14 @@ async def toggle_post_like(
     
     # Verificar que el post existe
     post_result = await db.execute(
-        select(CommunityPost).where(
+        select(CommunityPost.id).where(
             CommunityPost.id == post_id,
             CommunityPost.is_active == True
         )
     )
-    post = post_result.scalar_one_or_none()
+    post_uuid = post_result.scalar_one_or_none()
     
-    if not post:
+    if not post_uuid:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post no encontrado"
@@ -308,27 +330,26 @@ async def toggle_post_like(
     if existing_like:
         # Quitar like
         await db.delete(existing_like)
-        post.decrement_likes()
         liked = False
         message = "Like removido"
     else:
         # Agregar like
         new_like = CommunityPostLike(
-            post_id=post.id,
+            post_id=post_uuid,
             user_id=current_user.id
         )
         db.add(new_like)
-        post.increment_likes()
         liked = True
         message = "Like agregado"
     
+    # El contador se consolida en segundo plano (app.services.counters)
+    await counters.record(db, "post", post_uuid, "likes_count", 1 if liked else -1)
     await db.commit()
-    await db.refresh(post)
     
     return LikeResponse(
         message=message,
         liked=liked,
-        likes_count=post.likes_count
+        likes_count=await counters.read_count(db, "post", post_uuid, "likes_count")
     )
 
 
@@ -337,11 +358,113 @@ def _format_location(city: Optional[str], state: Optional[str], country: Optiona
     return ", ".join(parts) if parts else "Colombia"
 
 
+# Tipos de publicación del modelo admitidos por el esquema del feed (el resto como "general")
+_FEED_POST_TYPES = {t: FeedPostType(t.value) for t in PostType if t.value in FeedPostType._value2member_map_}
+
+
 def _user_display_name(user: User) -> str:
     name = f"{user.first_name or ''} {user.last_name or ''}".strip()
     return name if name else user.username
 
 
+def _feed_posts_query(current_actor: Optional[CurrentActor]):
+    """Publicaciones activas con su autor (usuario o empresa) y el "me gusta" del actor actual"""
+    is_liked = literal(False)
+    if current_actor is not None:
+        is_liked = select(CommunityFeedLike.id).where(
+            CommunityFeedLike.post_id == CommunityFeedPost.id,
+            CommunityFeedLike.actor_type == CommunityActorType(current_actor.actor_type),
+            CommunityFeedLike.actor_id == current_actor.id
+        ).exists()
+
+    return (
+        select(
+            CommunityFeedPost.id,
+            CommunityFeedPost.title,
+            CommunityFeedPost.content,
+            CommunityFeedPost.post_type,
+            CommunityFeedPost.media_type,
+            CommunityFeedPost.media_url,
+            counters.live("feed", "likes_count"),
+            counters.live("feed", "comments_count"),
+            counters.live("feed", "shares_count"),
+            CommunityFeedPost.created_at,
+            CommunityFeedPost.author_type,
+            CommunityFeedPost.author_id,
+            User.first_name,
+            User.last_name,
+            User.username,
+            User.avatar_url,
+            User.city,
+            User.state,
+            User.country,
+            Company.company_name,
+            Company.username,
+            Company.logo_url,
+            Company.city,
+            Company.state,
+            Company.country,
+            is_liked.label("is_liked"),
+        )
+        .outerjoin(User, and_(
+            CommunityFeedPost.author_type == CommunityActorType.USER,
+            User.id == CommunityFeedPost.author_id
+        ))
+        .outerjoin(Company, and_(
+            CommunityFeedPost.author_type == CommunityActorType.COMPANY,
+            Company.id == CommunityFeedPost.author_id
+        ))
+        .where(CommunityFeedPost.is_active == True)
+    )
+
+
+def _feed_post_rows(result) -> List[dict]:
+    """Filas de confianza: diccionarios con la forma de FeedPost, sin revalidar"""
+    posts = []
+    for (
+        post_id, title, content, post_type, media_type, media_url, likes_count, comments_count,
+        shares_count, created_at, author_type, author_id,
+        first_name, last_name, username, avatar_url, city, state, country,
+        company_name, company_username, logo_url, company_city, company_state, company_country,
+        liked
+    ) in result:
+        if author_type == CommunityActorType.USER:
+            name = f"{first_name or ''} {last_name or ''}".strip() or username
+            author = {
+                "id": str(author_id),
+                "actor_type": ActorType.user,
+                "name": name or "Usuario",
+                "username": username or "usuario",
+                "avatar": avatar_url or "/api/placeholder/48/48",
+                "location": _format_location(city, state, country)
+            }
+        else:
+            author = {
+                "id": str(author_id),
+                "actor_type": ActorType.company,
+                "name": company_name or "Empresa",
+                "username": company_username or "empresa",
+                "avatar": logo_url or "/api/placeholder/48/48",
+                "location": _format_location(company_city, company_state, company_country)
+            }
+
+        posts.append({
+            "id": str(post_id),
+            "title": title,
+            "content": content,
+            "post_type": _FEED_POST_TYPES.get(post_type, FeedPostType.general),
+            "media_type": media_type,
+            "media_url": media_url,
+            "author": author,
+            "likes_count": likes_count,
+            "comments_count": comments_count,
+            "shares_count": shares_count,
+            "created_at": created_at,
+            "is_liked": bool(liked)
+        })
+    return posts
+
+
 @router.get("/feed", response_model=FeedPostList)
 async def list_feed_posts(
     page: int = Query(1, ge=1),
@@ -357,89 +480,59 @@ async def list_feed_posts(
     offset = (page - 1) * page_size
 
     posts_q = (
-        select(CommunityFeedPost)
-        .where(CommunityFeedPost.is_active == True)
+        _feed_posts_query(current_actor)
         .order_by(CommunityFeedPost.created_at.desc())
         .offset(offset)
         .limit(page_size)
     )
     posts_res = await db.execute(posts_q)
-    posts = posts_res.scalars().all()
 
-    user_ids = set()
-    company_ids = set()
-    for p in posts:
-        if p.author_type == CommunityActorType.USER:
-            user_ids.add(p.author_id)
-        else:
-            company_ids.add(p.author_id)
+    return TrustedJSONResponse({
+        "posts": _feed_post_rows(posts_res),
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_prev": page > 1
+    })
+
+
+@router.get("/feed/home", response_model=FeedTimelinePage)
+async def get_home_feed(
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(20, ge=1, le=50),
+    region: Optional[str] = Query(None, max_length=100, description="Región (estado) para visitantes anónimos"),
+    current_actor: Optional[CurrentActor] = Depends(get_optional_actor),
+    db: AsyncSession = Depends(get_db)
+):
+    """Feed de inicio ordenado por relevancia y paginado por cursor"""
+    if current_actor is not None:
+        viewer = (CommunityActorType(current_actor.actor_type), current_actor.id)
+        key = feed_timeline.timeline_key(*viewer)
+        viewer_region = (current_actor.user or current_actor.company).state
+    else:
+        viewer = None
+        key, viewer_region = await feed_timeline.anonymous_timeline(db, region)
 
-    users_by_id = {}
-    companies_by_id = {}
-    if user_ids:
-        ures = await db.execute(select(User).where(User.id.in_(list(user_ids))))
-        users_by_id = {u.id: u for u in ures.scalars().all()}
-    if company_ids:
-        cres = await db.execute(select(Company).where(Company.id.in_(list(company_ids))))
-        companies_by_id = {c.id: c for c in cres.scalars().all()}
-
-    liked_post_ids = set()
-    if current_actor is not None and posts:
-        like_q = select(CommunityFeedLike.post_id).where(
-            CommunityFeedLike.post_id.in_([p.id for p in posts]),
-            CommunityFeedLike.actor_type == CommunityActorType(current_actor.actor_type),
-            CommunityFeedLike.actor_id == current_actor.id
-        )
-        like_res = await db.execute(like_q)
-        liked_post_ids = set(like_res.scalars().all())
+    # Sólo la primera página puede regenerar el timeline: las siguientes son estables
+    if cursor is None and await feed_timeline.ensure_timeline(db, key, viewer, viewer_region):
+        await db.commit()
 
-    response_posts = []
-    for p in posts:
-        if p.author_type == CommunityActorType.USER:
-            u = users_by_id.get(p.author_id)
-            author = FeedAuthor(
-                id=str(p.author_id),
-                actor_type=ActorType.user,
-                name=_user_display_name(u) if u else "Usuario",
-                username=u.username if u else "usuario",
-                avatar=u.avatar_url if u and u.avatar_url else "/api/placeholder/48/48",
-                location=_format_location(u.city if u else None, u.state if u else None, u.country if u else None)
-            )
-        else:
-            c = companies_by_id.get(p.author_id)
-            author = FeedAuthor(
-                id=str(p.author_id),
-                actor_type=ActorType.company,
-                name=c.company_name if c else "Empresa",
-                username=c.username if c else "empresa",
-                avatar=c.logo_url if c and c.logo_url else "/api/placeholder/48/48",
-                location=_format_location(c.city if c else None, c.state if c else None, c.country if c else None)
-            )
+    post_ids, next_cursor = await feed_timeline.read_timeline(db, key, cursor, limit)
 
-        response_posts.append(FeedPost(
-            id=str(p.id),
-            title=p.title,
-            content=p.content,
-            post_type=p.post_type.value if hasattr(p.post_type, "value") else "general",
-            media_type=p.media_type.value if hasattr(p.media_type, "value") else "none",
-            media_url=p.media_url,
-            author=author,
-            likes_count=p.likes_count,
-            comments_count=p.comments_count,
-            shares_count=p.shares_count,
-            created_at=p.created_at,
-            is_liked=p.id in liked_post_ids
-        ))
+    posts = []
+    if post_ids:
+        posts_res = await db.execute(_feed_posts_query(current_actor).where(CommunityFeedPost.id.in_(post_ids)))
+        by_id = {post["id"]: post for post in _feed_post_rows(posts_res)}
+        # Orden del timeline; las publicaciones desactivadas desaparecen
+        posts = [by_id[str(post_id)] for post_id in post_ids if str(post_id) in by_id]
 
-    return FeedPostList(
-        posts=response_posts,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages,
-        has_next=page < total_pages,
-        has_prev=page > 1
-    )
+    return TrustedJSONResponse({
+        "posts": posts,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    })
 
 
 @router.post("/feed", response_model=FeedPost)
@@ -461,6 +554,12 @@ async def create_feed_post(
         media_url=post_data.media_url
     )
     db.add(post)
+    await db.flush()
+
+    # Fan-out en escritura hacia los timelines vigentes de su audiencia
+    author_entity = current_actor.user or current_actor.company
+    await feed_timeline.fan_out_post(db, post, author_entity.state)
+
     await db.commit()
     await db.refresh(post)
 
@@ -501,22 +600,26 @@ async def create_feed_post(
     )
 
 
-@router.post("/feed/{post_id}/like", response_model=ToggleLikeResponse)
-async def toggle_feed_like(
-    post_id: UUID,
-    current_actor: CurrentActor = Depends(get_current_actor),
-    db: AsyncSession = Depends(get_db)
-):
+async def _ensure_feed_post(db: AsyncSession, post_id: UUID) -> None:
+    """404 si la publicación no existe o está desactivada (sin bloquear su fila)"""
     post_res = await db.execute(
-        select(CommunityFeedPost).where(
+        select(CommunityFeedPost.id).where(
             CommunityFeedPost.id == post_id,
             CommunityFeedPost.is_active == True
         )
     )
-    post = post_res.scalar_one_or_none()
-    if not post:
+    if post_res.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Post no encontrado")
 
+
+@router.post("/feed/{post_id}/like", response_model=ToggleLikeResponse)
+async def toggle_feed_like(
+    post_id: UUID,
+    current_actor: CurrentActor = Depends(get_current_actor),
+    db: AsyncSession = Depends(get_db)
+):
+    await _ensure_feed_post(db, post_id)
+
     like_res = await db.execute(
         select(CommunityFeedLike).where(
             CommunityFeedLike.post_id == post_id,
@@ -528,7 +631,6 @@ async def toggle_feed_like(
 
     if existing_like:
         await db.delete(existing_like)
-        post.decrement_likes()
         liked = False
     else:
         db.add(CommunityFeedLike(
@@ -536,12 +638,11 @@ async def toggle_feed_like(
             actor_type=CommunityActorType(current_actor.actor_type),
             actor_id=current_actor.id
         ))
-        post.increment_likes()
         liked = True
 
+    await counters.record(db, "feed", post_id, "likes_count", 1 if liked else -1)
     await db.commit()
-    await db.refresh(post)
-    return ToggleLikeResponse(liked=liked, likes_count=post.likes_count)
+    return ToggleLikeResponse(liked=liked, likes_count=await counters.read_count(db, "feed", post_id, "likes_count"))
 
 
 @router.post("/feed/{post_id}/share", response_model=ShareResponse)
@@ -549,20 +650,11 @@ async def register_feed_share(
     post_id: UUID,
     db: AsyncSession = Depends(get_db)
 ):
-    post_res = await db.execute(
-        select(CommunityFeedPost).where(
-            CommunityFeedPost.id == post_id,
-            CommunityFeedPost.is_active == True
-        )
-    )
-    post = post_res.scalar_one_or_none()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post no encontrado")
+    await _ensure_feed_post(db, post_id)
 
-    post.increment_shares()
+    await counters.record(db, "feed", post_id, "shares_count")
     await db.commit()
-    await db.refresh(post)
-    return ShareResponse(shares_count=post.shares_count)
+    return ShareResponse(shares_count=await counters.read_count(db, "feed", post_id, "shares_count"))
 
 
 @router.get("/feed/{post_id}/comments", response_model=FeedCommentList)
@@ -570,7 +662,8 @@ async def list_feed_comments(
     post_id: UUID,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     total_q = select(func.count(CommunityFeedComment.id)).where(
         CommunityFeedComment.post_id == post_id,
@@ -592,22 +685,12 @@ async def list_feed_comments(
     comments_res = await db.execute(comments_q)
     comments = comments_res.scalars().all()
 
-    user_ids = set()
-    company_ids = set()
-    for c in comments:
-        if c.actor_type == CommunityActorType.USER:
-            user_ids.add(c.actor_id)
-        else:
-            company_ids.add(c.actor_id)
-
-    users_by_id = {}
-    companies_by_id = {}
-    if user_ids:
-        ures = await db.execute(select(User).where(User.id.in_(list(user_ids))))
-        users_by_id = {u.id: u for u in ures.scalars().all()}
-    if company_ids:
-        cres = await db.execute(select(Company).where(Company.id.in_(list(company_ids))))
-        companies_by_id = {c.id: c for c in cres.scalars().all()}
+    users_by_id = await loaders.users.load_many(
+        c.actor_id for c in comments if c.actor_type == CommunityActorType.USER
+    )
+    companies_by_id = await loaders.companies.load_many(
+        c.actor_id for c in comments if c.actor_type != CommunityActorType.USER
+    )
 
     items = []
     for c in comments:
@@ -656,15 +739,7 @@ async def create_feed_comment(
     current_actor: CurrentActor = Depends(get_current_actor),
     db: AsyncSession = Depends(get_db)
 ):
-    post_res = await db.execute(
-        select(CommunityFeedPost).where(
-            CommunityFeedPost.id == post_id,
-            CommunityFeedPost.is_active == True
-        )
-    )
-    post = post_res.scalar_one_or_none()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post no encontrado")
+    await _ensure_feed_post(db, post_id)
 
     c = CommunityFeedComment(
         post_id=post_id,
@@ -673,7 +748,7 @@ async def create_feed_comment(
         content=comment.content
     )
     db.add(c)
-    post.increment_comments()
+    await counters.record(db, "feed", post_id, "comments_count")
     await db.commit()
     await db.refresh(c)
 
@@ -1,21 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from typing import Optional
 from datetime import datetime, timedelta
 import traceback
 import logging
+import uuid
 
 from app.core.database import get_db
 from app.core.security import (
     verify_password, 
-    create_access_token, 
-    create_refresh_token,
+    create_session_tokens,
+    hash_token,
     verify_token,
     get_password_hash
 )
-from app.core.company_dependencies import get_current_company, get_optional_current_company
+from app.core.company_dependencies import (
+    get_current_company,
+    get_current_company_session_id,
+    get_optional_current_company
+)
+from app.core.activity import tracker as activity
+from app.core.revocation import revoked_sessions
 from app.models.company import Company
 from app.models.company_session import CompanySession
 from app.schemas.company_auth import (
@@ -29,7 +36,7 @@ from app.schemas.company_auth import (
 )
 from app.schemas.company import CompanyResponse, CompanyRewards
 from app.models.contribution import Contribution, ContributionStatus
-from app.models.reward_event import RewardEvent
+from app.services import rewards
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
@@ -111,15 +118,15 @@ async def register_company(
         await db.refresh(new_company)
         
         # Crear tokens
-        access_token = create_access_token(data={"sub": str(new_company.id), "type": "company"})
-        refresh_token = create_refresh_token(data={"sub": str(new_company.id), "type": "company"})
+        session_id = uuid.uuid4()
+        access_token, refresh_token = create_session_tokens(str(new_company.id), session_id)
         
         # Crear sesión
         client_info = get_client_info(request)
         session = CompanySession.create_session(
             company_id=new_company.id,
-            access_token=access_token,
             refresh_token=refresh_token,
+            session_id=session_id,
             user_agent=client_info["user_agent"],
             ip_address=client_info["ip_address"]
         )
@@ -198,15 +205,15 @@ async def login_company(
         )
     
     # Crear tokens
-    access_token = create_access_token(data={"sub": str(company.id), "type": "company"})
-    refresh_token = create_refresh_token(data={"sub": str(company.id), "type": "company"})
+    session_id = uuid.uuid4()
+    access_token, refresh_token = create_session_tokens(str(company.id), session_id)
     
     # Crear sesión
     client_info = get_client_info(request)
     session = CompanySession.create_session(
         company_id=company.id,
-        access_token=access_token,
         refresh_token=refresh_token,
+        session_id=session_id,
         user_agent=client_info["user_agent"],
         ip_address=client_info["ip_address"]
     )
@@ -215,6 +222,7 @@ async def login_company(
     db.add(session)
     await db.commit()
     await db.refresh(session)
+    activity.record_company(company.id, session.id)
     
     # Preparar respuesta
     company_dict = {
@@ -261,26 +269,25 @@ async def refresh_company_token(
     
     try:
         # Verificar refresh token
-        payload = verify_token(refresh_data.refresh_token)
-        company_id = payload.get("sub")
-        token_type = payload.get("type")
+        payload = verify_token(refresh_data.refresh_token, "refresh")
+        company_id = payload.get("sub") if payload else None
         
-        if not company_id or token_type != "company":
+        if not company_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido"
             )
         
-        # Buscar sesión activa
+        # Buscar sesión activa (por la huella del refresh token; sólo existe si es de empresa)
         session_stmt = select(CompanySession).where(
-            CompanySession.refresh_token == refresh_data.refresh_token,
+            CompanySession.refresh_token_hash == hash_token(refresh_data.refresh_token),
             CompanySession.is_active == True,
             CompanySession.is_revoked == False
         )
         result = await db.execute(session_stmt)
         session = result.scalar_one_or_none()
         
-        if not session or session.is_expired:
+        if not session or session.is_expired or str(session.company_id) != company_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Sesión inválida o expirada"
@@ -297,14 +304,11 @@ async def refresh_company_token(
                 detail="Empresa no encontrada o inactiva"
             )
         
-        # Crear nuevos tokens
-        new_access_token = create_access_token(data={"sub": str(company.id), "type": "company"})
-        new_refresh_token = create_refresh_token(data={"sub": str(company.id), "type": "company"})
+        # Crear nuevos tokens de la misma sesión
+        new_access_token, new_refresh_token = create_session_tokens(str(company.id), session.id)
         
         # Actualizar sesión
-        session.access_token = new_access_token
-        session.refresh_token = new_refresh_token
-        session.last_activity = datetime.utcnow()
+        session.rotate(new_refresh_token)
         
         await db.commit()
         await db.refresh(session)
@@ -415,48 +419,8 @@ async def recompute_and_persist_company_rewards(
     current_company: Company = Depends(get_current_company),
     db: AsyncSession = Depends(get_db)
 ):
-    active_contributions = (await db.execute(
-        select(func.count()).select_from(Contribution).where(
-            (Contribution.company_id == current_company.id) &
-            (Contribution.status == ContributionStatus.ACTIVE)
-        )
-    )).scalar() or 0
-    completed_contributions = (await db.execute(
-        select(func.count()).select_from(Contribution).where(
-            (Contribution.company_id == current_company.id) &
-            (Contribution.status == ContributionStatus.COMPLETED)
-        )
-    )).scalar() or 0
-
-    points = int(active_contributions * 20 + completed_contributions * 100 + float(current_company.reputation_score or 0) * 30)
-    tier = 'Bronce'
-    if points >= 100 and points < 300:
-        tier = 'Plata'
-    elif points >= 300 and points < 600:
-        tier = 'Oro'
-    elif points >= 600:
-        tier = 'Platino'
-
-    old_points = current_company.reward_points or 0
-    old_tier = current_company.reward_tier or 'Bronce'
-
-    current_company.reward_points = points
-    current_company.reward_tier = tier
-    current_company.updated_at = datetime.utcnow()
-
-    event = RewardEvent(
-        actor_id=current_company.id,
-        actor_type='company',
-        event_type='recompute',
-        points_delta=int(points - old_points),
-        points_total=points,
-        tier_before=old_tier,
-        tier_after=tier,
-        description='Recomputación de recompensas de empresa',
-        meta=None
-    )
-    db.add(event)
-
+    """Recalcular y guardar los puntos y el nivel de la empresa actual"""
+    await rewards.recompute_companies(db, [current_company.id])
     await db.commit()
     await db.refresh(current_company)
     return current_company
@@ -465,35 +429,40 @@ async def recompute_and_persist_company_rewards(
 async def logout_company(
     logout_data: CompanyLogoutRequest,
     current_company: Company = Depends(get_current_company),
+    session_id: Optional[uuid.UUID] = Depends(get_current_company_session_id),
     db: AsyncSession = Depends(get_db)
 ):
-    """Cerrar sesión de empresa"""
+    """Cerrar sesión de empresa (sus tokens de acceso dejan de valer de inmediato)"""
     
     try:
         if logout_data.logout_all_devices:
             # Revocar todas las sesiones de la empresa
-            session_stmt = select(CompanySession).where(
-                CompanySession.company_id == current_company.id,
-                CompanySession.is_active == True,
-                CompanySession.is_revoked == False
+            result = await db.execute(
+                update(CompanySession)
+                .where(
+                    CompanySession.company_id == current_company.id,
+                    CompanySession.is_active == True,
+                    CompanySession.is_revoked == False
+                )
+                .values(is_active=False, is_revoked=True, revoked_at=func.now())
+                .returning(CompanySession.id)
+                .execution_options(synchronize_session=False)
             )
-            result = await db.execute(session_stmt)
-            sessions = result.scalars().all()
-            
-            for session in sessions:
-                session.is_active = False
-                session.is_revoked = True
-                session.revoked_at = datetime.utcnow()
-            
+            revoked = list(result.scalars())
+            await revoked_sessions.revoke(db, revoked)
             await db.commit()
             
             return CompanyLogoutResponse(
                 message="Se han cerrado todas las sesiones",
-                sessions_closed=len(sessions)
+                sessions_closed=len(revoked)
             )
         else:
-            # Revocar solo la sesión actual
-            if not logout_data.refresh_token:
+            # Revocar solo la sesión actual: la del token o la del refresh_token indicado
+            if logout_data.refresh_token:
+                condition = CompanySession.refresh_token_hash == hash_token(logout_data.refresh_token)
+            elif session_id:
+                condition = CompanySession.id == session_id
+            else:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Se requiere el refresh_token para cerrar la sesión actual"
@@ -501,7 +470,7 @@ async def logout_company(
             
             session_stmt = select(CompanySession).where(
                 CompanySession.company_id == current_company.id,
-                CompanySession.refresh_token == logout_data.refresh_token,
+                condition,
                 CompanySession.is_active == True,
                 CompanySession.is_revoked == False
             )
@@ -517,6 +486,7 @@ async def logout_company(
             session.is_active = False
             session.is_revoked = True
             session.revoked_at = datetime.utcnow()
+            await revoked_sessions.revoke(db, [session.id])
             
             await db.commit()
             
@@ -525,6 +495,8 @@ async def logout_company(
                 sessions_closed=1
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
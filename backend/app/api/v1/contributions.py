@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List, Optional
 from uuid import UUID
+from datetime import datetime
 import logging
 
 from app.core.database import get_db
+from app.core.replicas import get_read_db
+from app.core.filters import SearchSpec, contains, count_statement, eq, gte, lte, paginate
 from app.core.company_dependencies import get_current_company
+from app.core.exports import ExportFormat, stream_export
+from app.core.write_queue import write_queue
 from app.models.company import Company
 from app.models.contribution import Contribution, ContributionStatus, DeliveryMethod
 from app.models.contribution_category import ContributionCategory
@@ -21,10 +27,28 @@ from app.schemas.contribution import (
     ContributionSearchResponse,
     ContributionCategoryResponse
 )
+from app.services import exports
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Filtros admitidos por la búsqueda de contribuciones
+CONTRIBUTION_SEARCH = SearchSpec(
+    filters=[
+        eq("category_id", Contribution.category_id),
+        eq("delivery_method", Contribution.delivery_method),
+        eq("status", Contribution.status),
+        gte("min_value", Contribution.estimated_value),
+        lte("max_value", Contribution.estimated_value),
+        contains("city", Company.city),
+        eq("is_recurring", Contribution.is_recurring),
+        contains("search_query", Contribution.title, Contribution.description, Company.company_name),
+    ],
+    sorts={"created_at": Contribution.created_at},
+    default_sort="created_at",
+    tiebreaker=Contribution.id,
+)
+
 @router.get("/categories", response_model=List[ContributionCategoryResponse])
 async def get_contribution_categories(
     db: AsyncSession = Depends(get_db),
@@ -114,7 +138,7 @@ async def search_contributions(
     search_query: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Buscar contribuciones con filtros"""
     try:
@@ -140,48 +164,24 @@ async def search_contributions(
         )
         
         # Aplicar filtros
-        filters = []
-        
-        if category_id:
-            filters.append(Contribution.category_id == category_id)
-        
-        if delivery_method:
-            filters.append(Contribution.delivery_method == delivery_method)
-        
-        if status:
-            filters.append(Contribution.status == status)
-        
-        if min_value is not None:
-            filters.append(Contribution.estimated_value >= min_value)
-        
-        if max_value is not None:
-            filters.append(Contribution.estimated_value <= max_value)
-        
-        if city:
-            filters.append(Company.city.ilike(f"%{city}%"))
-        
-        if is_recurring is not None:
-            filters.append(Contribution.is_recurring == is_recurring)
-        
-        if search_query:
-            search_filter = or_(
-                Contribution.title.ilike(f"%{search_query}%"),
-                Contribution.description.ilike(f"%{search_query}%"),
-                Company.company_name.ilike(f"%{search_query}%")
-            )
-            filters.append(search_filter)
-        
-        if filters:
-            stmt = stmt.where(and_(*filters))
+        stmt = stmt.where(*CONTRIBUTION_SEARCH.conditions({
+            "category_id": category_id,
+            "delivery_method": delivery_method,
+            "status": status,
+            "min_value": min_value,
+            "max_value": max_value,
+            "city": city,
+            "is_recurring": is_recurring,
+            "search_query": search_query,
+        }))
         
         # Contar total de resultados
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        count_result = await db.execute(count_stmt)
+        count_result = await db.execute(count_statement(stmt))
         total = count_result.scalar()
         
         # Aplicar paginación y ordenamiento
-        stmt = stmt.order_by(Contribution.created_at.desc())
-        stmt = stmt.offset((page - 1) * limit).limit(limit)
+        stmt = CONTRIBUTION_SEARCH.order(stmt, "created_at", "desc")
+        stmt = paginate(stmt, page, limit)
         
         result = await db.execute(stmt)
         contributions_data = result.all()
@@ -251,6 +251,31 @@ async def get_my_contributions(
             detail="Error al obtener las contribuciones"
         )
 
+@router.get("/my/export")
+async def export_my_contributions(
+    format: ExportFormat = Query("csv"),
+    gzip: bool = Query(False),
+    current_company: Company = Depends(get_current_company)
+):
+    """Exportar las contribuciones de la empresa actual en streaming (CSV o NDJSON)"""
+    return stream_export(
+        exports.CONTRIBUTIONS,
+        format,
+        [Contribution.company_id == current_company.id],
+        compress=gzip,
+        filename=f"contributions_{current_company.username}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    )
+
+async def _count_view(db: AsyncSession, contribution_id: UUID) -> int:
+    result = await db.execute(
+        update(Contribution)
+        .where(Contribution.id == contribution_id)
+        .values(views_count=Contribution.views_count + 1)
+        .returning(Contribution.views_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one()
+
 @router.get("/{contribution_id}", response_model=ContributionResponse)
 async def get_contribution(
     contribution_id: UUID,
@@ -272,9 +297,9 @@ async def get_contribution(
                 detail="Contribución no encontrada"
             )
         
-        # Incrementar contador de vistas
-        contribution.views_count += 1
-        await db.commit()
+        # Incrementar contador de vistas (escritura pequeña: se confirma en grupo)
+        views = await write_queue.submit(lambda wdb: _count_view(wdb, contribution.id))
+        set_committed_value(contribution, "views_count", views)
         
         return contribution
         
@@ -1,17 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
 from typing import Optional, List
-from uuid import UUID
-from datetime import datetime, timedelta
+from uuid import UUID, uuid5
+from datetime import datetime, timedelta, timezone
 
-from app.core.database import get_db
+from app.core.database import get_db, get_uow
 from app.core.dependencies import (
     get_current_user, 
     get_current_active_user,
     validate_uuid
 )
+from app.core.loaders import Loaders, get_loaders
 from app.models.user import User
 from app.models.item import Item, ItemStatus
 from app.models.exchange import Exchange, ExchangeStatus
@@ -20,6 +22,7 @@ from app.schemas.exchange import (
     ExchangeCreate,
     ExchangeResponse,
     ExchangeDetailResponse,
+    ExchangeItemInfo,
     ExchangeListItem,
     ExchangeSearchParams,
     ExchangeSearchResponse,
@@ -37,7 +40,9 @@ from app.schemas.exchange import (
     ExchangeSuggestion,
     UserExchangeStats
 )
-from app.schemas.exchange_simple import ExchangeCreateResponse
+from app.schemas.exchange_simple import ExchangeCreateResponse, ExchangeStatusResponse
+from app.services import category_counts
+from app.services.leaderboard import leaderboard
 
 router = APIRouter()
 
@@ -46,7 +51,7 @@ router = APIRouter()
 async def create_exchange(
     exchange_data: ExchangeCreate,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Crear una nueva solicitud de intercambio"""
     
@@ -129,7 +134,7 @@ async def create_exchange(
     )
     
     db.add(new_exchange)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_exchange)
     
     # Crear mensaje inicial si se proporcionó
@@ -142,7 +147,6 @@ async def create_exchange(
             message_type=MessageType.TEXT
         )
         db.add(initial_message)
-        await db.commit()
     
     # TODO: Enviar notificación al propietario del ítem
     
@@ -221,23 +225,45 @@ async def get_exchanges(
     )
 
 
+def _exchange_item_info(item: Item) -> ExchangeItemInfo:
+    """Resumen de un ítem del intercambio (con ``images`` y ``owner`` ya cargados)"""
+    return ExchangeItemInfo(
+        id=item.id,
+        title=item.title,
+        condition=item.condition.value,
+        estimated_value=item.estimated_value,
+        primary_image_url=item.main_image_url,
+        owner_id=item.owner_id,
+        owner_username=item.owner.username,
+        owner_rating=item.owner.reputation_score
+    )
+
+
+def _days_since(moment: datetime) -> int:
+    now = datetime.now(timezone.utc) if moment.tzinfo else datetime.utcnow()
+    return max(0, (now - moment).days)
+
+
 @router.get("/{exchange_id}", response_model=ExchangeDetailResponse)
 async def get_exchange(
     exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
-    # Validate UUID format
-    try:
-        exchange_uuid = UUID(exchange_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid exchange ID format")
     """Obtener detalles de un intercambio"""
     
-    exchange = db.query(Exchange).filter(
-        Exchange.id == exchange_uuid,
-        (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id)
-    ).first()
+    item_options = [
+        selectinload(relation).selectinload(attribute)
+        for relation in (Exchange.requested_item, Exchange.offered_item)
+        for attribute in (Item.images, Item.owner)
+    ]
+    result = await db.execute(
+        select(Exchange).options(*item_options).where(
+            Exchange.id == exchange_id,
+            (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id)
+        )
+    )
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -245,45 +271,70 @@ async def get_exchange(
             detail="Intercambio no encontrado"
         )
     
-    # Obtener mensajes del intercambio
-    messages = db.query(Message).filter(
-        Message.exchange_id == exchange_uuid
-    ).order_by(Message.created_at.asc()).all()
-    
-    # Marcar mensajes como leídos
-    unread_messages = db.query(Message).filter(
-        Message.exchange_id == exchange_uuid,
-        Message.receiver_id == current_user.id,
-        Message.is_read == False
-    ).all()
-    
-    for message in unread_messages:
-        message.is_read = True
-        message.read_at = datetime.utcnow()
+    # Marcar como leídos los mensajes del intercambio
+    await db.execute(
+        update(Message)
+        .where(
+            Message.exchange_id == exchange.id,
+            Message.receiver_id == current_user.id,
+            Message.is_read == False
+        )
+        .values(is_read=True, read_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
     
-    if unread_messages:
-        db.commit()
+    completed_by_me = (
+        exchange.completed_by_requester if current_user.id == exchange.requester_id
+        else exchange.completed_by_owner
+    )
     
     return ExchangeDetailResponse(
-        **exchange.__dict__,
-        messages=messages,
-        unread_count=0  # Ya se marcaron como leídos
+        id=exchange.id,
+        status=exchange.status,
+        requester_id=exchange.requester_id,
+        owner_id=exchange.owner_id,
+        requester_item=_exchange_item_info(exchange.offered_item) if exchange.offered_item else None,
+        owner_item=_exchange_item_info(exchange.requested_item),
+        initial_message=exchange.initial_message,
+        proposed_cash_difference=exchange.additional_payment_amount,
+        final_cash_difference=None,
+        meeting_date=exchange.meeting_datetime,
+        meeting_location=exchange.meeting_location,
+        meeting_notes=None,
+        requester_meeting_confirmed=exchange.meeting_confirmed_by_requester,
+        owner_meeting_confirmed=exchange.meeting_confirmed_by_owner,
+        requester_completed=exchange.completed_by_requester,
+        owner_completed=exchange.completed_by_owner,
+        completion_notes=exchange.completion_notes,
+        created_at=exchange.created_at,
+        updated_at=exchange.updated_at,
+        accepted_at=exchange.accepted_at,
+        meeting_confirmed_at=exchange.confirmed_at,
+        completed_at=exchange.completed_at,
+        cancelled_at=exchange.cancelled_at,
+        status_display=exchange.status_display,
+        can_cancel=exchange.can_be_cancelled,
+        can_confirm_meeting=exchange.status == ExchangeStatus.CONFIRMED and not completed_by_me,
+        can_complete=exchange.status == ExchangeStatus.CONFIRMED,
+        days_since_created=_days_since(exchange.created_at)
     )
 
 
-@router.put("/{exchange_id}", response_model=ExchangeResponse)
+@router.put("/{exchange_id}", response_model=ExchangeStatusResponse)
 async def update_exchange(
     exchange_update: ExchangeUpdate,
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Actualizar un intercambio"""
+    """Actualizar la propuesta de un intercambio pendiente"""
     
-    exchange = db.query(Exchange).filter(
+    stmt = select(Exchange).where(
         Exchange.id == exchange_id,
-        (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id)
-    ).first()
+        Exchange.requester_id == current_user.id
+    )
+    result = await db.execute(stmt)
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -291,48 +342,25 @@ async def update_exchange(
             detail="Intercambio no encontrado"
         )
     
-    # Solo el propietario puede aceptar/rechazar
-    if exchange_update.status in [ExchangeStatus.ACCEPTED, ExchangeStatus.REJECTED]:
-        if current_user.id != exchange.owner_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo el propietario puede aceptar o rechazar el intercambio"
-            )
-        
-        if exchange.status != ExchangeStatus.PENDING:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Solo se pueden aceptar/rechazar intercambios pendientes"
-            )
+    # Solo se puede modificar la propuesta mientras el propietario no responde
+    if exchange.status != ExchangeStatus.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Solo se pueden modificar intercambios pendientes"
+        )
     
     # Actualizar campos permitidos
-    if exchange_update.status:
-        exchange.status = exchange_update.status
-    
-    if exchange_update.meeting_date:
-        exchange.meeting_date = exchange_update.meeting_date
+    if exchange_update.message:
+        exchange.initial_message = exchange_update.message
     
-    if exchange_update.meeting_location:
-        exchange.meeting_location = exchange_update.meeting_location
-    
-    if exchange_update.notes:
-        exchange.notes = exchange_update.notes
+    if exchange_update.proposed_cash_difference is not None:
+        exchange.requires_additional_payment = exchange_update.proposed_cash_difference > 0
+        exchange.additional_payment_amount = str(exchange_update.proposed_cash_difference)
     
     exchange.updated_at = datetime.utcnow()
     
-    # Actualizar fecha de estado si cambió
-    if exchange_update.status:
-        if exchange_update.status == ExchangeStatus.ACCEPTED:
-            exchange.accepted_at = datetime.utcnow()
-        elif exchange_update.status == ExchangeStatus.REJECTED:
-            exchange.rejected_at = datetime.utcnow()
-        elif exchange_update.status == ExchangeStatus.COMPLETED:
-            exchange.completed_at = datetime.utcnow()
-        elif exchange_update.status == ExchangeStatus.CANCELLED:
-            exchange.cancelled_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(exchange)
+    await db.commit()
+    await db.refresh(exchange)
     
     # TODO: Enviar notificación a la otra parte
     
@@ -341,7 +369,7 @@ async def update_exchange(
 
 @router.post("/{exchange_id}/accept", response_model=ExchangeResponse)
 async def accept_exchange(
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -379,17 +407,19 @@ async def accept_exchange(
 
 @router.post("/{exchange_id}/reject", response_model=ExchangeResponse)
 async def reject_exchange(
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Rechazar un intercambio"""
     
-    exchange = db.query(Exchange).filter(
+    stmt = select(Exchange).where(
         Exchange.id == exchange_id,
         Exchange.owner_id == current_user.id,
         Exchange.status == ExchangeStatus.PENDING
-    ).first()
+    )
+    result = await db.execute(stmt)
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -401,28 +431,35 @@ async def reject_exchange(
     exchange.rejected_at = datetime.utcnow()
     exchange.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(exchange)
+    await db.commit()
+    await db.refresh(exchange)
     
     # TODO: Enviar notificación al solicitante
     
-    return exchange
+    return ExchangeResponse(
+        action="reject",
+        message="Intercambio rechazado",
+        counter_cash_difference=None
+    )
 
 
-@router.post("/{exchange_id}/meeting", response_model=ExchangeResponse)
+@router.post("/{exchange_id}/meeting", response_model=ExchangeStatusResponse)
 async def arrange_meeting(
     meeting_info: MeetingInfoUpdate,
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Organizar encuentro para el intercambio"""
     
-    exchange = db.query(Exchange).filter(
+    # Aceptado, o ya con encuentro si se cambia la cita
+    stmt = select(Exchange).where(
         Exchange.id == exchange_id,
         (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id),
-        Exchange.status == ExchangeStatus.ACCEPTED
-    ).first()
+        Exchange.status.in_([ExchangeStatus.ACCEPTED, ExchangeStatus.CONFIRMED])
+    )
+    result = await db.execute(stmt)
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -431,34 +468,69 @@ async def arrange_meeting(
         )
     
     # Actualizar información del encuentro
-    exchange.meeting_date = meeting_info.meeting_date
+    exchange.meeting_datetime = meeting_info.meeting_date
     exchange.meeting_location = meeting_info.meeting_location
-    exchange.meeting_notes = meeting_info.meeting_notes
-    exchange.status = ExchangeStatus.MEETING_ARRANGED
+    exchange.status = ExchangeStatus.CONFIRMED
+    exchange.confirmed_at = datetime.utcnow()
     exchange.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(exchange)
+    await db.commit()
+    await db.refresh(exchange)
     
     # TODO: Enviar notificación a ambas partes
     
     return exchange
 
 
-@router.post("/{exchange_id}/confirm", response_model=ExchangeResponse)
+async def _mark_items_exchanged(db: AsyncSession, exchange: Exchange) -> None:
+    """Marcar como intercambiados los ítems del intercambio, con sus contadores de categoría"""
+    item_ids = [item_id for item_id in (exchange.requested_item_id, exchange.offered_item_id) if item_id]
+    result = await db.execute(select(Item).where(Item.id.in_(item_ids)))
+    
+    changes = []
+    for item in result.scalars().all():
+        before = category_counts.snapshot(item)
+        item.status = ItemStatus.EXCHANGED
+        changes.append((before, category_counts.snapshot(item)))
+    await category_counts.apply_many(db, changes)
+
+
+async def _complete_if_confirmed(db: AsyncSession, exchange: Exchange, *conditions, **values) -> bool:
+    """Pasar el intercambio de CONFIRMED a COMPLETED con una sola UPDATE condicional
+
+    Devuelve ``True`` sólo si esta llamada hizo la transición (y entonces marca
+    los ítems como intercambiados): con peticiones concurrentes, gana una.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(Exchange)
+        .where(Exchange.id == exchange.id, Exchange.status == ExchangeStatus.CONFIRMED, *conditions)
+        .values(status=ExchangeStatus.COMPLETED, completed_at=now, updated_at=now, **values)
+        .returning(Exchange.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        return False
+    await _mark_items_exchanged(db, exchange)
+    return True
+
+
+@router.post("/{exchange_id}/confirm", response_model=ExchangeStatusResponse)
 async def confirm_exchange(
     confirmation: MeetingConfirmation,
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Confirmar que el intercambio se realizó"""
     
-    exchange = db.query(Exchange).filter(
+    stmt = select(Exchange).where(
         Exchange.id == exchange_id,
         (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id),
-        Exchange.status == ExchangeStatus.MEETING_ARRANGED
-    ).first()
+        Exchange.status == ExchangeStatus.CONFIRMED
+    )
+    result = await db.execute(stmt)
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -466,53 +538,57 @@ async def confirm_exchange(
             detail="Intercambio no encontrado o no está listo para confirmar"
         )
     
-    # Marcar confirmación del usuario actual
-    if current_user.id == exchange.requester_id:
-        exchange.requester_confirmed = True
-        exchange.requester_confirmed_at = datetime.utcnow()
-    else:
-        exchange.owner_confirmed = True
-        exchange.owner_confirmed_at = datetime.utcnow()
-    
-    # Si ambos confirmaron, marcar como completado
-    if exchange.requester_confirmed and exchange.owner_confirmed:
-        exchange.status = ExchangeStatus.COMPLETED
-        exchange.completed_at = datetime.utcnow()
-        
-        # Marcar ítems como intercambiados
-        requester_item = db.query(Item).filter(Item.id == exchange.requester_item_id).first()
-        owner_item = db.query(Item).filter(Item.id == exchange.owner_item_id).first()
-        
-        if requester_item:
-            requester_item.status = ItemStatus.EXCHANGED
-            requester_item.is_available_for_exchange = False
-        
-        if owner_item:
-            owner_item.status = ItemStatus.EXCHANGED
-            owner_item.is_available_for_exchange = False
+    # Marcar confirmación del usuario actual; sólo mientras siga CONFIRMED
+    flag = "completed_by_requester" if current_user.id == exchange.requester_id else "completed_by_owner"
+    result = await db.execute(
+        update(Exchange)
+        .where(Exchange.id == exchange.id, Exchange.status == ExchangeStatus.CONFIRMED)
+        .values({flag: True, "updated_at": datetime.utcnow()})
+        .returning(Exchange.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Intercambio no encontrado o no está listo para confirmar"
+        )
     
-    exchange.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(exchange)
+    # Si ambos confirmaron, marcar como completado. La UPDATE anterior bloquea
+    # la fila, así que la segunda confirmación ve la bandera de la primera y
+    # sólo una de las dos peticiones hace la transición.
+    completed = await _complete_if_confirmed(
+        db, exchange,
+        Exchange.completed_by_requester.is_(True),
+        Exchange.completed_by_owner.is_(True),
+        **({"completion_notes": confirmation.notes} if confirmation.notes else {})
+    )
+    
+    await db.commit()
+    await db.refresh(exchange)
+    
+    if completed:
+        await leaderboard.exchange_completed(exchange)
     
     # TODO: Enviar notificación a la otra parte
     
     return exchange
 
 
-@router.post("/{exchange_id}/complete", response_model=ExchangeResponse)
+@router.post("/{exchange_id}/complete", response_model=ExchangeStatusResponse)
 async def complete_exchange(
     completion: ExchangeCompletion,
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Completar un intercambio"""
     
-    exchange = db.query(Exchange).filter(
+    stmt = select(Exchange).where(
         Exchange.id == exchange_id,
         (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id)
-    ).first()
+    )
+    result = await db.execute(stmt)
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -520,51 +596,49 @@ async def complete_exchange(
             detail="Intercambio no encontrado"
         )
     
-    if exchange.status != ExchangeStatus.MEETING_ARRANGED:
+    if exchange.status != ExchangeStatus.CONFIRMED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El intercambio debe estar en estado 'encuentro organizado' para completarse"
+            detail="El intercambio debe tener un encuentro organizado para completarse"
         )
     
-    # Completar intercambio
-    exchange.status = ExchangeStatus.COMPLETED
-    exchange.completed_at = datetime.utcnow()
-    exchange.completion_notes = completion.notes
-    exchange.updated_at = datetime.utcnow()
-    
-    # Marcar ítems como intercambiados
-    requester_item = db.query(Item).filter(Item.id == exchange.requester_item_id).first()
-    owner_item = db.query(Item).filter(Item.id == exchange.owner_item_id).first()
-    
-    if requester_item:
-        requester_item.status = ItemStatus.EXCHANGED
-        requester_item.is_available_for_exchange = False
-    
-    if owner_item:
-        owner_item.status = ItemStatus.EXCHANGED
-        owner_item.is_available_for_exchange = False
+    # Completar intercambio, salvo que otra petición se haya adelantado
+    completed = await _complete_if_confirmed(
+        db, exchange,
+        completed_by_requester=True,
+        completed_by_owner=True,
+        completion_notes=completion.completion_notes
+    )
+    if not completed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El intercambio debe tener un encuentro organizado para completarse"
+        )
     
-    db.commit()
-    db.refresh(exchange)
+    await db.commit()
+    await db.refresh(exchange)
+    await leaderboard.exchange_completed(exchange)
     
     # TODO: Enviar notificación para calificar el intercambio
     
     return exchange
 
 
-@router.post("/{exchange_id}/cancel", response_model=ExchangeResponse)
+@router.post("/{exchange_id}/cancel", response_model=ExchangeStatusResponse)
 async def cancel_exchange(
     cancellation: ExchangeCancellation,
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Cancelar un intercambio"""
     
-    exchange = db.query(Exchange).filter(
+    stmt = select(Exchange).where(
         Exchange.id == exchange_id,
         (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id)
-    ).first()
+    )
+    result = await db.execute(stmt)
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -578,15 +652,13 @@ async def cancel_exchange(
             detail="No se puede cancelar un intercambio completado o ya cancelado"
         )
     
-    # Cancelar intercambio
+    # Cancelar intercambio (el modelo no guarda el motivo)
     exchange.status = ExchangeStatus.CANCELLED
     exchange.cancelled_at = datetime.utcnow()
-    exchange.cancellation_reason = cancellation.reason
-    exchange.cancellation_notes = cancellation.notes
     exchange.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(exchange)
+    await db.commit()
+    await db.refresh(exchange)
     
     # TODO: Enviar notificación a la otra parte
     
@@ -595,16 +667,18 @@ async def cancel_exchange(
 
 @router.get("/{exchange_id}/timeline", response_model=List[ExchangeTimelineEvent])
 async def get_exchange_timeline(
-    exchange_id: str,
+    exchange_id: UUID,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Obtener línea de tiempo del intercambio"""
     
-    exchange = db.query(Exchange).filter(
+    result = await db.execute(select(Exchange).where(
         Exchange.id == exchange_id,
         (Exchange.requester_id == current_user.id) | (Exchange.owner_id == current_user.id)
-    ).first()
+    ))
+    exchange = result.scalar_one_or_none()
     
     if not exchange:
         raise HTTPException(
@@ -612,63 +686,35 @@ async def get_exchange_timeline(
             detail="Intercambio no encontrado"
         )
     
-    timeline = []
-    
-    # Evento de creación
-    timeline.append(ExchangeTimelineEvent(
-        event_type="created",
-        timestamp=exchange.created_at,
-        description="Intercambio creado",
-        user_id=exchange.requester_id
-    ))
-    
-    # Evento de aceptación
-    if exchange.accepted_at:
-        timeline.append(ExchangeTimelineEvent(
-            event_type="accepted",
-            timestamp=exchange.accepted_at,
-            description="Intercambio aceptado",
-            user_id=exchange.owner_id
-        ))
-    
-    # Evento de rechazo
-    if exchange.rejected_at:
-        timeline.append(ExchangeTimelineEvent(
-            event_type="rejected",
-            timestamp=exchange.rejected_at,
-            description="Intercambio rechazado",
-            user_id=exchange.owner_id
-        ))
-    
-    # Evento de encuentro organizado
-    if exchange.status == ExchangeStatus.MEETING_ARRANGED:
-        timeline.append(ExchangeTimelineEvent(
-            event_type="meeting_arranged",
-            timestamp=exchange.updated_at,
-            description="Encuentro organizado",
-            user_id=None
-        ))
-    
-    # Evento de finalización
-    if exchange.completed_at:
-        timeline.append(ExchangeTimelineEvent(
-            event_type="completed",
-            timestamp=exchange.completed_at,
-            description="Intercambio completado",
-            user_id=None
-        ))
-    
-    # Evento de cancelación
-    if exchange.cancelled_at:
-        timeline.append(ExchangeTimelineEvent(
-            event_type="cancelled",
-            timestamp=exchange.cancelled_at,
-            description="Intercambio cancelado",
-            user_id=None
-        ))
+    loaders.users.prime(current_user)
+    users = await loaders.users.load_many([exchange.requester_id, exchange.owner_id])
+    
+    # (tipo, momento, título, descripción, usuario)
+    events = [
+        ("created", exchange.created_at, "Intercambio creado", "Intercambio solicitado", exchange.requester_id),
+        ("accepted", exchange.accepted_at, "Intercambio aceptado", "El propietario aceptó el intercambio", exchange.owner_id),
+        ("rejected", exchange.rejected_at, "Intercambio rechazado", "El propietario rechazó el intercambio", exchange.owner_id),
+        ("meeting_arranged", exchange.confirmed_at, "Encuentro organizado", "Se acordó lugar y fecha del encuentro", None),
+        ("completed", exchange.completed_at, "Intercambio completado", "El intercambio se realizó", None),
+        ("cancelled", exchange.cancelled_at, "Intercambio cancelado", "El intercambio se canceló", None),
+    ]
+    
+    timeline = [
+        ExchangeTimelineEvent(
+            id=uuid5(exchange.id, event_type),
+            event_type=event_type,
+            title=title,
+            description=description,
+            user_id=user_id,
+            user_username=users[user_id].username if user_id in users else None,
+            created_at=moment
+        )
+        for event_type, moment, title, description, user_id in events
+        if moment is not None
+    ]
     
     # Ordenar por fecha
-    timeline.sort(key=lambda x: x.timestamp)
+    timeline.sort(key=lambda event: event.created_at)
     
     return timeline
 
@@ -6,9 +6,10 @@ from uuid import UUID
 import os
 import shutil
 from datetime import datetime
-from PIL import Image
+from decimal import Decimal
 
-from app.core.database import get_db
+from app.core.database import get_db, get_uow
+from app.core.replicas import get_read_db
 from app.core.dependencies import (
     get_current_user, 
     get_current_active_user,
@@ -16,16 +17,18 @@ from app.core.dependencies import (
     validate_uuid
 )
 from app.core.config import settings
+from app.core.filters import SearchSpec, Sort, contains, count_statement, eq, gte, lte, paginate
+from app.core.responses import TrustedJSONResponse
 from app.models.user import User
 from app.models.item import Item, ItemStatus, ItemCondition
 from app.models.item_image import ItemImage
 from app.models.category import Category
-from app.models.exchange import Exchange
+from app.models.exchange import Exchange, ExchangeStatus
+from app.services import category_counts
 from app.schemas.item import (
     ItemCreate,
     ItemUpdate,
     ItemResponse,
-    ItemListItem,
     ItemSearchParams,
     ItemSearchResponse,
     ItemInterestRequest,
@@ -43,6 +46,46 @@ from app.schemas.item import (
 
 router = APIRouter()
 
+# Filtros y ordenamientos admitidos por la búsqueda de ítems. La ubicación es la
+# del dueño: los ítems no guardan ciudad/estado/país propios.
+ITEM_SEARCH = SearchSpec(
+    filters=[
+        contains("query", Item.title, Item.description),
+        eq("category_id", Item.category_id),
+        eq("condition", Item.condition),
+        gte("min_value", Item.estimated_value),
+        lte("max_value", Item.estimated_value),
+        contains("city", User.city),
+        contains("state", User.state),
+        contains("country", User.country),
+        gte("created_after", Item.created_at),
+        lte("created_before", Item.created_at),
+    ],
+    sorts={
+        "created_at": Item.created_at,
+        "updated_at": Item.updated_at,
+        "title": Item.title,
+        "estimated_value": Sort(Item.estimated_value, nulls_last=True),
+        "view_count": Item.views_count,
+        # Sin coordenadas de referencia no hay distancia: se ordena por fecha
+        "distance": Item.created_at,
+    },
+    default_sort="created_at",
+    tiebreaker=Item.id,
+)
+
+# Textos de presentación precalculados para los listados
+_CONDITION_DISPLAY = {c: c.value.replace('_', ' ').title() for c in ItemCondition}
+_STATUS_DISPLAY = {s: s.value.replace('_', ' ').title() for s in ItemStatus}
+
+
+def _primary_image_url():
+    """Subconsulta con la URL de la imagen principal de cada ítem"""
+    return select(ItemImage.image_url).where(
+        ItemImage.item_id == Item.id,
+        ItemImage.is_primary == True
+    ).limit(1).correlate(Item).scalar_subquery().label("primary_image_url")
+
 
 def save_item_image(file: UploadFile, item_id: UUID) -> tuple[str, dict]:
     """Guardar imagen de ítem y retornar URL y metadatos"""
@@ -60,8 +103,10 @@ def save_item_image(file: UploadFile, item_id: UUID) -> tuple[str, dict]:
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
-    # Obtener dimensiones de la imagen
+    # Obtener dimensiones de la imagen (PIL sólo se carga al subir imágenes)
     try:
+        from PIL import Image
+
         with Image.open(file_path) as img:
             width, height = img.size
     except Exception:
@@ -81,11 +126,66 @@ def save_item_image(file: UploadFile, item_id: UUID) -> tuple[str, dict]:
     return url, metadata
 
 
+async def _item_response(db: AsyncSession, item: Item, owner: User, category: Optional[Category] = None) -> dict:
+    """Datos de ``ItemResponse`` de un ítem (propietario, categoría e imágenes)"""
+    if category is None or category.id != item.category_id:
+        category = await db.get(Category, item.category_id)
+    images = (await db.execute(
+        select(ItemImage).where(ItemImage.item_id == item.id).order_by(ItemImage.sort_order)
+    )).scalars().all()
+    return {
+        "id": item.id,
+        "title": item.title,
+        "description": item.description,
+        "category_id": item.category_id,
+        "condition": item.condition,
+        "estimated_value": item.estimated_value,
+        "owner_id": item.owner_id,
+        "status": item.status,
+        "slug": str(item.id),  # Usar ID como slug temporal
+        "view_count": item.views_count,
+        "interest_count": item.exchange_requests_count,
+        "created_at": item.created_at,
+        "updated_at": item.updated_at,
+        "location_description": item.location_description,
+        "latitude": item.latitude,
+        "longitude": item.longitude,
+        "allow_partial_exchange": item.allow_partial_exchange,
+        "owner": {
+            "id": owner.id,
+            "username": owner.username,
+            "email": owner.email
+        },
+        "category": {
+            "id": category.id,
+            "name": category.name,
+            "slug": category.slug
+        },
+        "images": [
+            {
+                "id": image.id,
+                "url": image.image_url,
+                "original_filename": image.original_filename or "",
+                "file_size": image.file_size or 0,
+                "width": image.width,
+                "height": image.height,
+                "is_primary": image.is_primary,
+                "sort_order": image.sort_order,
+                "alt_text": image.alt_text,
+                "created_at": image.created_at
+            }
+            for image in images
+        ],
+        "condition_display": item.condition.value,
+        "status_display": item.status.value
+    }
+
+
 @router.post("/", response_model=ItemResponse)
 async def create_item(
     item_data: ItemCreate,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Crear un nuevo ítem"""
     
@@ -132,225 +232,95 @@ async def create_item(
     )
     
     db.add(new_item)
-    await db.commit()
-    await db.refresh(new_item)
+    await db.flush()
     
-    # Actualizar contador de ítems en la categoría
-    await category.update_items_count(db)
-    
-    # Construir respuesta manualmente
-    response_data = {
-        "id": new_item.id,
-        "title": new_item.title,
-        "description": new_item.description,
-        "category_id": new_item.category_id,
-        "condition": new_item.condition,
-        "estimated_value": new_item.estimated_value,
-        "owner_id": new_item.owner_id,
-        "status": new_item.status,
-        "slug": str(new_item.id),  # Usar ID como slug temporal
-        "view_count": new_item.views_count,
-        "interest_count": new_item.exchange_requests_count,
-        "created_at": new_item.created_at,
-        "updated_at": new_item.updated_at,
-        "location_description": new_item.location_description,
-        "latitude": new_item.latitude,
-        "longitude": new_item.longitude,
-        "allow_partial_exchange": new_item.allow_partial_exchange,
-        "owner": {
-            "id": current_user.id,
-            "username": current_user.username,
-            "email": current_user.email
-        },
-        "category": {
-            "id": category.id,
-            "name": category.name,
-            "slug": category.slug
-        },
-        "images": [],
-        "condition_display": new_item.condition.value,
-        "status_display": new_item.status.value
-    }
+    # Actualizar contadores de ítems de la categoría y sus ancestros
+    await category_counts.apply(db, new=category_counts.snapshot(new_item))
+    await db.refresh(new_item)
     
-    return response_data
+    return await _item_response(db, new_item, current_user, category)
 
 
 @router.get("/", response_model=ItemSearchResponse)
 async def search_items(
     search_params: ItemSearchParams = Depends(),
     current_user: Optional[User] = Depends(get_optional_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Buscar ítems"""
     
-    query = select(Item, User.username, User.reputation_score, User.city, User.state, Category.name, Category.icon, Category.color).join(
+    query = select(
+        Item.id,
+        Item.title,
+        Item.condition,
+        Item.estimated_value,
+        Item.status,
+        Item.views_count,
+        Item.favorites_count,
+        Item.created_at,
+        User.username,
+        User.reputation_score,
+        User.city,
+        User.state,
+        Category.name,
+        Category.icon,
+        Category.color,
+    ).join(
         User, Item.owner_id == User.id
     ).join(
         Category, Item.category_id == Category.id
-    ).filter(
+    ).where(
         Item.status == ItemStatus.AVAILABLE,
-        Item.is_active == True
+        Item.is_active == True,
+        *ITEM_SEARCH.conditions(search_params)
     )
     
-    # Filtrar por consulta de texto
-    if search_params.query:
-        search_term = f"%{search_params.query}%"
-        query = query.filter(
-            (Item.title.ilike(search_term)) |
-            (Item.description.ilike(search_term))
-        )
-    
-    # Filtrar por categoría
-    if search_params.category_id:
-        query = query.filter(Item.category_id == search_params.category_id)
-    
-    # Filtrar por condición
-    if search_params.condition:
-        query = query.filter(Item.condition == search_params.condition)
-    
-    # Filtrar por rango de valor
-    if search_params.min_value:
-        query = query.filter(Item.estimated_value >= search_params.min_value)
-    if search_params.max_value:
-        query = query.filter(Item.estimated_value <= search_params.max_value)
-    
-    # Filtrar por ubicación
-    if search_params.city:
-        query = query.filter(Item.city.ilike(f"%{search_params.city}%"))
-    if search_params.state:
-        query = query.filter(Item.state.ilike(f"%{search_params.state}%"))
-    if search_params.country:
-        query = query.filter(Item.country.ilike(f"%{search_params.country}%"))
-    
-    # Filtrar por diferencia en efectivo
-    if search_params.accepts_cash_difference is not None:
-        query = query.filter(Item.accepts_cash_difference == search_params.accepts_cash_difference)
-    
-    # Filtrar por fechas
-    if search_params.created_after:
-        query = query.filter(Item.created_at >= search_params.created_after)
-    if search_params.created_before:
-        query = query.filter(Item.created_at <= search_params.created_before)
-    
     # Excluir ítems del usuario actual si está autenticado
     if current_user:
-        query = query.filter(Item.owner_id != current_user.id)
+        query = query.where(Item.owner_id != current_user.id)
     
     # Contar total con los mismos filtros
-    count_query = select(func.count(Item.id)).select_from(
-        Item.__table__.join(User.__table__, Item.owner_id == User.id).join(Category.__table__, Item.category_id == Category.id)
-    ).filter(
-        Item.status == ItemStatus.AVAILABLE,
-        Item.is_active == True
-    )
-    
-    # Aplicar los mismos filtros que en la consulta principal
-    if search_params.query:
-        search_term = f"%{search_params.query}%"
-        count_query = count_query.filter(
-            (Item.title.ilike(search_term)) |
-            (Item.description.ilike(search_term))
-        )
-    
-    if search_params.category_id:
-        count_query = count_query.filter(Item.category_id == search_params.category_id)
-    
-    if search_params.condition:
-        count_query = count_query.filter(Item.condition == search_params.condition)
-    
-    if search_params.min_value:
-        count_query = count_query.filter(Item.estimated_value >= search_params.min_value)
-    if search_params.max_value:
-        count_query = count_query.filter(Item.estimated_value <= search_params.max_value)
-    
-    if search_params.city:
-        count_query = count_query.filter(Item.city.ilike(f"%{search_params.city}%"))
-    if search_params.state:
-        count_query = count_query.filter(Item.state.ilike(f"%{search_params.state}%"))
-    if search_params.country:
-        count_query = count_query.filter(Item.country.ilike(f"%{search_params.country}%"))
-    
-    if search_params.accepts_cash_difference is not None:
-        count_query = count_query.filter(Item.accepts_cash_difference == search_params.accepts_cash_difference)
-    
-    if search_params.created_after:
-        count_query = count_query.filter(Item.created_at >= search_params.created_after)
-    if search_params.created_before:
-        count_query = count_query.filter(Item.created_at <= search_params.created_before)
-    
-    if current_user:
-        count_query = count_query.filter(Item.owner_id != current_user.id)
-    
-    total_result = await db.execute(count_query)
+    total_result = await db.execute(count_statement(query))
     total = total_result.scalar()
     
+    # Imagen principal en la misma consulta (subconsulta correlacionada)
+    query = query.add_columns(_primary_image_url())
+    
     # Ordenamiento
-    if search_params.sort_by == "title":
-        if search_params.sort_order == "desc":
-            query = query.order_by(Item.title.desc())
-        else:
-            query = query.order_by(Item.title.asc())
-    elif search_params.sort_by == "estimated_value":
-        if search_params.sort_order == "desc":
-            query = query.order_by(Item.estimated_value.desc().nulls_last())
-        else:
-            query = query.order_by(Item.estimated_value.asc().nulls_last())
-    elif search_params.sort_by == "view_count":
-        if search_params.sort_order == "desc":
-            query = query.order_by(Item.views_count.desc())
-        else:
-            query = query.order_by(Item.views_count.asc())
-    elif search_params.sort_by == "updated_at":
-        if search_params.sort_order == "desc":
-            query = query.order_by(Item.updated_at.desc())
-        else:
-            query = query.order_by(Item.updated_at.asc())
-    else:  # created_at por defecto
-        if search_params.sort_order == "desc":
-            query = query.order_by(Item.created_at.desc())
-        else:
-            query = query.order_by(Item.created_at.asc())
+    query = ITEM_SEARCH.order(query, search_params.sort_by, search_params.sort_order)
     
     # Paginación
-    offset = (search_params.page - 1) * search_params.page_size
-    items_query = query.offset(offset).limit(search_params.page_size)
-    items_result = await db.execute(items_query)
-    raw_items = items_result.all()
-    
-    # Procesar los resultados para crear objetos ItemListItem
-    items = []
-    for row in raw_items:
-        item, username, reputation_score, city, state, category_name, category_icon, category_color = row
-        
-        # Obtener imagen principal
-        primary_image_query = select(ItemImage.image_url).filter(
-            ItemImage.item_id == item.id,
-            ItemImage.is_primary == True
-        ).limit(1)
-        primary_image_result = await db.execute(primary_image_query)
-        primary_image_url = primary_image_result.scalar()
-        
-        item_data = ItemListItem(
-            id=item.id,
-            title=item.title,
-            condition=item.condition,
-            estimated_value=item.estimated_value,
-            city=city,
-            state=state,
-            status=item.status,
-            view_count=item.views_count,
-            interest_count=item.favorites_count,
-            created_at=item.created_at,
-            primary_image_url=primary_image_url,
-            owner_username=username,
-            owner_rating=reputation_score,
-            category_name=category_name,
-            category_icon=category_icon,
-            category_color=category_color,
-            condition_display=item.condition.value.replace('_', ' ').title(),
-            status_display=item.status.value.replace('_', ' ').title()
-        )
-        items.append(item_data)
+    items_result = await db.execute(paginate(query, search_params.page, search_params.page_size))
+    
+    # Filas de confianza: diccionarios con la forma de ItemListItem, sin revalidar
+    items = [
+        {
+            "id": item_id,
+            "title": title,
+            "condition": condition,
+            "estimated_value": Decimal(str(estimated_value)) if estimated_value is not None else None,
+            "city": city,
+            "state": state,
+            "status": item_status,
+            "view_count": views_count,
+            "interest_count": favorites_count,
+            "created_at": created_at,
+            "primary_image_url": primary_image_url,
+            "owner_username": username,
+            "owner_rating": reputation_score,
+            "category_name": category_name,
+            "category_icon": category_icon,
+            "category_color": category_color,
+            "distance_km": None,
+            "condition_display": _CONDITION_DISPLAY[condition],
+            "status_display": _STATUS_DISPLAY[item_status]
+        }
+        for (
+            item_id, title, condition, estimated_value, item_status, views_count, favorites_count,
+            created_at, username, reputation_score, city, state, category_name, category_icon,
+            category_color, primary_image_url
+        ) in items_result
+    ]
     
     # Calcular páginas
     total_pages = (total + search_params.page_size - 1) // search_params.page_size
@@ -358,8 +328,8 @@ async def search_items(
     # Obtener categorías sugeridas basadas en la búsqueda
     suggested_categories = []
     if search_params.query:
-        categories_query = select(Category).filter(
-            Category.name.ilike(f"%{search_params.query}%"),
+        categories_query = select(Category).where(
+            Category.name.icontains(search_params.query, autoescape=True),
             Category.is_active == True
         ).limit(5)
         categories_result = await db.execute(categories_query)
@@ -367,42 +337,42 @@ async def search_items(
         suggested_categories = [{
             "id": str(cat.id),
             "name": cat.name,
-            "item_count": cat.item_count
+            "item_count": cat.items_count
         } for cat in categories]
     
     # Obtener ciudades cercanas
     nearby_cities = []
     if search_params.city:
-        cities = db.query(Item.city).filter(
-            Item.city.ilike(f"%{search_params.city}%"),
-            Item.city.isnot(None),
+        cities_query = select(User.city).join(Item, Item.owner_id == User.id).where(
+            User.city.icontains(search_params.city, autoescape=True),
             Item.status == ItemStatus.AVAILABLE
-        ).distinct().limit(5).all()
-        nearby_cities = [city[0] for city in cities if city[0]]
-    
-    return ItemSearchResponse(
-        items=items,
-        total=total,
-        page=search_params.page,
-        page_size=search_params.page_size,
-        total_pages=total_pages,
-        has_next=search_params.page < total_pages,
-        has_prev=search_params.page > 1,
-        search_params=search_params.dict(),
-        suggested_categories=suggested_categories,
-        nearby_cities=nearby_cities
-    )
+        ).distinct().limit(5)
+        cities_result = await db.execute(cities_query)
+        nearby_cities = [city for city in cities_result.scalars().all() if city]
+    
+    return TrustedJSONResponse({
+        "items": items,
+        "total": total,
+        "page": search_params.page,
+        "page_size": search_params.page_size,
+        "total_pages": total_pages,
+        "has_next": search_params.page < total_pages,
+        "has_prev": search_params.page > 1,
+        "search_params": search_params.model_dump(),
+        "suggested_categories": suggested_categories,
+        "nearby_cities": nearby_cities
+    })
 
 
 @router.get("/{item_id}", response_model=ItemResponse)
 async def get_item(
     item_id: str,
     current_user: Optional[User] = Depends(get_optional_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Obtener detalles de un ítem"""
     
-    item = db.query(Item).filter(Item.id == item_id).first()
+    item = await db.get(Item, validate_uuid(item_id))
     
     if not item:
         raise HTTPException(
@@ -421,9 +391,11 @@ async def get_item(
     # Incrementar contador de vistas (solo si no es el propietario)
     if not current_user or current_user.id != item.owner_id:
         item.increment_views()
-        db.commit()
+        await db.flush()
+        await db.refresh(item)
     
-    return item
+    owner = current_user if current_user and current_user.id == item.owner_id else await db.get(User, item.owner_id)
+    return await _item_response(db, item, owner)
 
 
 @router.put("/{item_id}", response_model=ItemResponse)
@@ -431,14 +403,15 @@ async def update_item(
     item_update: ItemUpdate,
     item_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Actualizar un ítem"""
     
-    item = db.query(Item).filter(
-        Item.id == item_id,
+    result = await db.execute(select(Item).where(
+        Item.id == validate_uuid(item_id),
         Item.owner_id == current_user.id
-    ).first()
+    ))
+    item = result.scalar_one_or_none()
     
     if not item:
         raise HTTPException(
@@ -448,10 +421,10 @@ async def update_item(
     
     # Verificar que la nueva categoría existe (si se está cambiando)
     if item_update.category_id and item_update.category_id != item.category_id:
-        category = db.query(Category).filter(
+        category = (await db.execute(select(Category).where(
             Category.id == item_update.category_id,
             Category.is_active == True
-        ).first()
+        ))).scalar_one_or_none()
         
         if not category:
             raise HTTPException(
@@ -460,29 +433,33 @@ async def update_item(
             )
     
     # Actualizar campos
+    before = category_counts.snapshot(item)
     update_data = item_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(item, field, value)
     
     item.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(item)
+    await category_counts.apply(db, before, category_counts.snapshot(item))
+    await db.flush()
+    await db.refresh(item)
     
-    return item
+    return await _item_response(db, item, current_user)
 
 
 @router.delete("/{item_id}")
 async def delete_item(
     item_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Eliminar un ítem (cambiar estado a removido)"""
     
-    item = db.query(Item).filter(
-        Item.id == item_id,
+    item_uuid = validate_uuid(item_id)
+    result = await db.execute(select(Item).where(
+        Item.id == item_uuid,
         Item.owner_id == current_user.id
-    ).first()
+    ))
+    item = result.scalar_one_or_none()
     
     if not item:
         raise HTTPException(
@@ -491,10 +468,15 @@ async def delete_item(
         )
     
     # Verificar que no hay intercambios activos
-    active_exchanges = db.query(Exchange).filter(
-        (Exchange.requester_item_id == item_id) | (Exchange.owner_item_id == item_id),
-        Exchange.status.in_(["pending", "accepted", "meeting_arranged"])
-    ).count()
+    active_exchanges = (await db.execute(select(func.count(Exchange.id)).where(
+        (Exchange.requested_item_id == item_uuid) | (Exchange.offered_item_id == item_uuid),
+        Exchange.status.in_([
+            ExchangeStatus.PENDING,
+            ExchangeStatus.ACCEPTED,
+            ExchangeStatus.CONFIRMED,
+            ExchangeStatus.IN_PROGRESS
+        ])
+    ))).scalar()
     
     if active_exchanges > 0:
         raise HTTPException(
@@ -503,11 +485,12 @@ async def delete_item(
         )
     
     # Cambiar estado a removido
-    item.status = ItemStatus.REMOVED
-    item.is_available_for_exchange = False
+    before = category_counts.snapshot(item)
+    item.status = ItemStatus.INACTIVE
+    item.is_active = False
     item.updated_at = datetime.utcnow()
     
-    db.commit()
+    await category_counts.apply(db, before, category_counts.snapshot(item))
     
     return {"message": "Ítem eliminado exitosamente"}
 
@@ -955,14 +938,15 @@ async def update_item_status(
     status_data: ItemStatusUpdate,
     item_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Actualizar estado de un ítem"""
     
-    item = db.query(Item).filter(
-        Item.id == item_id,
+    result = await db.execute(select(Item).where(
+        Item.id == validate_uuid(item_id),
         Item.owner_id == current_user.id
-    ).first()
+    ))
+    item = result.scalar_one_or_none()
     
     if not item:
         raise HTTPException(
@@ -971,19 +955,15 @@ async def update_item_status(
         )
     
     # Actualizar estado
-    item.status = status_update.status
-    
-    # Si se pausa o remueve, marcar como no disponible
-    if status_update.status in [ItemStatus.PAUSED, ItemStatus.REMOVED]:
-        item.is_available_for_exchange = False
-    elif status_update.status == ItemStatus.AVAILABLE:
-        item.is_available_for_exchange = True
+    before = category_counts.snapshot(item)
+    item.status = status_data.status
     
     item.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(item)
+    await category_counts.apply(db, before, category_counts.snapshot(item))
+    await db.flush()
+    await db.refresh(item)
     
-    return item
+    return await _item_response(db, item, current_user)
 
 
 @router.post("/{item_id}/duplicate", response_model=ItemResponse)
@@ -1,12 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_, func, case, literal, union_all
 from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
+import json
 
-from app.core.database import get_db
+from app.core.database import get_db, get_uow
+from app.core.activity import tracker as activity
 from app.core.dependencies import get_current_user, get_current_active_user
+from app.core.filters import SearchSpec, contains, count_statement, custom, eq, gte, lte, paginate
+from app.core.loaders import Loaders, get_loaders
+from app.core.responses import TrustedJSONResponse
 from app.models.user import User
 from app.models.message import Message, MessageType
 from app.models.exchange import Exchange
@@ -14,7 +20,6 @@ from app.schemas.message import (
     MessageCreate,
     MessageResponse,
     MessageListItem,
-    ConversationResponse,
     ConversationListResponse,
     MessageSearchParams,
     MessageSearchResponse,
@@ -24,212 +29,246 @@ from app.schemas.message import (
 
 router = APIRouter()
 
+# Filtros y ordenamientos admitidos por la búsqueda de mensajes
+MESSAGE_SEARCH = SearchSpec(
+    filters=[
+        contains("query", Message.content),
+        custom("conversation_with", lambda user_id: or_(
+            Message.sender_id == user_id,
+            Message.receiver_id == user_id
+        )),
+        eq("exchange_id", Message.exchange_id),
+        eq("message_type", Message.message_type),
+        gte("created_after", Message.created_at),
+        lte("created_before", Message.created_at),
+    ],
+    sorts={
+        "created_at": Message.created_at,
+        "updated_at": Message.updated_at,
+    },
+    default_sort="created_at",
+    tiebreaker=Message.id,
+)
+
 @router.get("/conversations", response_model=ConversationListResponse)
 async def get_conversations(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener lista de conversaciones del usuario"""
     
-    # Obtener conversaciones donde el usuario es participante
-    conversations_query = db.query(Message).filter(
-        or_(
-            Message.sender_id == current_user.id,
-            Message.receiver_id == current_user.id
-        )
-    ).distinct(Message.sender_id, Message.receiver_id)
-    
-    # Agrupar por conversación (combinación de usuarios)
+    # Mensajes del usuario etiquetados con el interlocutor; cada rama usa su índice
+    sent = select(
+        Message.receiver_id.label("other_id"),
+        Message.id.label("message_id"),
+        Message.created_at.label("created_at"),
+        literal(0).label("unread")
+    ).where(Message.sender_id == current_user.id)
+    received = select(
+        Message.sender_id.label("other_id"),
+        Message.id.label("message_id"),
+        Message.created_at.label("created_at"),
+        case((Message.is_read == False, 1), else_=0).label("unread")
+    ).where(
+        Message.receiver_id == current_user.id,
+        Message.sender_id != current_user.id
+    )
+    conversation_messages = union_all(sent, received).cte("conversation_messages")
+    
+    # Una fila por conversación con sus estadísticas
+    stats = select(
+        conversation_messages.c.other_id,
+        func.count().label("total_messages"),
+        func.sum(conversation_messages.c.unread).label("unread_count"),
+        func.min(conversation_messages.c.created_at).label("first_at"),
+        func.max(conversation_messages.c.created_at).label("last_at")
+    ).group_by(conversation_messages.c.other_id).subquery("stats")
+    
+    totals = await db.execute(select(
+        func.count(),
+        func.coalesce(func.sum(case((stats.c.unread_count > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(stats.c.unread_count), 0)
+    ).select_from(stats))
+    total, unread_conversations, total_unread = totals.one()
+    
+    # Último mensaje de cada conversación
+    ranked = select(
+        conversation_messages.c.other_id,
+        conversation_messages.c.message_id,
+        func.row_number().over(
+            partition_by=conversation_messages.c.other_id,
+            order_by=(conversation_messages.c.created_at.desc(), conversation_messages.c.message_id.desc())
+        ).label("position")
+    ).subquery("ranked")
+    
+    page_query = select(
+        stats.c.other_id,
+        stats.c.total_messages,
+        stats.c.unread_count,
+        stats.c.first_at,
+        User.first_name,
+        User.last_name,
+        User.username,
+        User.avatar_url,
+        User.last_login,
+        Message.id,
+        Message.content,
+        Message.message_type,
+        Message.sender_id,
+        Message.is_read,
+        Message.created_at,
+        Exchange.id,
+        Exchange.status
+    ).join(
+        User, User.id == stats.c.other_id
+    ).join(
+        ranked, and_(ranked.c.other_id == stats.c.other_id, ranked.c.position == 1)
+    ).join(
+        Message, Message.id == ranked.c.message_id
+    ).outerjoin(
+        Exchange, Exchange.id == Message.exchange_id
+    ).order_by(
+        stats.c.last_at.desc(), stats.c.other_id
+    ).offset((page - 1) * limit).limit(limit)
+    
+    result = await db.execute(page_query)
+    
+    # Filas de confianza: diccionarios con la forma de ConversationResponse, sin revalidar
     conversations = []
-    processed_pairs = set()
-    
-    # Obtener todos los mensajes del usuario
-    user_messages = db.query(Message).filter(
-        or_(
-            Message.sender_id == current_user.id,
-            Message.receiver_id == current_user.id
-        )
-    ).order_by(desc(Message.created_at)).all()
-    
-    for message in user_messages:
-        other_user_id = message.receiver_id if message.sender_id == current_user.id else message.sender_id
-        
-        # Crear identificador único para la conversación
-        pair_id = tuple(sorted([str(current_user.id), str(other_user_id)]))
-        
-        if pair_id not in processed_pairs:
-            processed_pairs.add(pair_id)
-            
-            # Obtener información del otro usuario
-            other_user = db.query(User).filter(User.id == other_user_id).first()
-            if not other_user:
-                continue
-            
-            # Obtener último mensaje de la conversación
-            last_message = db.query(Message).filter(
-                or_(
-                    and_(Message.sender_id == current_user.id, Message.receiver_id == other_user_id),
-                    and_(Message.sender_id == other_user_id, Message.receiver_id == current_user.id)
-                )
-            ).order_by(desc(Message.created_at)).first()
-            
-            # Contar mensajes no leídos
-            unread_count = db.query(Message).filter(
-                Message.sender_id == other_user_id,
-                Message.receiver_id == current_user.id,
-                Message.is_read == False
-            ).count()
-            
-            # Contar total de mensajes
-            total_messages = db.query(Message).filter(
-                or_(
-                    and_(Message.sender_id == current_user.id, Message.receiver_id == other_user_id),
-                    and_(Message.sender_id == other_user_id, Message.receiver_id == current_user.id)
-                )
-            ).count()
-            
-            # Buscar intercambio relacionado si existe
-            exchange = None
-            if last_message and last_message.exchange_id:
-                exchange = db.query(Exchange).filter(Exchange.id == last_message.exchange_id).first()
-            
-            conversation = ConversationResponse(
-                conversation_id=f"{min(current_user.id, other_user_id)}_{max(current_user.id, other_user_id)}",
-                other_user={
-                    "id": other_user.id,
-                    "name": f"{other_user.first_name} {other_user.last_name}",
-                    "username": other_user.username,
-                    "avatar": other_user.avatar_url,
-                    "is_online": False  # TODO: Implementar estado online
-                },
-                exchange={
-                    "id": exchange.id,
-                    "status": exchange.status.value if exchange else None
-                } if exchange else None,
-                last_message=MessageListItem(
-                    id=last_message.id,
-                    content=last_message.content,
-                    sender_id=last_message.sender_id,
-                    message_type=last_message.message_type,
-                    created_at=last_message.created_at,
-                    is_read=last_message.is_read
-                ) if last_message else None,
-                total_messages=total_messages,
-                unread_count=unread_count,
-                created_at=last_message.created_at if last_message else datetime.utcnow(),
-                updated_at=last_message.created_at if last_message else datetime.utcnow()
-            )
-            
-            conversations.append(conversation)
-    
-    # Ordenar por último mensaje
-    conversations.sort(key=lambda x: x.updated_at, reverse=True)
-    
-    # Paginación
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_conversations = conversations[start:end]
-    
-    # Calcular estadísticas
-    total_unread = sum(conv.unread_count for conv in conversations)
-    unread_conversations = sum(1 for conv in conversations if conv.unread_count > 0)
-    
-    return ConversationListResponse(
-        conversations=paginated_conversations,
-        total=len(conversations),
-        unread_conversations=unread_conversations,
-        total_unread_messages=total_unread
+    for (
+        other_id, total_messages, unread_count, first_at,
+        first_name, last_name, username, avatar_url, last_seen,
+        message_id, content, message_type, sender_id, is_read, message_created_at,
+        exchange_id, exchange_status
+    ) in result:
+        sent_by_me = sender_id == current_user.id
+        conversations.append({
+            "conversation_id": f"{min(current_user.id, other_id)}_{max(current_user.id, other_id)}",
+            "other_user": {
+                "id": other_id,
+                "name": f"{first_name or ''} {last_name or ''}".strip() or username,
+                "username": username,
+                "avatar": avatar_url,
+                "is_online": activity.is_online(other_id, last_seen)
+            },
+            "exchange": {
+                "id": exchange_id,
+                "status": exchange_status.value
+            } if exchange_id else None,
+            "last_message": {
+                "id": message_id,
+                "content": content,
+                "message_type": message_type,
+                "sender_id": sender_id,
+                "sender_username": current_user.username if sent_by_me else username,
+                "sender_avatar": current_user.avatar_url if sent_by_me else avatar_url,
+                "is_read": is_read,
+                "created_at": message_created_at,
+                "reply_to_content": None
+            },
+            "total_messages": total_messages,
+            "unread_count": unread_count or 0,
+            "created_at": first_at,
+            "updated_at": message_created_at
+        })
+    
+    return TrustedJSONResponse({
+        "conversations": conversations,
+        "total": total,
+        "unread_conversations": unread_conversations,
+        "total_unread_messages": total_unread
+    })
+
+def _user_summary(user: User) -> dict:
+    return {
+        "id": user.id,
+        "name": f"{user.first_name} {user.last_name}",
+        "username": user.username,
+        "avatar": user.avatar_url
+    }
+
+
+def _message_response(message: Message, sender: User, receiver: User) -> MessageResponse:
+    """``MessageResponse`` de un mensaje con sus participantes ya cargados"""
+    return MessageResponse(
+        id=message.id,
+        content=message.content,
+        message_type=message.message_type,
+        sender_id=message.sender_id,
+        receiver_id=message.receiver_id,
+        exchange_id=message.exchange_id,
+        reply_to_id=None,  # El modelo no guarda respuestas encadenadas
+        is_read=message.is_read,
+        is_deleted_by_sender=message.is_deleted_by_sender,
+        is_deleted_by_receiver=message.is_deleted_by_receiver,
+        metadata=json.loads(message.message_metadata) if message.message_metadata else None,
+        created_at=message.created_at,
+        updated_at=message.updated_at,
+        read_at=message.read_at,
+        sender=_user_summary(sender),
+        receiver=_user_summary(receiver)
     )
 
+
 @router.get("/conversation/{user_id}", response_model=List[MessageResponse])
 async def get_conversation_messages(
     user_id: UUID,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Obtener mensajes de una conversación específica"""
     
     # Verificar que el otro usuario existe
-    other_user = db.query(User).filter(User.id == user_id).first()
+    other_user = await db.get(User, user_id)
     if not other_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
     
-    # Obtener mensajes de la conversación
-    messages = db.query(Message).filter(
-        or_(
-            and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
-            and_(Message.sender_id == user_id, Message.receiver_id == current_user.id)
+    # Marcar como leídos los mensajes recibidos en la conversación
+    await db.execute(
+        update(Message)
+        .where(
+            Message.sender_id == user_id,
+            Message.receiver_id == current_user.id,
+            Message.is_read == False
         )
-    ).order_by(Message.created_at.asc()).offset((page - 1) * limit).limit(limit).all()
-    
-    # Marcar mensajes como leídos
-    unread_messages = db.query(Message).filter(
-        Message.sender_id == user_id,
-        Message.receiver_id == current_user.id,
-        Message.is_read == False
-    ).all()
-    
-    for message in unread_messages:
-        message.is_read = True
-        message.read_at = datetime.utcnow()
+        .values(is_read=True, read_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
     
-    if unread_messages:
-        db.commit()
+    # Obtener mensajes de la conversación
+    result = await db.execute(
+        select(Message).where(
+            or_(
+                and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
+                and_(Message.sender_id == user_id, Message.receiver_id == current_user.id)
+            )
+        ).order_by(Message.created_at.asc()).offset((page - 1) * limit).limit(limit)
+    )
     
-    # Convertir a respuesta
-    message_responses = []
-    for message in messages:
-        sender = db.query(User).filter(User.id == message.sender_id).first()
-        receiver = db.query(User).filter(User.id == message.receiver_id).first()
-        
-        message_responses.append(MessageResponse(
-            id=message.id,
-            content=message.content,
-            message_type=message.message_type,
-            sender_id=message.sender_id,
-            receiver_id=message.receiver_id,
-            exchange_id=message.exchange_id,
-            reply_to_id=message.reply_to_id,
-            is_read=message.is_read,
-            is_deleted_by_sender=message.is_deleted_by_sender,
-            is_deleted_by_receiver=message.is_deleted_by_receiver,
-            metadata=message.metadata,
-            created_at=message.created_at,
-            updated_at=message.updated_at,
-            read_at=message.read_at,
-            sender={
-                "id": sender.id,
-                "name": f"{sender.first_name} {sender.last_name}",
-                "username": sender.username,
-                "avatar": sender.avatar_url
-            },
-            receiver={
-                "id": receiver.id,
-                "name": f"{receiver.first_name} {receiver.last_name}",
-                "username": receiver.username,
-                "avatar": receiver.avatar_url
-            }
-        ))
-    
-    return message_responses
+    # Sólo hay dos participantes: no hace falta cargar usuarios por mensaje
+    participants = {current_user.id: current_user, other_user.id: other_user}
+    return [
+        _message_response(message, participants[message.sender_id], participants[message.receiver_id])
+        for message in result.scalars().all()
+    ]
 
 @router.post("/send", response_model=MessageResponse)
 async def send_message(
     message_data: MessageCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Enviar un nuevo mensaje"""
     
     # Verificar que el receptor existe
-    receiver = db.query(User).filter(User.id == message_data.receiver_id).first()
+    receiver = await db.get(User, message_data.receiver_id)
     if not receiver:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -243,43 +282,14 @@ async def send_message(
         sender_id=current_user.id,
         receiver_id=message_data.receiver_id,
         exchange_id=message_data.exchange_id,
-        reply_to_id=message_data.reply_to_id,
-        metadata=message_data.metadata or {}
+        message_metadata=json.dumps(message_data.metadata) if message_data.metadata else None
     )
     
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    await db.flush()
+    await db.refresh(new_message)
     
-    # Crear respuesta
-    return MessageResponse(
-        id=new_message.id,
-        content=new_message.content,
-        message_type=new_message.message_type,
-        sender_id=new_message.sender_id,
-        receiver_id=new_message.receiver_id,
-        exchange_id=new_message.exchange_id,
-        reply_to_id=new_message.reply_to_id,
-        is_read=new_message.is_read,
-        is_deleted_by_sender=new_message.is_deleted_by_sender,
-        is_deleted_by_receiver=new_message.is_deleted_by_receiver,
-        metadata=new_message.metadata,
-        created_at=new_message.created_at,
-        updated_at=new_message.updated_at,
-        read_at=new_message.read_at,
-        sender={
-            "id": current_user.id,
-            "name": f"{current_user.first_name} {current_user.last_name}",
-            "username": current_user.username,
-            "avatar": current_user.avatar_url
-        },
-        receiver={
-            "id": receiver.id,
-            "name": f"{receiver.first_name} {receiver.last_name}",
-            "username": receiver.username,
-            "avatar": receiver.avatar_url
-        }
-    )
+    return _message_response(new_message, current_user, receiver)
 
 @router.put("/mark-read", response_model=dict)
 async def mark_messages_as_read(
@@ -328,78 +338,64 @@ async def mark_messages_as_read(
 async def search_messages(
     search_params: MessageSearchParams = Depends(),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Buscar mensajes"""
     
-    query = db.query(Message).filter(
+    # Sólo mensajes en los que participa el usuario actual; dentro de ese
+    # alcance, conversation_with equivale a "enviado o recibido por ese usuario"
+    query = select(Message).where(
         or_(
             Message.sender_id == current_user.id,
             Message.receiver_id == current_user.id
-        )
+        ),
+        *MESSAGE_SEARCH.conditions(search_params)
     )
     
-    # Aplicar filtros
-    if search_params.query:
-        query = query.filter(Message.content.ilike(f"%{search_params.query}%"))
-    
-    if search_params.conversation_with:
-        query = query.filter(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.receiver_id == search_params.conversation_with),
-                and_(Message.sender_id == search_params.conversation_with, Message.receiver_id == current_user.id)
-            )
-        )
-    
-    if search_params.exchange_id:
-        query = query.filter(Message.exchange_id == search_params.exchange_id)
-    
-    if search_params.message_type:
-        query = query.filter(Message.message_type == search_params.message_type)
-    
     if search_params.unread_only:
-        query = query.filter(
+        query = query.where(
             Message.receiver_id == current_user.id,
             Message.is_read == False
         )
     
-    if search_params.created_after:
-        query = query.filter(Message.created_at >= search_params.created_after)
+    # Total y paginación
+    total_result = await db.execute(count_statement(query))
+    total = total_result.scalar() or 0
     
-    if search_params.created_before:
-        query = query.filter(Message.created_at <= search_params.created_before)
+    query = MESSAGE_SEARCH.order(query, search_params.sort_by, search_params.sort_order)
+    result = await db.execute(paginate(query, search_params.page, search_params.page_size))
+    messages = result.scalars().all()
     
-    # Ordenamiento
-    if search_params.sort_order == "asc":
-        query = query.order_by(getattr(Message, search_params.sort_by).asc())
-    else:
-        query = query.order_by(getattr(Message, search_params.sort_by).desc())
+    # Remitentes de la página en una sola consulta
+    loaders.users.prime(current_user)
+    senders = await loaders.users.load_many(message.sender_id for message in messages)
     
-    # Paginación
-    total = query.count()
-    messages = query.offset((search_params.page - 1) * search_params.page_size).limit(search_params.page_size).all()
-    
-    # Convertir a lista de items
-    message_items = []
-    for message in messages:
-        sender = db.query(User).filter(User.id == message.sender_id).first()
-        
-        message_items.append(MessageListItem(
+    message_items = [
+        MessageListItem(
             id=message.id,
             content=message.content,
-            sender_id=message.sender_id,
             message_type=message.message_type,
-            created_at=message.created_at,
+            sender_id=message.sender_id,
+            sender_username=senders[message.sender_id].username,
+            sender_avatar=senders[message.sender_id].avatar_url,
             is_read=message.is_read,
-            sender_name=f"{sender.first_name} {sender.last_name}" if sender else "Usuario desconocido"
-        ))
+            created_at=message.created_at
+        )
+        for message in messages
+    ]
+    
+    total_pages = (total + search_params.page_size - 1) // search_params.page_size
     
     return MessageSearchResponse(
         messages=message_items,
         total=total,
         page=search_params.page,
         page_size=search_params.page_size,
-        total_pages=(total + search_params.page_size - 1) // search_params.page_size
+        total_pages=total_pages,
+        has_next=search_params.page < total_pages,
+        has_prev=search_params.page > 1,
+        search_query=search_params.query
     )
 
 @router.get("/stats", response_model=UserMessageStats)
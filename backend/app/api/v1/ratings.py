@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc
-from typing import List, Optional
+from sqlalchemy import select, func, and_, or_, case
+from sqlalchemy.orm import aliased
+from typing import List
 from uuid import UUID
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_db, get_uow
 from app.core.dependencies import get_current_active_user
+from app.core.filters import SearchSpec, count_statement, custom, eq, gte, lte, paginate
+from app.core.loaders import Loaders, get_loaders
 from app.models.user import User
 from app.models.rating import Rating
-from app.models.exchange import Exchange
+from app.models.exchange import Exchange, ExchangeStatus
+from app.models.item import Item
 from app.models.notification import Notification
 from app.schemas.rating import (
     RatingCreate,
@@ -24,14 +28,72 @@ from app.schemas.rating import (
     RatingSettings,
     RatingSettingsUpdate
 )
+from app.services import rating_summary
 
 router = APIRouter(tags=["ratings"])
 
+def _has_comment(has: bool):
+    if has:
+        return and_(Rating.comment.isnot(None), Rating.comment != "")
+    return or_(Rating.comment.is_(None), Rating.comment == "")
+
+
+# Filtros y ordenamientos admitidos por el listado de calificaciones
+RATING_SEARCH = SearchSpec(
+    filters=[
+        eq("user_id", Rating.rated_id),
+        eq("rater_id", Rating.rater_id),
+        eq("exchange_id", Rating.exchange_id),
+        gte("min_rating", Rating.overall_rating),
+        lte("max_rating", Rating.overall_rating),
+        eq("would_exchange_again", Rating.would_exchange_again, transform=int),
+        custom("has_comment", _has_comment),
+        gte("created_after", Rating.created_at),
+        lte("created_before", Rating.created_at),
+    ],
+    sorts={
+        "created_at": Rating.created_at,
+        "updated_at": Rating.updated_at,
+        "overall_rating": Rating.overall_rating,
+    },
+    default_sort="created_at",
+    tiebreaker=Rating.id,
+)
+
+def _user_info(user: User) -> dict:
+    return {"id": user.id, "username": user.username, "avatar": user.avatar_url}
+
+
+def _rating_response(rating: Rating, rater: User, rated: User, exchange: Exchange) -> RatingResponse:
+    """Respuesta completa de una calificación"""
+    stars = rating.overall_rating_stars
+    return RatingResponse(
+        id=rating.id,
+        rater_id=rating.rater_id,
+        rated_user_id=rating.rated_id,
+        exchange_id=rating.exchange_id,
+        overall_rating=rating.overall_rating,
+        communication_rating=rating.communication_rating,
+        punctuality_rating=rating.punctuality_rating,
+        item_condition_rating=rating.item_condition_rating,
+        friendliness_rating=rating.friendliness_rating,
+        comment=rating.comment,
+        would_exchange_again=bool(rating.would_exchange_again) if rating.would_exchange_again is not None else None,
+        created_at=rating.created_at,
+        updated_at=rating.updated_at,
+        rater=_user_info(rater),
+        rated_user=_user_info(rated),
+        exchange={"id": exchange.id, "status": exchange.status, "completed_at": exchange.completed_at},
+        rating_stars="★" * stars + "☆" * (5 - stars),
+        recommendation_text=rating.would_exchange_again_text
+    )
+
+
 @router.post("/", response_model=RatingResponse)
 async def create_rating(
     rating_data: RatingCreate,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Crear una nueva calificación"""
     
@@ -86,7 +148,8 @@ async def create_rating(
     )
     
     db.add(new_rating)
-    await db.commit()
+    await rating_summary.apply(db, new=rating_summary.snapshot(new_rating))
+    await db.flush()
     await db.refresh(new_rating)
     
     # Crear notificación para el usuario calificado
@@ -98,51 +161,28 @@ async def create_rating(
         exchange_id=rating_data.exchange_id
     )
     db.add(notification)
-    await db.commit()
     
     # Obtener información del usuario calificado para la respuesta
     rated_user_query = select(User).where(User.id == rating_data.rated_user_id)
     rated_user_result = await db.execute(rated_user_query)
     rated_user = rated_user_result.scalar_one()
     
-    return RatingResponse(
-        id=new_rating.id,
-        rater_id=new_rating.rater_id,
-        rated_id=new_rating.rated_id,
-        exchange_id=new_rating.exchange_id,
-        overall_rating=new_rating.overall_rating,
-        communication_rating=new_rating.communication_rating,
-        punctuality_rating=new_rating.punctuality_rating,
-        item_condition_rating=new_rating.item_condition_rating,
-        friendliness_rating=new_rating.friendliness_rating,
-        comment=new_rating.comment,
-        would_exchange_again=bool(new_rating.would_exchange_again) if new_rating.would_exchange_again is not None else None,
-        created_at=new_rating.created_at,
-        updated_at=new_rating.updated_at,
-        rater_username=current_user.username,
-        rated_username=rated_user.username
-    )
+    return _rating_response(new_rating, current_user, rated_user, exchange)
 
 @router.get("/", response_model=RatingSearchResponse)
 async def get_ratings(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    user_id: Optional[UUID] = None,
-    min_rating: Optional[float] = Query(None, ge=1, le=5),
-    max_rating: Optional[float] = Query(None, ge=1, le=5),
+    search_params: RatingSearchParams = Depends(),
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Obtener calificaciones con filtros y paginación"""
     
     # Construir query base
-    query = select(Rating)
+    query = select(Rating).where(*RATING_SEARCH.conditions(search_params))
     
-    # Si se especifica un user_id, mostrar las calificaciones recibidas por ese usuario
-    if user_id:
-        query = query.where(Rating.rated_id == user_id)
-    else:
-        # Si no se especifica, mostrar las calificaciones del usuario actual
+    # Sin user_id/rater_id, mostrar las calificaciones del usuario actual
+    if not search_params.user_id and not search_params.rater_id:
         query = query.where(
             or_(
                 Rating.rater_id == current_user.id,
@@ -150,28 +190,24 @@ async def get_ratings(
             )
         )
     
-    # Aplicar filtros de calificación
-    if min_rating is not None:
-        query = query.where(Rating.overall_rating >= min_rating)
-    if max_rating is not None:
-        query = query.where(Rating.overall_rating <= max_rating)
-    
     # Contar total
-    count_query = select(func.count()).select_from(query.subquery())
-    result = await db.execute(count_query)
+    result = await db.execute(count_statement(query))
     total = result.scalar()
     
     # Aplicar paginación y ordenamiento
-    query = query.order_by(desc(Rating.created_at))
-    query = query.offset((page - 1) * page_size).limit(page_size)
-    
-    # Ejecutar query con joins para obtener información de usuarios
-    from sqlalchemy.orm import selectinload
-    query = query.options(selectinload(Rating.rater), selectinload(Rating.rated))
+    page, page_size = search_params.page, search_params.page_size
+    query = RATING_SEARCH.order(query, search_params.sort_by, search_params.sort_order)
+    query = paginate(query, page, page_size)
     
     result = await db.execute(query)
     ratings = result.scalars().all()
     
+    # Calificadores y calificados en una sola consulta
+    loaders.users.prime(current_user)
+    users = await loaders.users.load_many(
+        user_id for r in ratings for user_id in (r.rater_id, r.rated_id)
+    )
+    
     # Calcular estadísticas
     if ratings:
         ratings_values = [r.overall_rating for r in ratings]
@@ -202,8 +238,8 @@ async def get_ratings(
             comment=rating.comment,
             would_exchange_again=bool(rating.would_exchange_again) if rating.would_exchange_again is not None else None,
             created_at=rating.created_at,
-            rater_username=rating.rater.username,
-            rated_username=rating.rated.username
+            rater_username=users[rating.rater_id].username,
+            rated_username=users[rating.rated_id].username
         ))
     
     total_pages = (total + page_size - 1) // page_size
@@ -237,93 +273,9 @@ async def get_user_rating_stats(
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    # Calificaciones recibidas
-    received_query = select(Rating).where(Rating.rated_id == user_id)
-    received_result = await db.execute(received_query)
-    received_ratings = received_result.scalars().all()
-    
-    # Calificaciones dadas
-    given_query = select(Rating).where(Rating.rater_id == user_id)
-    given_result = await db.execute(given_query)
-    given_ratings = given_result.scalars().all()
-    
-    # Estadísticas de calificaciones recibidas
-    total_ratings_received = len(received_ratings)
-    if received_ratings:
-        overall_ratings = [r.overall_rating for r in received_ratings]
-        average_rating = sum(overall_ratings) / len(overall_ratings)
-        
-        # Distribución
-        rating_distribution = {str(i): 0 for i in range(1, 6)}
-        for rating in overall_ratings:
-            rating_distribution[str(round(rating))] += 1
-        
-        # Promedios específicos
-        comm_ratings = [r.communication_rating for r in received_ratings if r.communication_rating is not None]
-        punct_ratings = [r.punctuality_rating for r in received_ratings if r.punctuality_rating is not None]
-        condition_ratings = [r.item_condition_rating for r in received_ratings if r.item_condition_rating is not None]
-        friendly_ratings = [r.friendliness_rating for r in received_ratings if r.friendliness_rating is not None]
-        
-        average_communication = sum(comm_ratings) / len(comm_ratings) if comm_ratings else None
-        average_punctuality = sum(punct_ratings) / len(punct_ratings) if punct_ratings else None
-        average_item_condition = sum(condition_ratings) / len(condition_ratings) if condition_ratings else None
-        average_friendliness = sum(friendly_ratings) / len(friendly_ratings) if friendly_ratings else None
-        
-        # Recomendaciones
-        recommendations = [r for r in received_ratings if r.would_exchange_again == 1]
-        total_recommendations = len(recommendations)
-        recommendation_percentage = (total_recommendations / total_ratings_received) * 100
-        
-        # Tendencia reciente (últimos 30 días)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_ratings = [r for r in received_ratings if r.created_at >= thirty_days_ago]
-        if recent_ratings:
-            recent_average = sum(r.overall_rating for r in recent_ratings) / len(recent_ratings)
-            if recent_average > average_rating + 0.2:
-                trend = "improving"
-            elif recent_average < average_rating - 0.2:
-                trend = "declining"
-            else:
-                trend = "stable"
-            last_30_days_average = recent_average
-        else:
-            trend = "stable"
-            last_30_days_average = None
-    else:
-        average_rating = None
-        rating_distribution = {str(i): 0 for i in range(1, 6)}
-        average_communication = None
-        average_punctuality = None
-        average_item_condition = None
-        average_friendliness = None
-        total_recommendations = 0
-        recommendation_percentage = None
-        trend = "stable"
-        last_30_days_average = None
-    
-    # Estadísticas de calificaciones dadas
-    total_ratings_given = len(given_ratings)
-    if given_ratings:
-        given_overall_ratings = [r.overall_rating for r in given_ratings]
-        average_rating_given = sum(given_overall_ratings) / len(given_overall_ratings)
-    else:
-        average_rating_given = None
-    
-    return UserRatingStats(
-        total_ratings_received=total_ratings_received,
-        average_rating=average_rating,
-        rating_distribution=rating_distribution,
-        average_communication=average_communication,
-        average_punctuality=average_punctuality,
-        average_item_condition=average_item_condition,
-        average_friendliness=average_friendliness,
-        total_recommendations=total_recommendations,
-        recommendation_percentage=recommendation_percentage,
-        total_ratings_given=total_ratings_given,
-        average_rating_given=average_rating_given,
-        recent_ratings_trend=trend,
-        last_30_days_average=last_30_days_average
-    )
+    # Agregados mantenidos incrementalmente: una fila por usuario
+    stats = await rating_summary.user_stats(db, user_id)
+    return UserRatingStats(**stats)
 
 @router.get("/pending", response_model=PendingRatingsResponse)
 async def get_pending_ratings(
@@ -332,65 +284,63 @@ async def get_pending_ratings(
 ):
     """Obtener intercambios completados que están pendientes de calificación"""
     
-    # Buscar intercambios completados donde el usuario participó
-    completed_exchanges_query = select(Exchange).where(
-        and_(
-            Exchange.status == "completed",
-            or_(
-                Exchange.requester_id == current_user.id,
-                Exchange.owner_id == current_user.id
-            )
+    now = datetime.utcnow()
+    seven_days_ago = now - timedelta(days=7)
+    is_requester = Exchange.requester_id == current_user.id
+    
+    other_user = aliased(User)
+    my_item = aliased(Item)
+    other_item = aliased(Item)
+    my_rating = aliased(Rating)
+    completed_at = func.coalesce(Exchange.completed_at, Exchange.updated_at)
+    
+    # Una sola consulta: intercambios completados del usuario sin calificación
+    # suya (anti-join), con la contraparte y los artículos de cada lado
+    query = (
+        select(
+            Exchange.id,
+            other_user.id,
+            other_user.username,
+            other_user.avatar_url,
+            my_item.title,
+            other_item.title,
+            completed_at.label("completed_at"),
+            case((completed_at < seven_days_ago, True), else_=False).label("is_overdue")
         )
+        .join(other_user, other_user.id == case((is_requester, Exchange.owner_id), else_=Exchange.requester_id))
+        .outerjoin(my_rating, and_(
+            my_rating.exchange_id == Exchange.id,
+            my_rating.rater_id == current_user.id
+        ))
+        .outerjoin(my_item, my_item.id == case((is_requester, Exchange.requested_item_id), else_=Exchange.offered_item_id))
+        .outerjoin(other_item, other_item.id == case((is_requester, Exchange.offered_item_id), else_=Exchange.requested_item_id))
+        .where(
+            Exchange.status == ExchangeStatus.COMPLETED,
+            or_(is_requester, Exchange.owner_id == current_user.id),
+            my_rating.id.is_(None)
+        )
+        .order_by(completed_at.asc(), Exchange.id)
     )
-    
-    completed_result = await db.execute(completed_exchanges_query)
-    completed_exchanges = completed_result.scalars().all()
+    result = await db.execute(query)
     
     pending_ratings = []
     overdue_count = 0
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    
-    for exchange in completed_exchanges:
-        # Verificar si ya calificó este intercambio
-        existing_rating_query = select(Rating).where(
-            and_(
-                Rating.rater_id == current_user.id,
-                Rating.exchange_id == exchange.id
-            )
-        )
-        existing_result = await db.execute(existing_rating_query)
-        existing_rating = existing_result.scalar_one_or_none()
+    for (exchange_id, other_id, other_username, other_avatar,
+         my_item_title, other_item_title, completed, is_overdue) in result:
+        if is_overdue:
+            overdue_count += 1
         
-        if not existing_rating:
-            # Determinar el otro usuario
-            other_user_id = exchange.owner_id if exchange.requester_id == current_user.id else exchange.requester_id
-            
-            # Obtener información del otro usuario
-            other_user_query = select(User).where(User.id == other_user_id)
-            other_user_result = await db.execute(other_user_query)
-            other_user = other_user_result.scalar_one()
-            
-            # Obtener información de los items
-            my_item_title = exchange.requested_item.title if exchange.requester_id == current_user.id else exchange.offered_item.title
-            other_item_title = exchange.offered_item.title if exchange.requester_id == current_user.id else exchange.requested_item.title
-            
-            days_since_completion = (datetime.utcnow() - exchange.updated_at).days
-            is_overdue = exchange.updated_at < seven_days_ago
-            
-            if is_overdue:
-                overdue_count += 1
-            
-            pending_ratings.append(PendingRatingResponse(
-                exchange_id=exchange.id,
-                other_user_id=other_user.id,
-                other_user_username=other_user.username,
-                other_user_avatar=other_user.avatar_url,
-                my_item_title=my_item_title,
-                other_item_title=other_item_title,
-                completed_at=exchange.updated_at,
-                days_since_completion=days_since_completion,
-                reminder_sent=False  # TODO: Implementar sistema de recordatorios
-            ))
+        pending_ratings.append(PendingRatingResponse(
+            exchange_id=exchange_id,
+            other_user_id=other_id,
+            other_user_username=other_username,
+            other_user_avatar=other_avatar,
+            my_item_title=my_item_title or "",
+            other_item_title=other_item_title or "",
+            completed_at=completed,
+            days_since_completion=(now - completed.replace(tzinfo=None)).days,
+            reminder_sent=False  # TODO: Implementar sistema de recordatorios
+        ))
     
     return PendingRatingsResponse(
         pending_ratings=pending_ratings,
@@ -436,7 +386,8 @@ async def update_rating(
     rating_id: UUID,
     rating_update: RatingUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Actualizar una calificación existente"""
     
@@ -453,6 +404,7 @@ async def update_rating(
         raise HTTPException(status_code=403, detail="Solo puedes editar tus propias calificaciones")
     
     # Actualizar campos
+    before = rating_summary.snapshot(rating)
     if rating_update.overall_rating is not None:
         rating.overall_rating = rating_update.overall_rating
     if rating_update.communication_rating is not None:
@@ -469,33 +421,15 @@ async def update_rating(
         rating.would_exchange_again = 1 if rating_update.would_exchange_again else 0
     
     rating.updated_at = datetime.utcnow()
+    await rating_summary.apply(db, before, rating_summary.snapshot(rating))
     
     await db.commit()
     await db.refresh(rating)
     
     # Obtener información de usuarios para la respuesta
-    rater_query = select(User).where(User.id == rating.rater_id)
-    rater_result = await db.execute(rater_query)
-    rater = rater_result.scalar_one()
+    loaders.users.prime(current_user)
+    users = await loaders.users.load_many([rating.rater_id, rating.rated_id])
+    rater, rated = users[rating.rater_id], users[rating.rated_id]
     
-    rated_query = select(User).where(User.id == rating.rated_id)
-    rated_result = await db.execute(rated_query)
-    rated = rated_result.scalar_one()
-    
-    return RatingResponse(
-        id=rating.id,
-        rater_id=rating.rater_id,
-        rated_id=rating.rated_id,
-        exchange_id=rating.exchange_id,
-        overall_rating=rating.overall_rating,
-        communication_rating=rating.communication_rating,
-        punctuality_rating=rating.punctuality_rating,
-        item_condition_rating=rating.item_condition_rating,
-        friendliness_rating=rating.friendliness_rating,
-        comment=rating.comment,
-        would_exchange_again=bool(rating.would_exchange_again) if rating.would_exchange_again is not None else None,
-        created_at=rating.created_at,
-        updated_at=rating.updated_at,
-        rater_username=rater.username,
-        rated_username=rated.username
-    )
\ No newline at end of file
+    exchange = (await db.execute(select(Exchange).where(Exchange.id == rating.exchange_id))).scalar_one()
+    return _rating_response(rating, rater, rated, exchange)
\ No newline at end of file
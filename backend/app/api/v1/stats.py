@@ -4,7 +4,7 @@ from sqlalchemy import func, and_, select
 from typing import Dict, Any
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.replicas import get_read_db
 from app.models.user import User
 from app.models.item import Item, ItemStatus
 from app.models.exchange import Exchange, ExchangeStatus
@@ -12,7 +12,7 @@ from app.models.exchange import Exchange, ExchangeStatus
 router = APIRouter()
 
 @router.get("/education-impact", response_model=Dict[str, Any])
-async def get_education_impact_stats(db: AsyncSession = Depends(get_db)):
+async def get_education_impact_stats(db: AsyncSession = Depends(get_read_db)):
     """
     Obtener estadísticas dinámicas para la página de educación
     """
@@ -162,7 +162,7 @@ async def get_education_impact_stats(db: AsyncSession = Depends(get_db)):
         )
 
 @router.get("/platform-metrics", response_model=Dict[str, Any])
-async def get_platform_metrics(db: AsyncSession = Depends(get_db)):
+async def get_platform_metrics(db: AsyncSession = Depends(get_read_db)):
     """
     Obtener métricas generales de la plataforma
     """
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
@@ -9,7 +9,8 @@ import os
 import shutil
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_uow
+from app.core.replicas import get_read_db
 from app.core.dependencies import (
     get_current_user, 
     get_current_active_user,
@@ -17,6 +18,10 @@ from app.core.dependencies import (
     validate_uuid
 )
 from app.core.config import settings
+from app.core.activity import tracker as activity
+from app.core.revocation import revoked_sessions
+from app.core.filters import SearchSpec, contains, count_statement, gte
+from app.core.http_cache import check_not_modified, weak_etag
 from app.models.user import User
 from app.models.item import Item, ItemStatus
 from app.models.exchange import Exchange, ExchangeStatus
@@ -38,13 +43,36 @@ from app.schemas.user import (
     RewardCatalogItem,
     RewardRedemptionSummary,
     RewardRedemptionItem,
-    RewardRedemptionListResponse
+    RewardRedemptionListResponse,
+    UserPresence
 )
 from app.schemas.item import ItemListItem
 from app.schemas.exchange import ExchangeListItem
+from app.services import rewards
+from app.services.leaderboard import leaderboard
 
 router = APIRouter()
 
+# Filtros y ordenamientos admitidos por la búsqueda de usuarios
+USER_SEARCH = SearchSpec(
+    filters=[
+        contains("query", User.username, User.first_name, User.last_name),
+        contains("city", User.city),
+        contains("state", User.state),
+        contains("country", User.country),
+        gte("min_reputation", User.reputation_score),
+        gte("min_exchanges", User.total_exchanges),
+    ],
+    sorts={
+        "reputation": User.reputation_score,
+        "exchanges": User.total_exchanges,
+        "created_at": User.created_at,
+        "username": User.username,
+    },
+    default_sort="reputation",
+    tiebreaker=User.id,
+)
+
 
 @router.get("/profile", response_model=UserDetailResponse)
 async def get_user_profile(
@@ -58,44 +86,18 @@ async def get_user_profile(
 async def update_user_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_uow)
 ):
     """Actualizar perfil del usuario"""
     
-    # Verificar si el nuevo username ya existe (si se está cambiando)
-    if user_update.username and user_update.username != current_user.username:
-        existing_user = db.query(User).filter(
-            User.username == user_update.username,
-            User.id != current_user.id
-        ).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El nombre de usuario ya está en uso"
-            )
-    
-    # Verificar si el nuevo email ya existe (si se está cambiando)
-    if user_update.email and user_update.email != current_user.email:
-        existing_email = db.query(User).filter(
-            User.email == user_update.email,
-            User.id != current_user.id
-        ).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El email ya está registrado"
-            )
-        # Si cambia el email, marcar como no verificado
-        current_user.email_verified = False
-    
-    # Actualizar campos
+    # Actualizar campos (UserUpdate no permite cambiar username ni email)
     update_data = user_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(current_user, field, value)
     
     current_user.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(current_user)
+    await db.flush()
+    await db.refresh(current_user)
     
     return current_user
 
@@ -181,7 +183,7 @@ async def delete_avatar(
 @router.get("/profile/stats", response_model=UserStats)
 async def get_user_stats(
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Obtener estadísticas del usuario"""
     
@@ -289,42 +291,13 @@ async def get_user_rewards(
 @router.put("/profile/rewards/recompute", response_model=UserResponse)
 async def recompute_and_persist_user_rewards(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    total_items = db.query(func.count()).select_from(Item).filter(Item.owner_id == current_user.id).scalar() or 0
-    completed_exchanges = db.query(func.count()).select_from(Exchange).filter(
-        ((Exchange.requester_id == current_user.id) |
-         (Exchange.owner_id == current_user.id)) &
-        (Exchange.status == ExchangeStatus.COMPLETED)
-    ).scalar() or 0
-    avg_rating = db.query(func.avg(Rating.overall_rating)).filter(Rating.rated_id == current_user.id).scalar() or 0
-    points = int(completed_exchanges * 50 + total_items * 10 + float(avg_rating or 0) * 20)
-    tier = 'Bronce'
-    if points >= 100 and points < 300:
-        tier = 'Plata'
-    elif points >= 300 and points < 600:
-        tier = 'Oro'
-    elif points >= 600:
-        tier = 'Platino'
-    old_points = current_user.reward_points or 0
-    old_tier = current_user.reward_tier or 'Bronce'
-    current_user.reward_points = points
-    current_user.reward_tier = tier
-    current_user.updated_at = datetime.utcnow()
-    event = RewardEvent(
-        actor_id=current_user.id,
-        actor_type='user',
-        event_type='recompute',
-        points_delta=int(points - old_points),
-        points_total=points,
-        tier_before=old_tier,
-        tier_after=tier,
-        description='Recomputación de recompensas de usuario',
-        meta=None
-    )
-    db.add(event)
-    db.commit()
-    db.refresh(current_user)
+    """Recalcular y guardar los puntos y el nivel del usuario actual"""
+    deltas = await rewards.recompute_users(db, [current_user.id])
+    await db.commit()
+    await rewards.notify_leaderboard(deltas)
+    await db.refresh(current_user)
     return current_user
 
 
@@ -398,6 +371,7 @@ async def redeem_user_reward(
     db.add(event)
     await db.commit()
     await db.refresh(current_user)
+    await leaderboard.rewards_changed(current_user.id, -cost)
 
     return RewardRedeemResponse(
         success=True,
@@ -534,17 +508,50 @@ async def get_rewards_redemptions_list(
     )
 
 
+@router.get("/search", response_model=UserSearchResponse)
+async def search_users(
+    search_params: UserSearchParams = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Buscar usuarios"""
+    
+    query = select(User).where(
+        User.is_active == True,
+        *USER_SEARCH.conditions(search_params)
+    )
+    
+    # Contar total
+    total_result = await db.execute(count_statement(query))
+    total = total_result.scalar() or 0
+    
+    # Ordenamiento y paginación
+    query = USER_SEARCH.order(query, search_params.sort_by, search_params.sort_order)
+    result = await db.execute(query.offset(search_params.skip).limit(search_params.limit))
+    users = result.scalars().all()
+    
+    return UserSearchResponse(
+        users=[UserListItem.model_validate(user) for user in users],
+        total=total,
+        skip=search_params.skip,
+        limit=search_params.limit,
+        has_more=search_params.skip + len(users) < total
+    )
+
+
 @router.get("/{user_id}", response_model=UserPublicProfile)
 async def get_user_public_profile(
     user_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Obtener perfil público de un usuario"""
     
-    user = db.query(User).filter(
-        User.id == user_id,
-        User.is_active == True
-    ).first()
+    user_uuid = validate_uuid(user_id)
+    result = await db.execute(
+        select(User).where(User.id == user_uuid, User.is_active == True)
+    )
+    user = result.scalar_one_or_none()
     
     if not user:
         raise HTTPException(
@@ -552,7 +559,51 @@ async def get_user_public_profile(
             detail="Usuario no encontrado"
         )
     
-    return user
+    # Cualquier cambio del usuario (también los contadores) actualiza updated_at
+    etag = weak_etag("user", user.id, user.updated_at)
+    check_not_modified(request, etag)
+    response.headers["ETag"] = etag
+
+    # El perfil público nunca incluye datos de contacto
+    return UserPublicProfile(
+        id=user.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        full_name=user.full_name,
+        bio=user.bio,
+        avatar_url=user.avatar_url,
+        city=user.city if user.show_location else None,
+        state=user.state if user.show_location else None,
+        country=user.country if user.show_location else None,
+        reputation_score=user.reputation_score,
+        total_exchanges=user.total_exchanges,
+        successful_exchanges=user.successful_exchanges,
+        success_rate=round(user.success_rate, 2),
+        member_since=user.created_at.isoformat()
+    )
+
+
+@router.get("/{user_id}/presence", response_model=UserPresence)
+async def get_user_presence(
+    user_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Saber si un usuario está en línea y cuándo se le vio por última vez"""
+    
+    user_uuid = validate_uuid(user_id)
+    row = (await db.execute(
+        select(User.last_login).where(User.id == user_uuid, User.is_active == True)
+    )).one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+    
+    last_seen = activity.last_seen(user_uuid, row.last_login)
+    return UserPresence(user_id=user_uuid, is_online=activity.is_online(user_uuid, last_seen), last_seen=last_seen)
 
 
 @router.get("/{user_id}/items", response_model=List[ItemListItem])
@@ -586,89 +637,6 @@ async def get_user_items(
     return items
 
 
-@router.get("/search", response_model=UserSearchResponse)
-async def search_users(
-    search_params: UserSearchParams = Depends(),
-    db: Session = Depends(get_db)
-):
-    """Buscar usuarios"""
-    
-    query = db.query(User).filter(User.is_active == True)
-    
-    # Filtrar por consulta de texto
-    if search_params.query:
-        search_term = f"%{search_params.query}%"
-        query = query.filter(
-            (User.username.ilike(search_term)) |
-            (User.first_name.ilike(search_term)) |
-            (User.last_name.ilike(search_term))
-        )
-    
-    # Filtrar por ubicación
-    if search_params.city:
-        query = query.filter(User.city.ilike(f"%{search_params.city}%"))
-    
-    if search_params.state:
-        query = query.filter(User.state.ilike(f"%{search_params.state}%"))
-    
-    if search_params.country:
-        query = query.filter(User.country.ilike(f"%{search_params.country}%"))
-    
-    # Filtrar por verificación
-    if search_params.verified_only:
-        query = query.filter(User.email_verified == True)
-    
-    # Filtrar por calificación mínima
-    if search_params.min_rating:
-        # Subconsulta para obtener usuarios con calificación mínima
-        rated_users = db.query(Rating.rated_id).group_by(Rating.rated_id).having(
-                db.func.avg(Rating.overall_rating) >= search_params.min_rating
-            ).subquery()
-        query = query.filter(User.id.in_(rated_users))
-    
-    # Contar total
-    total = query.count()
-    
-    # Ordenamiento
-    if search_params.sort_by == "username":
-        if search_params.sort_order == "desc":
-            query = query.order_by(User.username.desc())
-        else:
-            query = query.order_by(User.username.asc())
-    elif search_params.sort_by == "created_at":
-        if search_params.sort_order == "desc":
-            query = query.order_by(User.created_at.desc())
-        else:
-            query = query.order_by(User.created_at.asc())
-    elif search_params.sort_by == "rating":
-        # Ordenar por calificación promedio
-        if search_params.sort_order == "desc":
-            query = query.outerjoin(Rating, User.id == Rating.rated_id).group_by(User.id).order_by(
-                db.func.coalesce(db.func.avg(Rating.overall_rating), 0).desc()
-            )
-        else:
-            query = query.outerjoin(Rating, User.id == Rating.rated_id).group_by(User.id).order_by(
-                db.func.coalesce(db.func.avg(Rating.overall_rating), 0).asc()
-            )
-    
-    # Paginación
-    offset = (search_params.page - 1) * search_params.page_size
-    users = query.offset(offset).limit(search_params.page_size).all()
-    
-    # Calcular páginas
-    total_pages = (total + search_params.page_size - 1) // search_params.page_size
-    
-    return UserSearchResponse(
-        users=users,
-        total=total,
-        page=search_params.page,
-        page_size=search_params.page_size,
-        total_pages=total_pages,
-        has_next=search_params.page < total_pages,
-        has_prev=search_params.page > 1
-    )
-
-
 @router.get("/me/items", response_model=List[ItemListItem])
 async def get_my_items(
     status: Optional[str] = Query(None),
@@ -857,7 +825,7 @@ async def update_notification_settings(
 @router.delete("/me/account")
 async def delete_account(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Eliminar cuenta del usuario (desactivar)"""
     
@@ -867,8 +835,9 @@ async def delete_account(
     
     # Revocar todas las sesiones
     from app.models.user_session import UserSession
-    UserSession.revoke_all_user_sessions(db, current_user.id)
+    revoked = await UserSession.revoke_all_user_sessions(db, current_user.id)
+    await revoked_sessions.revoke(db, revoked)
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Cuenta desactivada exitosamente"}
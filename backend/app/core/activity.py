@@ -0,0 +1,175 @@
+"""Última actividad de usuarios, empresas y sesiones con escritura diferida.
+
+Cada petición autenticada anota en memoria "visto ahora" para el actor y su
+sesión (``record_user`` / ``record_company``, llamadas desde las dependencias
+de autenticación) sin escribir en la base de datos. Cada
+ACTIVITY_FLUSH_SECONDS el tracker vuelca lo acumulado con un UPDATE por lotes
+por tabla: ``users.last_login``, ``companies.last_login`` y
+``last_activity`` de ``user_sessions``/``company_sessions``. Varias
+peticiones del mismo actor entre dos volcados cuestan una sola fila, y la
+condición ``columna < nuevo valor`` evita que un worker atrasado retroceda
+la marca que escribió otro.
+
+Presencia: un actor está en línea si se le vio en los últimos
+PRESENCE_ONLINE_SECONDS, según este proceso o según la marca ya volcada
+(lo que ven los demás workers), que ``presence`` lee en una consulta.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Company, CompanySession, User, UserSession
+
+logger = logging.getLogger(__name__)
+
+# Tabla y columna de "visto por última vez" de cada tipo de registro
+TARGETS = {
+    "user": (User, "last_login"),
+    "user_session": (UserSession, "last_activity"),
+    "company": (Company, "last_login"),
+    "company_session": (CompanySession, "last_activity"),
+}
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devuelve fechas sin zona (en UTC)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class ActivityTracker:
+    """Acumula la actividad en memoria y la vuelca periódicamente"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        interval: Optional[float] = None,
+        online_seconds: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval if interval is not None else settings.ACTIVITY_FLUSH_SECONDS
+        self.online_seconds = online_seconds if online_seconds is not None else settings.PRESENCE_ONLINE_SECONDS
+        self._pending: Dict[str, Dict[UUID, datetime]] = {kind: {} for kind in TARGETS}
+        self._seen: Dict[UUID, float] = {}  # actor -> time.time() de su última petición en este proceso
+        self._task: Optional[asyncio.Task] = None
+
+    def _record(self, actor_kind: str, actor_id: UUID, session_id: Optional[UUID]) -> None:
+        now = datetime.now(timezone.utc)
+        self._pending[actor_kind][actor_id] = now
+        if session_id is not None:
+            self._pending[f"{actor_kind}_session"][session_id] = now
+        self._seen[actor_id] = now.timestamp()
+
+    def record_user(self, user_id: UUID, session_id: Optional[UUID] = None) -> None:
+        self._record("user", user_id, session_id)
+
+    def record_company(self, company_id: UUID, session_id: Optional[UUID] = None) -> None:
+        self._record("company", company_id, session_id)
+
+    # Presencia
+
+    def last_seen(self, actor_id: UUID, stored: Optional[datetime] = None) -> Optional[datetime]:
+        """Última actividad conocida: la de este proceso o ``stored`` (la volcada), la más reciente"""
+        stored = _aware(stored)
+        local = self._seen.get(actor_id)
+        if local is None:
+            return stored
+        local_dt = datetime.fromtimestamp(local, tz=timezone.utc)
+        return local_dt if stored is None or local_dt > stored else stored
+
+    def is_online(self, actor_id: UUID, stored: Optional[datetime] = None) -> bool:
+        seen = self.last_seen(actor_id, stored)
+        return seen is not None and time.time() - seen.timestamp() <= self.online_seconds
+
+    async def presence(self, db: AsyncSession, user_ids: Iterable[UUID]) -> Dict[UUID, Tuple[bool, Optional[datetime]]]:
+        """``{usuario: (en línea, visto por última vez)}`` con una sola consulta"""
+        ids = list(user_ids)
+        if not ids:
+            return {}
+        stored = dict((await db.execute(select(User.id, User.last_login).where(User.id.in_(ids)))).all())
+        result = {}
+        for user_id in ids:
+            seen = self.last_seen(user_id, stored.get(user_id))
+            result[user_id] = (self.is_online(user_id, seen), seen)
+        return result
+
+    # Volcado
+
+    async def flush(self) -> int:
+        """Escribir la actividad acumulada; devuelve cuántas marcas se enviaron"""
+        pending, self._pending = self._pending, {kind: {} for kind in TARGETS}
+        written = 0
+        try:
+            async with self.session_factory() as db:
+                for kind, seen in pending.items():
+                    if not seen:
+                        continue
+                    model, column_name = TARGETS[kind]
+                    table = model.__table__
+                    column = table.c[column_name]
+                    stmt = (
+                        update(table)
+                        .where(table.c.id == bindparam("b_id"), or_(column.is_(None), column < bindparam("b_seen")))
+                        .values({column_name: bindparam("b_seen")})
+                    )
+                    # Orden por id: bloqueos consistentes entre workers
+                    await db.execute(stmt, [
+                        {"b_id": row_id, "b_seen": when}
+                        for row_id, when in sorted(seen.items(), key=lambda kv: str(kv[0]))
+                    ])
+                    written += len(seen)
+                await db.commit()
+        except BaseException:
+            # Devolver lo no escrito para el siguiente intento (sin pisar marcas más nuevas)
+            for kind, seen in pending.items():
+                current = self._pending[kind]
+                for row_id, when in seen.items():
+                    if row_id not in current or current[row_id] < when:
+                        current[row_id] = when
+            raise
+        self._prune()
+        return written
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.online_seconds
+        self._seen = {actor_id: seen for actor_id, seen in self._seen.items() if seen >= cutoff}
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error volcando la actividad de usuarios")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="activity-tracker")
+
+    async def stop(self) -> None:
+        """Detener la tarea y volcar lo que quede pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Error volcando la actividad de usuarios al cerrar")
+
+
+tracker = ActivityTracker()
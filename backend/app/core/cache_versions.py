@@ -0,0 +1,119 @@
+"""Invalidación de cachés en memoria entre workers.
+
+Cada dato cacheado por proceso (p. ej. el árbol de categorías) tiene una fila
+en ``cache_versions``. Quien lo modifica llama a ``bump`` dentro de su
+transacción, de modo que la nueva versión se publica exactamente cuando se
+confirma el cambio. ``watcher`` consulta todas las versiones con una sola
+consulta cada CACHE_VERSION_POLL_SECONDS y avisa a las cachés suscritas, que
+recargan fuera del camino de las peticiones.
+
+Además, al confirmarse un ``bump`` se avisa al resto de workers por
+``app.core.coordination`` y su ``watcher`` consulta en el momento, sin
+esperar al siguiente sondeo. El aviso sólo adelanta la consulta: si se
+pierde, el sondeo sigue garantizando que la caché se recarga.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.coordination import bus
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.models import CacheVersion
+
+logger = logging.getLogger(__name__)
+
+_versions = CacheVersion.__table__
+
+CHANNEL = "cache_versions"
+
+
+async def bump(db: AsyncSession, name: str, on_commit: Optional[Callable[[], None]] = None) -> None:
+    """Incrementar la versión de ``name`` en la transacción actual.
+
+    ``on_commit`` se ejecuta en este proceso al confirmarse la transacción
+    (para invalidar la copia local sin esperar al sondeo).
+    """
+    stmt = dialect_insert(db, _versions).values(name=name, version=1)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": _versions.c.version + 1, "updated_at": func.now()}
+    ))
+    event.listen(db.sync_session, "after_commit", lambda session: bus.publish(CHANNEL, name), once=True)
+    if on_commit is not None:
+        event.listen(db.sync_session, "after_commit", lambda session: on_commit(), once=True)
+
+
+async def read(db: AsyncSession, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    query = select(_versions.c.name, _versions.c.version)
+    if names is not None:
+        query = query.where(_versions.c.name.in_(list(names)))
+    return dict((await db.execute(query)).all())
+
+
+class VersionWatcher:
+    """Sondea ``cache_versions`` y notifica los cambios a los suscriptores"""
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal, interval: Optional[float] = None):
+        self.session_factory = session_factory
+        self.interval = interval if interval is not None else settings.CACHE_VERSION_POLL_SECONDS
+        self._subscribers: Dict[str, Callable[[int], Awaitable[None]]] = {}
+        self._seen: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def subscribe(self, name: str, callback: Callable[[int], Awaitable[None]]) -> None:
+        self._subscribers[name] = callback
+
+    async def poll_once(self) -> None:
+        if not self._subscribers:
+            return
+        async with self.session_factory() as db:
+            versions = await read(db, self._subscribers)
+        for name, callback in self._subscribers.items():
+            version = versions.get(name, 0)
+            if self._seen.get(name) != version:
+                self._seen[name] = version
+                try:
+                    await callback(version)
+                except Exception:
+                    logger.exception("Error recargando la caché %s", name)
+
+    async def _on_bump(self, name: str) -> None:
+        if name in self._subscribers:
+            self._wake.set()
+
+    async def _loop(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error consultando versiones de caché")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            bus.subscribe(CHANNEL, self._on_bump)
+            self._task = asyncio.create_task(self._loop(), name="cache-version-watcher")
+
+    async def stop(self) -> None:
+        bus.unsubscribe(CHANNEL, self._on_bump)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+watcher = VersionWatcher()
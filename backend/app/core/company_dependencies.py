@@ -5,7 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from app.core.database import get_db
-from app.core.security import verify_token, AuthenticationError
+from app.core.activity import tracker as activity
+from app.core.dependencies import session_id_from_payload
+from app.core.revocation import verify_access_token
+from app.core.security import AuthenticationError
 from app.models.company import Company
 
 # OAuth2 scheme para empresas
@@ -14,17 +17,27 @@ oauth2_scheme_company = OAuth2PasswordBearer(
     scheme_name="JWT_Company"
 )
 
+def get_company_access_payload(
+    token: str = Depends(oauth2_scheme_company)
+) -> dict:
+    """Verificar el token de acceso de empresa (firma, expiración y sesión no revocada)"""
+    payload = verify_access_token(token)
+    if payload is None:
+        raise AuthenticationError("Token inválido o expirado")
+    return payload
+
+def get_current_company_session_id(
+    payload: dict = Depends(get_company_access_payload)
+) -> Optional[UUID]:
+    """Obtener el id de la sesión del token de empresa actual"""
+    return session_id_from_payload(payload)
+
 async def get_current_company(
-    token: str = Depends(oauth2_scheme_company),
+    payload: dict = Depends(get_company_access_payload),
     db: AsyncSession = Depends(get_db)
 ) -> Company:
     """Obtener la empresa actual basada en el token JWT"""
     
-    # Verificar el token
-    payload = verify_token(token, "access")
-    if payload is None:
-        raise AuthenticationError("Token inválido o expirado")
-    
     # Extraer el ID de la empresa
     company_id_str = payload.get("sub")
     if company_id_str is None:
@@ -46,6 +59,7 @@ async def get_current_company(
     if not company.is_active:
         raise AuthenticationError("Empresa inactiva")
     
+    activity.record_company(company.id, session_id_from_payload(payload))
     return company
 
 def get_current_active_company(
@@ -84,7 +98,7 @@ async def get_optional_current_company(
     
     try:
         # Verificar el token
-        payload = verify_token(token, "access")
+        payload = verify_access_token(token)
         if payload is None:
             return None
         
@@ -104,6 +118,7 @@ async def get_optional_current_company(
         company = result.scalar_one_or_none()
         
         if company and company.is_active:
+            activity.record_company(company.id, session_id_from_payload(payload))
             return company
         
         return None
@@ -0,0 +1,195 @@
+"""Compresión de respuestas: brotli o gzip según ``Accept-Encoding``.
+
+Se comprimen los tipos de texto (JSON, NDJSON, CSV, HTML, SVG...) a partir de
+COMPRESSION_MIN_SIZE bytes; por debajo la cabecera y el coste de comprimir no
+compensan. Brotli (``br``) sólo se ofrece si el paquete ``brotli`` está
+instalado; si no, gzip. Las respuestas en streaming (exportaciones) se
+comprimen según se envían, sin reunir el cuerpo. No se tocan las respuestas
+que ya traen ``Content-Encoding`` (una exportación ``.gz``), las que no tienen
+cuerpo (204, 304) ni las de HEAD.
+
+Los niveles por defecto (gzip 6, brotli 4) están pensados para comprimir en
+cada petición: los más altos ganan poco tamaño y cuestan mucha CPU.
+"""
+import zlib
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+
+_COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                 "application/xml", "image/svg+xml")
+_DROPPED = {b"content-length", b"content-encoding"}
+
+
+@lru_cache(maxsize=None)
+def _brotli():
+    """Módulo brotli (dependencia opcional) o ``None``"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """``br``, ``gzip`` o ``None`` según lo que acepta el cliente (con sus ``q``)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            accepted[name.strip()] = quality
+    candidates = ("br", "gzip") if _brotli() is not None else ("gzip",)
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(_COMPRESSIBLE) or "+json" in content_type
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits 31: formato gzip, con fecha 0 (la misma salida para el mismo cuerpo)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = _brotli().Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def compressor(encoding: str, level: Optional[int] = None):
+    """Compresor incremental (``compress`` / ``finish``) para ``br`` o ``gzip``"""
+    if encoding == "br":
+        return _Brotli(settings.COMPRESSION_BROTLI_QUALITY if level is None else level)
+    return _Gzip(settings.COMPRESSION_GZIP_LEVEL if level is None else level)
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Cuerpo completo comprimido con ``encoding``"""
+    single = compressor(encoding, level)
+    return single.compress(body) + single.finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return [*headers, (b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary.strip() == b"*":
+        return headers
+    return [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+
+
+class CompressionMiddleware:
+    """Middleware ASGI: comprime el cuerpo con brotli o gzip si el cliente lo acepta"""
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else settings.COMPRESSION_MIN_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _header(scope.get("headers", []), b"accept-encoding")
+        encoding = choose_encoding(accept_encoding.decode("latin-1")) if accept_encoding else None
+
+        start = None        # inicio de la respuesta retenido hasta ver el cuerpo
+        stream = None       # compresor en streaming
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, stream, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                status = message["status"]
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if status == 304:
+                    # Mismas cabeceras de caché que tendría el 200
+                    passthrough = True
+                    await send({**message, "headers": _with_vary(headers)})
+                elif status < 200 or status == 204 or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                elif encoding is None or _header(headers, b"content-encoding") is not None:
+                    passthrough = True
+                    await send({**message, "headers": _with_vary(headers)})
+                else:
+                    start = {**message, "headers": _with_vary(headers)}
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is not None:
+                chunk = stream.compress(body)
+                if not more_body:
+                    chunk += stream.finish()
+                if chunk or not more_body:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = [(k, v) for k, v in start["headers"] if k.lower() not in _DROPPED]
+            headers.append((b"content-encoding", encoding.encode()))
+            if not more_body:
+                # Cuerpo completo en un mensaje
+                if len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                body = compress(body, encoding)
+                headers.append((b"content-length", str(len(body)).encode()))
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            # Streaming: se comprime cada trozo según llega
+            stream = compressor(encoding)
+            await send({**start, "headers": headers})
+            chunk = stream.compress(body)
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,278 @@
+"""Mensajes entre los workers de la API: invalidación de cachés y eventos.
+
+Con varios workers cada uno tiene su propia memoria: cachés, marcas, etc. Lo
+que uno cambia los demás no lo ven hasta que lo leen de la base de datos.
+``bus`` publica mensajes pequeños (JSON) en un canal y los entrega a los
+suscriptores de ese canal en todos los workers, incluido el que publica::
+
+    bus.subscribe("cache_versions", on_change)   # async def on_change(data)
+    bus.publish("cache_versions", {"name": "category_tree"})
+
+La entrega es best effort: un worker que está arrancando o un Redis caído
+pierden mensajes. Quien necesite consistencia debe tener su fuente de verdad
+en la base de datos y usar el mensaje sólo para enterarse antes (como
+``cache_versions``, que además sondea).
+
+Backends (COORDINATION_BACKEND):
+
+- ``redis``: pub/sub de Redis (REDIS_URL); llega a workers de otras máquinas.
+- ``ipc``: un socket Unix de datagramas por worker en COORDINATION_IPC_DIR;
+  publicar es enviar a todos los sockets del directorio. Sin dependencias,
+  para los workers de una misma máquina.
+- ``local``: sólo este proceso (un worker, pruebas).
+- ``auto`` (por defecto): ``redis`` si hay REDIS_URL y el paquete está
+  instalado; si no, ``ipc`` donde hay sockets Unix y ``local`` en otro caso.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Awaitable[None]]
+
+
+class LocalTransport:
+    """Sin transporte: los mensajes sólo llegan a este proceso"""
+
+    name = "local"
+
+    async def start(self, deliver: Callable[[bytes], None]) -> None:
+        pass
+
+    def send(self, payload: bytes) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class IPCTransport:
+    """Sockets Unix de datagramas, uno por worker, en un directorio compartido"""
+
+    name = "ipc"
+
+    def __init__(self, directory: Optional[str] = None):
+        if directory is None:
+            # Un directorio por base de datos: los workers que comparten estado
+            digest = hashlib.sha1(settings.DATABASE_URL.encode()).hexdigest()[:12]
+            directory = os.path.join(tempfile.gettempdir(), f"greenloop-ipc-{digest}")
+        self.directory = Path(directory)
+        self.path: Optional[Path] = None
+        self._socket: Optional[socket.socket] = None
+
+    async def start(self, deliver: Callable[[bytes], None]) -> None:
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.path = self.directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(str(self.path))
+
+        def on_readable():
+            while True:
+                try:
+                    payload = self._socket.recv(65536)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    return
+                deliver(payload)
+
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), on_readable)
+
+    def send(self, payload: bytes) -> None:
+        if self._socket is None:
+            return
+        for peer in self.directory.glob("*.sock"):
+            if peer == self.path:
+                continue
+            try:
+                self._socket.sendto(payload, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de un worker que ya no existe
+                peer.unlink(missing_ok=True)
+            except BlockingIOError:
+                logger.debug("Worker %s saturado, mensaje descartado", peer.name)
+            except OSError as e:
+                logger.warning("No se pudo enviar a %s: %s", peer.name, e)
+
+    async def stop(self) -> None:
+        if self._socket is not None:
+            asyncio.get_running_loop().remove_reader(self._socket.fileno())
+            self._socket.close()
+            self._socket = None
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class RedisTransport:
+    """Pub/sub de Redis en un único canal para todos los mensajes"""
+
+    name = "redis"
+    CHANNEL = "greenloop:coordination"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # dependencia opcional
+
+        self.redis = redis.from_url(url)
+        self._task: Optional[asyncio.Task] = None
+        self._pending: set = set()
+
+    async def start(self, deliver: Callable[[bytes], None]) -> None:
+        self._task = asyncio.create_task(self._listen(deliver), name="coordination-redis")
+
+    async def _listen(self, deliver: Callable[[bytes], None]) -> None:
+        delay = 1.0
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    delay = 1.0
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            deliver(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Coordinación por Redis interrumpida (%s); reintento en %.0fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def send(self, payload: bytes) -> None:
+        task = asyncio.get_running_loop().create_task(self._publish(payload))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _publish(self, payload: bytes) -> None:
+        try:
+            await self.redis.publish(self.CHANNEL, payload)
+        except Exception as e:
+            logger.warning("No se pudo publicar en Redis: %s", e)
+
+    async def stop(self) -> None:
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.redis.aclose()
+
+
+def create_transport(backend: Optional[str] = None):
+    backend = backend or settings.COORDINATION_BACKEND
+    if backend == "auto":
+        if settings.REDIS_URL:
+            try:
+                return RedisTransport(settings.REDIS_URL)
+            except ImportError:
+                logger.info("REDIS_URL configurado pero falta el paquete redis: coordinación por IPC")
+        backend = "ipc" if hasattr(socket, "AF_UNIX") else "local"
+    if backend == "redis":
+        if not settings.REDIS_URL:
+            raise RuntimeError("COORDINATION_BACKEND=redis requiere REDIS_URL")
+        return RedisTransport(settings.REDIS_URL)
+    if backend == "ipc":
+        return IPCTransport(settings.COORDINATION_IPC_DIR or None)
+    if backend == "local":
+        return LocalTransport()
+    raise ValueError(f"COORDINATION_BACKEND desconocido: {backend}")
+
+
+class Bus:
+    """Canales con suscriptores en este proceso y transporte hacia los demás workers"""
+
+    def __init__(self, transport=None):
+        self._transport = transport
+        self.origin: Optional[str] = None
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._tasks: set = set()
+        self.started = False
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = create_transport()
+        return self._transport
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        if handler not in self._handlers[channel]:
+            self._handlers[channel].append(handler)
+
+    def unsubscribe(self, channel: str, handler: Handler) -> None:
+        if handler in self._handlers.get(channel, ()):
+            self._handlers[channel].remove(handler)
+
+    def publish(self, channel: str, data: Any = None) -> None:
+        """Entregar ``data`` a los suscriptores de ``channel`` en todos los workers.
+
+        No bloquea (se puede llamar desde eventos síncronos como
+        ``after_commit``); los suscriptores se ejecutan como tareas.
+        """
+        self._dispatch(channel, data)
+        if self.started:
+            payload = json.dumps({"o": self.origin, "c": channel, "d": data}, default=str).encode()
+            self.transport.send(payload)
+
+    def _receive(self, payload: bytes) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Mensaje de coordinación no válido descartado")
+            return
+        if message.get("o") != self.origin:
+            self._dispatch(message.get("c"), message.get("d"))
+
+    def _dispatch(self, channel: str, data: Any) -> None:
+        handlers = self._handlers.get(channel)
+        if not handlers:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # sin bucle (scripts): nadie escucha
+        for handler in list(handlers):
+            task = loop.create_task(self._run(channel, handler, data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _run(channel: str, handler: Handler, data: Any) -> None:
+        try:
+            await handler(data)
+        except Exception:
+            logger.exception("Error procesando un mensaje de %s", channel)
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        # En start() y no al importar: con preload_app los workers se crean
+        # por fork y compartirían el mismo origen
+        self.origin = uuid.uuid4().hex
+        await self.transport.start(self._receive)
+        self.started = True
+        logger.info("Coordinación entre workers: %s", self.transport.name)
+
+    async def stop(self) -> None:
+        if not self.started:
+            return
+        self.started = False
+        await self.transport.stop()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+bus = Bus()
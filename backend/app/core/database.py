@@ -1,37 +1,132 @@
+from fastapi import Depends
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
 import os
 import asyncio
+import logging
+from uuid import uuid4
 
 from .config import settings
+from .sqlite import SQLiteSession, configure as configure_sqlite, is_sqlite_file
 
-# Crear el engine async de SQLAlchemy
-if "sqlite" in settings.DATABASE_URL:
-    # Para SQLite (desarrollo)
-    engine = create_async_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=settings.DEBUG
+logger = logging.getLogger(__name__)
+
+# Conexiones que puede ocupar a la vez una petición: la de su sesión (``get_db``,
+# compartida con ``get_uow`` y ``get_read_db``) y la de una sesión interna
+# breve, como la recarga de una caché en memoria (árbol de categorías)
+CONNECTIONS_PER_REQUEST = 2
+
+
+def required_connections() -> int:
+    """Conexiones para que CONCURRENCY_LIMIT peticiones no se esperen unas a otras"""
+    return CONNECTIONS_PER_REQUEST * max(1, settings.CONCURRENCY_LIMIT)
+
+
+def sqlite_read_overflow() -> int:
+    """Conexiones de lectura extra sobre SQLITE_READ_POOL_SIZE (por defecto, hasta ``required_connections``)"""
+    if settings.SQLITE_READ_MAX_OVERFLOW is not None:
+        return max(0, settings.SQLITE_READ_MAX_OVERFLOW)
+    return max(0, required_connections() - settings.SQLITE_READ_POOL_SIZE)
+
+
+def _asyncpg_connect_args() -> dict:
+    args = {
+        "timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT_SECONDS,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+    if settings.DB_UNIQUE_PREPARED_STATEMENT_NAMES:
+        # Nombres únicos: otra conexión del servidor (PgBouncer) no los tiene preparados
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return args
+
+
+def create_engine_for(url: str, **kwargs):
+    """Engine async con la configuración de pool de su dialecto (primario o réplica)"""
+    if is_sqlite_file(url):
+        # SQLite en fichero: pool de conexiones en modo WAL (ver app.core.sqlite)
+        writer = kwargs.pop("writer", False)
+        sqlite_engine = create_async_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=kwargs.pop("pool_size", 1 if writer else settings.SQLITE_READ_POOL_SIZE),
+            max_overflow=kwargs.pop("max_overflow", 0 if writer else sqlite_read_overflow()),
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            # Los lectores van en autocommit: no hay nada que deshacer al devolverlos
+            pool_reset_on_return="rollback" if writer else None,
+            echo=settings.DEBUG,
+            **kwargs
+        )
+        configure_sqlite(sqlite_engine, writer=writer)
+        return sqlite_engine
+    if "sqlite" in url:
+        # SQLite en memoria (desarrollo y pruebas): una única conexión compartida
+        return create_async_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=settings.DEBUG,
+            **kwargs
+        )
+    # Para PostgreSQL (producción)
+    return create_async_engine(
+        url,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        connect_args=_asyncpg_connect_args() if "+asyncpg" in url else {},
+        echo=settings.DEBUG,
+        **kwargs
+    )
+
+# Crear el engine async de SQLAlchemy (primario: lecturas y escrituras)
+if is_sqlite_file(settings.DATABASE_URL):
+    # Una conexión de escritura y un pool de lectores que reparte SQLiteSession
+    engine = create_engine_for(settings.DATABASE_URL, writer=True)
+    read_engine = create_engine_for(settings.DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        sync_session_class=SQLiteSession,
+        reader=read_engine.sync_engine,
+        expire_on_commit=False
     )
 else:
-    # Para PostgreSQL (producción)
-    engine = create_async_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20,
-        echo=settings.DEBUG
+    engine = read_engine = create_engine_for(settings.DATABASE_URL)
+
+    # Crear AsyncSessionLocal class
+    AsyncSessionLocal = async_sessionmaker(
+        engine, 
+        class_=AsyncSession, 
+        expire_on_commit=False
     )
 
-# Crear AsyncSessionLocal class
-AsyncSessionLocal = async_sessionmaker(
-    engine, 
-    class_=AsyncSession, 
-    expire_on_commit=False
-)
+def check_pool_size() -> None:
+    """Avisar si el pool no cubre CONCURRENCY_LIMIT peticiones con sus conexiones.
+
+    Con menos conexiones, cada petición retiene una mientras espera otra y el
+    pool se bloquea hasta DB_POOL_TIMEOUT_SECONDS.
+    """
+    url = settings.DATABASE_URL
+    if "sqlite" in url and not is_sqlite_file(url):
+        return  # una única conexión compartida
+    if is_sqlite_file(url):
+        name, capacity = "SQLITE_READ_POOL_SIZE + SQLITE_READ_MAX_OVERFLOW", settings.SQLITE_READ_POOL_SIZE + sqlite_read_overflow()
+    else:
+        name, capacity = "DB_POOL_SIZE + DB_MAX_OVERFLOW", settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    if capacity < required_connections():
+        logger.warning(
+            "%s = %d conexiones y CONCURRENCY_LIMIT=%d peticiones pueden necesitar hasta %d: "
+            "baja CONCURRENCY_LIMIT o amplía el pool",
+            name, capacity, settings.CONCURRENCY_LIMIT, required_connections()
+        )
 
 # Crear Base class
 Base = declarative_base()
@@ -44,6 +139,51 @@ async def get_db():
         finally:
             await session.close()
 
+# Unidad de trabajo: toda la petición en una sola transacción
+async def get_uow(session: AsyncSession = Depends(get_db)):
+    """Sesión cuya transacción se confirma una vez al terminar el endpoint.
+
+    Es la misma sesión de ``get_db`` que usan las dependencias de
+    autenticación (FastAPI la crea una vez por petición): una petición ocupa
+    una sola conexión del pool y no espera a una segunda mientras retiene la
+    primera.
+
+    El endpoint sólo hace ``flush`` (y ``refresh`` si necesita valores
+    generados por la base de datos); si lanza cualquier excepción, incluida
+    una ``HTTPException``, se deshace todo. La confirmación ocurre antes de
+    enviar la respuesta, así que un fallo al confirmar llega al cliente como
+    error y no como un éxito que no se guardó.
+    """
+    try:
+        yield session
+    except BaseException:
+        await session.rollback()
+        raise
+    else:
+        await session.commit()
+
+def dialect_insert(db, table):
+    """``INSERT`` del dialecto activo, con ``on_conflict_do_*`` (upserts).
+
+    Acepta una sesión o una conexión.
+    """
+    dialect = db.dialect.name if hasattr(db, "dialect") else db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise RuntimeError(f"Dialecto no soportado para upserts: {dialect}")
+
+async def dispose_engines():
+    """Cerrar las conexiones de los pools (en SQLite, también las de lectura)
+
+    Las conexiones de aiosqlite viven en hilos que no son daemon: si quedan
+    abiertas, el proceso no termina al acabar el lifespan.
+    """
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
 # Función async para crear todas las tablas
 async def create_tables():
     """Crear todas las tablas en la base de datos"""
@@ -5,7 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from app.core.database import get_db
-from app.core.security import verify_token, AuthenticationError
+from app.core.activity import tracker as activity
+from app.core.revocation import verify_access_token
+from app.core.security import AuthenticationError
 from app.models.user import User
 from app.models.company import Company
 from app.models.admin_user import AdminUser
@@ -17,17 +19,34 @@ oauth2_scheme = OAuth2PasswordBearer(
     scheme_name="JWT"
 )
 
+def get_access_payload(
+    token: str = Depends(oauth2_scheme)
+) -> dict:
+    """Verificar el token de acceso (firma, expiración y sesión no revocada)"""
+    payload = verify_access_token(token)
+    if payload is None:
+        raise AuthenticationError("Token inválido o expirado")
+    return payload
+
+def session_id_from_payload(payload: dict) -> Optional[UUID]:
+    """Id de la sesión (``sid``) de un token; None en tokens anteriores a las sesiones por id"""
+    try:
+        return UUID(payload["sid"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def get_current_session_id(
+    payload: dict = Depends(get_access_payload)
+) -> Optional[UUID]:
+    """Obtener el id de la sesión del token actual"""
+    return session_id_from_payload(payload)
+
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
+    payload: dict = Depends(get_access_payload),
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """Obtener el usuario actual basado en el token JWT"""
     
-    # Verificar el token
-    payload = verify_token(token, "access")
-    if payload is None:
-        raise AuthenticationError("Token inválido o expirado")
-    
     # Extraer el ID del usuario
     user_id_str = payload.get("sub")
     if user_id_str is None:
@@ -49,6 +68,7 @@ async def get_current_user(
     if not user.is_active:
         raise AuthenticationError("Usuario inactivo")
     
+    activity.record_user(user.id, session_id_from_payload(payload))
     return user
 
 def get_current_active_user(
@@ -87,7 +107,7 @@ async def get_optional_current_user(
     
     try:
         # Verificar el token
-        payload = verify_token(token, "access")
+        payload = verify_access_token(token)
         if payload is None:
             return None
         
@@ -108,6 +128,7 @@ async def get_optional_current_user(
         if user is None or not user.is_active:
             return None
         
+        activity.record_user(user.id, session_id_from_payload(payload))
         return user
     except Exception:
         return None
@@ -140,7 +161,7 @@ async def get_current_actor(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
 ) -> CurrentActor:
-    payload = verify_token(token, "access")
+    payload = verify_access_token(token)
     if payload is None:
         raise AuthenticationError("Token inválido o expirado")
 
@@ -159,6 +180,7 @@ async def get_current_actor(
     if user is not None:
         if not user.is_active:
             raise AuthenticationError("Usuario inactivo")
+        activity.record_user(user.id, session_id_from_payload(payload))
         return CurrentActor(actor_type="user", user=user)
 
     company_result = await db.execute(select(Company).where(Company.id == actor_id))
@@ -166,6 +188,7 @@ async def get_current_actor(
     if company is not None:
         if not company.is_active:
             raise AuthenticationError("Empresa inactiva")
+        activity.record_company(company.id, session_id_from_payload(payload))
         return CurrentActor(actor_type="company", company=company)
 
     raise AuthenticationError("Usuario o empresa no encontrado")
@@ -181,7 +204,7 @@ async def get_optional_actor(
 
     token = authorization.split(" ")[1]
     try:
-        payload = verify_token(token, "access")
+        payload = verify_access_token(token)
         if payload is None:
             return None
         actor_id_str = payload.get("sub")
@@ -196,11 +219,13 @@ async def get_optional_actor(
         user_result = await db.execute(select(User).where(User.id == actor_id))
         user = user_result.scalar_one_or_none()
         if user is not None and user.is_active:
+            activity.record_user(user.id, session_id_from_payload(payload))
             return CurrentActor(actor_type="user", user=user)
 
         company_result = await db.execute(select(Company).where(Company.id == actor_id))
         company = company_result.scalar_one_or_none()
         if company is not None and company.is_active:
+            activity.record_company(company.id, session_id_from_payload(payload))
             return CurrentActor(actor_type="company", company=company)
 
         return None
@@ -0,0 +1,182 @@
+"""Exportaciones en streaming (CSV / NDJSON / JSON, opcionalmente gzip).
+
+Cada exportación declara sus columnas una sola vez (``ExportSpec``). Las
+filas se leen con un cursor del lado del servidor (``AsyncSession.stream``
+con ``yield_per``) y cada lote se codifica y se envía en cuanto llega, así
+que la memoria usada no depende del tamaño de la tabla. ``json`` es el mismo
+contenido que ``ndjson`` dentro del sobre de las exportaciones JSON
+(``{"format", "filename", "data": [...], "total_records"}``), para los
+clientes que esperan un documento JSON; ``total_records`` va al final
+porque sólo se conoce al terminar.
+
+La consulta se ejecuta en una sesión propia: FastAPI cierra las dependencias
+con ``yield`` (``get_db``) antes de enviar el cuerpo de la respuesta. Los
+permisos y parámetros se validan en el endpoint antes de devolverla.
+
+Ejemplo::
+
+    CATEGORIES = ExportSpec("categories", {"id": Category.id, "name": Category.name}, order_by=[Category.name])
+    return stream_export(CATEGORIES, "csv", conditions=[Category.is_active == True])
+"""
+import csv
+import enum
+import io
+import zlib
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Iterable, Literal, Optional, Sequence
+
+import orjson
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+ExportFormat = Literal["csv", "ndjson", "json"]
+
+_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+class ExportSpec:
+    """Columnas exportadas (nombre → columna) y orden de una exportación"""
+
+    def __init__(self, name: str, columns: Mapping[str, Any], order_by: Sequence[Any] = (), joins: Sequence[tuple] = ()):
+        self.name = name
+        self.columns = dict(columns)
+        self.order_by = list(order_by)
+        self.joins = list(joins)  # (tabla, condición) para columnas de otras tablas
+
+    def statement(self, conditions: Iterable[Any] = ()) -> Select:
+        stmt = select(*[column.label(name) for name, column in self.columns.items()])
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        return stmt.where(*conditions).order_by(*self.order_by)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+class _CSVEncoder:
+    def __init__(self, header: Sequence[str]):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(header)
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        self._writer.writerows([_csv_value(v) for v in row] for row in rows)
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+        return data.encode("utf-8")
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _NDJSONEncoder:
+    def __init__(self, header: Sequence[str]):
+        self._header = list(header)
+
+    def _dumps(self, row: Sequence[Any]) -> bytes:
+        return orjson.dumps(dict(zip(self._header, row)), default=_json_default, option=orjson.OPT_UTC_Z)
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        return b"".join(self._dumps(row) + b"\n" for row in rows)
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _JSONEncoder(_NDJSONEncoder):
+    """Sobre JSON: las filas en ``data`` y el total en ``total_records`` al final"""
+
+    def __init__(self, header: Sequence[str], filename: str = ""):
+        super().__init__(header)
+        self._filename = filename
+        self._started = False
+        self._count = 0
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        prefix = b""
+        if not self._started:
+            self._started = True
+            prefix = orjson.dumps({"format": "json", "filename": self._filename})[:-1] + b',"data":['
+        if not rows:
+            return prefix
+        if self._count:
+            prefix += b","
+        self._count += len(rows)
+        return prefix + b",".join(self._dumps(row) for row in rows)
+
+    def finish(self) -> bytes:
+        return b'],"total_records":' + str(self._count).encode() + b"}"
+
+
+_ENCODERS = {"csv": _CSVEncoder, "ndjson": _NDJSONEncoder}
+
+
+async def export_chunks(
+    spec: ExportSpec,
+    format: ExportFormat,
+    conditions: Iterable[Any] = (),
+    compress: bool = False,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    batch_size: Optional[int] = None,
+    filename: str = "",
+) -> AsyncIterator[bytes]:
+    """Bloques de la exportación, un lote de filas por bloque"""
+    header = list(spec.columns)
+    encoder = _JSONEncoder(header, filename) if format == "json" else _ENCODERS[format](header)
+    gzipper = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    stmt = spec.statement(conditions).execution_options(yield_per=batch_size or settings.EXPORT_BATCH_SIZE)
+
+    def out(data: bytes) -> bytes:
+        return gzipper.compress(data) if gzipper else data
+
+    first = out(encoder.encode([]))
+    if first:
+        yield first
+    async with session_factory() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            chunk = out(encoder.encode(rows))
+            if chunk:
+                yield chunk
+    last = out(encoder.finish())
+    if last:
+        yield last
+    if gzipper:
+        yield gzipper.flush()
+
+
+def stream_export(
+    spec: ExportSpec,
+    format: ExportFormat,
+    conditions: Iterable[Any] = (),
+    compress: bool = False,
+    filename: Optional[str] = None,
+) -> StreamingResponse:
+    """Respuesta de descarga con la exportación en streaming"""
+    filename = (filename or f"{spec.name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}") + f".{format}"
+    download = filename + (".gz" if compress else "")
+    return StreamingResponse(
+        export_chunks(spec, format, list(conditions), compress, filename=filename),
+        media_type="application/gzip" if compress else _MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{download}"'},
+    )
@@ -0,0 +1,149 @@
+"""Filtros y ordenamiento declarativos para endpoints de búsqueda.
+
+Cada endpoint declara una sola vez qué parámetros filtran sobre qué columnas y
+por qué columnas se puede ordenar (``SearchSpec``). A partir de los parámetros
+recibidos se generan las condiciones siempre en el mismo orden y con valores
+como parámetros enlazados, de modo que cada combinación de filtros produce una
+única sentencia SQL estable: la caché de compilación de SQLAlchemy y las
+sentencias preparadas de asyncpg se reutilizan entre peticiones. La misma
+lista de condiciones sirve para la consulta paginada y para el conteo.
+
+Ejemplo::
+
+    ITEM_SEARCH = SearchSpec(
+        filters=[contains("query", Item.title, Item.description), eq("category_id", Item.category_id)],
+        sorts={"created_at": Item.created_at, "title": Item.title},
+        default_sort="created_at",
+        tiebreaker=Item.id,
+    )
+    conditions = ITEM_SEARCH.conditions(search_params)
+    stmt = ITEM_SEARCH.order(select(Item).where(*conditions), search_params.sort_by, search_params.sort_order)
+"""
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class Filter:
+    """Condición que se aplica cuando el parámetro ``param`` tiene valor"""
+
+    def __init__(self, param: str, build: Callable[[Any], ColumnElement], apply_false: bool = True):
+        self.param = param
+        self.build = build
+        # Para flags como ``unread_only`` el valor False equivale a "sin filtro"
+        self.apply_false = apply_false
+
+    def is_active(self, value: Any) -> bool:
+        if value is None or value == "":
+            return False
+        if value is False and not self.apply_false:
+            return False
+        return True
+
+
+def eq(param: str, column, transform: Optional[Callable[[Any], Any]] = None) -> Filter:
+    return Filter(param, lambda v: column == (transform(v) if transform else v))
+
+
+def gte(param: str, column) -> Filter:
+    return Filter(param, lambda v: column >= v)
+
+
+def lte(param: str, column) -> Filter:
+    return Filter(param, lambda v: column <= v)
+
+
+def contains(param: str, *columns) -> Filter:
+    """Búsqueda de texto sin distinguir mayúsculas en una o varias columnas.
+
+    Los comodines del usuario (``%``, ``_``) se escapan.
+    """
+    def build(value):
+        clauses = [column.icontains(value, autoescape=True) for column in columns]
+        return clauses[0] if len(clauses) == 1 else or_(*clauses)
+    return Filter(param, build)
+
+
+def flag(param: str, *clauses: ColumnElement) -> Filter:
+    """Condiciones fijas que se aplican sólo cuando el parámetro es verdadero"""
+    condition = clauses[0] if len(clauses) == 1 else and_(*clauses)
+    return Filter(param, lambda v: condition, apply_false=False)
+
+
+def custom(param: str, build: Callable[[Any], ColumnElement], apply_false: bool = True) -> Filter:
+    return Filter(param, build, apply_false=apply_false)
+
+
+class Sort:
+    """Columna ordenable; ``nulls_last`` mantiene los nulos al final en ambos sentidos"""
+
+    def __init__(self, column, nulls_last: bool = False):
+        self.column = column
+        self.nulls_last = nulls_last
+
+    def clause(self, descending: bool):
+        clause = self.column.desc() if descending else self.column.asc()
+        return clause.nulls_last() if self.nulls_last else clause
+
+
+class SearchSpec:
+    """Filtros y ordenamientos permitidos para un endpoint de búsqueda"""
+
+    def __init__(
+        self,
+        filters: Sequence[Filter],
+        sorts: Dict[str, Union[Sort, Any]],
+        default_sort: str,
+        tiebreaker=None,
+    ):
+        self.filters = list(filters)
+        self.sorts = {name: s if isinstance(s, Sort) else Sort(s) for name, s in sorts.items()}
+        if default_sort not in self.sorts:
+            raise ValueError(f"Ordenamiento por defecto desconocido: {default_sort}")
+        self.default_sort = default_sort
+        self.tiebreaker = tiebreaker
+
+    @staticmethod
+    def _value(params: Any, name: str) -> Any:
+        if isinstance(params, Mapping):
+            return params.get(name)
+        return getattr(params, name, None)
+
+    def conditions(self, params: Any) -> List[ColumnElement]:
+        """Condiciones activas, siempre en el orden de declaración"""
+        result = []
+        for spec_filter in self.filters:
+            value = self._value(params, spec_filter.param)
+            if spec_filter.is_active(value):
+                result.append(spec_filter.build(value))
+        return result
+
+    def order_by(self, sort_by: Optional[str], sort_order: Optional[str] = "desc") -> list:
+        """Cláusulas ORDER BY; sólo se admiten los campos declarados"""
+        name = sort_by or self.default_sort
+        sort = self.sorts.get(name)
+        if sort is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campo de ordenamiento no permitido: {name}"
+            )
+        descending = (sort_order or "desc").lower() == "desc"
+        clauses = [sort.clause(descending)]
+        if self.tiebreaker is not None:
+            clauses.append(self.tiebreaker.desc() if descending else self.tiebreaker.asc())
+        return clauses
+
+    def order(self, stmt: Select, sort_by: Optional[str], sort_order: Optional[str] = "desc") -> Select:
+        return stmt.order_by(*self.order_by(sort_by, sort_order))
+
+
+def count_statement(stmt: Select) -> Select:
+    """``SELECT count(*)`` sobre una consulta ya filtrada (sin ORDER BY/LIMIT)"""
+    return select(func.count()).select_from(stmt.order_by(None).limit(None).offset(None).subquery())
+
+
+def paginate(stmt: Select, page: int, page_size: int) -> Select:
+    return stmt.offset((page - 1) * page_size).limit(page_size)
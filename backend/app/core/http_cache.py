@@ -0,0 +1,128 @@
+"""GET condicionales: ETag débil y 304 Not Modified.
+
+``ConditionalGetMiddleware`` calcula un ETag débil (``W/"..."``) con el hash
+del cuerpo de cada respuesta GET 200 que no trae uno propio. Si el cliente
+envía ese mismo valor en ``If-None-Match`` responde 304 sin cuerpo: se ahorra
+la transferencia, pero la consulta y la serialización ya se hicieron. No se
+calcula en streaming (exportaciones) ni para cuerpos de más de
+ETAG_MAX_BODY_BYTES.
+
+Cuando el endpoint conoce la versión de lo que va a devolver antes de
+construirlo (la versión de una caché, el ``updated_at`` de una entidad),
+puede ahorrarse también la serialización::
+
+    etag = weak_etag("user", user.id, user.updated_at)
+    check_not_modified(request, etag)   # HTTPException 304 si coincide
+    response.headers["ETag"] = etag
+
+El ETag es débil: vale para el mismo contenido con cualquier codificación
+(gzip, brotli). Un ETag a partir de ``updated_at`` sólo es tan fino como la
+columna: en SQLite (segundos) dos cambios en el mismo segundo dan el mismo.
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+_DROPPED = {b"content-length", b"content-type", b"content-encoding", b"transfer-encoding", b"etag"}
+
+
+def body_etag(body: bytes) -> str:
+    """ETag débil del contenido"""
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def weak_etag(*parts: Any) -> str:
+    """ETag débil a partir de versiones (ids, números de versión, ``updated_at``)"""
+    return body_etag(repr(parts).encode())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de ``If-None-Match`` (lista de ETags o ``*``)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def check_not_modified(request: Request, etag: str) -> None:
+    """Cortar con 304 si el cliente ya tiene la versión ``etag``"""
+    if settings.ETAG_ENABLED and etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+
+
+def _not_modified(message: dict, etag: bytes) -> dict:
+    headers = [(k, v) for k, v in message.get("headers", []) if k.lower() not in _DROPPED]
+    return {"type": "http.response.start", "status": 304, "headers": [*headers, (b"etag", etag)]}
+
+
+class ConditionalGetMiddleware:
+    """Middleware ASGI: ETag débil en las respuestas GET y 304 si no cambiaron"""
+
+    def __init__(self, app, max_body_bytes: Optional[int] = None):
+        self.app = app
+        self.max_body_bytes = max_body_bytes if max_body_bytes is not None else settings.ETAG_MAX_BODY_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ETAG_ENABLED or scope.get("method") != "GET":
+            await self.app(scope, receive, send)
+            return
+        if_none_match = None
+        for key, value in scope.get("headers", []):
+            if key == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        start = None        # inicio retenido hasta tener el cuerpo
+        passthrough = False
+        swallow = False     # ya se envió el 304: se descarta el cuerpo
+
+        async def send_tagged(message):
+            nonlocal start, passthrough, swallow
+            if passthrough:
+                await send(message)
+                return
+            if swallow:
+                return
+
+            if message["type"] == "http.response.start":
+                etag = next((v for k, v in message.get("headers", []) if k.lower() == b"etag"), None)
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                elif etag is not None:
+                    # El endpoint puso su propio ETag
+                    if etag_matches(if_none_match, etag.decode("latin-1")):
+                        swallow = True
+                        await send(_not_modified(message, etag))
+                        await send({"type": "http.response.body", "body": b""})
+                    else:
+                        passthrough = True
+                        await send(message)
+                else:
+                    start = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) > self.max_body_bytes:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            etag = body_etag(body)
+            if etag_matches(if_none_match, etag):
+                await send(_not_modified(start, etag.encode()))
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await send({**start, "headers": [*start.get("headers", []), (b"etag", etag.encode())]})
+                await send(message)
+
+        await self.app(scope, receive, send_tagged)
@@ -0,0 +1,153 @@
+"""Listados grandes con proyección de columnas y paginación por cursor.
+
+Cada listado declara una sola vez las columnas que se pueden pedir
+(nombre → columna o expresión SQL), las que se devuelven por defecto, sus
+filtros (los mismos ``Filter`` de ``app.core.filters``) y la columna de orden.
+El cliente elige columnas con ``fields=id,username,...`` y sólo esas se leen
+de la base de datos; las filas salen como diccionarios sin pasar por modelos.
+
+La paginación es por clave (``(orden, id) < cursor``), así que el coste de una
+página no depende de lo lejos que esté: no hay OFFSET. En SQLite las fechas
+son texto y no todas tienen el mismo formato (``server_default=func.now()``
+guarda ``2026-10-19 02:21:49``, el driver ``...49.000000``), así que allí la
+fecha se normaliza con ``strftime`` en ambos lados de la comparación y en el
+ORDER BY (``sort_key``). El mismo listado puede
+servirse en streaming como NDJSON (``export``), con los mismos filtros.
+
+Ejemplo::
+
+    USERS = ListingSpec(
+        "users",
+        {"id": User.id, "username": User.username, "created_at": User.created_at},
+        default_fields=["id", "username"],
+        filters=[contains("q", User.username)],
+        sort_column=User.created_at,
+        tiebreaker=User.id,
+    )
+    page = await USERS.page(db, USERS.fields(fields), USERS.conditions(params, cursor), limit)
+"""
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.core.exports import ExportSpec
+from app.core.filters import Filter, SearchSpec
+
+
+class sort_key(FunctionElement):
+    """La columna de orden tal cual; en SQLite, la fecha normalizada a ``%Y-%m-%d %H:%M:%f``"""
+    inherit_cache = True
+
+
+@compiles(sort_key)
+def _sort_key(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(sort_key, "sqlite")
+def _sort_key_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime("%Y-%m-%d %H:%M:%f", *element.clauses), **kw)
+
+
+def encode_cursor(value: datetime, row_id: UUID) -> str:
+    raw = f"{value.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, row_id = raw.split("|")
+        return datetime.fromisoformat(value), UUID(row_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+
+class ListingSpec:
+    """Columnas, filtros y orden (descendente, por fecha e id) de un listado"""
+
+    def __init__(
+        self,
+        name: str,
+        columns: Mapping[str, Any],
+        default_fields: Sequence[str],
+        filters: Sequence[Filter],
+        sort_column,
+        tiebreaker,
+        joins: Sequence[tuple] = (),
+    ):
+        self.name = name
+        self.columns = dict(columns)
+        unknown = [field for field in default_fields if field not in self.columns]
+        if unknown:
+            raise ValueError(f"Campos por defecto desconocidos: {unknown}")
+        self.default_fields = list(default_fields)
+        self.search = SearchSpec(filters, {"sort": sort_column}, "sort", tiebreaker=tiebreaker)
+        self.sort_column = sort_column
+        self.tiebreaker = tiebreaker
+        self.joins = list(joins)  # (tabla, condición) para columnas de otras tablas
+
+    def fields(self, requested: Optional[str]) -> List[str]:
+        """Columnas pedidas (``"a,b,c"``) o las de por defecto; 400 si alguna no existe"""
+        if not requested:
+            return list(self.default_fields)
+        fields = list(dict.fromkeys(f.strip() for f in requested.split(",") if f.strip()))
+        unknown = [field for field in fields if field not in self.columns]
+        if unknown or not fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campos no permitidos: {', '.join(unknown)}. Opciones: {', '.join(self.columns)}"
+            )
+        return fields
+
+    def conditions(self, params: Any, cursor: Optional[str] = None) -> List[ColumnElement]:
+        """Filtros activos y, si hay cursor, la condición de "después del cursor" """
+        conditions = self.search.conditions(params)
+        if cursor:
+            after_value, after_id = decode_cursor(cursor)
+            conditions.append(
+                tuple_(sort_key(self.sort_column), self.tiebreaker) < tuple_(
+                    sort_key(literal(after_value, self.sort_column.type)),
+                    literal(after_id, self.tiebreaker.type)
+                )
+            )
+        return conditions
+
+    def _order_by(self) -> list:
+        return [sort_key(self.sort_column).desc(), self.tiebreaker.desc()]
+
+    async def page(self, db: AsyncSession, fields: Sequence[str], conditions: Sequence[ColumnElement], limit: int) -> Dict[str, Any]:
+        """Una página: ``{"items", "next_cursor", "has_more", "limit"}``"""
+        stmt = select(*[self.columns[field].label(field) for field in fields], self.sort_column, self.tiebreaker)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        stmt = stmt.where(*conditions).order_by(*self._order_by()).limit(limit + 1)
+        rows = (await db.execute(stmt)).all()
+
+        width = len(fields)
+        items = [dict(zip(fields, row[:width])) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[width], last[width + 1])
+        return {"items": items, "next_cursor": next_cursor, "has_more": next_cursor is not None, "limit": limit}
+
+    def export(self, fields: Sequence[str]) -> ExportSpec:
+        """El listado como exportación en streaming (mismas columnas y orden)"""
+        return ExportSpec(
+            self.name,
+            {field: self.columns[field] for field in fields},
+            order_by=self._order_by(),
+            joins=self.joins,
+        )
@@ -0,0 +1,86 @@
+"""Carga por lotes de entidades relacionadas dentro de una petición.
+
+Los listados necesitan el autor, la empresa o el artículo de cada fila.
+Consultarlos fila a fila produce N+1 consultas. Un ``Loader`` reúne los ids
+de todo el resultado, los resuelve con una sola consulta ``IN`` y guarda lo
+obtenido en una caché de identidad que dura lo que dura la petición: si otro
+paso de la misma petición vuelve a pedir los mismos ids, no se consulta otra
+vez.
+
+Uso típico en un endpoint::
+
+    async def listado(loaders: Loaders = Depends(get_loaders), ...):
+        rows = ...
+        authors = await loaders.users.load_many(row.author_id for row in rows)
+        author = authors.get(row.author_id)
+"""
+from typing import Dict, Generic, Hashable, Iterable, Optional, Type, TypeVar
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.models import Category, Company, Item, User
+
+T = TypeVar("T")
+
+# Límite de parámetros por consulta IN (SQLite admite 32766 desde 3.32)
+MAX_BATCH = 5000
+
+
+class Loader(Generic[T]):
+    """Resuelve instancias de ``model`` por ``key`` con caché por petición"""
+
+    def __init__(self, db: AsyncSession, model: Type[T], key: str = "id"):
+        self.db = db
+        self.model = model
+        self.column = getattr(model, key)
+        self.key = key
+        self._cache: Dict[Hashable, Optional[T]] = {}
+
+    def prime(self, instance: T) -> None:
+        """Añadir a la caché una instancia ya cargada por otro camino"""
+        self._cache[getattr(instance, self.key)] = instance
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, T]:
+        """Devolver ``{clave: instancia}`` para las claves existentes.
+
+        Las claves ``None`` y repetidas se ignoran; las que no existen no
+        aparecen en el resultado (y tampoco se vuelven a consultar).
+        """
+        wanted = {k for k in keys if k is not None}
+        missing = [k for k in wanted if k not in self._cache]
+        for start in range(0, len(missing), MAX_BATCH):
+            chunk = missing[start:start + MAX_BATCH]
+            result = await self.db.execute(select(self.model).where(self.column.in_(chunk)))
+            for instance in result.scalars():
+                self.prime(instance)
+            for k in chunk:
+                self._cache.setdefault(k, None)
+        return {k: self._cache[k] for k in wanted if self._cache[k] is not None}
+
+    async def load(self, key: Optional[Hashable]) -> Optional[T]:
+        if key is None:
+            return None
+        return (await self.load_many([key])).get(key)
+
+
+class Loaders:
+    """Loaders de las entidades compartidas, uno por petición"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.users: Loader[User] = Loader(db, User)
+        self.companies: Loader[Company] = Loader(db, Company)
+        self.items: Loader[Item] = Loader(db, Item)
+        self.categories: Loader[Category] = Loader(db, Category)
+
+
+async def get_loaders(db: AsyncSession = Depends(get_db)) -> Loaders:
+    """Dependencia: loaders ligados a la sesión de la petición.
+
+    FastAPI cachea ``get_db`` dentro de una petición, así que los loaders
+    usan la misma sesión que el endpoint.
+    """
+    return Loaders(db)
@@ -0,0 +1,278 @@
+"""Perfilado por muestreo bajo demanda para workers en producción.
+
+El perfilador no instala nada mientras está inactivo: sólo se activa cuando un
+administrador solicita una captura de N segundos o cuando una petición trae la
+cabecera ``X-Profile`` con un token de perfilado válido.
+
+Modos:
+- ``wall``: un hilo auxiliar muestrea la pila del hilo del event loop con
+  ``sys._current_frames()`` (incluye tiempo esperando I/O).
+- ``cpu``: usa ``SIGPROF``/``ITIMER_PROF``, que sólo dispara mientras el proceso
+  consume CPU. Si la plataforma no lo soporta se recurre a ``wall``.
+
+Los resultados se exportan como pilas colapsadas (formato de flamegraph.pl) o
+como JSON de speedscope.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import verify_token
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+
+class ProfilerBusyError(RuntimeError):
+    """Ya hay una captura en curso en este worker"""
+
+
+class Profile:
+    """Resultado agregado de una captura"""
+
+    def __init__(self, profile_id: str, mode: str, interval: float, started_at: float, duration: float, samples: Counter, label: str):
+        self.id = profile_id
+        self.mode = mode
+        self.interval = interval
+        self.started_at = started_at
+        self.duration = duration
+        self.samples = samples
+        self.label = label
+
+    @property
+    def total_samples(self) -> int:
+        return sum(self.samples.values())
+
+    def to_collapsed(self) -> str:
+        """Pilas colapsadas: ``raiz;...;hoja <conteo>`` por línea"""
+        lines = []
+        for stack, count in self.samples.most_common():
+            names = ";".join(f"{func} ({os.path.basename(path)}:{line})" for func, path, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def to_speedscope(self) -> dict:
+        """Documento speedscope con un perfil de tipo 'sampled'"""
+        frame_index: Dict[Frame, int] = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                idx = frame_index.get(frame)
+                if idx is None:
+                    idx = len(frames)
+                    frame_index[frame] = idx
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(idx)
+            samples.append(indexes)
+            weights.append(round(count * self.interval, 6))
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label,
+            "exporter": "greenloop-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.label} ({self.mode})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.duration, 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "mode": self.mode,
+            "interval_ms": round(self.interval * 1000, 3),
+            "duration_seconds": round(self.duration, 3),
+            "total_samples": self.total_samples,
+            "unique_stacks": len(self.samples),
+        }
+
+
+def _frame_stack(frame) -> Stack:
+    """Convertir un frame en una tupla raíz→hoja"""
+    stack = []
+    depth = 0
+    while frame is not None and depth < 256:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+        depth += 1
+    stack.reverse()
+    return tuple(stack)
+
+
+def _cpu_mode_supported() -> bool:
+    return (
+        hasattr(signal, "SIGPROF")
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
+class StackSampler:
+    """Muestreador de pilas para un único hilo objetivo"""
+
+    def __init__(self, mode: str = "wall", interval: Optional[float] = None, thread_id: Optional[int] = None, label: str = "worker"):
+        if mode == "cpu" and not _cpu_mode_supported():
+            mode = "wall"
+        self.mode = mode
+        self.interval = interval or settings.PROFILING_SAMPLE_INTERVAL_MS / 1000
+        self.thread_id = thread_id or threading.get_ident()
+        self.label = label
+        self.profile_id = uuid.uuid4().hex
+        self._samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous_handler = None
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        if self.mode == "cpu":
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_sigprof)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._thread = threading.Thread(target=self._run, name="greenloop-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> Profile:
+        if self.mode == "cpu":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        else:
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join()
+        duration = time.perf_counter() - self._started_at
+        return Profile(self.profile_id, self.mode, self.interval, self._started_at, duration, self._samples, self.label)
+
+    def _on_sigprof(self, signum, frame) -> None:
+        if frame is not None:
+            self._samples[_frame_stack(frame)] += 1
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None and self.thread_id != own_id:
+                self._samples[_frame_stack(frame)] += 1
+
+
+class ProfilerRegistry:
+    """Coordina una sola captura por worker y guarda los últimos resultados"""
+
+    def __init__(self, max_results: int):
+        self._lock = threading.Lock()
+        self._active: Optional[StackSampler] = None
+        self._results: "OrderedDict[str, Profile]" = OrderedDict()
+        self._max_results = max_results
+
+    @property
+    def is_active(self) -> bool:
+        return self._active is not None
+
+    def begin(self, mode: str, label: str) -> StackSampler:
+        with self._lock:
+            if self._active is not None:
+                raise ProfilerBusyError("Ya hay un perfilado en curso en este worker")
+            sampler = StackSampler(mode=mode, label=label)
+            self._active = sampler
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler) -> Profile:
+        try:
+            profile = sampler.stop()
+        finally:
+            with self._lock:
+                self._active = None
+        self._store(profile)
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._results.get(profile_id)
+
+    def list(self) -> list:
+        return [p.summary() for p in reversed(self._results.values())]
+
+    def _store(self, profile: Profile) -> None:
+        with self._lock:
+            self._results[profile.id] = profile
+            while len(self._results) > self._max_results:
+                self._results.popitem(last=False)
+
+
+profiler = ProfilerRegistry(max_results=settings.PROFILING_RESULTS_KEPT)
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila una petición si trae ``X-Profile: <token>``.
+
+    Sin la cabecera sólo se hace una búsqueda en la lista de cabeceras, por lo
+    que el coste en reposo es despreciable. El perfil resultante se guarda en
+    el registro y su id se devuelve en la cabecera ``X-Profile-Id``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                token = value.decode("latin-1")
+                break
+
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+
+        payload = verify_token(token, "profile")
+        if payload is None or profiler.is_active:
+            await self.app(scope, receive, send)
+            return
+
+        mode = payload.get("mode", "wall")
+        label = f"{scope.get('method', 'GET')} {scope.get('path', '')}"
+        try:
+            sampler = profiler.begin(mode, label)
+        except ProfilerBusyError:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = sampler.profile_id
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.finish(sampler)
@@ -0,0 +1,282 @@
+"""Límite de peticiones por cliente y control de admisión por concurrencia.
+
+Cada petición a ``/api`` pertenece a una clase de ruta (``route_class``):
+``auth`` (login, registro y demás POST de autenticación, costosos por
+bcrypt), ``search`` (listados con búsqueda), ``stats`` (estadísticas) o
+``default``. Por cada clase y cliente hay un token bucket con la regla de
+RATE_LIMITS: ``"10/60"`` admite ráfagas de 10 peticiones y repone 10 cada 60
+segundos. El cliente es el usuario del token de acceso si lo hay y, si no (o
+en la clase ``auth``), la IP. Los buckets viven en memoria del proceso o en
+Redis (RATE_LIMIT_BACKEND=redis), compartidos entre workers. Superado el
+límite se responde 429 con ``Retry-After``.
+
+Además, ``AdmissionGate`` limita las peticiones en curso en este proceso
+(CONCURRENCY_LIMIT, por debajo del pool de conexiones) y, por clase, las de
+CONCURRENCY_LIMITS. Las que no caben esperan en una cola corta; si la cola
+está llena o la espera supera CONCURRENCY_QUEUE_TIMEOUT_SECONDS se responde
+503 con ``Retry-After`` en lugar de acumular peticiones esperando conexión.
+"""
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.core.security import verify_token
+
+logger = logging.getLogger(__name__)
+
+# (clase, método o None para cualquiera, patrón de la ruta); gana la primera que coincide
+ROUTE_CLASSES = [
+    ("auth", "POST", re.compile(r"^/api/v1/(auth|company-auth)/")),
+    ("search", "GET", re.compile(r"^/api/v1/items/?$|/search/?$")),
+    ("stats", "GET", re.compile(r"^/api/v1/stats/|/stats(/|$)")),
+]
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Clase de la ruta o ``None`` si no se limita (fuera de ``/api``)"""
+    if not path.startswith("/api/"):
+        return None
+    for name, route_method, pattern in ROUTE_CLASSES:
+        if (route_method is None or method == route_method) and pattern.search(path):
+            return name
+    return "default"
+
+
+def parse_rule(rule: str) -> Tuple[float, float]:
+    """``"10/60"`` -> (capacidad 10, reposición 10/60 por segundo)"""
+    try:
+        requests, seconds = rule.split("/")
+        capacity, period = float(requests), float(seconds)
+    except ValueError:
+        raise ValueError(f"Regla de límite no válida: {rule!r} (formato peticiones/segundos)")
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f"Regla de límite no válida: {rule!r}")
+    return capacity, capacity / period
+
+
+class MemoryBuckets:
+    """Token buckets en memoria de este proceso"""
+
+    def __init__(self, idle_seconds: float, max_keys: int = 100_000):
+        self.idle_seconds = idle_seconds  # tras este tiempo sin uso cualquier bucket está lleno
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}  # clave -> [tokens, instante de la última lectura]
+
+    async def take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        """Consumir un token; devuelve (admitida, segundos hasta el siguiente token)"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [capacity, now]
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True, 0.0
+        bucket[0] = tokens
+        return False, (1 - tokens) / rate
+
+    def _prune(self, now: float) -> None:
+        # Un bucket que ya se habría rellenado equivale a no tenerlo
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < self.idle_seconds
+        }
+
+
+class RedisBuckets:
+    """Los mismos buckets en Redis, compartidos entre workers (script atómico)"""
+
+    PREFIX = "greenloop:ratelimit"
+
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 't', 's')
+local tokens = tonumber(bucket[1]) or capacity
+local stamp = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 's', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # dependencia opcional, sólo con RATE_LIMIT_BACKEND=redis
+
+        self.redis = redis.from_url(url, decode_responses=True)
+        self._script = self.redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[f"{self.PREFIX}:{key}"], args=[capacity, rate])
+        if int(allowed):
+            return True, 0.0
+        return False, (1 - float(tokens)) / rate
+
+
+class AdmissionGate:
+    """Máximo de peticiones simultáneas con una cola de espera acotada"""
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> bool:
+        """Ocupar una plaza; ``False`` si la cola está llena o la espera se agota"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # Si la plaza llegó a la vez que la cancelación, devolverla
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        # La plaza pasa directamente al primero de la cola
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class RateLimiter:
+    """Reglas, buckets y compuertas configurados desde ``settings``"""
+
+    def __init__(self):
+        self.rules = {name: parse_rule(rule) for name, rule in settings.RATE_LIMITS.items()}
+        self._backend = None
+        queue, timeout = settings.CONCURRENCY_QUEUE_SIZE, settings.CONCURRENCY_QUEUE_TIMEOUT_SECONDS
+        self.gate = AdmissionGate(settings.CONCURRENCY_LIMIT, queue, timeout) if settings.CONCURRENCY_LIMIT > 0 else None
+        self.class_gates = {
+            name: AdmissionGate(limit, queue, timeout)
+            for name, limit in settings.CONCURRENCY_LIMITS.items() if limit > 0
+        }
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                if not settings.REDIS_URL:
+                    raise RuntimeError("RATE_LIMIT_BACKEND=redis requiere REDIS_URL")
+                self._backend = RedisBuckets(settings.REDIS_URL)
+            else:
+                self._backend = MemoryBuckets(max((capacity / rate for capacity, rate in self.rules.values()), default=0))
+        return self._backend
+
+    async def check(self, route: str, client: str) -> Tuple[bool, float]:
+        """¿Se admite otra petición de ``client`` en la clase ``route``?"""
+        rule = self.rules.get(route) or self.rules.get("default")
+        if rule is None:
+            return True, 0.0
+        try:
+            return await self.backend.take(f"{route}:{client}", *rule)
+        except Exception:
+            # Sin Redis no se bloquea el servicio: se admite la petición
+            logger.warning("No se pudo consultar el límite de peticiones", exc_info=True)
+            return True, 0.0
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_key(scope, route: str) -> str:
+    """Usuario o empresa del token de acceso y, si no hay (o en ``auth``), la IP"""
+    if route != "auth":
+        authorization = _header(scope, b"authorization")
+        if authorization and authorization[:7].lower() == "bearer ":
+            payload = verify_token(authorization[7:], "access")
+            if payload and payload.get("sub"):
+                return f"sub:{payload['sub']}"
+    ip = None
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            ip = forwarded.split(",")[0].strip()
+    if not ip:
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+    return f"ip:{ip}"
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> ORJSONResponse:
+    return ORJSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI: 429 por cliente y clase de ruta, 503 si el proceso está saturado"""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        route = route_class(scope.get("method", "GET"), scope.get("path", ""))
+        if route is None or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        allowed, retry_after = await self.limiter.check(route, client_key(scope, route))
+        if not allowed:
+            response = _reject(429, "Demasiadas solicitudes. Inténtalo de nuevo más tarde", retry_after)
+            await response(scope, receive, send)
+            return
+
+        gates = [gate for gate in (self.limiter.gate, self.limiter.class_gates.get(route)) if gate is not None]
+        acquired = []
+        try:
+            for gate in gates:
+                if not await gate.acquire():
+                    response = _reject(503, "Servicio saturado. Inténtalo de nuevo en unos segundos", gate.timeout)
+                    await response(scope, receive, send)
+                    return
+                acquired.append(gate)
+            await self.app(scope, receive, send)
+        finally:
+            for gate in reversed(acquired):
+                gate.release()
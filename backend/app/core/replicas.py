@@ -0,0 +1,234 @@
+"""Lecturas en réplicas de la base de datos.
+
+Con DATABASE_REPLICA_URLS configurado, los endpoints de sólo lectura
+(búsquedas, listados, estadísticas, perfiles públicos) piden su sesión con
+``get_read_db`` en lugar de ``get_db`` y se reparten entre las réplicas por
+turnos. Todo lo demás, incluida la autenticación, sigue en el primario.
+
+``router`` comprueba cada DATABASE_REPLICA_CHECK_SECONDS que cada réplica
+responde y cuánto retraso lleva; sólo se usan las que responden con un
+retraso de como mucho DATABASE_REPLICA_MAX_LAG_SECONDS. Si no queda ninguna,
+las lecturas vuelven al primario.
+
+Leer lo que uno acaba de escribir: tras una petición de escritura con éxito
+``ReadYourWritesMiddleware`` marca al cliente (cookie para el navegador, que
+vale en cualquier worker, y marca en memoria por usuario o IP, que se envía
+al resto de workers por ``app.core.coordination``) y durante
+DATABASE_REPLICA_MAX_LAG_SECONDS sus lecturas van al primario, el mismo
+margen que se tolera de retraso a las réplicas.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.coordination import bus
+from app.core.database import AsyncSessionLocal, create_engine_for, get_db
+from app.core.rate_limit import client_key
+
+logger = logging.getLogger(__name__)
+
+COOKIE = "gl_primary_until"
+CHANNEL = "replicas.write"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Segundos de retraso de una réplica de PostgreSQL (0 si está al día)
+_PG_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """Engine de una réplica y su último estado conocido"""
+
+    def __init__(self, url: str):
+        self.engine = create_engine_for(url)
+        self.name = self.engine.url.render_as_string(hide_password=True)
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        # Sin comprobar todavía: no se usa hasta el primer chequeo
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+    async def check(self, timeout: float) -> None:
+        query = _PG_LAG if self.engine.dialect.name == "postgresql" else text("SELECT 0")
+        try:
+            async with self.engine.connect() as conn:
+                lag = await asyncio.wait_for(conn.scalar(query), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.healthy:
+                logger.warning("Réplica %s no disponible: %s", self.name, e)
+            self.healthy, self.lag = False, None
+            return
+        if not self.healthy:
+            logger.info("Réplica %s disponible", self.name)
+        self.healthy, self.lag = True, float(lag or 0)
+
+
+class ReplicaRouter:
+    """Elige dónde ejecutar cada lectura y vigila el estado de las réplicas"""
+
+    def __init__(
+        self,
+        urls: Optional[List[str]] = None,
+        max_lag: Optional[float] = None,
+        interval: Optional[float] = None,
+    ):
+        if urls is None:
+            urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag if max_lag is not None else settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+        self.interval = interval if interval is not None else settings.DATABASE_REPLICA_CHECK_SECONDS
+        self._turn = itertools.count()
+        self._writers: Dict[str, float] = {}  # cliente -> time.time() hasta el que lee del primario
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def available(self) -> List[Replica]:
+        return [r for r in self.replicas if r.healthy and r.lag is not None and r.lag <= self.max_lag]
+
+    def choose(self) -> Optional[Replica]:
+        """Siguiente réplica utilizable por turnos; ``None`` si no hay ninguna"""
+        available = self.available()
+        if not available:
+            return None
+        return available[next(self._turn) % len(available)]
+
+    # Leer lo propio
+
+    def mark_write(self, client: str) -> float:
+        until = time.time() + self.max_lag
+        self._remember(client, until)
+        bus.publish(CHANNEL, {"client": client, "until": until})
+        return until
+
+    def _remember(self, client: str, until: float) -> None:
+        if self._writers.get(client, 0) < until:
+            self._writers[client] = until
+        if len(self._writers) > 10_000:
+            now = time.time()
+            self._writers = {key: t for key, t in self._writers.items() if t > now}
+
+    async def _on_remote_write(self, data: dict) -> None:
+        self._remember(data["client"], float(data["until"]))
+
+    def recently_wrote(self, scope) -> bool:
+        now = time.time()
+        cookie = _cookie(scope, COOKIE)
+        if cookie:
+            try:
+                if float(cookie) > now:
+                    return True
+            except ValueError:
+                pass
+        until = self._writers.get(client_key(scope, "default"))
+        return until is not None and until > now
+
+    def session_factory(self, scope) -> async_sessionmaker:
+        """Réplica para esta lectura, o el primario si no hay o el cliente acaba de escribir"""
+        if not self.replicas or self.recently_wrote(scope):
+            return AsyncSessionLocal
+        replica = self.choose()
+        return replica.sessionmaker if replica is not None else AsyncSessionLocal
+
+    # Chequeo periódico
+
+    async def check_once(self) -> None:
+        await asyncio.gather(*(replica.check(self.interval) for replica in self.replicas))
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.check_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error comprobando las réplicas")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.replicas and (self._task is None or self._task.done()):
+            bus.subscribe(CHANNEL, self._on_remote_write)
+            self._task = asyncio.create_task(self._loop(), name="replica-checker")
+
+    async def stop(self) -> None:
+        bus.unsubscribe(CHANNEL, self._on_remote_write)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+def _cookie(scope, name: str) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == b"cookie":
+            for part in value.decode("latin-1").split(";"):
+                cookie_name, _, cookie_value = part.strip().partition("=")
+                if cookie_name == name:
+                    return cookie_value
+    return None
+
+
+router = ReplicaRouter()
+
+
+async def get_read_db(request: Request, primary: AsyncSession = Depends(get_db)):
+    """Como ``get_db`` pero en una réplica cuando es posible (sólo lecturas).
+
+    Si la lectura va al primario se usa la sesión de ``get_db`` de la
+    petición (la misma que la autenticación): abrir otra ocuparía una segunda
+    conexión del pool mientras se retiene la primera.
+    """
+    factory = router.session_factory(request.scope)
+    if factory is AsyncSessionLocal:
+        yield primary
+        return
+    async with factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI: tras una escritura con éxito el cliente lee del primario un tiempo"""
+
+    def __init__(self, app, replica_router: Optional[ReplicaRouter] = None):
+        self.app = app
+        self.router = replica_router or router
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.router.enabled
+            or scope.get("method") in SAFE_METHODS
+            or not scope.get("path", "").startswith("/api/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = self.router.mark_write(client_key(scope, "default"))
+                cookie = f"{COOKIE}={int(until) + 1}; Max-Age={max(1, round(self.router.max_lag))}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", ()), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
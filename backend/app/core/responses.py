@@ -0,0 +1,40 @@
+"""Respuestas JSON rápidas.
+
+``ORJSONResponse`` es la clase de respuesta por defecto de la API (ver
+``app.main``). ``TrustedJSONResponse`` se usa en listados grandes cuyas filas
+se construyen en el propio endpoint directamente a partir de tuplas SQL, como
+diccionarios con la forma exacta del ``response_model``: se serializan con
+orjson sin crear modelos Pydantic y, al devolver una ``Response``, FastAPI no
+vuelve a validar el contenido (el ``response_model`` del decorador se mantiene
+para la documentación). La salida es idéntica a la del camino validado.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+__all__ = ["ORJSONResponse", "TrustedJSONResponse"]
+
+# Igual que Pydantic: fechas UTC con sufijo "Z"
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        # Pydantic serializa Decimal como cadena
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+class TrustedJSONResponse(Response):
+    """Respuesta para datos de confianza que ya tienen la forma del esquema"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
@@ -0,0 +1,105 @@
+"""Sesiones revocadas, consultadas en memoria en cada petición.
+
+Los tokens de acceso llevan el id de su sesión (``sid``). Al revocar una
+sesión (logout, revoke-session, cambio de contraseña) su id entra en
+``revoked_sessions`` y ``verify_access_token`` rechaza sus tokens sin leer
+la base de datos: una consulta a un diccionario por petición.
+
+Las revocaciones se publican con ``cache_versions`` en la misma transacción:
+este proceso las aplica al confirmar y el resto de workers recarga el
+conjunto en su siguiente sondeo (CACHE_VERSION_POLL_SECONDS). Sólo hace falta
+recordar una sesión revocada mientras pueda quedar vivo alguno de sus tokens
+de acceso (ACCESS_TOKEN_EXPIRE_MINUTES), así que el conjunto se mantiene
+pequeño.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import cache_versions
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import verify_token
+from app.models import CompanySession, UserSession
+
+NAME = "revoked_sessions"
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite devuelve fechas sin zona (en UTC)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevokedSessions:
+    """Ids de sesión revocados y hasta cuándo pueden seguir vivos sus tokens"""
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal, ttl: Optional[float] = None):
+        self.session_factory = session_factory
+        self.ttl = ttl if ttl is not None else settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self._until: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def is_revoked(self, session_id: Optional[str]) -> bool:
+        if not session_id:
+            return False
+        until = self._until.get(session_id)
+        if until is None:
+            return False
+        if until > time.time():
+            return True
+        self._until.pop(session_id, None)
+        return False
+
+    def add(self, session_ids: Iterable[str]) -> None:
+        until = time.time() + self.ttl
+        for session_id in session_ids:
+            self._until[session_id] = until
+
+    async def revoke(self, db: AsyncSession, session_ids: Iterable[UUID]) -> None:
+        """Publicar en la transacción actual la revocación de ``session_ids``"""
+        ids = [str(session_id) for session_id in session_ids]
+        if ids:
+            await cache_versions.bump(db, NAME, on_commit=lambda: self.add(ids))
+
+    async def reload(self, version: int = 0) -> None:
+        """Reconstruir el conjunto con las sesiones revocadas recientemente"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        until: Dict[str, float] = {}
+        async with self.session_factory() as db:
+            for model in (UserSession, CompanySession):
+                rows = await db.execute(
+                    select(model.id, model.revoked_at)
+                    .where(model.is_revoked == True, model.revoked_at >= cutoff)
+                )
+                for session_id, revoked_at in rows:
+                    until[str(session_id)] = _timestamp(revoked_at) + self.ttl
+        # Conservar las añadidas en este proceso mientras se consultaba
+        now = time.time()
+        for session_id, expires in self._until.items():
+            if expires > now:
+                until.setdefault(session_id, expires)
+        self._until = until
+
+
+revoked_sessions = RevokedSessions()
+cache_versions.watcher.subscribe(NAME, revoked_sessions.reload)
+
+
+def verify_access_token(token: str) -> Optional[dict]:
+    """``verify_token`` de un token de acceso que además rechaza las sesiones revocadas.
+
+    Los tokens emitidos antes de existir ``sid`` no se pueden revocar y
+    valen hasta que expiran.
+    """
+    payload = verify_token(token, "access")
+    if payload is None or revoked_sessions.is_revoked(payload.get("sid")):
+        return None
+    return payload
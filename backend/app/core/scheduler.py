@@ -0,0 +1,266 @@
+"""Planificador de tareas periódicas persistido en la tabla ``jobs``.
+
+Las tareas se registran en código con un horario cron::
+
+    @scheduler.job("sessions.expire", "*/15 * * * *")
+    async def expire_sessions(db: AsyncSession):
+        ...
+
+y su estado vive en ``jobs`` (próxima ejecución, reintentos, arrendamiento),
+así que sobrevive a reinicios y varios workers pueden ejecutar el mismo
+planificador: para ejecutar una tarea vencida, un worker la "arrienda" con un
+UPDATE condicional (sólo si nadie tiene un arrendamiento vigente) y sólo el
+que lo consigue la ejecuta. El arrendamiento dura lo que puede durar la
+tarea (su ``timeout``, o SCHEDULER_LEASE_SECONDS si no tiene) más un margen
+para registrar el resultado: al cumplirse el ``timeout`` la tarea se cancela,
+así que ningún otro worker la puede arrendar mientras sigue en marcha. Un
+worker que muere a mitad deja el arrendamiento, que caduca a ese plazo, y la
+tarea se vuelve a ejecutar.
+
+La función recibe una sesión que se confirma si termina bien. Si falla se
+reintenta con espera exponencial hasta ``max_attempts`` veces; después se
+espera a la siguiente fecha del horario. Cada ejecución queda en
+``job_runs``.
+
+Con SCHEDULER_ENABLED=false la API no ejecuta tareas y se puede lanzar el
+planificador aparte con ``python -m app.worker``.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Job, JobRun
+from app.utils.cron import CronSchedule
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[AsyncSession], Awaitable[Any]]
+
+# Segundos de arrendamiento tras el timeout de la tarea, para registrar el resultado
+LEASE_MARGIN_SECONDS = 60
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class JobDefinition:
+    name: str
+    schedule: CronSchedule
+    func: JobFunc
+    max_attempts: int = 3
+    retry_seconds: float = 60.0
+    timeout: Optional[float] = None
+
+    def retry_delay(self, attempt: int) -> timedelta:
+        return timedelta(seconds=self.retry_seconds * 2 ** (attempt - 1))
+
+
+class Scheduler:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+        worker_id: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval if poll_interval is not None else settings.SCHEDULER_POLL_SECONDS
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.SCHEDULER_LEASE_SECONDS
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, JobDefinition] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def job(self, name: str, schedule: str, max_attempts: int = 3, retry_seconds: float = 60.0, timeout: Optional[float] = None):
+        """Decorador para registrar una tarea"""
+        def register(func: JobFunc) -> JobFunc:
+            if name in self.jobs:
+                raise ValueError(f"Tarea duplicada: {name}")
+            self.jobs[name] = JobDefinition(name, CronSchedule(schedule), func, max_attempts, retry_seconds, timeout)
+            return func
+        return register
+
+    async def sync(self) -> None:
+        """Crear las filas de tareas nuevas y actualizar horarios cambiados"""
+        now = utcnow()
+        async with self.session_factory() as db:
+            existing = dict((await db.execute(select(Job.name, Job.schedule))).all())
+            for definition in self.jobs.values():
+                expression = definition.schedule.expression
+                next_run = definition.schedule.next_after(now)
+                if definition.name not in existing:
+                    db.add(Job(name=definition.name, schedule=expression, next_run_at=next_run))
+                elif existing[definition.name] != expression:
+                    await db.execute(
+                        update(Job).where(Job.name == definition.name).values(schedule=expression, next_run_at=next_run)
+                    )
+            await db.commit()
+
+    def _lease_free(self, now: datetime):
+        return or_(Job.lease_expires_at.is_(None), Job.lease_expires_at < now)
+
+    def _timeout(self, definition: JobDefinition) -> float:
+        return definition.timeout or self.lease_seconds
+
+    async def _claim(self, definition: JobDefinition) -> Optional[int]:
+        """Arrendar una tarea vencida; devuelve sus fallos previos o None si otro la tiene"""
+        name = definition.name
+        now = utcnow()
+        lease = max(self.lease_seconds, self._timeout(definition)) + LEASE_MARGIN_SECONDS
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(Job)
+                .where(Job.name == name, Job.enabled == True, Job.next_run_at <= now, self._lease_free(now))
+                .values(
+                    lease_owner=self.worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease),
+                    last_started_at=now,
+                )
+                .returning(Job.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            attempts = result.scalar()
+            await db.commit()
+        return attempts
+
+    async def _execute(self, definition: JobDefinition, previous_attempts: int) -> bool:
+        attempt = previous_attempts + 1
+        started_at = utcnow()
+        clock = time.monotonic()
+        error = None
+        result = None
+        try:
+            async with self.session_factory() as db:
+                result = await asyncio.wait_for(definition.func(db), self._timeout(definition))
+                await db.commit()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.exception("Tarea %s falló (intento %d)", definition.name, attempt)
+        finished_at = utcnow()
+
+        if error is None:
+            next_run, attempts = definition.schedule.next_after(finished_at), 0
+        elif attempt < definition.max_attempts:
+            next_run, attempts = finished_at + definition.retry_delay(attempt), attempt
+        else:
+            next_run, attempts = definition.schedule.next_after(finished_at), 0
+
+        status = "succeeded" if error is None else "failed"
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.name == definition.name, Job.lease_owner == self.worker_id)
+                .values(
+                    next_run_at=next_run,
+                    attempts=attempts,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    last_finished_at=finished_at,
+                    last_status=status,
+                    last_error=error,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.execute(insert(JobRun).values(
+                job_name=definition.name,
+                worker=self.worker_id,
+                attempt=attempt,
+                status=status,
+                result=None if result is None else str(result)[:1000],
+                error=error,
+                started_at=started_at,
+                finished_at=finished_at,
+                duration_seconds=time.monotonic() - clock,
+            ))
+            await db.commit()
+        return error is None
+
+    async def run_due(self) -> List[str]:
+        """Ejecutar las tareas vencidas que este worker consiga arrendar"""
+        now = utcnow()
+        async with self.session_factory() as db:
+            due = (await db.execute(
+                select(Job.name)
+                .where(Job.name.in_(list(self.jobs)), Job.enabled == True, Job.next_run_at <= now, self._lease_free(now))
+                .order_by(Job.next_run_at)
+            )).scalars().all()
+
+        ran = []
+        for name in due:
+            attempts = await self._claim(self.jobs[name])
+            if attempts is None:
+                continue
+            await self._execute(self.jobs[name], attempts)
+            ran.append(name)
+        return ran
+
+    async def trigger(self, db: AsyncSession, name: str) -> bool:
+        """Programar una tarea para ya. No confirma la transacción."""
+        result = await db.execute(
+            update(Job).where(Job.name == name).values(next_run_at=utcnow()).execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    async def _release_leases(self) -> None:
+        """Soltar los arrendamientos propios (tarea interrumpida al cerrar): se repite pronto"""
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.lease_owner == self.worker_id)
+                .values(lease_owner=None, lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def _loop(self) -> None:
+        synced = False
+        while True:
+            try:
+                if not synced:
+                    await self.sync()
+                    synced = True
+                await self.run_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error en el planificador de tareas")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="job-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await self._release_leases()
+            except Exception:
+                logger.exception("Error liberando tareas al cerrar")
+
+    async def run_forever(self) -> None:
+        """Ejecutar el planificador en primer plano (proceso dedicado)"""
+        self.start()
+        try:
+            await self._task
+        finally:
+            await self.stop()
+
+
+scheduler = Scheduler()
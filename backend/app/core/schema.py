@@ -0,0 +1,105 @@
+"""Comprobación de la versión del esquema al arrancar.
+
+El esquema lo gestiona sólo Alembic: ``alembic upgrade head`` se ejecuta una
+vez en cada despliegue, antes de arrancar los workers. Al arrancar, cada
+worker ya no inspecciona todas las tablas con ``create_all``; lee la revisión
+de ``alembic_version`` (una consulta) y la compara con las cabezas de
+``alembic/versions``, que se leen de los ficheros sin importar Alembic.
+
+Con SCHEMA_CHECK=error un worker no arranca si la base de datos está en una
+revisión anterior a la suya (falta migrar); con ``warn`` sólo lo avisa y con
+``off`` no se comprueba. Si la base de datos está en una revisión que este
+código no conoce (ya migrada por un despliegue más nuevo) sólo se avisa. Si
+no se encuentra ninguna migración (``alembic/versions`` falta o está vacío en
+la imagen) no hay nada con qué comparar: se trata igual que un esquema sin
+migrar, en lugar de dar por bueno cualquier esquema.
+
+Las bases de datos SQLite en memoria no se pueden migrar desde fuera del
+proceso: ahí se siguen creando las tablas con ``create_tables``.
+"""
+import logging
+import re
+from pathlib import Path
+from typing import Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.core.database import create_tables, engine
+from app.core.sqlite import is_sqlite_file
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+_REVISION = re.compile(r"^revision\b[^=]*=\s*['\"](\w+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision\b[^=]*=\s*(.+)$", re.M)
+_QUOTED = re.compile(r"['\"](\w+)['\"]")
+
+
+class SchemaOutOfDate(RuntimeError):
+    """La base de datos no tiene aplicadas las migraciones de este código"""
+
+
+def read_revisions(directory: Path = VERSIONS_DIR) -> Tuple[Set[str], Set[str]]:
+    """(todas las revisiones, cabezas) de los ficheros de migraciones"""
+    revisions, parents = set(), set()
+    for path in directory.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION.search(source)
+        if down_revision is not None:
+            parents.update(_QUOTED.findall(down_revision.group(1)))
+    return revisions, revisions - parents
+
+
+async def current_revisions(db_engine=engine) -> Set[str]:
+    """Revisiones aplicadas en la base de datos (vacío si nunca se migró)"""
+    async with db_engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except DBAPIError:
+            return set()
+        return set(result.scalars())
+
+
+async def check_schema(db_engine=engine, directory: Path = VERSIONS_DIR) -> Set[str]:
+    """Comparar la revisión de la base de datos con la de este código; devuelve la aplicada"""
+    known, heads = read_revisions(directory)
+    if not heads:
+        message = f"No hay migraciones en {directory}: no se puede comprobar el esquema"
+        if settings.SCHEMA_CHECK == "error":
+            raise SchemaOutOfDate(message)
+        logger.warning(message)
+        return await current_revisions(db_engine)
+    current = await current_revisions(db_engine)
+    if current == heads:
+        return current
+    if current and not current <= known:
+        logger.warning(
+            "La base de datos está en la revisión %s, más nueva que este código (%s)",
+            ", ".join(sorted(current)), ", ".join(sorted(heads))
+        )
+        return current
+    message = (
+        f"La base de datos está en la revisión {', '.join(sorted(current)) or '(ninguna)'} "
+        f"y este código necesita {', '.join(sorted(heads))}. Ejecuta: alembic upgrade head"
+    )
+    if settings.SCHEMA_CHECK == "error":
+        raise SchemaOutOfDate(message)
+    logger.warning(message)
+    return current
+
+
+async def prepare_schema() -> None:
+    """Paso de arranque: comprobar la versión del esquema (o crearlo si es SQLite en memoria)"""
+    url = settings.DATABASE_URL
+    if "sqlite" in url and not is_sqlite_file(url):
+        await create_tables()
+        return
+    if settings.SCHEMA_CHECK != "off":
+        await check_schema()
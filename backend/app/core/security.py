@@ -1,14 +1,21 @@
+import hashlib
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
+from uuid import UUID, uuid4
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.core.config import settings
 
-# Configurar el contexto de encriptación de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Contexto de encriptación de contraseñas: passlib se importa con el primer
+# login o registro, no al arrancar cada worker
+@lru_cache(maxsize=None)
+def password_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Configurar OAuth2
 oauth2_scheme = OAuth2PasswordBearer(
@@ -18,11 +25,11 @@ oauth2_scheme = OAuth2PasswordBearer(
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar que una contraseña en texto plano coincida con el hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Generar hash de una contraseña"""
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def create_access_token(
     data: dict, 
@@ -68,6 +75,18 @@ def create_refresh_token(
     )
     return encoded_jwt
 
+def create_session_tokens(subject: str, session_id: UUID, **claims) -> Tuple[str, str]:
+    """Crear el par (acceso, refresh) de una sesión; ambos llevan su id en ``sid``.
+
+    El ``jti`` hace único cada refresh token, así que al renovar el anterior deja de valer.
+    """
+    data = {"sub": subject, "sid": str(session_id), **claims}
+    return create_access_token(data), create_refresh_token({**data, "jti": uuid4().hex})
+
+def hash_token(token: str) -> str:
+    """Huella SHA-256 (64 caracteres hex) con la que se guarda un token en la base de datos"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def create_password_reset_token(email: str, expires_minutes: int = 60) -> str:
     to_encode = {"email": email}
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
@@ -79,6 +98,19 @@ def create_password_reset_token(email: str, expires_minutes: int = 60) -> str:
     )
     return encoded_jwt
 
+def create_profiling_token(mode: str = "wall", expires_minutes: Optional[int] = None) -> str:
+    """Crear un token de corta duración para perfilar peticiones con X-Profile"""
+    expire = datetime.now(timezone.utc) + timedelta(
+        minutes=expires_minutes or settings.PROFILING_TOKEN_EXPIRE_MINUTES
+    )
+    to_encode = {"mode": mode, "exp": expire, "type": "profile"}
+    encoded_jwt = jwt.encode(
+        to_encode,
+        settings.SECRET_KEY,
+        algorithm=settings.JWT_ALGORITHM
+    )
+    return encoded_jwt
+
 def verify_token(
     token: str, 
     token_type: str = "access"
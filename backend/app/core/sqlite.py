@@ -0,0 +1,108 @@
+"""Perfil de SQLite para despliegues de un solo nodo.
+
+Con una base de datos SQLite en fichero, el engine principal deja de ser una
+única conexión compartida (``StaticPool``) y pasa a ser:
+
+- Un pool de SQLITE_READ_POOL_SIZE conexiones para lecturas, que en modo WAL
+  no se bloquean entre sí ni con la escritura en curso. Con el pool ocupado
+  se abren lectores extra (SQLITE_READ_MAX_OVERFLOW, por defecto hasta dos
+  por petición admitida): una petición que retiene un lector puede necesitar
+  otro para una sesión interna, y con un pool fijo todas acabarían
+  esperándose unas a otras.
+- Una sola conexión de escritura (pool de 1), que abre sus transacciones con
+  ``BEGIN IMMEDIATE``: el bloqueo de escritura se toma al empezar y los
+  escritores esperan su turno en el pool en lugar de fallar con
+  ``database is locked`` al pasar de lectura a escritura.
+
+``SQLiteSession`` decide por sentencia: las lecturas van al pool de lectores
+hasta la primera escritura (flush, INSERT/UPDATE/DELETE, ``SELECT ... FOR
+UPDATE`` o SQL textual); desde ahí, y hasta que termina la transacción, todo
+va a la conexión de escritura para leer lo propio. Una sesión que escribe no
+debe abrir otra sesión que también escriba: esperaría a la conexión que ella
+misma tiene.
+
+Cada conexión se configura con ``journal_mode=WAL``, ``synchronous`` (NORMAL:
+en WAL no se corrompe la base de datos, como mucho se pierden las últimas
+transacciones ante un corte de luz), ``mmap_size`` y ``busy_timeout``. Las
+bases de datos en memoria siguen con una única conexión compartida.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# ``session.info``: la transacción actual ya usa la conexión de escritura
+_WRITING = "sqlite_writing"
+
+
+def is_sqlite_file(url: str) -> bool:
+    """¿Es una URL de SQLite con fichero (no en memoria)?"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return False
+    database = parsed.database or ""
+    return database not in ("", ":memory:") and parsed.query.get("mode") != "memory"
+
+
+def configure(engine, writer: bool = False) -> None:
+    """PRAGMAs de rendimiento en cada conexión nueva y control de transacciones.
+
+    El driver abre las transacciones por su cuenta y no admite SAVEPOINT de
+    forma fiable; con ``isolation_level = None`` las controla SQLAlchemy. La
+    conexión de escritura empieza con ``BEGIN IMMEDIATE``; las de lectura
+    quedan en autocommit, como antes (el driver nunca abría transacción para
+    un SELECT), sin BEGIN/ROLLBACK por cada consulta.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.close()
+
+    if writer:
+        @event.listens_for(sync_engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    return (
+        getattr(clause, "is_dml", False)
+        or getattr(clause, "is_text", False)
+        or getattr(clause, "_for_update_arg", None) is not None
+    )
+
+
+class SQLiteSession(Session):
+    """Sesión que lee del pool de lectores y escribe por la conexión de escritura (``bind``)"""
+
+    def __init__(self, *args, reader=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reader = reader
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.reader is None or self.info.get(_WRITING) or self._flushing or _is_write(clause):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return self.reader
+
+
+@event.listens_for(SQLiteSession, "after_begin")
+def _mark_writing(session, transaction, connection):
+    if session.reader is not None and connection.engine is not session.reader:
+        session.info[_WRITING] = True
+
+
+@event.listens_for(SQLiteSession, "after_transaction_end")
+def _clear_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WRITING, None)
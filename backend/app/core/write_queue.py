@@ -0,0 +1,160 @@
+"""Cola de escrituras pequeñas confirmadas en grupo.
+
+En SQLite cada ``commit`` es una sincronización del WAL y sólo hay una
+conexión de escritura, así que las escrituras pequeñas y frecuentes (contar
+una vista, por ejemplo) acaban haciendo cola de una en una. ``submit`` las
+encola; una tarea en segundo plano toma todas las que haya pendientes (hasta
+SQLITE_WRITE_BATCH_SIZE, esperando como mucho SQLITE_WRITE_BATCH_WAIT_MS a
+que lleguen más), las ejecuta en una transacción y confirma el lote con un
+único ``commit``. Quien llamó recibe el resultado de su trabajo cuando
+el lote está confirmado, o su excepción si falló sólo el suyo.
+
+Sólo se activa con SQLite en fichero (SQLITE_WRITE_QUEUE); en otro caso, o
+sin la tarea en marcha (scripts), ``submit`` ejecuta el trabajo en su propia
+sesión y confirma.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.sqlite import is_sqlite_file
+
+logger = logging.getLogger(__name__)
+
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Agrupa escrituras pequeñas de distintas peticiones en una transacción"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        enabled: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+        wait_ms: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        if enabled is None:
+            enabled = settings.SQLITE_WRITE_QUEUE and is_sqlite_file(settings.DATABASE_URL)
+        self.enabled = enabled
+        self.batch_size = batch_size or settings.SQLITE_WRITE_BATCH_SIZE
+        self.wait = (wait_ms if wait_ms is not None else settings.SQLITE_WRITE_BATCH_WAIT_MS) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, job: WriteJob) -> Any:
+        """Ejecutar ``job(db)`` y confirmarlo; devuelve lo que devuelva ``job``"""
+        if self._task is None or self._task.done():
+            async with self.session_factory() as db:
+                result = await job(db)
+                await db.commit()
+                return result
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, future))
+        return await future
+
+    async def _collect(self) -> Tuple[List[Tuple[WriteJob, asyncio.Future]], bool]:
+        """Siguiente lote y si se pidió parar (``None`` en la cola)"""
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                entry = self._queue.get_nowait()
+            elif deadline > loop.time():
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+            else:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    async def run_batch(self, batch: List[Tuple[WriteJob, asyncio.Future]]) -> None:
+        """Todo el lote con un único ``commit``.
+
+        Primero sin SAVEPOINT (una sentencia menos por trabajo); si algún
+        trabajo falla se deshace el lote y se repite con un SAVEPOINT por
+        trabajo, de modo que sólo el que falla recibe su excepción.
+        """
+        batch = [(job, future) for job, future in batch if not future.done()]  # quien ya no espera
+        if not batch:
+            return
+        async with self.session_factory() as db:
+            try:
+                outcomes = [(future, await job(db), None) for job, future in batch]
+            except Exception:
+                await db.rollback()
+                outcomes = []
+                for job, future in batch:
+                    try:
+                        async with db.begin_nested():
+                            outcomes.append((future, await job(db), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+            await db.commit()
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if not batch:
+                continue
+            try:
+                await self.run_batch(batch)
+            except asyncio.CancelledError:
+                _fail(batch, RuntimeError("Cola de escrituras detenida"))
+                raise
+            except Exception as e:
+                logger.exception("Error confirmando un lote de %d escrituras", len(batch))
+                _fail(batch, e)
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._loop(), name="write-queue")
+
+    async def stop(self) -> None:
+        """Confirmar lo que ya estaba en cola y detener la tarea"""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        try:
+            await self._task
+        finally:
+            self._task = None
+        # Lo encolado después de la marca de parada
+        pending = []
+        while not self._queue.empty():
+            entry = self._queue.get_nowait()
+            if entry is not None:
+                pending.append(entry)
+        if pending:
+            await self.run_batch(pending)
+
+
+def _fail(batch, error: BaseException) -> None:
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+write_queue = WriteQueue()
@@ -4,10 +4,24 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import os
 
+from .core.compression import CompressionMiddleware
 from .core.config import settings
-from .core.database import engine, create_tables, check_database_connection, Base
+from .core.coordination import bus
+from .core.database import check_pool_size, dispose_engines
+from .core.http_cache import ConditionalGetMiddleware
+from .core.profiling import ProfilingMiddleware
+from .core.rate_limit import RateLimitMiddleware
+from .core.replicas import ReadYourWritesMiddleware, router as replica_router
+from .core.responses import ORJSONResponse
+from .core.schema import SchemaOutOfDate, prepare_schema
 from . import models  # Importar modelos para registrar tablas antes de crear
 from .api.v1 import api_router
+from .services.counters import compactor as counter_compactor
+from .core.cache_versions import watcher as cache_version_watcher
+from .core.activity import tracker as activity_tracker
+from .core.scheduler import scheduler
+from .core.write_queue import write_queue
+from .services import maintenance  # noqa: F401  registra las tareas periódicas
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -15,20 +29,53 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Iniciando GreenLoop API...")
     
-    # Verificar conexión a la base de datos
-    if await check_database_connection():
-        print("✅ Conexión a la base de datos establecida")
-        
-        # Crear tablas
-        await create_tables()
-        print("✅ Tablas de la base de datos creadas/verificadas")
-    else:
-        print("❌ Error al conectar con la base de datos")
+    # Verificar la versión del esquema (las migraciones se aplican con
+    # ``alembic upgrade head`` antes de arrancar los workers)
+    try:
+        await prepare_schema()
+        print("✅ Esquema de la base de datos verificado")
+    except SchemaOutOfDate:
+        raise
+    except Exception as e:
+        print(f"❌ Error al conectar con la base de datos: {e}")
+
+    # Conexiones suficientes para CONCURRENCY_LIMIT peticiones a la vez
+    check_pool_size()
+    
+    # Mensajes entre workers (invalidación de cachés, eventos)
+    await bus.start()
+
+    # Escrituras pequeñas agrupadas en un commit (sólo SQLite en fichero)
+    write_queue.start()
+
+    # Consolidación de contadores de publicaciones en segundo plano
+    counter_compactor.start()
+    
+    # Invalidación de cachés en memoria hechas por otros workers
+    cache_version_watcher.start()
+    
+    # Estado y retraso de las réplicas de lectura (si hay)
+    replica_router.start()
+    
+    # Volcado en lote de la última actividad de usuarios y sesiones
+    activity_tracker.start()
+    
+    # Tareas periódicas (si no se ejecutan en un proceso aparte)
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
     
     yield
     
     # Shutdown
     print("🛑 Cerrando GreenLoop API...")
+    await scheduler.stop()
+    await activity_tracker.stop()
+    await cache_version_watcher.stop()
+    await replica_router.stop()
+    await counter_compactor.stop()
+    await write_queue.stop()
+    await bus.stop()
+    await dispose_engines()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -37,9 +84,20 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# ETag débil en las respuestas GET y 304 si el cliente ya tiene esa versión
+app.add_middleware(ConditionalGetMiddleware)
+
+# Tras una escritura, el cliente lee del primario mientras las réplicas se ponen al día
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Límite de peticiones y control de admisión (dentro de CORS para que los
+# 429/503 lleguen al navegador con sus cabeceras)
+app.add_middleware(RateLimitMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +114,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli de las respuestas (fuera de CORS y del 304)
+app.add_middleware(CompressionMiddleware)
+
+# Perfilado por petición (cabecera X-Profile con token de administrador)
+app.add_middleware(ProfilingMiddleware)
+
 # Crear directorio de uploads si no existe
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
@@ -87,6 +151,7 @@ async def health_check():
     }
 
 if __name__ == "__main__":
+    # Desarrollo: un proceso. En producción: python -m app.server
     import uvicorn
     uvicorn.run(
         "app.main:app",
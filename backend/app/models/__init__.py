@@ -1,6 +1,7 @@
 # Models module for GreenLoop backend
 
 from .user import User
+from .admin_user import AdminUser
 from .category import Category
 from .item import Item, ItemCondition, ItemStatus
 from .item_image import ItemImage
@@ -20,6 +21,11 @@ from .community_post import (
     CommunityActorType,
     CommunityMediaType,
 )
+from .feed_timeline import FeedTimeline, FeedTimelineEntry
+from .counter_delta import CounterDelta
+from .rating_summary import UserRatingSummary, UserRatingDaily
+from .cache_version import CacheVersion
+from .job import Job, JobRun
 from .company import Company
 from .company_session import CompanySession
 from .contribution import Contribution, ContributionStatus, DeliveryMethod
@@ -31,6 +37,7 @@ from .reward import Reward
 # Exportar todos los modelos
 __all__ = [
     "User",
+    "AdminUser",
     "Category", 
     "Item",
     "ItemCondition",
@@ -54,6 +61,14 @@ __all__ = [
     "CommunityFeedComment",
     "CommunityActorType",
     "CommunityMediaType",
+    "FeedTimeline",
+    "FeedTimelineEntry",
+    "CounterDelta",
+    "UserRatingSummary",
+    "UserRatingDaily",
+    "CacheVersion",
+    "Job",
+    "JobRun",
     "Company",
     "CompanySession",
     "Contribution",
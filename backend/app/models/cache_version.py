@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime, BigInteger
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class CacheVersion(Base):
+    """Versión de un dato cacheado en memoria por cada proceso.
+
+    Quien modifica el dato incrementa ``version`` en su misma transacción;
+    los procesos comparan la versión periódicamente y recargan si cambió
+    (ver ``app.core.cache_versions``).
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
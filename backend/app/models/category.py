@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.sql import func
 import uuid
 
@@ -20,12 +20,19 @@ class Category(Base):
     color = Column(String(7), nullable=True)   # Color hexadecimal (ej: "#FF5722")
     image_url = Column(String(500), nullable=True)
     
+    # Jerarquía (0 = raíz, máximo 3)
+    parent_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True, index=True)
+    level = Column(Integer, default=0, nullable=False)
+    
     # Estado y orden
     is_active = Column(Boolean, default=True, nullable=False)
     sort_order = Column(Integer, default=0, nullable=False)
     
-    # Estadísticas
-    items_count = Column(Integer, default=0, nullable=False)
+    # Estadísticas: ítems publicados (activos y disponibles), mantenidos por
+    # incrementos en app.services.category_counts
+    own_items_count = Column(Integer, default=0, nullable=False)  # solo esta categoría
+    items_count = Column(Integer, default=0, nullable=False)      # incluye subcategorías
+    item_count = synonym("items_count")  # nombre usado por los esquemas
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -122,15 +129,3 @@ class Category(Base):
                 "sort_order": 10
             }
         ]
-    
-    async def update_items_count(self, db_session):
-        """Actualizar el contador de items en esta categoría"""
-        from app.models.item import Item
-        from sqlalchemy import select, func
-        
-        query = select(func.count(Item.id)).filter(
-            Item.category_id == self.id,
-            Item.is_active == True
-        )
-        result = await db_session.execute(query)
-        self.items_count = result.scalar()
\ No newline at end of file
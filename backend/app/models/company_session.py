@@ -6,6 +6,7 @@ import uuid
 from datetime import datetime, timedelta, timezone
 
 from app.core.database import Base
+from app.core.security import hash_token
 
 class CompanySession(Base):
     __tablename__ = "company_sessions"
@@ -14,9 +15,8 @@ class CompanySession(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False, index=True)
     
-    # Tokens
-    access_token = Column(String(500), nullable=False, unique=True, index=True)
-    refresh_token = Column(String(500), nullable=False, unique=True, index=True)
+    # Huella SHA-256 del refresh token vigente (ver UserSession)
+    refresh_token_hash = Column(String(64), nullable=False, unique=True, index=True)
     
     # Información del dispositivo/navegador
     device_info = Column(Text, nullable=True)  # JSON string con info del dispositivo
@@ -86,16 +86,21 @@ class CompanySession(Base):
         else:
             return None
     
+    def rotate(self, refresh_token):
+        """Sustituir el refresh token de la sesión (renovación)"""
+        self.refresh_token_hash = hash_token(refresh_token)
+        self.last_activity = func.now()
+    
     @classmethod
-    def create_session(cls, company_id, access_token, refresh_token, user_agent=None, ip_address=None):
-        """Crear una nueva sesión"""
+    def create_session(cls, company_id, refresh_token, session_id=None, user_agent=None, ip_address=None):
+        """Crear una nueva sesión (``session_id`` es el ``sid`` de sus tokens)"""
         # Calcular fecha de expiración (30 días)
         expires_at = datetime.now(timezone.utc) + timedelta(days=30)
         
         return cls(
+            id=session_id or uuid.uuid4(),
             company_id=company_id,
-            access_token=access_token,
-            refresh_token=refresh_token,
+            refresh_token_hash=hash_token(refresh_token),
             user_agent=user_agent,
             ip_address=ip_address,
             expires_at=expires_at,
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class CounterDelta(Base):
+    """Incremento pendiente de un contador de publicación.
+
+    Los likes, comentarios y compartidos añaden una fila aquí en lugar de
+    actualizar la fila de la publicación; el compactor de
+    ``app.services.counters`` las suma periódicamente a la publicación.
+    """
+    __tablename__ = "community_counter_deltas"
+    __table_args__ = (
+        Index("ix_community_counter_deltas_target", "target", "post_id", "field"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    target = Column(String(10), nullable=False)   # "post" (CommunityPost) o "feed" (CommunityFeedPost)
+    post_id = Column(UUID(as_uuid=True), nullable=False)
+    field = Column(String(30), nullable=False)    # likes_count, comments_count o shares_count
+    delta = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -19,8 +19,15 @@ class ExchangeStatus(str, enum.Enum):
     CANCELLED = "cancelled"        # Cancelado por cualquier parte
     DISPUTED = "disputed"          # En disputa
 
+# Intercambios completados por participante (calificaciones pendientes, clasificación)
+_COMPLETED = text("status = 'COMPLETED'")
+
 class Exchange(Base):
     __tablename__ = "exchanges"
+    __table_args__ = (
+        Index("ix_exchanges_completed_requester", "requester_id", postgresql_where=_COMPLETED, sqlite_where=_COMPLETED),
+        Index("ix_exchanges_completed_owner", "owner_id", postgresql_where=_COMPLETED, sqlite_where=_COMPLETED),
+    )
     
     # Campos principales
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
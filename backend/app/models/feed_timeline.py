@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class FeedTimeline(Base):
+    """Timeline precalculado del feed de la comunidad.
+
+    La clave identifica a quién pertenece: ``user:<id>`` / ``company:<id>``
+    para el feed personal, ``region:<estado>`` o ``global`` para visitantes.
+    """
+    __tablename__ = "feed_timelines"
+
+    key = Column(String(120), primary_key=True)
+    built_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class FeedTimelineEntry(Base):
+    """Publicación dentro de un timeline con su puntuación de ranking"""
+    __tablename__ = "feed_timeline_entries"
+    __table_args__ = (
+        # Lectura por cursor: una sola búsqueda por rango en este índice
+        Index("ix_feed_timeline_entries_rank", "timeline_key", "score", "post_id"),
+    )
+
+    timeline_key = Column(String(120), ForeignKey("feed_timelines.key", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("community_feed_posts.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+    score = Column(Float, nullable=False)
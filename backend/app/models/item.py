@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, DateTime, Float, Integer, ForeignKey, Enum
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Float, Integer, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -25,6 +25,10 @@ class ItemStatus(str, enum.Enum):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Listado de administración paginado por (created_at, id)
+        Index("ix_items_created_at_id", "created_at", "id"),
+    )
     
     # Campos principales
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
@@ -0,0 +1,52 @@
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer, BigInteger, Float, Index
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Job(Base):
+    """Tarea periódica registrada en el planificador (``app.core.scheduler``).
+
+    La fila guarda el estado que debe sobrevivir a reinicios: la próxima
+    ejecución, el arrendamiento (qué worker la está ejecutando y hasta
+    cuándo) y los reintentos pendientes.
+    """
+    __tablename__ = "jobs"
+
+    name = Column(String(100), primary_key=True)
+    schedule = Column(String(100), nullable=False)  # Expresión cron
+    enabled = Column(Boolean, default=True, nullable=False)
+
+    next_run_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)  # Fallos consecutivos del intento actual
+
+    # Arrendamiento: sólo el worker que lo tiene ejecuta la tarea
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    last_started_at = Column(DateTime(timezone=True), nullable=True)
+    last_finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_status = Column(String(20), nullable=True)  # succeeded | failed
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class JobRun(Base):
+    """Historial de ejecuciones de una tarea"""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        Index("ix_job_runs_job_started", "job_name", "started_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    job_name = Column(String(100), nullable=False)
+    worker = Column(String(100), nullable=False)
+    attempt = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)  # succeeded | failed
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    duration_seconds = Column(Float, nullable=False)
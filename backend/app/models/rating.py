@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Float, CheckConstraint
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Float, CheckConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
 
 from app.core.database import Base
+from app.models.rating_summary import STARS, UserRatingSummary
 
 class Rating(Base):
     __tablename__ = "ratings"
@@ -47,6 +48,8 @@ class Rating(Base):
         CheckConstraint('friendliness_rating IS NULL OR (friendliness_rating >= 1 AND friendliness_rating <= 5)', name='check_friendliness_rating_range'),
         CheckConstraint('would_exchange_again IS NULL OR would_exchange_again IN (0, 1)', name='check_would_exchange_again'),
         CheckConstraint('rater_id != rated_id', name='check_different_users'),
+        # "¿Ya calificó este usuario este intercambio?" (anti-join de pendientes)
+        Index('ix_ratings_rater_exchange', 'rater_id', 'exchange_id'),
     )
     
     # Relaciones
@@ -102,20 +105,10 @@ class Rating(Base):
     
     @classmethod
     def calculate_user_average_rating(cls, db_session, user_id: UUID) -> dict:
-        """Calcular las calificaciones promedio de un usuario"""
-        from sqlalchemy import func as sql_func
+        """Calcular las calificaciones promedio de un usuario (desde user_rating_summary)"""
+        summary = db_session.get(UserRatingSummary, user_id)
         
-        result = db_session.query(
-            sql_func.avg(cls.overall_rating).label('overall_avg'),
-            sql_func.avg(cls.communication_rating).label('communication_avg'),
-            sql_func.avg(cls.punctuality_rating).label('punctuality_avg'),
-            sql_func.avg(cls.item_condition_rating).label('item_condition_avg'),
-            sql_func.avg(cls.friendliness_rating).label('friendliness_avg'),
-            sql_func.count(cls.id).label('total_ratings'),
-            sql_func.sum(cls.would_exchange_again).label('positive_recommendations')
-        ).filter(cls.rated_id == user_id).first()
-        
-        if result.total_ratings == 0:
+        if summary is None or summary.overall_count == 0:
             return {
                 "overall_average": 0.0,
                 "communication_average": 0.0,
@@ -126,41 +119,34 @@ class Rating(Base):
                 "recommendation_rate": 0.0
             }
         
+        def average(dim: str) -> float:
+            count = getattr(summary, f"{dim}_count")
+            return round(getattr(summary, f"{dim}_sum") / count, 2) if count else 0.0
+        
+        # Calcular solo entre los que especificaron recomendación
+        total_with_recommendation = summary.recommend_yes + summary.recommend_no
         recommendation_rate = 0.0
-        if result.positive_recommendations:
-            # Calcular solo entre los que especificaron recomendación
-            total_with_recommendation = db_session.query(cls).filter(
-                cls.rated_id == user_id,
-                cls.would_exchange_again.isnot(None)
-            ).count()
-            if total_with_recommendation > 0:
-                recommendation_rate = (result.positive_recommendations / total_with_recommendation) * 100
+        if total_with_recommendation > 0:
+            recommendation_rate = (summary.recommend_yes / total_with_recommendation) * 100
         
         return {
-            "overall_average": round(float(result.overall_avg or 0), 2),
-            "communication_average": round(float(result.communication_avg or 0), 2),
-            "punctuality_average": round(float(result.punctuality_avg or 0), 2),
-            "item_condition_average": round(float(result.item_condition_avg or 0), 2),
-            "friendliness_average": round(float(result.friendliness_avg or 0), 2),
-            "total_ratings": result.total_ratings,
+            "overall_average": average("overall"),
+            "communication_average": average("communication"),
+            "punctuality_average": average("punctuality"),
+            "item_condition_average": average("item_condition"),
+            "friendliness_average": average("friendliness"),
+            "total_ratings": summary.overall_count,
             "recommendation_rate": round(recommendation_rate, 1)
         }
     
     @classmethod
     def get_user_ratings_distribution(cls, db_session, user_id: UUID) -> dict:
-        """Obtener la distribución de calificaciones de un usuario"""
-        from sqlalchemy import func as sql_func, case
-        
-        # Contar calificaciones por estrella (1-5)
-        distribution = {}
-        for stars in range(1, 6):
-            count = db_session.query(cls).filter(
-                cls.rated_id == user_id,
-                sql_func.round(cls.overall_rating) == stars
-            ).count()
-            distribution[f"{stars}_stars"] = count
-        
-        return distribution
+        """Obtener la distribución de calificaciones de un usuario (una sola fila)"""
+        summary = db_session.get(UserRatingSummary, user_id)
+        return {
+            f"{stars}_stars": getattr(summary, f"overall_{stars}") if summary is not None else 0
+            for stars in STARS
+        }
     
     @classmethod
     def user_has_rated_exchange(cls, db_session, user_id: UUID, exchange_id: UUID) -> bool:
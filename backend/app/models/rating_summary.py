@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+# Dimensiones calificadas: la general y las específicas de Rating
+RATING_DIMENSIONS = ("overall", "communication", "punctuality", "item_condition", "friendliness")
+STARS = range(1, 6)
+
+
+class UserRatingSummary(Base):
+    """Agregados de calificaciones de un usuario, mantenidos incrementalmente.
+
+    Por cada dimensión guarda ``<dim>_count``, ``<dim>_sum`` y un histograma
+    ``<dim>_1`` … ``<dim>_5``; además las recomendaciones recibidas y las
+    calificaciones dadas. Se actualiza en la misma transacción que crea o
+    modifica la calificación (``app.services.rating_summary``).
+    """
+    __tablename__ = "user_rating_summary"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    recommend_yes = Column(Integer, default=0, nullable=False)
+    recommend_no = Column(Integer, default=0, nullable=False)
+
+    given_count = Column(Integer, default=0, nullable=False)
+    given_sum = Column(Float, default=0.0, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+for _dim in RATING_DIMENSIONS:
+    setattr(UserRatingSummary, f"{_dim}_count", Column(Integer, default=0, nullable=False))
+    setattr(UserRatingSummary, f"{_dim}_sum", Column(Float, default=0.0, nullable=False))
+    for _star in STARS:
+        setattr(UserRatingSummary, f"{_dim}_{_star}", Column(Integer, default=0, nullable=False))
+
+
+class UserRatingDaily(Base):
+    """Calificación general recibida por día, para la media de los últimos 30 días"""
+    __tablename__ = "user_rating_daily"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    total = Column(Float, default=0.0, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Float, Text, Integer
+from sqlalchemy import Column, String, Boolean, DateTime, Float, Text, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -8,6 +8,10 @@ from app.core.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Listado de administración paginado por (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     # Campos principales
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, select, update
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -6,6 +6,7 @@ import uuid
 from datetime import datetime, timedelta, timezone
 
 from app.core.database import Base
+from app.core.security import hash_token
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
@@ -14,9 +15,10 @@ class UserSession(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     
-    # Tokens
-    access_token = Column(String(500), nullable=False, unique=True, index=True)
-    refresh_token = Column(String(500), nullable=False, unique=True, index=True)
+    # Huella SHA-256 del refresh token vigente. Los tokens de acceso no se
+    # guardan: llevan el id de la sesión (``sid``) y su revocación se consulta
+    # en memoria (``app.core.revocation``)
+    refresh_token_hash = Column(String(64), nullable=False, unique=True, index=True)
     
     # Información del dispositivo/navegador
     device_info = Column(Text, nullable=True)  # JSON string con info del dispositivo
@@ -43,10 +45,17 @@ class UserSession(Base):
     def __repr__(self):
         return f"<UserSession(id={self.id}, user_id={self.user_id}, is_active={self.is_active})>"
     
+    @property
+    def expires_at_utc(self) -> datetime:
+        """``expires_at`` con zona horaria (SQLite la devuelve sin ella)"""
+        if self.expires_at.tzinfo is None:
+            return self.expires_at.replace(tzinfo=timezone.utc)
+        return self.expires_at
+
     @property
     def is_expired(self) -> bool:
         """Verificar si la sesión ha expirado"""
-        return datetime.now(timezone.utc) > self.expires_at
+        return datetime.now(timezone.utc) > self.expires_at_utc
     
     @property
     def is_valid(self) -> bool:
@@ -58,7 +67,7 @@ class UserSession(Base):
         """Obtener el tiempo restante hasta la expiración"""
         if self.is_expired:
             return timedelta(0)
-        return self.expires_at - datetime.now(timezone.utc)
+        return self.expires_at_utc - datetime.now(timezone.utc)
     
     @property
     def time_until_expiry_hours(self) -> int:
@@ -124,24 +133,29 @@ class UserSession(Base):
         if self.is_valid:
             self.expires_at = datetime.now(timezone.utc) + timedelta(days=days)
     
+    def rotate(self, refresh_token: str):
+        """Sustituir el refresh token de la sesión (renovación)"""
+        self.refresh_token_hash = hash_token(refresh_token)
+        self.update_activity()
+    
     @classmethod
     def create_session(
         cls,
         user_id: UUID,
-        access_token: str,
         refresh_token: str,
+        session_id: UUID = None,
         user_agent: str = None,
         ip_address: str = None,
         device_info: str = None,
         expires_in_days: int = 7
     ):
-        """Crear una nueva sesión de usuario"""
+        """Crear una nueva sesión de usuario (``session_id`` es el ``sid`` de sus tokens)"""
         expires_at = datetime.now(timezone.utc) + timedelta(days=expires_in_days)
         
         return cls(
+            id=session_id or uuid.uuid4(),
             user_id=user_id,
-            access_token=access_token,
-            refresh_token=refresh_token,
+            refresh_token_hash=hash_token(refresh_token),
             user_agent=user_agent,
             ip_address=ip_address,
             device_info=device_info,
@@ -149,71 +163,72 @@ class UserSession(Base):
         )
     
     @classmethod
-    def find_by_access_token(cls, db_session, access_token: str):
-        """Buscar sesión por access token"""
-        return db_session.query(cls).filter(
-            cls.access_token == access_token,
+    async def find_by_refresh_token(cls, db_session, refresh_token: str):
+        """Buscar sesión activa por refresh token"""
+        result = await db_session.execute(select(cls).where(
+            cls.refresh_token_hash == hash_token(refresh_token),
             cls.is_active == True,
             cls.is_revoked == False
-        ).first()
+        ))
+        return result.scalar_one_or_none()
     
     @classmethod
-    def find_by_refresh_token(cls, db_session, refresh_token: str):
-        """Buscar sesión por refresh token"""
-        return db_session.query(cls).filter(
-            cls.refresh_token == refresh_token,
-            cls.is_active == True,
-            cls.is_revoked == False
-        ).first()
-    
-    @classmethod
-    def revoke_all_user_sessions(cls, db_session, user_id: UUID, except_session_id: UUID = None):
-        """Revocar todas las sesiones de un usuario (excepto una específica)"""
-        query = db_session.query(cls).filter(
-            cls.user_id == user_id,
-            cls.is_active == True
-        )
+    async def revoke_all_user_sessions(cls, db_session, user_id: UUID, except_session_id: UUID = None) -> list:
+        """Revocar todas las sesiones de un usuario (excepto una específica).
         
-        if except_session_id:
-            query = query.filter(cls.id != except_session_id)
+        Devuelve los ids revocados para ``revoked_sessions.revoke``; no confirma la transacción.
+        """
+        stmt = update(cls).where(cls.user_id == user_id, cls.is_active == True)
         
-        query.update({
-            "is_active": False,
-            "is_revoked": True,
-            "revoked_at": func.now()
-        })
+        if except_session_id:
+            stmt = stmt.where(cls.id != except_session_id)
         
-        db_session.commit()
-    
+        result = await db_session.execute(
+            stmt.values(is_active=False, is_revoked=True, revoked_at=func.now())
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars())
+
     @classmethod
-    def cleanup_expired_sessions(cls, db_session):
-        """Limpiar sesiones expiradas"""
-        expired_sessions = db_session.query(cls).filter(
-            cls.expires_at < datetime.now(timezone.utc),
-            cls.is_active == True
+    async def revoke_users_sessions(cls, db_session, user_ids: list) -> list:
+        """Revocar en un solo UPDATE las sesiones activas de varios usuarios.
+
+        Devuelve los ids revocados para ``revoked_sessions.revoke``; no confirma la transacción.
+        """
+        if not user_ids:
+            return []
+        result = await db_session.execute(
+            update(cls)
+            .where(cls.user_id.in_(user_ids), cls.is_active == True)
+            .values(is_active=False, is_revoked=True, revoked_at=func.now())
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
         )
-        
-        count = expired_sessions.count()
-        
-        expired_sessions.update({
-            "is_active": False,
-            "is_revoked": True,
-            "revoked_at": func.now()
-        })
-        
-        db_session.commit()
-        return count
+        return list(result.scalars())
+
+    @classmethod
+    async def cleanup_expired_sessions(cls, db_session) -> int:
+        """Revocar las sesiones expiradas (no confirma la transacción)"""
+        result = await db_session.execute(
+            update(cls)
+            .where(cls.expires_at < datetime.now(timezone.utc), cls.is_active == True)
+            .values(is_active=False, is_revoked=True, revoked_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
     
     @classmethod
-    def get_user_active_sessions(cls, db_session, user_id: UUID):
+    async def get_user_active_sessions(cls, db_session, user_id: UUID):
         """Obtener todas las sesiones activas de un usuario"""
-        return db_session.query(cls).filter(
+        result = await db_session.execute(select(cls).where(
             cls.user_id == user_id,
             cls.is_active == True,
             cls.is_revoked == False
-        ).order_by(cls.last_activity.desc()).all()
+        ).order_by(cls.last_activity.desc()))
+        return result.scalars().all()
     
-    def to_dict(self, include_tokens: bool = False) -> dict:
+    def to_dict(self) -> dict:
         """Convertir la sesión a diccionario para API"""
         result = {
             "id": str(self.id),
@@ -228,12 +243,6 @@ class UserSession(Base):
             "time_until_expiry_hours": int(self.time_until_expiry.total_seconds() / 3600)
         }
         
-        if include_tokens:
-            result.update({
-                "access_token": self.access_token,
-                "refresh_token": self.refresh_token
-            })
-        
         return result
     
     def get_security_info(self) -> dict:
@@ -43,7 +43,8 @@ from .user import (
     PasswordReset,
     PasswordResetConfirm,
     UserSearchParams,
-    UserSearchResponse
+    UserSearchResponse,
+    UserPresence
 )
 
 # Esquemas de categoría
@@ -56,6 +57,7 @@ from .category import (
     PopularCategory,
     CategoryStats,
     CategoryDetailResponse,
+    CategoryBreadcrumb,
     CategorySearchParams,
     CategorySearchResponse,
     CategoryReorderRequest,
@@ -63,9 +65,7 @@ from .category import (
     ImportResponse,
     CategorySlugCheck,
     SlugAvailabilityResponse,
-    CategoryHierarchy,
-    CategoryExportFormat,
-    CategoryExportResponse
+    CategoryHierarchy
 )
 
 # Esquemas de ítem
@@ -211,6 +211,8 @@ from .community import (
     CommunityStatsResponse,
     TopUser,
     TopUsersResponse,
+    LeaderboardRank,
+    MyLeaderboardResponse,
     ApiUser,
     ActorType,
     MediaType,
@@ -218,6 +220,7 @@ from .community import (
     FeedPostCreate,
     FeedPost,
     FeedPostList,
+    FeedTimelinePage,
     FeedCommentCreate,
     FeedComment,
     FeedCommentList,
@@ -249,6 +252,16 @@ from .community_post import (
 # Esquemas de administración
 from .admin import (
     AdminRoleUpdate,
+    ProfileTokenRequest,
+    ProfileTokenResponse,
+    ProfileSummary,
+    ProfileListResponse,
+    JobResponse,
+    JobRunResponse,
+    AdminListingPage,
+    AdminBulkUserAction,
+    AdminBulkItemAction,
+    AdminBulkResult,
 )
 
 __all__ = [
@@ -295,6 +308,7 @@ __all__ = [
     "PasswordResetConfirm",
     "UserSearchParams",
     "UserSearchResponse",
+    "UserPresence",
     
     # Category
     "CategoryBase",
@@ -305,6 +319,7 @@ __all__ = [
     "PopularCategory",
     "CategoryStats",
     "CategoryDetailResponse",
+    "CategoryBreadcrumb",
     "CategorySearchParams",
     "CategorySearchResponse",
     "CategoryReorderRequest",
@@ -313,8 +328,6 @@ __all__ = [
     "CategorySlugCheck",
     "SlugAvailabilityResponse",
     "CategoryHierarchy",
-    "CategoryExportFormat",
-    "CategoryExportResponse",
     
     # Item
     "ItemBase",
@@ -447,6 +460,8 @@ __all__ = [
     "CommunityStatsResponse",
     "TopUser",
     "TopUsersResponse",
+    "LeaderboardRank",
+    "MyLeaderboardResponse",
     "ApiUser",
     # Posts de comunidad
     "CommunityPostBase",
@@ -468,4 +483,14 @@ __all__ = [
     "CommentResponse",
     # Admin
     "AdminRoleUpdate",
+    "ProfileTokenRequest",
+    "ProfileTokenResponse",
+    "ProfileSummary",
+    "ProfileListResponse",
+    "JobResponse",
+    "JobRunResponse",
+    "AdminListingPage",
+    "AdminBulkUserAction",
+    "AdminBulkItemAction",
+    "AdminBulkResult",
 ]
@@ -1,5 +1,103 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from app.models.item import ItemStatus
 
 
 class AdminRoleUpdate(BaseModel):
-    make_admin: bool
\ No newline at end of file
+    make_admin: bool
+
+
+ProfileMode = Literal["wall", "cpu"]
+ProfileFormat = Literal["speedscope", "collapsed"]
+
+
+class ProfileTokenRequest(BaseModel):
+    mode: ProfileMode = "wall"
+
+
+class ProfileTokenResponse(BaseModel):
+    token: str
+    header: str = "X-Profile"
+    mode: ProfileMode
+    expires_at: datetime
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    label: str
+    mode: str
+    interval_ms: float
+    duration_seconds: float
+    total_samples: int
+    unique_stacks: int
+
+
+class ProfileListResponse(BaseModel):
+    active: bool
+    profiles: List[ProfileSummary]
+
+
+class JobResponse(BaseModel):
+    name: str
+    schedule: str
+    enabled: bool
+    registered: bool
+    next_run_at: Optional[datetime] = None
+    attempts: int
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobRunResponse(BaseModel):
+    id: int
+    job_name: str
+    worker: str
+    attempt: int
+    status: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+ListingFormat = Literal["json", "ndjson"]
+
+
+class AdminListingPage(BaseModel):
+    """Página de un listado de administración con las columnas pedidas en ``fields``"""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    has_more: bool
+    limit: int
+
+
+class AdminBulkUserAction(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=1000)
+    action: Literal["activate", "deactivate"]
+
+
+class AdminBulkItemAction(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=1000)
+    action: Literal["activate", "deactivate", "set_status"]
+    status: Optional[ItemStatus] = None
+
+
+class AdminBulkResult(BaseModel):
+    requested: int
+    updated: int
+    ids: List[UUID]
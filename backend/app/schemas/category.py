@@ -27,7 +27,8 @@ class CategoryBase(BaseModel):
 
 # Esquema para crear categoría
 class CategoryCreate(CategoryBase):
-    pass
+    slug: Optional[str] = Field(None, max_length=100)  # Se genera desde el nombre si falta
+    parent_id: Optional[UUID] = None
 
 # Esquema para actualizar categoría
 class CategoryUpdate(BaseModel):
@@ -38,6 +39,8 @@ class CategoryUpdate(BaseModel):
     image_url: Optional[str] = Field(None, max_length=500)
     is_active: Optional[bool] = None
     sort_order: Optional[int] = Field(None, ge=0)
+    slug: Optional[str] = Field(None, max_length=100)
+    parent_id: Optional[UUID] = None
     
     @validator('color')
     def validate_color(cls, v):
@@ -57,6 +60,8 @@ class CategoryUpdate(BaseModel):
 class CategoryResponse(CategoryBase):
     id: UUID
     slug: str
+    parent_id: Optional[UUID] = None
+    level: int = 0
     item_count: int
     created_at: datetime
     updated_at: datetime
@@ -106,10 +111,18 @@ class CategoryStats(BaseModel):
     class Config:
         from_attributes = True
 
+# Ancestro de una categoría (ruta de navegación)
+class CategoryBreadcrumb(BaseModel):
+    id: UUID
+    name: str
+    slug: str
+
 # Esquema detallado de categoría con estadísticas
 class CategoryDetailResponse(CategoryResponse):
     stats: CategoryStats
     recent_items: list[dict]  # Lista simplificada de ítems recientes
+    path: list[CategoryBreadcrumb] = []  # De la raíz al padre
+    subcategories: list[CategoryListItem] = []
     
     class Config:
         from_attributes = True
@@ -193,19 +206,3 @@ class CategoryHierarchy(BaseModel):
 
 # Permitir referencias circulares para CategoryHierarchy
 CategoryHierarchy.model_rebuild()
-
-# Esquema para exportar categorías
-class CategoryExportFormat(BaseModel):
-    format: str = Field(default="json", pattern="^(json|csv|xlsx)$")
-    include_stats: bool = Field(default=True)
-    include_inactive: bool = Field(default=False)
-    fields: Optional[list[str]] = Field(None, description="Campos específicos a exportar")
-
-# Esquema para respuesta de exportación
-class CategoryExportResponse(BaseModel):
-    download_url: str
-    filename: str
-    format: str
-    expires_at: datetime
-    file_size: int  # En bytes
-    record_count: int
\ No newline at end of file
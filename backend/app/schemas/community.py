@@ -101,6 +101,20 @@ class TopUsersResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LeaderboardRank(BaseModel):
+    """Posición de un usuario en una clasificación"""
+    scope: str
+    rank: int
+    total: int
+    total_exchanges: int
+    reward_points: int
+
+class MyLeaderboardResponse(BaseModel):
+    """Posiciones del usuario actual: global, en su ciudad y en su país"""
+    global_rank: Optional[LeaderboardRank] = None
+    city_rank: Optional[LeaderboardRank] = None
+    country_rank: Optional[LeaderboardRank] = None
+
 class CommunityPost(BaseModel):
     """Post de la comunidad"""
     id: str
@@ -177,6 +191,12 @@ class FeedPostList(BaseModel):
     has_prev: bool
 
 
+class FeedTimelinePage(BaseModel):
+    posts: List[FeedPost]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
 class FeedCommentCreate(BaseModel):
     content: str = Field(..., min_length=1, max_length=1000)
 
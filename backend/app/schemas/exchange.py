@@ -138,8 +138,8 @@ class ExchangeDetailResponse(BaseModel):
     requester_id: UUID
     owner_id: UUID
     
-    # Información de ítems
-    requester_item: ExchangeItemInfo
+    # Información de ítems (el solicitante puede no ofrecer ninguno)
+    requester_item: Optional[ExchangeItemInfo]
     owner_item: ExchangeItemInfo
     
     # Detalles del intercambio
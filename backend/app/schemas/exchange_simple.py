@@ -18,4 +18,27 @@ class ExchangeCreateResponse(BaseModel):
     updated_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Esquema simple para respuesta de cambios de estado de un intercambio
+class ExchangeStatusResponse(BaseModel):
+    id: UUID
+    status: ExchangeStatus
+    requester_id: UUID
+    owner_id: UUID
+    requested_item_id: UUID
+    offered_item_id: Optional[UUID] = None
+    meeting_location: Optional[str] = None
+    meeting_datetime: Optional[datetime] = None
+    completed_by_requester: bool
+    completed_by_owner: bool
+    completion_notes: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    accepted_at: Optional[datetime] = None
+    confirmed_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    cancelled_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -99,8 +99,8 @@ class RatingSearchParams(BaseModel):
     exchange_id: Optional[UUID] = None
     
     # Filtros de calificación
-    min_rating: Optional[int] = Field(None, ge=1, le=5)
-    max_rating: Optional[int] = Field(None, ge=1, le=5)
+    min_rating: Optional[float] = Field(None, ge=1, le=5)
+    max_rating: Optional[float] = Field(None, ge=1, le=5)
     would_exchange_again: Optional[bool] = None
     has_comment: Optional[bool] = None
     
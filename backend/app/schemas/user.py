@@ -334,3 +334,9 @@ class UserSearchResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+# Esquema de presencia (en línea / visto por última vez)
+class UserPresence(BaseModel):
+    user_id: UUID
+    is_online: bool
+    last_seen: Optional[datetime] = None
@@ -0,0 +1,147 @@
+"""Servidor de producción con varios workers.
+
+Uso (después de ``alembic upgrade head``)::
+
+    python -m app.server
+
+Con gunicorn instalado: un proceso maestro y WEB_CONCURRENCY workers de
+uvicorn. La aplicación se importa en el maestro antes de crear los workers
+(``preload_app``), que la heredan ya cargada y comparten esa memoria; cada
+worker se recicla tras WEB_MAX_REQUESTS peticiones (más un margen aleatorio
+para que no se reinicien todos a la vez) y, al recibir SIGTERM, deja de
+aceptar conexiones y tiene WEB_GRACEFUL_TIMEOUT_SECONDS para terminar las que
+tiene en curso. Si un worker muere, el maestro arranca otro.
+
+Sin gunicorn se usa ``uvicorn --workers``: mismos workers y parada ordenada,
+pero sin precarga ni reciclado.
+
+Cada worker tiene su propio pool de conexiones, sus cachés y sus tareas de
+fondo; lo que tienen que saber los demás (invalidación de cachés, escrituras
+recientes, cambios en la clasificación en memoria) se lo cuentan por
+``app.core.coordination``.
+"""
+import gc
+import logging
+import os
+from typing import Optional
+
+from app.core.config import settings
+from app.core.sqlite import is_sqlite_file
+
+logger = logging.getLogger(__name__)
+
+APP = "app.main:app"
+
+
+def cpu_count() -> int:
+    """CPUs que puede usar este proceso: afinidad y cuota del cgroup (contenedores)"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            count = min(count, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY o un worker por CPU; uno solo con SQLite en memoria"""
+    url = settings.DATABASE_URL
+    if "sqlite" in url and not is_sqlite_file(url):
+        # Cada worker tendría su propia base de datos
+        return 1
+    if settings.WEB_CONCURRENCY:
+        return max(1, settings.WEB_CONCURRENCY)
+    return cpu_count()
+
+
+def _check(workers: int) -> None:
+    """Avisos de configuración que sólo importan con varios workers"""
+    if workers > 1 and "sqlite" not in settings.DATABASE_URL:
+        per_worker = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        logger.info(
+            "%d workers x %d conexiones = hasta %d conexiones a la base de datos",
+            workers, per_worker, workers * per_worker
+        )
+    if workers > 1 and settings.RATE_LIMIT_BACKEND == "memory":
+        logger.warning("RATE_LIMIT_BACKEND=memory con %d workers: cada worker lleva su propia cuenta", workers)
+
+
+def gunicorn_options(workers: int) -> dict:
+    return {
+        "bind": f"{settings.WEB_HOST}:{settings.WEB_PORT}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.WEB_MAX_REQUESTS,
+        "max_requests_jitter": settings.WEB_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+        "timeout": settings.WEB_TIMEOUT_SECONDS,
+        "keepalive": settings.WEB_KEEPALIVE_SECONDS,
+        "when_ready": _when_ready,
+        "accesslog": "-" if settings.DEBUG else None,
+    }
+
+
+def _when_ready(server) -> None:
+    # Lo importado por el maestro no vuelve a recorrerlo el recolector de
+    # basura en los workers: las páginas siguen compartidas tras el fork
+    gc.freeze()
+    server.log.info("GreenLoop listo con %d workers", server.cfg.workers)
+
+
+def _run_gunicorn(app: str, workers: int) -> None:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+
+    class Application(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(app)
+
+    Application(gunicorn_options(workers)).run()
+
+
+def _run_uvicorn(app: str, workers: int) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=workers,
+        timeout_keep_alive=settings.WEB_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+        # Con un solo proceso nadie lo reiniciaría al llegar al límite
+        limit_max_requests=None,
+    )
+
+
+def main(app: str = APP, workers: Optional[int] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    workers = workers or worker_count()
+    _check(workers)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        logger.warning("gunicorn no está instalado: uvicorn con %d workers, sin reciclado", workers)
+        _run_uvicorn(app, workers)
+        return
+    _run_gunicorn(app, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Servicios de dominio compartidos por varios endpoints"""
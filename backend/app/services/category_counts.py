@@ -0,0 +1,143 @@
+"""Contadores de ítems por categoría mantenidos por incrementos.
+
+Una categoría cuenta sus ítems publicados (activos y disponibles, los mismos
+que muestra el buscador). ``own_items_count`` cuenta los de la propia
+categoría e ``items_count`` suma además los de sus subcategorías, de modo que
+cada cambio de un ítem se propaga a todos sus ancestros. Los ancestros salen
+del árbol en memoria (``category_tree``) y el ajuste es un único UPDATE por
+lotes en la misma transacción que modifica el ítem.
+
+Uso, como en ``rating_summary``: ``antes = snapshot(item)``, modificar el
+ítem y ``await apply(db, antes, snapshot(item))`` antes de confirmar.
+
+``reconcile`` recalcula los contadores desde ``items`` y corrige las
+diferencias; la tarea ``categories.reconcile_counts`` lo ejecuta cada hora
+para reparar lo que no pase por la API (importaciones, cambios manuales).
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Category, Item
+from app.models.item import ItemStatus
+from app.services.category_tree import category_tree
+
+logger = logging.getLogger(__name__)
+
+_categories = Category.__table__
+
+# (categoría, cuenta) de un ítem en un momento dado
+Snapshot = Tuple[Optional[UUID], bool]
+
+
+def counts_toward(item: Item) -> bool:
+    return bool(item.is_active) and item.status == ItemStatus.AVAILABLE
+
+
+def snapshot(item: Item) -> Snapshot:
+    """Estado del ítem que afecta a los contadores; ``None`` si aún no existe"""
+    return item.category_id, counts_toward(item)
+
+
+async def _adjust(db: AsyncSession, deltas: Dict[UUID, Tuple[int, int]]) -> None:
+    """Sumar ``(propio, total)`` a cada categoría, en orden de id (bloqueos consistentes)"""
+    changes = [
+        {"b_id": category_id, "b_own": own, "b_total": total}
+        for category_id, (own, total) in sorted(deltas.items(), key=lambda kv: str(kv[0]))
+        if own or total
+    ]
+    if not changes:
+        return
+    stmt = update(_categories).where(_categories.c.id == bindparam("b_id")).values(
+        own_items_count=_categories.c.own_items_count + bindparam("b_own"),
+        items_count=_categories.c.items_count + bindparam("b_total"),
+    )
+    await db.execute(stmt, changes)
+
+
+async def apply(db: AsyncSession, old: Optional[Snapshot] = None, new: Optional[Snapshot] = None) -> None:
+    """Actualizar los contadores por el cambio de un ítem. No confirma la transacción.
+
+    Alta: ``apply(db, new=snapshot(item))``; cambio: ``apply(db, antes, después)``.
+    """
+    await apply_many(db, [(old, new)])
+
+
+async def apply_many(db: AsyncSession, changes: Iterable[Tuple[Optional[Snapshot], Optional[Snapshot]]]) -> None:
+    """Como ``apply`` para muchos ítems a la vez (``(antes, después)`` por ítem), con un solo UPDATE"""
+    per_category: Dict[UUID, int] = defaultdict(int)
+    for old, new in changes:
+        for snap, sign in ((old, -1), (new, 1)):
+            if snap is not None and snap[0] is not None and snap[1]:
+                per_category[snap[0]] += sign
+
+    if not any(per_category.values()):
+        return
+    tree = await category_tree.get()
+    deltas: Dict[UUID, list] = defaultdict(lambda: [0, 0])
+    for category_id, delta in per_category.items():
+        if not delta:
+            continue
+        deltas[category_id][0] += delta
+        for ancestor_id in (category_id, *tree.ancestors.get(category_id, ())):
+            deltas[ancestor_id][1] += delta
+    await _adjust(db, {category_id: tuple(d) for category_id, d in deltas.items()})
+
+
+async def moved(db: AsyncSession, total: int, old_ancestors: Iterable[UUID], new_ancestors: Iterable[UUID]) -> None:
+    """Trasladar el total de un subárbol que cambia de categoría padre.
+
+    ``old_ancestors``/``new_ancestors``: ancestros de la categoría movida antes
+    y después del cambio (sin incluirla).
+    """
+    deltas: Dict[UUID, list] = defaultdict(lambda: [0, 0])
+    for ancestor_id in old_ancestors:
+        deltas[ancestor_id][1] -= total
+    for ancestor_id in new_ancestors:
+        deltas[ancestor_id][1] += total
+    await _adjust(db, {category_id: tuple(d) for category_id, d in deltas.items()})
+
+
+async def reconcile(db: AsyncSession) -> int:
+    """Recalcular los contadores desde ``items`` y corregir las diferencias.
+
+    Lee la jerarquía de la base de datos (no del árbol en memoria) para no
+    arrastrar una copia desactualizada. Devuelve cuántas categorías se
+    corrigieron; el llamante confirma la transacción.
+    """
+    rows = (await db.execute(
+        select(Category.id, Category.parent_id, Category.own_items_count, Category.items_count)
+    )).all()
+    parents = {category_id: parent_id for category_id, parent_id, _, _ in rows}
+
+    own = dict((await db.execute(
+        select(Item.category_id, func.count(Item.id))
+        .where(Item.is_active == True, Item.status == ItemStatus.AVAILABLE)
+        .group_by(Item.category_id)
+    )).all())
+
+    totals: Dict[UUID, int] = defaultdict(int)
+    for category_id in parents:
+        count = own.get(category_id, 0)
+        if not count:
+            continue
+        current, seen = category_id, set()
+        while current is not None and current in parents and current not in seen:
+            seen.add(current)
+            totals[current] += count
+            current = parents[current]
+
+    drift = {}
+    for category_id, _, stored_own, stored_total in rows:
+        expected = (own.get(category_id, 0), totals.get(category_id, 0))
+        if (stored_own, stored_total) != expected:
+            drift[category_id] = (expected[0] - stored_own, expected[1] - stored_total)
+
+    if drift:
+        logger.warning("Contadores de ítems desajustados en %d categorías; corrigiendo", len(drift))
+        await _adjust(db, drift)
+    return len(drift)
@@ -0,0 +1,199 @@
+"""Árbol de categorías en memoria, compartido por todas las peticiones.
+
+Las categorías cambian muy poco y se leen en casi todas las páginas. El árbol
+se carga con una sola consulta (todas las categorías, activas o no) y se
+construyen en memoria la jerarquía, las rutas de ancestros y el mapa
+slug → id. Las lecturas no tocan la base de datos.
+
+Los contadores de ítems del árbol pueden ir hasta
+CATEGORY_TREE_MAX_AGE_SECONDS por detrás de la tabla: cambian con cada ítem y
+no merecen una invalidación por cambio.
+
+Invalidación: los endpoints que modifican categorías llaman a
+``category_tree.changed(db)`` antes de confirmar. Eso incrementa la versión
+``category_tree`` en ``cache_versions`` dentro de la misma transacción y
+descarta la copia local al confirmar; el resto de workers ve la nueva versión
+en su siguiente sondeo (``app.core.cache_versions.watcher``) y recarga.
+"""
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import cache_versions
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.http_cache import body_etag
+from app.models import Category
+
+NAME = "category_tree"
+MAX_LEVEL = 3  # Máximo 4 niveles (0, 1, 2, 3)
+
+
+@dataclass(frozen=True)
+class CategoryNode:
+    id: UUID
+    name: str
+    slug: str
+    description: Optional[str]
+    icon: Optional[str]
+    color: Optional[str]
+    image_url: Optional[str]
+    parent_id: Optional[UUID]
+    level: int
+    sort_order: int
+    item_count: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+_COLUMNS = [
+    Category.id, Category.name, Category.slug, Category.description, Category.icon, Category.color,
+    Category.image_url, Category.parent_id, Category.level, Category.sort_order, Category.items_count,
+    Category.is_active, Category.created_at, Category.updated_at,
+]
+
+
+class CategoryTree:
+    """Instantánea inmutable de las categorías"""
+
+    def __init__(self, nodes: Iterable[CategoryNode], version: int = 0):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_id: Dict[UUID, CategoryNode] = {node.id: node for node in nodes}
+        self.id_by_slug: Dict[str, UUID] = {node.slug: node.id for node in self.by_id.values()}
+
+        children: Dict[Optional[UUID], List[CategoryNode]] = {}
+        for node in self.by_id.values():
+            parent = node.parent_id if node.parent_id in self.by_id else None
+            children.setdefault(parent, []).append(node)
+        for siblings in children.values():
+            siblings.sort(key=lambda n: (n.sort_order, n.name))
+        self._children = children
+
+        # Rutas raíz → padre, recorriendo el árbol una vez desde las raíces
+        self.ancestors: Dict[UUID, Tuple[UUID, ...]] = {}
+        stack = [(node, ()) for node in children.get(None, [])]
+        while stack:
+            node, path = stack.pop()
+            self.ancestors[node.id] = path
+            stack.extend((child, path + (node.id,)) for child in children.get(node.id, []))
+
+    def get(self, category_id: UUID) -> Optional[CategoryNode]:
+        return self.by_id.get(category_id)
+
+    def by_slug(self, slug: str) -> Optional[CategoryNode]:
+        category_id = self.id_by_slug.get(slug)
+        return self.by_id.get(category_id) if category_id else None
+
+    def resolve(self, id_or_slug: str) -> Optional[CategoryNode]:
+        """Categoría por id (UUID en texto) o por slug"""
+        try:
+            return self.get(UUID(str(id_or_slug)))
+        except ValueError:
+            return self.by_slug(id_or_slug)
+
+    def children(self, category_id: Optional[UUID], active_only: bool = True) -> List[CategoryNode]:
+        nodes = self._children.get(category_id, [])
+        return [n for n in nodes if n.is_active] if active_only else list(nodes)
+
+    def path(self, category_id: UUID) -> List[CategoryNode]:
+        """Ancestros de la raíz al padre"""
+        return [self.by_id[a] for a in self.ancestors.get(category_id, ())]
+
+    def descendant_ids(self, category_id: UUID) -> List[UUID]:
+        result, stack = [], [category_id]
+        while stack:
+            current = stack.pop()
+            for child in self._children.get(current, []):
+                result.append(child.id)
+                stack.append(child.id)
+        return result
+
+    def is_descendant(self, category_id: UUID, ancestor_id: UUID) -> bool:
+        return ancestor_id in self.ancestors.get(category_id, ())
+
+    def hierarchy(self) -> List[dict]:
+        """Categorías activas anidadas (esquema ``CategoryHierarchy``)"""
+        def build(node: CategoryNode) -> dict:
+            return {
+                "id": node.id,
+                "name": node.name,
+                "slug": node.slug,
+                "icon": node.icon,
+                "color": node.color,
+                "item_count": node.item_count,
+                "parent_id": node.parent_id,
+                "children": [build(child) for child in self.children(node.id)],
+                "level": node.level,
+            }
+        return [build(root) for root in self.children(None)]
+
+    @cached_property
+    def hierarchy_json(self) -> bytes:
+        return orjson.dumps(self.hierarchy())
+
+    @cached_property
+    def hierarchy_etag(self) -> str:
+        # Del contenido y no sólo de la versión: los contadores cambian sin ella
+        return body_etag(self.hierarchy_json)
+
+
+class CategoryTreeCache:
+    """Árbol de categorías del proceso, recargado al cambiar su versión"""
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal, max_age: Optional[float] = None):
+        self.session_factory = session_factory
+        self.max_age = max_age if max_age is not None else settings.CATEGORY_TREE_MAX_AGE_SECONDS
+        self._tree: Optional[CategoryTree] = None
+        self._lock = asyncio.Lock()
+
+    async def _load(self) -> CategoryTree:
+        async with self.session_factory() as db:
+            version = (await cache_versions.read(db, [NAME])).get(NAME, 0)
+            result = await db.execute(select(*_COLUMNS))
+            return CategoryTree([CategoryNode(*row) for row in result], version)
+
+    async def get(self) -> CategoryTree:
+        tree = self._tree
+        if tree is not None:
+            if time.monotonic() - tree.loaded_at < self.max_age or self._lock.locked():
+                return tree
+            # Refrescar contadores; mientras tanto el resto sigue con la copia actual
+            async with self._lock:
+                if self._tree is tree:
+                    self._tree = await self._load()
+                return self._tree or tree
+        async with self._lock:
+            if self._tree is None:
+                self._tree = await self._load()
+            return self._tree
+
+    def invalidate(self) -> None:
+        self._tree = None
+
+    async def changed(self, db: AsyncSession) -> None:
+        """Registrar en la transacción actual que las categorías cambiaron"""
+        await cache_versions.bump(db, NAME, on_commit=self.invalidate)
+
+    async def on_version(self, version: int) -> None:
+        """Aviso del sondeo de versiones: recargar si la copia es de otra versión"""
+        tree = self._tree
+        if tree is not None and tree.version != version:
+            async with self._lock:
+                self._tree = await self._load()
+
+
+category_tree = CategoryTreeCache()
+cache_versions.watcher.subscribe(NAME, category_tree.on_version)
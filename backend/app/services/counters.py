@@ -0,0 +1,183 @@
+"""Contadores de publicaciones con escritura diferida.
+
+Los likes, comentarios y compartidos no actualizan la fila de la publicación
+dentro de la petición (eso serializa todas las interacciones de una
+publicación viral sobre una misma fila). En su lugar se inserta un incremento
+en ``community_counter_deltas`` y un compactor en segundo plano los suma a la
+publicación cada COUNTER_COMPACT_INTERVAL_SECONDS.
+
+Las lecturas usan ``live()``: el valor consolidado más la suma de incrementos
+pendientes, en la misma sentencia SQL, de modo que el resultado es exacto
+aunque el compactor esté trabajando en paralelo. El compactor reclama los
+incrementos con ``DELETE ... RETURNING`` en la misma transacción en la que
+actualiza las publicaciones, por lo que varios procesos pueden compactar a la
+vez sin contar dos veces.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import Integer, bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import CommunityFeedPost, CommunityPost, CounterDelta
+
+logger = logging.getLogger(__name__)
+
+# Publicaciones con contadores y los contadores de cada una
+TARGETS = {
+    "post": (CommunityPost, ("likes_count", "comments_count")),
+    "feed": (CommunityFeedPost, ("likes_count", "comments_count", "shares_count")),
+}
+
+
+class non_negative(FunctionElement):
+    """``GREATEST(x, 0)``: los contadores nunca bajan de cero (``max`` en SQLite)"""
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(non_negative)
+def _non_negative(element, compiler, **kw):
+    return f"GREATEST({compiler.process(element.clauses, **kw)}, 0)"
+
+
+@compiles(non_negative, "sqlite")
+def _non_negative_sqlite(element, compiler, **kw):
+    return f"max({compiler.process(element.clauses, **kw)}, 0)"
+
+
+def _target(target: str):
+    try:
+        return TARGETS[target]
+    except KeyError:
+        raise ValueError(f"Contador desconocido: {target}")
+
+
+async def record(db: AsyncSession, target: str, post_id: UUID, field: str, delta: int = 1) -> None:
+    """Registrar un incremento (o decremento) pendiente en la transacción actual"""
+    _, fields = _target(target)
+    if field not in fields:
+        raise ValueError(f"Campo de contador desconocido: {target}.{field}")
+    await db.execute(insert(CounterDelta).values(target=target, post_id=post_id, field=field, delta=delta))
+
+
+def pending(target: str, field: str, post_id_column):
+    """Suma de incrementos pendientes para la publicación de ``post_id_column``"""
+    return select(func.coalesce(func.sum(CounterDelta.delta), 0)).where(
+        CounterDelta.target == target,
+        CounterDelta.post_id == post_id_column,
+        CounterDelta.field == field
+    ).scalar_subquery()
+
+
+def live(target: str, field: str):
+    """Expresión SQL con el valor actual del contador (consolidado + pendiente)"""
+    model, _ = _target(target)
+    return non_negative(getattr(model, field) + pending(target, field, model.id)).label(field)
+
+
+async def read_counts(db: AsyncSession, target: str, post_ids: Iterable[UUID]) -> Dict[UUID, Dict[str, int]]:
+    """Valores actuales de todos los contadores de varias publicaciones"""
+    model, fields = _target(target)
+    ids = list(post_ids)
+    if not ids:
+        return {}
+    result = await db.execute(select(model.id, *[live(target, f) for f in fields]).where(model.id.in_(ids)))
+    return {row[0]: dict(zip(fields, row[1:])) for row in result}
+
+
+async def read_count(db: AsyncSession, target: str, post_id: UUID, field: str) -> int:
+    model, _ = _target(target)
+    return (await db.execute(select(live(target, field)).where(model.id == post_id))).scalar() or 0
+
+
+# Compactación
+
+async def compact(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """Consolidar un lote de incrementos pendientes; devuelve cuántos se aplicaron.
+
+    El llamante confirma la transacción.
+    """
+    batch = select(CounterDelta.id).order_by(CounterDelta.id).limit(batch_size or settings.COUNTER_COMPACT_BATCH)
+    claimed = await db.execute(
+        delete(CounterDelta)
+        .where(CounterDelta.id.in_(batch.scalar_subquery()))
+        .returning(CounterDelta.target, CounterDelta.post_id, CounterDelta.field, CounterDelta.delta)
+        .execution_options(synchronize_session=False)
+    )
+
+    totals: Dict[str, Dict[UUID, Dict[str, int]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    applied = 0
+    for target, post_id, field, delta in claimed:
+        totals[target][post_id][field] += delta
+        applied += 1
+
+    for target, posts in totals.items():
+        model, fields = _target(target)
+        table = model.__table__
+        stmt = update(table).where(table.c.id == bindparam("b_id")).values({
+            field: non_negative(table.c[field] + bindparam(f"b_{field}")) for field in fields
+        })
+        await db.execute(stmt, [
+            {"b_id": post_id, **{f"b_{field}": deltas.get(field, 0) for field in fields}}
+            for post_id, deltas in posts.items()
+        ])
+    return applied
+
+
+class CounterCompactor:
+    """Tarea en segundo plano que consolida los contadores periódicamente"""
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal, interval: Optional[float] = None):
+        self.session_factory = session_factory
+        self.interval = interval if interval is not None else settings.COUNTER_COMPACT_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Consolidar todo lo pendiente, lote a lote"""
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                applied = await compact(db)
+                await db.commit()
+            total += applied
+            if applied < settings.COUNTER_COMPACT_BATCH:
+                return total
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error consolidando contadores de publicaciones")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="counter-compactor")
+
+    async def stop(self) -> None:
+        """Detener la tarea y consolidar lo que quede pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.run_once()
+        except Exception:
+            logger.exception("Error consolidando contadores de publicaciones al cerrar")
+
+
+compactor = CounterCompactor()
@@ -0,0 +1,112 @@
+"""Exportaciones disponibles para administradores y empresas.
+
+Las columnas de cada exportación son planas (sin relaciones cargadas) para
+que las filas salgan directamente del cursor; ver ``app.core.exports``.
+"""
+from sqlalchemy.orm import aliased
+
+from app.core.exports import ExportSpec
+from app.models import Category, Contribution, ContributionCategory, Exchange, Item, User
+
+_Parent = aliased(Category)
+_Requester = aliased(User)
+_Owner = aliased(User)
+
+CATEGORIES = ExportSpec(
+    "categories",
+    {
+        "id": Category.id,
+        "name": Category.name,
+        "slug": Category.slug,
+        "description": Category.description,
+        "icon": Category.icon,
+        "color": Category.color,
+        "parent_id": Category.parent_id,
+        "parent_slug": _Parent.slug,
+        "level": Category.level,
+        "sort_order": Category.sort_order,
+        "item_count": Category.items_count,
+        "is_active": Category.is_active,
+        "created_at": Category.created_at,
+        "updated_at": Category.updated_at,
+    },
+    order_by=[Category.level, Category.sort_order, Category.id],
+    joins=[(_Parent, _Parent.id == Category.parent_id)],
+)
+
+ITEMS = ExportSpec(
+    "items",
+    {
+        "id": Item.id,
+        "title": Item.title,
+        "owner_id": Item.owner_id,
+        "category_id": Item.category_id,
+        "category_slug": Category.slug,
+        "condition": Item.condition,
+        "status": Item.status,
+        "is_active": Item.is_active,
+        "estimated_value": Item.estimated_value,
+        "currency": Item.currency,
+        "location_description": Item.location_description,
+        "views_count": Item.views_count,
+        "favorites_count": Item.favorites_count,
+        "exchange_requests_count": Item.exchange_requests_count,
+        "created_at": Item.created_at,
+        "updated_at": Item.updated_at,
+    },
+    order_by=[Item.created_at, Item.id],
+    joins=[(Category, Category.id == Item.category_id)],
+)
+
+EXCHANGES = ExportSpec(
+    "exchanges",
+    {
+        "id": Exchange.id,
+        "status": Exchange.status,
+        "requester_id": Exchange.requester_id,
+        "requester_username": _Requester.username,
+        "owner_id": Exchange.owner_id,
+        "owner_username": _Owner.username,
+        "requested_item_id": Exchange.requested_item_id,
+        "offered_item_id": Exchange.offered_item_id,
+        "meeting_location": Exchange.meeting_location,
+        "meeting_datetime": Exchange.meeting_datetime,
+        "created_at": Exchange.created_at,
+        "accepted_at": Exchange.accepted_at,
+        "completed_at": Exchange.completed_at,
+        "cancelled_at": Exchange.cancelled_at,
+    },
+    order_by=[Exchange.created_at, Exchange.id],
+    joins=[
+        (_Requester, _Requester.id == Exchange.requester_id),
+        (_Owner, _Owner.id == Exchange.owner_id),
+    ],
+)
+
+CONTRIBUTIONS = ExportSpec(
+    "contributions",
+    {
+        "id": Contribution.id,
+        "title": Contribution.title,
+        "company_id": Contribution.company_id,
+        "category_id": Contribution.category_id,
+        "category_name": ContributionCategory.name,
+        "quantity": Contribution.quantity,
+        "estimated_value": Contribution.estimated_value,
+        "currency": Contribution.currency,
+        "destination": Contribution.destination,
+        "delivery_method": Contribution.delivery_method,
+        "status": Contribution.status,
+        "is_recurring": Contribution.is_recurring,
+        "available_from": Contribution.available_from,
+        "available_until": Contribution.available_until,
+        "views_count": Contribution.views_count,
+        "interested_count": Contribution.interested_count,
+        "created_at": Contribution.created_at,
+        "updated_at": Contribution.updated_at,
+    },
+    order_by=[Contribution.created_at, Contribution.id],
+    joins=[(ContributionCategory, ContributionCategory.id == Contribution.category_id)],
+)
+
+DATASETS = {spec.name: spec for spec in (CATEGORIES, ITEMS, EXCHANGES, CONTRIBUTIONS)}
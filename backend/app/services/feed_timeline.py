@@ -0,0 +1,394 @@
+"""Feed de inicio con ranking y timelines precalculados.
+
+Puntuación de una publicación para un lector::
+
+    log10(1 + likes + 3·comentarios + 5·compartidos)      interacción
+    + segundos desde epoch / 45000                         recencia
+    + 1.5·log10(1 + interacciones del lector con el autor) afinidad
+    + 0.5 si el autor es de la región del lector           cercanía
+
+La recencia crece linealmente con la fecha de publicación, así que la
+puntuación no caduca con el tiempo: 12,5 horas más reciente equivale a diez
+veces más interacción. La afinidad cuenta los likes y comentarios del lector
+en publicaciones del autor y los intercambios entre ambos.
+
+Cada timeline (``feed_timeline_entries``) guarda hasta FEED_TIMELINE_SIZE
+publicaciones con su puntuación congelada, y se lee por cursor
+``(score, post_id)`` con una única búsqueda por rango en el índice
+``(timeline_key, score, post_id)``:
+
+- Fan-out en lectura: la primera página (sin cursor) regenera el timeline si
+  no existe o tiene más de FEED_TIMELINE_TTL_SECONDS.
+- Fan-out en escritura: al publicar, si la audiencia del autor (quienes han
+  interactuado con él) no supera FEED_FANOUT_MAX_AUDIENCE, la publicación se
+  añade a los timelines vigentes de esa audiencia. Con audiencias mayores sólo
+  se añade a los timelines compartidos (global y región del autor); los
+  personales la recogen al regenerarse.
+
+Los visitantes anónimos sólo tienen timeline por región si la región es el
+estado de algún usuario o empresa (``known_regions``); cualquier otro valor
+usa el global, para que no se pueda crear un timeline por cada cadena. Los
+timelines que nadie regenera en FEED_TIMELINE_PRUNE_AFTER_SECONDS los borra
+la tarea ``feed.prune_timelines`` (``app.services.maintenance``).
+"""
+import asyncio
+import base64
+import heapq
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, literal, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models import (
+    Company,
+    CommunityActorType,
+    CommunityFeedComment,
+    CommunityFeedLike,
+    CommunityFeedPost,
+    Exchange,
+    FeedTimeline,
+    FeedTimelineEntry,
+    User,
+)
+from app.services import counters
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+SHARE_WEIGHT = 5.0
+RECENCY_SECONDS = 45000.0
+AFFINITY_WEIGHT = 1.5
+REGION_BONUS = 0.5
+
+GLOBAL_KEY = "global"
+
+Actor = Tuple[CommunityActorType, UUID]
+
+
+# Claves y puntuación
+
+def timeline_key(actor_type: CommunityActorType, actor_id: UUID) -> str:
+    return f"{actor_type.value}:{actor_id}"
+
+
+def normalize_region(region: Optional[str]) -> str:
+    return (region or "").strip().lower()
+
+
+def region_key(region: Optional[str]) -> str:
+    normalized = normalize_region(region)
+    return f"region:{normalized}" if normalized else GLOBAL_KEY
+
+
+class KnownRegions:
+    """Regiones (estados normalizados) de usuarios y empresas, recargadas cada FEED_TIMELINE_TTL_SECONDS"""
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._regions: FrozenSet[str] = frozenset()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, db: AsyncSession) -> FrozenSet[str]:
+        max_age = self.max_age if self.max_age is not None else settings.FEED_TIMELINE_TTL_SECONDS
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < max_age:
+            return self._regions
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= max_age:
+                states = await db.execute(union_all(
+                    select(User.state).where(User.state.isnot(None)).distinct(),
+                    select(Company.state).where(Company.state.isnot(None)).distinct()
+                ))
+                self._regions = frozenset(filter(None, (normalize_region(state) for state in states.scalars())))
+                self._loaded_at = time.monotonic()
+        return self._regions
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+
+known_regions = KnownRegions()
+
+
+async def anonymous_timeline(db: AsyncSession, region: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(clave, región) del timeline de un visitante: la región sólo si es conocida"""
+    normalized = normalize_region(region)
+    if normalized and normalized in await known_regions.get(db):
+        return region_key(normalized), normalized
+    return GLOBAL_KEY, None
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite devuelve las fechas sin zona horaria (están en UTC)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def base_score(likes: int, comments: int, shares: int, created_at: datetime) -> float:
+    engagement = likes * LIKE_WEIGHT + comments * COMMENT_WEIGHT + shares * SHARE_WEIGHT
+    return math.log10(1 + engagement) + _aware(created_at).timestamp() / RECENCY_SECONDS
+
+
+def affinity_bonus(interactions: int) -> float:
+    return AFFINITY_WEIGHT * math.log10(1 + interactions) if interactions else 0.0
+
+
+# Cursor opaco
+
+def encode_cursor(score: float, post_id: UUID) -> str:
+    raw = f"{score!r}|{post_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, post_id = raw.split("|")
+        return float(score), UUID(post_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+
+# Grafo de afinidad
+
+def _author_type_literal():
+    return literal(CommunityActorType.USER, CommunityFeedPost.__table__.c.author_type.type)
+
+
+async def viewer_affinity(db: AsyncSession, viewer: Actor) -> Dict[Actor, int]:
+    """Interacciones del lector con cada autor"""
+    actor_type, actor_id = viewer
+    parts = [
+        select(
+            CommunityFeedPost.author_type.label("author_type"),
+            CommunityFeedPost.author_id.label("author_id")
+        ).join(
+            CommunityFeedLike, CommunityFeedLike.post_id == CommunityFeedPost.id
+        ).where(
+            CommunityFeedLike.actor_type == actor_type,
+            CommunityFeedLike.actor_id == actor_id
+        ),
+        select(CommunityFeedPost.author_type, CommunityFeedPost.author_id).join(
+            CommunityFeedComment, CommunityFeedComment.post_id == CommunityFeedPost.id
+        ).where(
+            CommunityFeedComment.actor_type == actor_type,
+            CommunityFeedComment.actor_id == actor_id,
+            CommunityFeedComment.is_active == True
+        ),
+    ]
+    if actor_type == CommunityActorType.USER:
+        parts += [
+            select(_author_type_literal(), Exchange.owner_id).where(Exchange.requester_id == actor_id),
+            select(_author_type_literal(), Exchange.requester_id).where(Exchange.owner_id == actor_id),
+        ]
+    interactions = union_all(*parts).subquery()
+    result = await db.execute(
+        select(interactions.c.author_type, interactions.c.author_id, func.count())
+        .group_by(interactions.c.author_type, interactions.c.author_id)
+    )
+    return {(author_type, author_id): count for author_type, author_id, count in result}
+
+
+async def author_audience(db: AsyncSession, author: Actor, limit: int) -> Dict[Actor, int]:
+    """Actores que han interactuado con el autor (como mucho ``limit``)"""
+    author_type, author_id = author
+    parts = [
+        select(
+            CommunityFeedLike.actor_type.label("actor_type"),
+            CommunityFeedLike.actor_id.label("actor_id")
+        ).join(
+            CommunityFeedPost, CommunityFeedPost.id == CommunityFeedLike.post_id
+        ).where(
+            CommunityFeedPost.author_type == author_type,
+            CommunityFeedPost.author_id == author_id
+        ),
+        select(CommunityFeedComment.actor_type, CommunityFeedComment.actor_id).join(
+            CommunityFeedPost, CommunityFeedPost.id == CommunityFeedComment.post_id
+        ).where(
+            CommunityFeedPost.author_type == author_type,
+            CommunityFeedPost.author_id == author_id,
+            CommunityFeedComment.is_active == True
+        ),
+    ]
+    if author_type == CommunityActorType.USER:
+        parts += [
+            select(_author_type_literal(), Exchange.requester_id).where(Exchange.owner_id == author_id),
+            select(_author_type_literal(), Exchange.owner_id).where(Exchange.requester_id == author_id),
+        ]
+    interactions = union_all(*parts).subquery()
+    result = await db.execute(
+        select(interactions.c.actor_type, interactions.c.actor_id, func.count())
+        .group_by(interactions.c.actor_type, interactions.c.actor_id)
+        .limit(limit)
+    )
+    return {(actor_type, actor_id): count for actor_type, actor_id, count in result}
+
+
+# Escritura de timelines
+
+async def _store_timeline(db: AsyncSession, key: str, entries: List[dict], now: datetime) -> None:
+    await db.execute(delete(FeedTimelineEntry).where(FeedTimelineEntry.timeline_key == key))
+    upsert = dialect_insert(db, FeedTimeline.__table__).values(key=key, built_at=now)
+    await db.execute(upsert.on_conflict_do_update(index_elements=["key"], set_={"built_at": now}))
+    if entries:
+        # Otra petición puede estar regenerando el mismo timeline a la vez
+        await db.execute(dialect_insert(db, FeedTimelineEntry.__table__).on_conflict_do_nothing(), entries)
+
+
+async def build_timeline(
+    db: AsyncSession,
+    key: str,
+    viewer: Optional[Actor] = None,
+    region: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """Regenerar el timeline ``key`` (fan-out en lectura); devuelve su tamaño"""
+    now = now or datetime.now(timezone.utc)
+    author_region = func.coalesce(User.state, Company.state)
+    candidates = await db.execute(
+        select(
+            CommunityFeedPost.id,
+            CommunityFeedPost.author_type,
+            CommunityFeedPost.author_id,
+            counters.live("feed", "likes_count"),
+            counters.live("feed", "comments_count"),
+            counters.live("feed", "shares_count"),
+            CommunityFeedPost.created_at,
+            author_region
+        )
+        .outerjoin(User, and_(
+            CommunityFeedPost.author_type == CommunityActorType.USER,
+            User.id == CommunityFeedPost.author_id
+        ))
+        .outerjoin(Company, and_(
+            CommunityFeedPost.author_type == CommunityActorType.COMPANY,
+            Company.id == CommunityFeedPost.author_id
+        ))
+        .where(
+            CommunityFeedPost.is_active == True,
+            CommunityFeedPost.created_at >= now - timedelta(days=settings.FEED_CANDIDATE_DAYS)
+        )
+        .order_by(CommunityFeedPost.created_at.desc())
+        .limit(settings.FEED_CANDIDATE_LIMIT)
+    )
+
+    affinity = await viewer_affinity(db, viewer) if viewer else {}
+    region = normalize_region(region)
+    scored = []
+    for post_id, author_type, author_id, likes, comments, shares, created_at, post_region in candidates:
+        score = base_score(likes, comments, shares, created_at)
+        score += affinity_bonus(affinity.get((author_type, author_id), 0))
+        if region and normalize_region(post_region) == region:
+            score += REGION_BONUS
+        scored.append({"timeline_key": key, "post_id": post_id, "score": score})
+
+    top = heapq.nlargest(settings.FEED_TIMELINE_SIZE, scored, key=lambda entry: entry["score"])
+    await _store_timeline(db, key, top, now)
+    return len(top)
+
+
+async def ensure_timeline(
+    db: AsyncSession,
+    key: str,
+    viewer: Optional[Actor] = None,
+    region: Optional[str] = None,
+) -> bool:
+    """Regenerar el timeline si no existe o ha caducado; indica si se regeneró"""
+    now = datetime.now(timezone.utc)
+    built_at = (await db.execute(select(FeedTimeline.built_at).where(FeedTimeline.key == key))).scalar()
+    if built_at is not None and _aware(built_at) >= now - timedelta(seconds=settings.FEED_TIMELINE_TTL_SECONDS):
+        return False
+    await build_timeline(db, key, viewer, region, now)
+    return True
+
+
+async def fan_out_post(
+    db: AsyncSession,
+    post: CommunityFeedPost,
+    author_region: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """Añadir una publicación nueva a los timelines vigentes (fan-out en escritura).
+
+    Devuelve el número de timelines actualizados.
+    """
+    now = now or datetime.now(timezone.utc)
+    author = (post.author_type, post.author_id)
+    score = base_score(post.likes_count or 0, post.comments_count or 0, post.shares_count or 0, now)
+
+    targets: Dict[str, float] = {GLOBAL_KEY: score, timeline_key(*author): score}
+    if normalize_region(author_region):
+        targets[region_key(author_region)] = score + REGION_BONUS
+
+    audience = await author_audience(db, author, settings.FEED_FANOUT_MAX_AUDIENCE + 1)
+    if len(audience) <= settings.FEED_FANOUT_MAX_AUDIENCE:
+        for actor, interactions in audience.items():
+            targets.setdefault(timeline_key(*actor), score + affinity_bonus(interactions))
+
+    fresh = await db.execute(
+        select(FeedTimeline.key).where(
+            FeedTimeline.key.in_(list(targets)),
+            FeedTimeline.built_at >= now - timedelta(seconds=settings.FEED_TIMELINE_TTL_SECONDS)
+        )
+    )
+    entries = [
+        {"timeline_key": key, "post_id": post.id, "score": targets[key]}
+        for key in fresh.scalars()
+    ]
+    if entries:
+        await db.execute(dialect_insert(db, FeedTimelineEntry.__table__).on_conflict_do_nothing(), entries)
+    return len(entries)
+
+
+async def prune_timelines(db: AsyncSession, older_than: timedelta, now: Optional[datetime] = None) -> int:
+    """Borrar los timelines (y sus entradas) construidos antes de ``now - older_than``"""
+    cutoff = (now or datetime.now(timezone.utc)) - older_than
+    stale = select(FeedTimeline.key).where(FeedTimeline.built_at < cutoff)
+    # Las entradas explícitamente: SQLite no aplica ON DELETE CASCADE sin PRAGMA foreign_keys
+    await db.execute(
+        delete(FeedTimelineEntry)
+        .where(FeedTimelineEntry.timeline_key.in_(stale))
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(FeedTimeline).where(FeedTimeline.built_at < cutoff).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+# Lectura
+
+async def read_timeline(
+    db: AsyncSession,
+    key: str,
+    cursor: Optional[str],
+    limit: int,
+) -> Tuple[List[UUID], Optional[str]]:
+    """Ids de la página siguiente al cursor y cursor de la página posterior"""
+    stmt = select(FeedTimelineEntry.post_id, FeedTimelineEntry.score).where(
+        FeedTimelineEntry.timeline_key == key
+    )
+    if cursor:
+        after_score, after_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(FeedTimelineEntry.score, FeedTimelineEntry.post_id) < tuple_(
+                literal(after_score, FeedTimelineEntry.score.type),
+                literal(after_id, FeedTimelineEntry.post_id.type)
+            )
+        )
+    stmt = stmt.order_by(FeedTimelineEntry.score.desc(), FeedTimelineEntry.post_id.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last_id, last_score = rows[limit - 1]
+        next_cursor = encode_cursor(last_score, last_id)
+    return [post_id for post_id, _ in rows[:limit]], next_cursor
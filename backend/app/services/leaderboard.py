@@ -0,0 +1,339 @@
+"""Clasificación de usuarios de la comunidad (``/community/top-users``).
+
+La puntuación de cada usuario combina sus intercambios completados y sus
+puntos de recompensa en un único número::
+
+    score = intercambios * SCALE + puntos
+
+de modo que ordenar por ``score`` equivale a ordenar por intercambios y, a
+igualdad, por puntos. Cada usuario aparece en varias clasificaciones
+(``global``, ``city:<ciudad>`` y ``country:<país>``) y cada una es un
+conjunto ordenado: ``SortedList`` en memoria o un sorted set de Redis
+(``LEADERBOARD_BACKEND=redis``), con la misma semántica en ambos casos,
+incluido el desempate de Redis (orden lexicográfico inverso del miembro).
+
+Las clasificaciones se reconstruyen desde la base de datos cuando tienen más
+de LEADERBOARD_REBUILD_SECONDS y entre reconstrucciones se actualizan de
+forma incremental: ``exchange_completed`` al completarse un intercambio y
+``rewards_changed`` al cambiar los puntos. La reconstrucción periódica
+corrige lo que no pasa por esos ganchos (cambios de ubicación, usuarios
+desactivados).
+
+Con el backend en memoria cada worker tiene su copia: los cambios
+incrementales se aplican en el worker que los produce y se publican en el
+canal ``leaderboard`` de ``app.core.coordination`` para que los apliquen los
+demás. Un worker que aún no ha construido su clasificación ignora los avisos
+(la construirá desde la base de datos) y un aviso perdido lo corrige la
+siguiente reconstrucción. Con Redis la clasificación ya es compartida y no se
+publica nada.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sortedcontainers import SortedList
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.coordination import bus
+from app.core.database import AsyncSessionLocal
+from app.models import Exchange, User
+from app.models.exchange import ExchangeStatus
+
+logger = logging.getLogger(__name__)
+
+# Los puntos ocupan las cifras bajas; por debajo de 10M no se mezclan con los
+# intercambios y el total sigue siendo exacto en un double (sorted set de Redis)
+SCALE = 10_000_000
+GLOBAL = "global"
+
+CHANNEL = "leaderboard"
+# Usuarios por mensaje: los datagramas IPC tienen un tamaño máximo
+MESSAGE_BATCH = 500
+
+
+def score_of(exchanges: int, rewards: int) -> float:
+    return float(exchanges * SCALE + min(max(rewards, 0), SCALE - 1))
+
+
+def split_score(score: float) -> Tuple[int, int]:
+    """``(intercambios, puntos)`` a partir de la puntuación"""
+    return divmod(int(score), SCALE)
+
+
+def _norm(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip().casefold()
+    return value or None
+
+
+def scope_key(city: Optional[str] = None, country: Optional[str] = None) -> str:
+    """Clasificación a consultar: por ciudad, por país o global"""
+    if _norm(city):
+        return f"city:{_norm(city)}"
+    if _norm(country):
+        return f"country:{_norm(country)}"
+    return GLOBAL
+
+
+def scopes_for(city: Optional[str], country: Optional[str]) -> List[str]:
+    """Clasificaciones en las que participa un usuario"""
+    scopes = [GLOBAL]
+    if _norm(city):
+        scopes.append(scope_key(city=city))
+    if _norm(country):
+        scopes.append(scope_key(country=country))
+    return scopes
+
+
+class MemoryBackend:
+    """Conjuntos ordenados en memoria del proceso"""
+
+    def __init__(self):
+        self._sets: Dict[str, SortedList] = {}
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._scopes: Dict[str, List[str]] = {}
+        self._built_at: Optional[float] = None
+
+    async def is_fresh(self, max_age: float) -> bool:
+        return self._built_at is not None and time.monotonic() - self._built_at < max_age
+
+    async def replace(self, entries: Iterable[Tuple[str, float, List[str]]]) -> None:
+        sets: Dict[str, SortedList] = {}
+        scores: Dict[str, Dict[str, float]] = {}
+        member_scopes: Dict[str, List[str]] = {}
+        for member, score, scopes in entries:
+            member_scopes[member] = scopes
+            for scope in scopes:
+                sets.setdefault(scope, SortedList()).add((score, member))
+                scores.setdefault(scope, {})[member] = score
+        self._sets, self._scores, self._scopes = sets, scores, member_scopes
+        self._built_at = time.monotonic()
+
+    async def scopes_of(self, member: str) -> Optional[List[str]]:
+        return self._scopes.get(member)
+
+    async def incr(self, member: str, delta: float, scopes: List[str]) -> None:
+        self._scopes.setdefault(member, scopes)
+        for scope in scopes:
+            entries = self._sets.setdefault(scope, SortedList())
+            scores = self._scores.setdefault(scope, {})
+            old = scores.get(member)
+            if old is not None:
+                entries.remove((old, member))
+            new = (old or 0.0) + delta
+            entries.add((new, member))
+            scores[member] = new
+
+    async def top(self, scope: str, n: int) -> List[Tuple[str, float]]:
+        entries = self._sets.get(scope)
+        if not entries or n <= 0:
+            return []
+        return [(member, score) for score, member in reversed(entries[-n:])]
+
+    async def rank(self, scope: str, member: str) -> Optional[Tuple[int, float, int]]:
+        """``(posición desde 0, puntuación, total)`` como ZREVRANK/ZSCORE/ZCARD"""
+        score = self._scores.get(scope, {}).get(member)
+        if score is None:
+            return None
+        entries = self._sets[scope]
+        return len(entries) - 1 - entries.index((score, member)), score, len(entries)
+
+
+class RedisBackend:
+    """Mismas operaciones sobre sorted sets de Redis, compartidas entre procesos"""
+
+    PREFIX = "greenloop:leaderboard"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # dependencia opcional, sólo con LEADERBOARD_BACKEND=redis
+
+        self.redis = redis.from_url(url, decode_responses=True)
+
+    def _key(self, scope: str) -> str:
+        return f"{self.PREFIX}:{scope}"
+
+    async def is_fresh(self, max_age: float) -> bool:
+        # La clave expira sola a los max_age segundos
+        return bool(await self.redis.exists(f"{self.PREFIX}/built"))
+
+    async def replace(self, entries: Iterable[Tuple[str, float, List[str]]]) -> None:
+        sets: Dict[str, Dict[str, float]] = {}
+        locations: Dict[str, str] = {}
+        for member, score, scopes in entries:
+            locations[member] = "|".join(scopes)
+            for scope in scopes:
+                sets.setdefault(scope, {})[member] = score
+
+        old_scopes = await self.redis.smembers(f"{self.PREFIX}/scopes")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*[self._key(s) for s in set(old_scopes) | set(sets)], f"{self.PREFIX}/scopes", f"{self.PREFIX}/locations")
+            for scope, mapping in sets.items():
+                pipe.zadd(self._key(scope), mapping)
+            if sets:
+                pipe.sadd(f"{self.PREFIX}/scopes", *sets)
+            if locations:
+                pipe.hset(f"{self.PREFIX}/locations", mapping=locations)
+            pipe.set(f"{self.PREFIX}/built", "1", ex=max(1, int(settings.LEADERBOARD_REBUILD_SECONDS)))
+            await pipe.execute()
+
+    async def scopes_of(self, member: str) -> Optional[List[str]]:
+        value = await self.redis.hget(f"{self.PREFIX}/locations", member)
+        return value.split("|") if value else None
+
+    async def incr(self, member: str, delta: float, scopes: List[str]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(f"{self.PREFIX}/locations", member, "|".join(scopes))
+            pipe.sadd(f"{self.PREFIX}/scopes", *scopes)
+            for scope in scopes:
+                pipe.zincrby(self._key(scope), delta, member)
+            await pipe.execute()
+
+    async def top(self, scope: str, n: int) -> List[Tuple[str, float]]:
+        if n <= 0:
+            return []
+        return await self.redis.zrevrange(self._key(scope), 0, n - 1, withscores=True)
+
+    async def rank(self, scope: str, member: str) -> Optional[Tuple[int, float, int]]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(self._key(scope), member)
+            pipe.zscore(self._key(scope), member)
+            pipe.zcard(self._key(scope))
+            position, score, total = await pipe.execute()
+        if position is None:
+            return None
+        return position, score, total
+
+
+class Leaderboard:
+    """Clasificación de usuarios por intercambios completados y puntos"""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = asyncio.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if settings.LEADERBOARD_BACKEND == "redis":
+                if not settings.REDIS_URL:
+                    raise RuntimeError("LEADERBOARD_BACKEND=redis requiere REDIS_URL")
+                self._backend = RedisBackend(settings.REDIS_URL)
+            else:
+                self._backend = MemoryBackend()
+        return self._backend
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Recalcular todas las clasificaciones desde la base de datos"""
+        participants = union_all(
+            select(Exchange.requester_id.label("user_id")).where(Exchange.status == ExchangeStatus.COMPLETED),
+            select(Exchange.owner_id.label("user_id")).where(Exchange.status == ExchangeStatus.COMPLETED),
+        ).subquery()
+        completed = (
+            select(participants.c.user_id, func.count().label("exchanges"))
+            .group_by(participants.c.user_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                User.id,
+                User.city,
+                User.country,
+                User.reward_points,
+                func.coalesce(completed.c.exchanges, literal(0)),
+            )
+            .outerjoin(completed, completed.c.user_id == User.id)
+            .where(User.is_active == True)
+        )
+        entries = [
+            (str(user_id), score_of(exchanges, rewards or 0), scopes_for(city, country))
+            for user_id, city, country, rewards, exchanges in result
+        ]
+        await self.backend.replace(entries)
+        logger.info("Clasificación de usuarios reconstruida (%d usuarios)", len(entries))
+        return len(entries)
+
+    async def ensure_built(self, db: AsyncSession) -> None:
+        max_age = settings.LEADERBOARD_REBUILD_SECONDS
+        if await self.backend.is_fresh(max_age):
+            return
+        async with self._lock:
+            if not await self.backend.is_fresh(max_age):
+                await self.rebuild(db)
+
+    async def _scopes(self, user_id: UUID) -> Optional[List[str]]:
+        scopes = await self.backend.scopes_of(str(user_id))
+        if scopes is not None:
+            return scopes
+        # Usuario nuevo desde la última reconstrucción
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(User.city, User.country).where(User.id == user_id, User.is_active == True)
+            )).first()
+        return scopes_for(row.city, row.country) if row else None
+
+    async def _incr(self, user_id: UUID, delta: float) -> None:
+        try:
+            scopes = await self._scopes(user_id)
+            if scopes:
+                await self.backend.incr(str(user_id), delta, scopes)
+        except Exception:
+            # La próxima reconstrucción corrige la clasificación
+            logger.exception("No se pudo actualizar la clasificación del usuario %s", user_id)
+
+    async def _apply(self, deltas: Dict[UUID, float]) -> None:
+        for user_id, delta in deltas.items():
+            await self._incr(user_id, delta)
+
+    async def _changed(self, deltas: Dict[UUID, float]) -> None:
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        await self._apply(deltas)
+        if not isinstance(self.backend, MemoryBackend):
+            return
+        # Los demás workers tienen su propia copia en memoria
+        items = [(str(user_id), delta) for user_id, delta in deltas.items()]
+        for start in range(0, len(items), MESSAGE_BATCH):
+            bus.publish(CHANNEL, {"origin": bus.origin, "deltas": dict(items[start:start + MESSAGE_BATCH])})
+
+    async def _on_message(self, data: dict) -> None:
+        # El bus también entrega lo publicado a este proceso, que ya lo aplicó
+        if data.get("origin") == bus.origin:
+            return
+        if not await self.backend.is_fresh(float("inf")):
+            return
+        await self._apply({UUID(user_id): delta for user_id, delta in data["deltas"].items()})
+
+    async def exchange_completed(self, exchange: Exchange) -> None:
+        """Llamar tras confirmar un intercambio completado"""
+        await self._changed({user_id: SCALE for user_id in {exchange.requester_id, exchange.owner_id}})
+
+    async def rewards_changed(self, user_id: UUID, delta: int) -> None:
+        """Llamar tras confirmar un cambio de ``reward_points``"""
+        await self._changed({user_id: delta})
+
+    async def rewards_changed_many(self, deltas: Dict[UUID, int]) -> None:
+        """Como ``rewards_changed`` para varios usuarios (recálculo de puntos)"""
+        await self._changed(deltas)
+
+    async def top(self, db: AsyncSession, scope: str, n: int) -> List[Tuple[UUID, int, int]]:
+        """Primeros ``n`` de la clasificación: ``(user_id, intercambios, puntos)``"""
+        await self.ensure_built(db)
+        return [(UUID(member), *split_score(score)) for member, score in await self.backend.top(scope, n)]
+
+    async def rank(self, db: AsyncSession, scope: str, user_id: UUID) -> Optional[Dict[str, int]]:
+        """Posición (desde 1) de un usuario en una clasificación"""
+        await self.ensure_built(db)
+        found = await self.backend.rank(scope, str(user_id))
+        if found is None:
+            return None
+        position, score, total = found
+        exchanges, rewards = split_score(score)
+        return {"rank": position + 1, "total": total, "total_exchanges": exchanges, "reward_points": rewards}
+
+
+leaderboard = Leaderboard()
+bus.subscribe(CHANNEL, leaderboard._on_message)
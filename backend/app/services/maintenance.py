@@ -0,0 +1,79 @@
+"""Tareas periódicas de mantenimiento (ver ``app.core.scheduler``).
+
+Importar este módulo registra las tareas en ``scheduler``; lo hacen la API
+(``app.main``) y el proceso dedicado (``app.worker``).
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.scheduler import scheduler
+from app.models import CompanySession, JobRun, Notification, UserSession
+from app.services import category_counts, feed_timeline, rating_summary, rewards
+from app.services.category_tree import category_tree
+
+
+@scheduler.job("sessions.expire", "*/15 * * * *")
+async def expire_sessions(db: AsyncSession) -> dict:
+    """Revocar sesiones de usuario y de empresa expiradas"""
+    users = await UserSession.cleanup_expired_sessions(db)
+    companies = (await db.execute(
+        update(CompanySession)
+        .where(CompanySession.expires_at < datetime.now(timezone.utc), CompanySession.is_active == True)
+        .values(is_active=False, is_revoked=True, revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )).rowcount
+    return {"user_sessions": users, "company_sessions": companies}
+
+
+@scheduler.job("notifications.purge_expired", "5 * * * *")
+async def purge_expired_notifications(db: AsyncSession) -> int:
+    """Eliminar notificaciones cuya fecha de expiración pasó"""
+    result = await db.execute(
+        delete(Notification)
+        .where(Notification.expires_at.isnot(None), Notification.expires_at < datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+@scheduler.job("categories.reconcile_counts", "17 * * * *")
+async def reconcile_category_counts(db: AsyncSession) -> int:
+    """Corregir desajustes de los contadores de ítems por categoría"""
+    repaired = await category_counts.reconcile(db)
+    if repaired:
+        await category_tree.changed(db)
+    return repaired
+
+
+@scheduler.job("ratings.prune_daily", "40 4 * * *")
+async def prune_rating_daily(db: AsyncSession) -> int:
+    """Borrar los agregados diarios de calificaciones fuera de la ventana reciente"""
+    return await rating_summary.prune_daily(db)
+
+
+@scheduler.job("rewards.recompute", "30 3 * * *", timeout=3600)
+async def recompute_rewards(db: AsyncSession) -> dict:
+    """Recalcular puntos y nivel de todos los usuarios y empresas"""
+    users = await rewards.recompute_users(db)
+    companies = await rewards.recompute_companies(db)
+    await db.commit()
+    await rewards.notify_leaderboard(users)
+    return {"users": len(users), "companies": len(companies)}
+
+
+@scheduler.job("feed.prune_timelines", "*/30 * * * *")
+async def prune_feed_timelines(db: AsyncSession) -> int:
+    """Borrar los timelines del feed que nadie ha regenerado en un tiempo"""
+    older_than = max(settings.FEED_TIMELINE_PRUNE_AFTER_SECONDS, settings.FEED_TIMELINE_TTL_SECONDS)
+    return await feed_timeline.prune_timelines(db, timedelta(seconds=older_than))
+
+
+@scheduler.job("jobs.prune_history", "45 4 * * *")
+async def prune_job_history(db: AsyncSession) -> int:
+    """Borrar el historial de ejecuciones antiguo"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)
+    result = await db.execute(delete(JobRun).where(JobRun.started_at < cutoff))
+    return result.rowcount
@@ -0,0 +1,174 @@
+"""Listados y acciones masivas del panel de administración.
+
+``USERS`` e ``ITEMS`` declaran las columnas que el panel puede pedir y sus
+filtros (ver ``app.core.listing``). Las acciones masivas aplican un único
+UPDATE sobre todos los ids y devuelven los que realmente cambiaron; los
+efectos derivados (contadores de categorías, revocación de sesiones) también
+se resuelven con una sentencia por tabla. Ninguna confirma la transacción.
+"""
+from typing import List, Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.filters import contains, custom, eq, gte, lte
+from app.core.listing import ListingSpec
+from app.core.revocation import revoked_sessions
+from app.models import Item, User, UserSession
+from app.models.item import ItemStatus
+from app.services import category_counts
+
+
+def parse_item_status(value: str) -> ItemStatus:
+    """Estado de ítem por valor (``available``) o por nombre (``AVAILABLE``)"""
+    if isinstance(value, ItemStatus):
+        return value
+    try:
+        return ItemStatus(value.lower())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Estado no válido. Opciones: {', '.join(s.value for s in ItemStatus)}"
+        )
+
+
+USERS = ListingSpec(
+    "users",
+    {
+        "id": User.id,
+        "username": User.username,
+        "email": User.email,
+        "first_name": User.first_name,
+        "last_name": User.last_name,
+        "full_name": User.first_name + " " + User.last_name,
+        "avatar_url": User.avatar_url,
+        "city": User.city,
+        "state": User.state,
+        "country": User.country,
+        "is_active": User.is_active,
+        "email_verified": User.email_verified,
+        "reputation_score": User.reputation_score,
+        "total_exchanges": User.total_exchanges,
+        "successful_exchanges": User.successful_exchanges,
+        "reward_points": User.reward_points,
+        "reward_tier": User.reward_tier,
+        "created_at": User.created_at,
+        "last_login": User.last_login,
+    },
+    default_fields=[
+        "id", "username", "first_name", "last_name", "full_name", "avatar_url",
+        "city", "is_active", "reputation_score", "total_exchanges",
+    ],
+    filters=[
+        contains("q", User.username, User.email, User.first_name, User.last_name),
+        eq("is_active", User.is_active),
+        contains("city", User.city),
+        gte("created_from", User.created_at),
+        lte("created_to", User.created_at),
+        gte("min_reputation", User.reputation_score),
+        lte("max_reputation", User.reputation_score),
+    ],
+    sort_column=User.created_at,
+    tiebreaker=User.id,
+)
+
+ITEMS = ListingSpec(
+    "items",
+    {
+        "id": Item.id,
+        "title": Item.title,
+        "owner_id": Item.owner_id,
+        "category_id": Item.category_id,
+        "condition": Item.condition,
+        "status": Item.status,
+        "is_active": Item.is_active,
+        "estimated_value": Item.estimated_value,
+        "currency": Item.currency,
+        "location_description": Item.location_description,
+        "views_count": Item.views_count,
+        "favorites_count": Item.favorites_count,
+        "exchange_requests_count": Item.exchange_requests_count,
+        "created_at": Item.created_at,
+        "updated_at": Item.updated_at,
+    },
+    default_fields=[
+        "id", "title", "owner_id", "category_id", "condition", "status",
+        "is_active", "views_count", "exchange_requests_count", "created_at",
+    ],
+    filters=[
+        contains("q", Item.title),
+        custom("status", lambda v: Item.status == parse_item_status(v)),
+        eq("is_active", Item.is_active),
+        eq("owner_id", Item.owner_id),
+        eq("category_id", Item.category_id),
+        gte("created_from", Item.created_at),
+        lte("created_to", Item.created_at),
+    ],
+    sort_column=Item.created_at,
+    tiebreaker=Item.id,
+)
+
+
+async def set_users_active(db: AsyncSession, user_ids: Sequence[UUID], active: bool) -> List[UUID]:
+    """Activar o desactivar usuarios; al desactivar se revocan también sus sesiones"""
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids), User.is_active != active)
+        .values(is_active=active)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    changed = list(result.scalars())
+    if not active and changed:
+        session_ids = await UserSession.revoke_users_sessions(db, changed)
+        await revoked_sessions.revoke(db, session_ids)
+    return changed
+
+
+async def update_items(
+    db: AsyncSession,
+    item_ids: Sequence[UUID],
+    is_active: Optional[bool] = None,
+    status: Optional[ItemStatus] = None,
+) -> List[UUID]:
+    """Cambiar ``is_active`` y/o ``status`` de varios ítems y ajustar los contadores de categorías"""
+    values = {}
+    if is_active is not None:
+        values["is_active"] = is_active
+    if status is not None:
+        values["status"] = status
+    if not values:
+        return []
+
+    # Estado previo bloqueado: el ajuste de contadores parte de lo que se va a sobrescribir
+    rows = (await db.execute(
+        select(Item.id, Item.category_id, Item.is_active, Item.status)
+        .where(Item.id.in_(item_ids))
+        .order_by(Item.id)
+        .with_for_update()
+    )).all()
+
+    changes, changed = [], []
+    for item_id, category_id, was_active, old_status in rows:
+        now_active = values.get("is_active", was_active)
+        new_status = values.get("status", old_status)
+        if (now_active, new_status) == (was_active, old_status):
+            continue
+        changed.append(item_id)
+        changes.append((
+            (category_id, bool(was_active) and old_status == ItemStatus.AVAILABLE),
+            (category_id, bool(now_active) and new_status == ItemStatus.AVAILABLE),
+        ))
+    if not changed:
+        return []
+
+    await db.execute(
+        update(Item)
+        .where(Item.id.in_(changed))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await category_counts.apply_many(db, changes)
+    return changed
@@ -0,0 +1,224 @@
+"""Agregados de calificaciones por usuario.
+
+``user_rating_summary`` guarda, por usuario, sumas, conteos e histograma por
+estrellas de cada dimensión, y ``user_rating_daily`` la calificación general
+recibida por día. Ambas se actualizan con upserts incrementales (``col = col
++ delta``) en la misma transacción que crea o edita la calificación, junto con
+``users.reputation_score``; las estadísticas leen una fila de resumen y como
+mucho 30 filas diarias, sin importar cuántas calificaciones tenga el usuario.
+
+``rebuild`` recalcula todo desde ``ratings`` (tras importaciones masivas que
+no pasan por la API). ``prune_daily`` borra los días que ya salieron de la
+ventana de ``RECENT_DAYS`` (tarea ``ratings.prune_daily``).
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import case, delete, func, select, update
+
+from app.core.database import dialect_insert
+from app.models import Rating, User, UserRatingDaily, UserRatingSummary
+from app.models.rating_summary import RATING_DIMENSIONS, STARS
+
+RECENT_DAYS = 30
+TREND_THRESHOLD = 0.2
+
+_summary = UserRatingSummary.__table__
+_daily = UserRatingDaily.__table__
+
+
+def _star(value: float) -> int:
+    return min(max(int(round(value)), 1), 5)
+
+
+def snapshot(rating: Rating) -> dict:
+    """Valores de una calificación que afectan a los agregados.
+
+    Tomarlo antes de modificarla para poder restar su aportación anterior.
+    """
+    created = rating.created_at or datetime.utcnow()
+    return {
+        "rater_id": rating.rater_id,
+        "rated_id": rating.rated_id,
+        "day": created.date(),
+        "would_exchange_again": rating.would_exchange_again,
+        **{dim: getattr(rating, f"{dim}_rating") for dim in RATING_DIMENSIONS},
+    }
+
+
+async def _bump(db, table, keys: dict, deltas: dict) -> None:
+    deltas = {column: value for column, value in deltas.items() if value}
+    if not deltas:
+        return
+    stmt = dialect_insert(db, table).values(**keys, **deltas)
+    changes = {column: table.c[column] + stmt.excluded[column] for column in deltas}
+    if "updated_at" in table.c:
+        changes["updated_at"] = func.now()
+    await db.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=changes))
+
+
+async def apply(db, old: Optional[dict] = None, new: Optional[dict] = None) -> None:
+    """Actualizar los agregados por el cambio de una calificación.
+
+    Alta: ``apply(db, new=snapshot(r))``; edición: ``apply(db, antes, después)``.
+    No confirma la transacción.
+    """
+    per_user: Dict[UUID, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    per_day: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+
+    for snap, sign in ((old, -1), (new, 1)):
+        if snap is None:
+            continue
+        received = per_user[snap["rated_id"]]
+        for dim in RATING_DIMENSIONS:
+            value = snap[dim]
+            if value is None:
+                continue
+            received[f"{dim}_count"] += sign
+            received[f"{dim}_sum"] += sign * value
+            received[f"{dim}_{_star(value)}"] += sign
+        if snap["would_exchange_again"] == 1:
+            received["recommend_yes"] += sign
+        elif snap["would_exchange_again"] == 0:
+            received["recommend_no"] += sign
+
+        given = per_user[snap["rater_id"]]
+        given["given_count"] += sign
+        given["given_sum"] += sign * snap["overall"]
+
+        day = per_day[(snap["rated_id"], snap["day"])]
+        day["count"] += sign
+        day["total"] += sign * snap["overall"]
+
+    for user_id, deltas in per_user.items():
+        await _bump(db, _summary, {"user_id": user_id}, deltas)
+    since = _window_start()
+    for (user_id, day), deltas in per_day.items():
+        # Los días fuera de la ventana ya no se leen (y pueden estar podados)
+        if day >= since:
+            await _bump(db, _daily, {"user_id": user_id, "day": day}, deltas)
+
+    rated = {snap["rated_id"] for snap in (old, new) if snap is not None}
+    await _refresh_reputation(db, rated)
+
+
+def _reputation():
+    """Media general recibida según el resumen (0 sin calificaciones)"""
+    return func.coalesce(
+        select(_summary.c.overall_sum / _summary.c.overall_count)
+        .where(_summary.c.user_id == User.id, _summary.c.overall_count > 0)
+        .scalar_subquery(),
+        0.0,
+    )
+
+
+async def _refresh_reputation(db, user_ids) -> None:
+    await db.execute(
+        update(User)
+        .where(User.id.in_(list(user_ids)))
+        .values(reputation_score=_reputation())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _window_start(today: Optional[date] = None) -> date:
+    """Primer día que cuenta para la media reciente"""
+    return (today or datetime.utcnow().date()) - timedelta(days=RECENT_DAYS)
+
+
+async def prune_daily(db, today: Optional[date] = None) -> int:
+    """Borrar las filas diarias anteriores a la ventana reciente; devuelve cuántas"""
+    result = await db.execute(delete(_daily).where(_daily.c.day < _window_start(today)))
+    return result.rowcount
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    return total / count if count else None
+
+
+async def user_stats(db, user_id: UUID, today: Optional[date] = None) -> dict:
+    """Campos de ``UserRatingStats`` para un usuario"""
+    summary = await db.get(UserRatingSummary, user_id)
+    since = _window_start(today)
+    recent_count, recent_total = (await db.execute(
+        select(func.coalesce(func.sum(_daily.c.count), 0), func.coalesce(func.sum(_daily.c.total), 0.0))
+        .where(_daily.c.user_id == user_id, _daily.c.day >= since)
+    )).one()
+
+    def value(column: str):
+        return getattr(summary, column) if summary is not None else 0
+
+    received = value("overall_count")
+    average_rating = _average(value("overall_sum"), received)
+    recent_average = _average(recent_total, recent_count)
+    if recent_average is None or average_rating is None:
+        trend = "stable"
+    elif recent_average > average_rating + TREND_THRESHOLD:
+        trend = "improving"
+    elif recent_average < average_rating - TREND_THRESHOLD:
+        trend = "declining"
+    else:
+        trend = "stable"
+
+    return {
+        "total_ratings_received": received,
+        "average_rating": average_rating,
+        "rating_distribution": {str(star): value(f"overall_{star}") for star in STARS},
+        "average_communication": _average(value("communication_sum"), value("communication_count")),
+        "average_punctuality": _average(value("punctuality_sum"), value("punctuality_count")),
+        "average_item_condition": _average(value("item_condition_sum"), value("item_condition_count")),
+        "average_friendliness": _average(value("friendliness_sum"), value("friendliness_count")),
+        "total_recommendations": value("recommend_yes"),
+        "recommendation_percentage": value("recommend_yes") / received * 100 if received else None,
+        "total_ratings_given": value("given_count"),
+        "average_rating_given": _average(value("given_sum"), value("given_count")),
+        "recent_ratings_trend": trend,
+        "last_30_days_average": recent_average,
+    }
+
+
+async def rebuild(db) -> None:
+    """Recalcular todos los agregados desde ``ratings`` (sesión o conexión)"""
+    await db.execute(delete(_daily))
+    await db.execute(delete(_summary))
+
+    received = [
+        Rating.rated_id.label("user_id"),
+        func.sum(case((Rating.would_exchange_again == 1, 1), else_=0)).label("recommend_yes"),
+        func.sum(case((Rating.would_exchange_again == 0, 1), else_=0)).label("recommend_no"),
+    ]
+    for dim in RATING_DIMENSIONS:
+        column = getattr(Rating, f"{dim}_rating")
+        received.append(func.count(column).label(f"{dim}_count"))
+        received.append(func.coalesce(func.sum(column), 0.0).label(f"{dim}_sum"))
+        for star in STARS:
+            received.append(func.sum(case((func.round(column) == star, 1), else_=0)).label(f"{dim}_{star}"))
+    received_q = select(*received).group_by(Rating.rated_id)
+    await db.execute(_summary.insert().from_select([c.name for c in received_q.selected_columns], received_q))
+
+    given_q = (
+        select(
+            Rating.rater_id.label("user_id"),
+            func.count().label("given_count"),
+            func.sum(Rating.overall_rating).label("given_sum"),
+        )
+        .where(Rating.rater_id.isnot(None))  # SQLite exige WHERE en INSERT ... SELECT ... ON CONFLICT
+        .group_by(Rating.rater_id)
+    )
+    upsert = dialect_insert(db, _summary).from_select(["user_id", "given_count", "given_sum"], given_q)
+    await db.execute(upsert.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"given_count": upsert.excluded.given_count, "given_sum": upsert.excluded.given_sum},
+    ))
+
+    day = func.date(Rating.created_at)
+    daily_q = (
+        select(Rating.rated_id, day, func.count(), func.sum(Rating.overall_rating))
+        .where(Rating.created_at >= datetime.utcnow() - timedelta(days=RECENT_DAYS + 1))
+        .group_by(Rating.rated_id, day)
+    )
+    await db.execute(_daily.insert().from_select(["user_id", "day", "count", "total"], daily_q))
+
+    await db.execute(update(User).values(reputation_score=_reputation()).execution_options(synchronize_session=False))
@@ -0,0 +1,140 @@
+"""Recálculo de puntos y nivel de recompensas de usuarios y empresas.
+
+Las mismas fórmulas que ``/users/profile/rewards`` y
+``/company/auth/me/rewards``, calculadas para muchos actores con una sola
+consulta (subconsultas correlacionadas por fila) y escritas con un UPDATE por
+lotes. Sólo se tocan los actores cuyo resultado cambió, y por cada uno se
+registra un ``RewardEvent`` de tipo ``recompute``.
+
+Lo usan los endpoints de recálculo (un actor) y la tarea nocturna
+``rewards.recompute`` (todos).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Company, Contribution, ContributionStatus, Exchange, Item, RewardEvent, User
+from app.models.exchange import ExchangeStatus
+from app.services.leaderboard import leaderboard
+
+BATCH_SIZE = 1000
+
+# (puntos mínimos, nivel), de mayor a menor
+TIERS = ((600, "Platino"), (300, "Oro"), (100, "Plata"), (0, "Bronce"))
+
+
+def tier_for(points: int) -> str:
+    for minimum, tier in TIERS:
+        if points >= minimum:
+            return tier
+    return "Bronce"
+
+
+def _count(model, *conditions):
+    return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+
+def _user_rows(user_ids: Optional[List[UUID]]):
+    completed = ExchangeStatus.COMPLETED
+    stmt = select(
+        User.id,
+        User.reward_points,
+        User.reward_tier,
+        _count(Exchange, Exchange.requester_id == User.id, Exchange.status == completed)
+        + _count(Exchange, Exchange.owner_id == User.id, Exchange.status == completed),
+        _count(Item, Item.owner_id == User.id),
+        User.reputation_score,
+    )
+    return stmt.where(User.id.in_(user_ids)) if user_ids is not None else stmt
+
+
+def _company_rows(company_ids: Optional[List[UUID]]):
+    stmt = select(
+        Company.id,
+        Company.reward_points,
+        Company.reward_tier,
+        _count(Contribution, Contribution.company_id == Company.id, Contribution.status == ContributionStatus.ACTIVE),
+        _count(Contribution, Contribution.company_id == Company.id, Contribution.status == ContributionStatus.COMPLETED),
+        Company.reputation_score,
+    )
+    return stmt.where(Company.id.in_(company_ids)) if company_ids is not None else stmt
+
+
+def user_points(completed_exchanges: int, total_items: int, reputation: float) -> int:
+    return int(completed_exchanges * 50 + total_items * 10 + float(reputation or 0) * 20)
+
+
+def company_points(active_contributions: int, completed_contributions: int, reputation: float) -> int:
+    return int(active_contributions * 20 + completed_contributions * 100 + float(reputation or 0) * 30)
+
+
+async def _persist(db: AsyncSession, model, actor_type: str, changes: List[Tuple[UUID, int, str, int, str]]) -> None:
+    """Guardar ``(id, puntos_antes, nivel_antes, puntos, nivel)`` y sus eventos"""
+    if not changes:
+        return
+    table = model.__table__
+    await db.execute(
+        update(table).where(table.c.id == bindparam("b_id")).values(
+            reward_points=bindparam("b_points"), reward_tier=bindparam("b_tier"), updated_at=func.now()
+        ),
+        [{"b_id": actor_id, "b_points": points, "b_tier": tier} for actor_id, _, _, points, tier in changes],
+    )
+    label = "usuario" if actor_type == "user" else "empresa"
+    await db.execute(insert(RewardEvent), [
+        {
+            "actor_id": actor_id,
+            "actor_type": actor_type,
+            "event_type": "recompute",
+            "points_delta": points - old_points,
+            "points_total": points,
+            "tier_before": old_tier,
+            "tier_after": tier,
+            "description": f"Recomputación de recompensas de {label}",
+        }
+        for actor_id, old_points, old_tier, points, tier in changes
+    ])
+
+
+async def _recompute(db: AsyncSession, stmt, model, actor_type: str, points_of) -> Dict[UUID, int]:
+    """Recorrer los actores por lotes ordenados por id (paginación por clave)"""
+    deltas: Dict[UUID, int] = {}
+    last_id = None
+    while True:
+        page = stmt.order_by(model.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            page = page.where(model.id > last_id)
+        rows = (await db.execute(page)).all()
+        changes = []
+        for actor_id, old_points, old_tier, a, b, reputation in rows:
+            points = points_of(a, b, reputation)
+            tier = tier_for(points)
+            old_points = old_points or 0
+            if points != old_points or tier != old_tier:
+                changes.append((actor_id, old_points, old_tier or "Bronce", points, tier))
+                deltas[actor_id] = points - old_points
+        await _persist(db, model, actor_type, changes)
+        if len(rows) < BATCH_SIZE:
+            return deltas
+        last_id = rows[-1][0]
+
+
+async def recompute_users(db: AsyncSession, user_ids: Optional[Iterable[UUID]] = None) -> Dict[UUID, int]:
+    """Recalcular usuarios (todos si ``user_ids`` es None).
+
+    Devuelve la variación de puntos de los que cambiaron; tras confirmar,
+    pasarla a ``notify_leaderboard``. No confirma la transacción.
+    """
+    ids = list(user_ids) if user_ids is not None else None
+    return await _recompute(db, _user_rows(ids), User, "user", user_points)
+
+
+async def notify_leaderboard(deltas: Dict[UUID, int]) -> None:
+    await leaderboard.rewards_changed_many(deltas)
+
+
+async def recompute_companies(db: AsyncSession, company_ids: Optional[Iterable[UUID]] = None) -> Dict[UUID, int]:
+    """Recalcular empresas (todas si ``company_ids`` es None). No confirma la transacción."""
+    ids = list(company_ids) if company_ids is not None else None
+    return await _recompute(db, _company_rows(ids), Company, "company", company_points)
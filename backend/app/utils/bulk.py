@@ -0,0 +1,370 @@
+"""Carga, exportación y limpieza masiva de datos.
+
+Trabaja directamente con las tablas de ``Base.metadata`` (SQLAlchemy Core) y
+evita el ORM por completo:
+
+- Importación desde NDJSON o CSV (opcionalmente ``.gz``) con conversión de tipos
+  según la columna destino.
+- Inserción por lotes: ``COPY ... FROM STDIN`` en PostgreSQL (asyncpg) y
+  ``executemany`` en una sola transacción en SQLite.
+- Vaciado de tablas respetando dependencias: ``TRUNCATE ... CASCADE`` en
+  PostgreSQL y ``DELETE`` en orden inverso de dependencias en SQLite.
+- Exportación en streaming a NDJSON o CSV.
+"""
+import csv
+import enum
+import gzip
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone
+from typing import IO, Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from sqlalchemy import Boolean, Date, DateTime, Enum, Float, Integer, String, Table, Uuid, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+import app.models  # noqa: F401  registra todas las tablas en Base.metadata
+from app.core.database import Base
+
+FORMATS = ("ndjson", "csv")
+
+_TRUE = {"1", "true", "t", "yes", "y", "si", "sí"}
+_FALSE = {"0", "false", "f", "no", "n"}
+
+
+class BulkDataError(ValueError):
+    """Datos de entrada no válidos para la tabla destino"""
+
+
+# Tablas y dependencias
+
+def get_table(name: str) -> Table:
+    table = Base.metadata.tables.get(name)
+    if table is None:
+        raise BulkDataError(f"Tabla desconocida: {name}")
+    return table
+
+
+def dependency_order() -> List[Table]:
+    """Tablas ordenadas de forma que cada una va después de las que referencia"""
+    return list(Base.metadata.sorted_tables)
+
+
+def with_dependents(tables: Iterable[Table]) -> List[Table]:
+    """Añadir las tablas que referencian (transitivamente) a ``tables``"""
+    selected: Set[Table] = set(tables)
+    changed = True
+    while changed:
+        changed = False
+        for table in Base.metadata.sorted_tables:
+            if table in selected:
+                continue
+            if any(fk.column.table in selected for fk in table.foreign_keys):
+                selected.add(table)
+                changed = True
+    return [t for t in dependency_order() if t in selected]
+
+
+async def truncate_tables(conn: AsyncConnection, tables: Iterable[Table]) -> List[str]:
+    """Vaciar ``tables`` y todas las que dependen de ellas.
+
+    En PostgreSQL es un único ``TRUNCATE ... RESTART IDENTITY CASCADE``; en
+    SQLite un ``DELETE`` sin ``WHERE`` por tabla (que SQLite optimiza como
+    truncado) en orden inverso de dependencias. Devuelve los nombres vaciados.
+    """
+    ordered = with_dependents(tables)
+    names = [t.name for t in ordered]
+    if not names:
+        return names
+
+    if conn.dialect.name == "postgresql":
+        quoted = ", ".join(conn.dialect.identifier_preparer.quote(n) for n in names)
+        await conn.execute(text(f"TRUNCATE TABLE {quoted} RESTART IDENTITY CASCADE"))
+    else:
+        for table in reversed(ordered):
+            await conn.execute(table.delete())
+    return names
+
+
+# Conversión de tipos
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(value)
+
+
+def _make_converter(column) -> Callable[[Any], Any]:
+    """Función de conversión para los valores de ``column``, resuelta una sola vez"""
+    col_type = column.type
+
+    if isinstance(col_type, Uuid):
+        parse = lambda v: v if isinstance(v, uuid.UUID) else uuid.UUID(str(v))
+    elif isinstance(col_type, Enum):
+        enum_class = col_type.enum_class
+
+        def parse(v):
+            if enum_class is None or isinstance(v, enum_class):
+                return v
+            try:
+                return enum_class(v)
+            except ValueError:
+                return enum_class[v]
+    elif isinstance(col_type, Boolean):
+        parse = _parse_bool
+    elif isinstance(col_type, DateTime):
+        aware = col_type.timezone
+
+        def parse(v):
+            if isinstance(v, datetime):
+                return v
+            parsed = datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+            return parsed.replace(tzinfo=timezone.utc) if aware and parsed.tzinfo is None else parsed
+    elif isinstance(col_type, Date):
+        parse = lambda v: v if isinstance(v, date) else date.fromisoformat(str(v))
+    elif isinstance(col_type, Integer):
+        parse = int
+    elif isinstance(col_type, Float):
+        parse = float
+    else:
+        parse = None
+
+    # En CSV la celda vacía es NULL salvo en columnas de texto obligatorias
+    empty = "" if _is_text(column) and not column.nullable else None
+
+    def convert(value):
+        if value is None:
+            return None
+        if value == "":
+            return empty
+        if parse is None:
+            return value
+        try:
+            return parse(value)
+        except (KeyError, TypeError, ValueError):
+            raise BulkDataError(f"Valor no válido para {column.table.name}.{column.name}: {value!r}")
+
+    return convert
+
+
+def _is_text(column) -> bool:
+    return isinstance(column.type, String) and not isinstance(column.type, Enum)
+
+
+class RowPreparer:
+    """Convierte filas crudas en diccionarios listos para insertar.
+
+    Aplica los valores por defecto de Python de las columnas (ids, flags...) y,
+    para columnas con ``server_default`` de fecha, la hora de la importación, de
+    modo que todas las filas de un lote comparten el mismo conjunto de columnas
+    (requisito tanto de ``executemany`` como de ``COPY``).
+    """
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.columns = {c.name: c for c in table.columns}
+        self.converters = {c.name: _make_converter(c) for c in table.columns}
+        self.now = datetime.now(timezone.utc)
+
+    def prepare(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        converters = self.converters
+        try:
+            return {key: converters[key](value) for key, value in raw.items()}
+        except KeyError as exc:
+            raise BulkDataError(f"Columna desconocida '{exc.args[0]}' para la tabla {self.table.name}")
+
+    def fill(self, batch: List[Dict[str, Any]]) -> List[str]:
+        """Completar las columnas ausentes del lote y devolver su lista de columnas"""
+        present: Set[str] = set()
+        for row in batch:
+            present.update(row)
+        names = [c.name for c in self.table.columns if c.name in present or self._has_fill(c)]
+        for row in batch:
+            for name in names:
+                if name not in row:
+                    row[name] = self._default(self.columns[name])
+        return names
+
+    def _has_fill(self, column) -> bool:
+        default = column.default
+        if default is not None and (default.is_scalar or default.is_callable):
+            return True
+        return column.server_default is not None and isinstance(column.type, DateTime)
+
+    def _default(self, column) -> Any:
+        default = column.default
+        if default is not None:
+            if default.is_scalar:
+                return default.arg
+            if default.is_callable:
+                return default.arg(None)
+        if column.server_default is not None and isinstance(column.type, DateTime):
+            return self.now
+        return None
+
+
+# Lectura de ficheros
+
+def open_text(path: str, mode: str = "r") -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise BulkDataError(f"No se pudo deducir el formato de {path}; use --format")
+
+
+def read_rows(fh: IO[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+        return
+    for line_number, line in enumerate(fh, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise BulkDataError(f"JSON no válido en la línea {line_number}: {exc.msg}")
+
+
+def batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Inserción
+
+def _copy_field(value: Any) -> str:
+    """Valor en formato CSV de COPY; ``\\N`` sin comillas es NULL"""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy guarda los enums por nombre
+        return '"' + value.name + '"'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+async def _copy_batch(conn: AsyncConnection, table: Table, columns: Sequence[str], batch: List[Dict[str, Any]]) -> None:
+    buffer = io.BytesIO()
+    for row in batch:
+        line = ",".join(_copy_field(row[name]) for name in columns)
+        buffer.write(line.encode("utf-8"))
+        buffer.write(b"\n")
+    buffer.seek(0)
+
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_to_table(
+        table.name,
+        source=buffer,
+        columns=list(columns),
+        schema_name=table.schema,
+        format="csv",
+        null=r"\N",
+    )
+
+
+def _supports_copy(conn: AsyncConnection) -> bool:
+    return conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg"
+
+
+async def bulk_insert(
+    conn: AsyncConnection,
+    table: Table,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = 5000,
+    use_copy: Optional[bool] = None,
+) -> int:
+    """Insertar ``rows`` en ``table`` por lotes y devolver el número de filas.
+
+    Debe llamarse dentro de una transacción (``engine.begin()``); con asyncpg
+    se usa ``COPY`` salvo que ``use_copy`` sea ``False``.
+    """
+    preparer = RowPreparer(table)
+    copy = _supports_copy(conn) if use_copy is None else use_copy and _supports_copy(conn)
+    if copy:
+        # Garantiza que la transacción del adaptador está abierta antes del COPY
+        await conn.execute(text("SELECT 1"))
+
+    total = 0
+    for raw_batch in batched(rows, batch_size):
+        batch = [preparer.prepare(row) for row in raw_batch]
+        columns = preparer.fill(batch)
+        if copy:
+            await _copy_batch(conn, table, columns, batch)
+        else:
+            await conn.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+
+async def sqlite_fast_path(conn: AsyncConnection) -> None:
+    """Ajustes de SQLite para cargas masivas en esta conexión.
+
+    Debe ejecutarse antes de la primera escritura de la transacción.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    await conn.exec_driver_sql("PRAGMA synchronous=OFF")
+    await conn.exec_driver_sql("PRAGMA temp_store=MEMORY")
+    await conn.exec_driver_sql("PRAGMA cache_size=-65536")
+    await conn.exec_driver_sql("PRAGMA defer_foreign_keys=ON")
+
+
+# Exportación
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+async def iter_table(conn: AsyncConnection, table: Table, batch_size: int = 5000) -> AsyncIterator[Dict[str, Any]]:
+    """Recorrer una tabla en streaming con valores serializables"""
+    result = await conn.stream(select(table).execution_options(yield_per=batch_size))
+    async for partition in result.mappings().partitions(batch_size):
+        for row in partition:
+            yield {key: _export_value(value) for key, value in row.items()}
+
+
+async def export_table(conn: AsyncConnection, table: Table, fh: IO[str], fmt: str, batch_size: int = 5000) -> int:
+    """Escribir ``table`` completa en ``fh`` como NDJSON o CSV"""
+    total = 0
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(fh, fieldnames=[c.name for c in table.columns])
+        writer.writeheader()
+
+    async for row in iter_table(conn, table, batch_size):
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            fh.write(json.dumps(row, ensure_ascii=False))
+            fh.write("\n")
+        total += 1
+    return total
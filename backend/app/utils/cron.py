@@ -0,0 +1,89 @@
+"""Expresiones cron de cinco campos (minuto hora día mes día-de-la-semana).
+
+Admite ``*``, valores, rangos ``a-b``, listas ``a,b`` y pasos ``*/n`` o
+``a-b/n``; el día de la semana va de 0 (domingo) a 6 (7 también es domingo).
+Como en cron, si se restringen tanto el día del mes como el de la semana
+basta con que coincida uno de los dos. Atajos: ``@hourly``, ``@daily``,
+``@weekly``, ``@monthly``.
+"""
+from datetime import datetime, timedelta
+from typing import FrozenSet, Tuple
+
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+_BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# Búsqueda acotada: cualquier expresión válida coincide en menos de 5 años
+_MAX_DAYS = 366 * 5
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(field: str, low: int, high: int) -> Tuple[FrozenSet[int], bool]:
+    values = set()
+    for part in field.split(","):
+        expr, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise CronError(f"Paso inválido: {part}")
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start, end = (int(v) for v in expr.split("-", 1))
+        else:
+            start = int(expr)
+            end = high if step_text else start
+        if not (low <= start <= end <= high):
+            raise CronError(f"Valor fuera de rango ({low}-{high}): {part}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values), field == "*"
+
+
+class CronSchedule:
+    """Expresión cron compilada; ``next_after`` calcula la siguiente ejecución"""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = _ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise CronError(f"Se esperaban 5 campos: {expression!r}")
+        try:
+            parsed = [_parse_field(f, low, high) for f, (low, high) in zip(fields, _BOUNDS)]
+        except ValueError as e:
+            raise CronError(f"Expresión cron inválida {expression!r}: {e}") from None
+        (self.minutes, _), (self.hours, _), (self.days, days_any), (self.months, _), (weekdays, weekdays_any) = parsed
+        # cron usa 0 = domingo; datetime.weekday() usa 0 = lunes
+        self.weekdays = frozenset((d - 1) % 7 for d in weekdays)
+        self._days_any = days_any
+        self._weekdays_any = weekdays_any
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day = dt.day in self.days
+        weekday = dt.weekday() in self.weekdays
+        if self._days_any or self._weekdays_any:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, after: datetime) -> datetime:
+        """Primer instante que coincide estrictamente después de ``after``"""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=_MAX_DAYS)
+        while dt < limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise CronError(f"La expresión {self.expression!r} no coincide con ninguna fecha")
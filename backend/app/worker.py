@@ -0,0 +1,34 @@
+"""Proceso dedicado a las tareas periódicas.
+
+Uso (con SCHEDULER_ENABLED=false en los workers de la API)::
+
+    python -m app.worker
+"""
+import asyncio
+import logging
+
+from app.core.coordination import bus
+from app.core.scheduler import scheduler
+from app.services import maintenance  # noqa: F401  registra las tareas periódicas
+
+
+async def run() -> None:
+    # Las tareas avisan a los workers de la API (clasificación, cachés)
+    await bus.start()
+    try:
+        await scheduler.run_forever()
+    finally:
+        await bus.stop()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger(__name__).info("Planificador de tareas iniciado (%s)", ", ".join(scheduler.jobs))
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
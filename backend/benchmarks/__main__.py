@@ -0,0 +1,270 @@
+"""CLI de benchmarks.
+
+Uso (desde ``backend/``)::
+
+    # 1. Generar datos sintéticos (borra y recrea el esquema de la BD indicada;
+    #    sin --database-url pide confirmación y fuera de SQLite exige --yes)
+    python -m benchmarks seed --database-url sqlite+aiosqlite:///./bench.db --users 10000
+
+    # 2. Ejecutar un escenario en proceso (usa DATABASE_URL) o contra un servidor vivo
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m benchmarks run browse --duration 30
+    python -m benchmarks run feed --base-url http://localhost:8000 --concurrency 50
+
+    # 3. Guardar una línea base y comparar ejecuciones posteriores contra ella
+    python -m benchmarks run browse --save-baseline
+    python -m benchmarks compare reports/browse.json
+
+    # CPU de serialización por página de 100 filas (antes/después, sin BD)
+    python -m benchmarks serialization --rows 100
+
+    # Escrituras con un commit por paso frente a un único commit por petición
+    python -m benchmarks transactions --database-url sqlite+aiosqlite:///./bench.db --operations 2000
+
+    # SQLite: conexión única compartida frente a WAL + lectores + cola de escrituras
+    python -m benchmarks sqlite --rows 20000 --concurrency 20
+
+    # Arranque de un worker: importación, lifespan y paquetes que más pesan
+    python -m benchmarks startup --runs 5
+
+    # Bytes y CPU por respuesta de listado con gzip / brotli, y coste del ETag
+    python -m benchmarks compression --rows 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(BASE_DIR, "dataset.json")
+BASELINE_DIR = os.path.join(BASE_DIR, "baselines")
+REPORT_DIR = os.path.join(BASE_DIR, "reports")
+
+
+def _baseline_path(scenario: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{scenario}.json")
+
+
+async def _seed(args) -> int:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.core.config import settings
+    from benchmarks.datagen import DatasetSpec, seed_database, write_manifest
+
+    url = args.database_url or settings.DATABASE_URL
+    reset = not args.no_reset
+    if reset and not args.yes:
+        # El reinicio borra todas las tablas: nunca sobre una BD real por descuido
+        if not url.startswith("sqlite"):
+            print(f"❌ {url} no es SQLite: use --yes para borrar y recrear su esquema, o --no-reset")
+            return 1
+        if not args.database_url:
+            answer = input(f"Se borrarán todas las tablas de {url} (DATABASE_URL). ¿Continuar? [s/N] ")
+            if answer.strip().lower() not in ("s", "si", "sí", "y", "yes"):
+                print("Operación cancelada")
+                return 1
+
+    spec = DatasetSpec(
+        users=args.users,
+        seed=args.seed,
+        items=args.items,
+        images_per_item=args.images_per_item,
+        exchanges=args.exchanges,
+        messages_per_exchange=args.messages_per_exchange,
+        feed_posts=args.feed_posts,
+    )
+    print(f"🌱 Generando datos en {url} (semilla {spec.seed}): {spec.counts()}")
+    engine = create_async_engine(url)
+    try:
+        manifest = await seed_database(engine, spec, batch_size=args.batch_size, reset=reset)
+    finally:
+        await engine.dispose()
+    manifest["database_url"] = url
+    write_manifest(manifest, args.manifest)
+    print(f"📄 Manifiesto escrito en {args.manifest}")
+    return 0
+
+
+async def _run(args) -> int:
+    from benchmarks.datagen import read_manifest
+    from benchmarks.report import compare_reports, format_comparison, format_report, load_report, save_report
+    from benchmarks.runner import run_scenario
+
+    manifest = read_manifest(args.manifest)
+    report = await run_scenario(
+        args.scenario,
+        manifest,
+        base_url=args.base_url,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        iterations=args.iterations,
+        seed=args.seed,
+    )
+    print(format_report(report))
+
+    output = args.output or os.path.join(REPORT_DIR, f"{args.scenario}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    save_report(report, output)
+    print(f"📄 Informe escrito en {output}")
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        save_report(report, _baseline_path(args.scenario))
+        print(f"📌 Línea base actualizada: {_baseline_path(args.scenario)}")
+        return 0
+
+    baseline = args.baseline or _baseline_path(args.scenario)
+    if os.path.exists(baseline):
+        rows = compare_reports(report, load_report(baseline), args.tolerance)
+        print(format_comparison(rows))
+        return 1 if any(r["regression"] for r in rows) else 0
+    return 0
+
+
+def _compare(args) -> int:
+    from benchmarks.report import compare_reports, format_comparison, load_report
+
+    current = load_report(args.report)
+    baseline = load_report(args.baseline or _baseline_path(current["scenario"]))
+    rows = compare_reports(current, baseline, args.tolerance)
+    print(format_comparison(rows))
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+def _serialization(args) -> int:
+    from benchmarks.serialization import format_serialization, run_serialization
+
+    results = run_serialization(rows=args.rows, iterations=args.iterations, seed=args.seed)
+    print(format_serialization(results))
+    return 0
+
+
+async def _transactions(args) -> int:
+    from app.core.config import settings
+    from benchmarks.transactions import format_transactions, run_transactions
+
+    url = args.database_url or settings.DATABASE_URL
+    results = await run_transactions(url, operations=args.operations, concurrency=args.concurrency, counters=args.counters)
+    print(format_transactions(results))
+    return 0
+
+
+async def _sqlite(args) -> int:
+    from benchmarks.sqlite_profile import format_sqlite_profile, run_sqlite_profile
+
+    results = await run_sqlite_profile(rows=args.rows, reads=args.reads, writes=args.writes, concurrency=args.concurrency)
+    print(format_sqlite_profile(results))
+    return 0
+
+
+def _startup(args) -> int:
+    from benchmarks.report import save_report
+    from benchmarks.startup import format_startup, run_startup
+
+    summary = run_startup(args.app, runs=args.runs)
+    print(format_startup(summary, top=args.top))
+    if args.output:
+        save_report(summary, args.output)
+        print(f"📄 Informe escrito en {args.output}")
+    return 0
+
+
+def _compression(args) -> int:
+    from benchmarks.compression import format_compression, run_compression
+
+    results = run_compression(rows=args.rows, iterations=args.iterations, seed=args.seed)
+    print(format_compression(results))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from benchmarks.scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de carga de GreenLoop")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed = sub.add_parser("seed", help="Generar datos sintéticos")
+    seed.add_argument("--database-url", help="URL de la BD (por defecto DATABASE_URL)")
+    seed.add_argument("--users", type=int, default=10_000)
+    seed.add_argument("--items", type=int)
+    seed.add_argument("--images-per-item", type=int, default=2)
+    seed.add_argument("--exchanges", type=int)
+    seed.add_argument("--messages-per-exchange", type=int, default=4)
+    seed.add_argument("--feed-posts", type=int)
+    seed.add_argument("--seed", type=int, default=42)
+    seed.add_argument("--batch-size", type=int, default=5000)
+    seed.add_argument("--no-reset", action="store_true", help="No borrar ni recrear el esquema")
+    seed.add_argument("--yes", action="store_true", help="Borrar el esquema sin pedir confirmación")
+    seed.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+    run = sub.add_parser("run", help="Ejecutar un escenario de carga")
+    run.add_argument("scenario", choices=sorted(SCENARIOS))
+    run.add_argument("--base-url", help="Servidor vivo; sin él se usa httpx.ASGITransport en proceso")
+    run.add_argument("--duration", type=float, default=30.0)
+    run.add_argument("--concurrency", type=int, default=10)
+    run.add_argument("--warmup", type=float, default=5.0)
+    run.add_argument("--iterations", type=int, help="Máximo de iteraciones por usuario virtual")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    run.add_argument("--output", help="Ruta del informe JSON")
+    run.add_argument("--baseline", help="Línea base con la que comparar")
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--tolerance", type=float, default=0.10)
+
+    compare = sub.add_parser("compare", help="Comparar un informe con su línea base")
+    compare.add_argument("report")
+    compare.add_argument("--baseline")
+    compare.add_argument("--tolerance", type=float, default=0.10)
+
+    serialization = sub.add_parser("serialization", help="CPU de serialización de listados (antes/después)")
+    serialization.add_argument("--rows", type=int, default=100)
+    serialization.add_argument("--iterations", type=int, default=200)
+    serialization.add_argument("--seed", type=int, default=42)
+
+    transactions = sub.add_parser("transactions", help="Escrituras: un commit por paso frente a uno por petición")
+    transactions.add_argument("--database-url", help="URL de la BD (por defecto DATABASE_URL)")
+    transactions.add_argument("--operations", type=int, default=2000)
+    transactions.add_argument("--concurrency", type=int, default=10)
+    transactions.add_argument("--counters", type=int, default=10, help="Filas de contador compartidas")
+
+    sqlite_profile = sub.add_parser("sqlite", help="SQLite: conexión compartida frente al perfil WAL")
+    sqlite_profile.add_argument("--rows", type=int, default=20000)
+    sqlite_profile.add_argument("--reads", type=int, default=500)
+    sqlite_profile.add_argument("--writes", type=int, default=2000)
+    sqlite_profile.add_argument("--concurrency", type=int, default=20)
+
+    startup = sub.add_parser("startup", help="Tiempo de importación y arranque de un worker")
+    startup.add_argument("--app", default="app.main:app", help="módulo:atributo de la aplicación")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--top", type=int, default=15, help="Paquetes a mostrar")
+    startup.add_argument("--output", help="Ruta del informe JSON")
+
+    compression = sub.add_parser("compression", help="Tamaño y CPU de las respuestas comprimidas")
+    compression.add_argument("--rows", type=int, default=100)
+    compression.add_argument("--iterations", type=int, default=100)
+    compression.add_argument("--seed", type=int, default=42)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "seed":
+        return asyncio.run(_seed(args))
+    if args.command == "run":
+        return asyncio.run(_run(args))
+    if args.command == "serialization":
+        return _serialization(args)
+    if args.command == "transactions":
+        return asyncio.run(_transactions(args))
+    if args.command == "sqlite":
+        return asyncio.run(_sqlite(args))
+    if args.command == "startup":
+        return _startup(args)
+    if args.command == "compression":
+        return _compression(args)
+    return _compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Tamaño y CPU de comprimir las respuestas de listado.
+
+Para las mismas páginas sintéticas del benchmark de serialización (búsqueda
+de ítems, feed, conversaciones) mide, por codificación y nivel, los bytes
+enviados y los milisegundos de CPU por respuesta, junto al coste del ETag
+(hash del cuerpo). Brotli sólo se mide si el paquete está instalado. No
+necesita base de datos.
+"""
+import random
+import time
+from typing import Callable, List, Sequence
+
+from app.core.compression import _brotli, compress
+from app.core.http_cache import body_etag
+from benchmarks.serialization import CASES
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 11)
+
+
+def _cpu_ms(operation: Callable[[], object], iterations: int) -> float:
+    operation()  # calentamiento
+    started = time.process_time()
+    for _ in range(iterations):
+        operation()
+    return (time.process_time() - started) * 1000 / iterations
+
+
+def _encodings(gzip_levels: Sequence[int], brotli_qualities: Sequence[int]) -> List[tuple]:
+    encodings = [("gzip", level) for level in gzip_levels]
+    if _brotli() is not None:
+        encodings += [("br", quality) for quality in brotli_qualities]
+    return encodings
+
+
+def run_compression(
+    rows: int = 100,
+    iterations: int = 100,
+    seed: int = 42,
+    gzip_levels: Sequence[int] = GZIP_LEVELS,
+    brotli_qualities: Sequence[int] = BROTLI_QUALITIES,
+) -> List[dict]:
+    results = []
+    for name, (make_rows, _, trusted) in CASES.items():
+        body = trusted(make_rows(random.Random(seed), rows))
+        results.append({
+            "case": name, "encoding": "identity", "level": None, "bytes": len(body), "ratio": 1.0,
+            "cpu_ms": round(_cpu_ms(lambda: body_etag(body), iterations), 3),  # sólo el ETag
+        })
+        for encoding, level in _encodings(gzip_levels, brotli_qualities):
+            compressed = compress(body, encoding, level)
+            results.append({
+                "case": name,
+                "encoding": encoding,
+                "level": level,
+                "bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "cpu_ms": round(_cpu_ms(lambda: compress(body, encoding, level), iterations), 3),
+            })
+    return results
+
+
+def format_compression(results: List[dict]) -> str:
+    lines = [f"{'caso':<15}{'codificación':<14}{'nivel':>6}{'bytes':>9}{'ratio':>8}{'CPU ms':>9}"]
+    for r in results:
+        level = "-" if r["level"] is None else str(r["level"])
+        lines.append(
+            f"{r['case']:<15}{r['encoding']:<14}{level:>6}{r['bytes']:>9}{r['ratio']:>7.2f}x{r['cpu_ms']:>9.3f}"
+        )
+    return "\n".join(lines)
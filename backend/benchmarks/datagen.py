@@ -0,0 +1,408 @@
+"""Generador determinista de datos sintéticos para benchmarks.
+
+Con la misma semilla y los mismos tamaños produce exactamente los mismos
+registros, de modo que dos ejecuciones del benchmark comparan lo mismo. Los
+ids se derivan del tipo de entidad y de su índice (``entity_id``), así que los
+escenarios de carga pueden referenciar usuarios, ítems o intercambios
+existentes sin consultar la base de datos ni guardar millones de UUIDs. Por
+lo mismo, el dueño de un ítem (``index % users``) y si está disponible
+(``item_available``) se deducen de su índice.
+
+Las filas se insertan por lotes con ``app.utils.bulk.bulk_insert`` (``COPY`` en
+PostgreSQL, ``executemany`` en SQLite), saltándose el ORM por completo.
+"""
+import hashlib
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.database import Base
+from app.core.schema import read_revisions
+from app.core.security import get_password_hash
+from app.models.category import Category
+from app.models.community_post import (
+    CommunityActorType,
+    CommunityFeedPost,
+    CommunityMediaType,
+    PostType,
+)
+from app.models.exchange import Exchange, ExchangeStatus
+from app.models.item import Item, ItemCondition, ItemStatus
+from app.models.item_image import ItemImage
+from app.models.message import Message, MessageType
+from app.models.rating import Rating
+from app.models.user import User
+from app.services import category_counts, rating_summary
+from app.utils.bulk import bulk_insert, sqlite_fast_path
+
+# Contraseña común de todos los usuarios sintéticos (los escenarios la usan para login)
+BENCH_PASSWORD = "BenchPass123!"
+
+# Prefijos por tipo de entidad para derivar ids deterministas
+_KIND_CODES = {
+    "user": 0x01,
+    "category": 0x02,
+    "item": 0x03,
+    "image": 0x04,
+    "exchange": 0x05,
+    "message": 0x06,
+    "rating": 0x07,
+    "feed_post": 0x08,
+}
+
+_CITIES = [
+    ("Bogotá", "Cundinamarca", "Colombia"),
+    ("Medellín", "Antioquia", "Colombia"),
+    ("Cali", "Valle del Cauca", "Colombia"),
+    ("Ciudad de México", "CDMX", "México"),
+    ("Guadalajara", "Jalisco", "México"),
+    ("Lima", "Lima", "Perú"),
+    ("Santiago", "Región Metropolitana", "Chile"),
+    ("Buenos Aires", "Buenos Aires", "Argentina"),
+    ("Quito", "Pichincha", "Ecuador"),
+    ("Madrid", "Madrid", "España"),
+]
+
+WORDS = [
+    "bicicleta", "libro", "lámpara", "silla", "mesa", "chaqueta", "guitarra",
+    "cámara", "teléfono", "juguete", "planta", "maceta", "reloj", "mochila",
+    "zapatos", "monitor", "teclado", "sofá", "cafetera", "patines", "vintage",
+    "reciclado", "usado", "artesanal", "eléctrico", "madera", "metal", "azul",
+    "verde", "grande", "pequeño", "infantil", "deportivo", "clásico",
+]
+
+
+def entity_id(kind: str, index: int, seed: int = 0) -> uuid.UUID:
+    """Id determinista para la entidad ``index`` de tipo ``kind``"""
+    high = (_KIND_CODES[kind] << 56) | ((seed & 0xFFFFFF) << 32)
+    return uuid.UUID(int=(high << 64) | index, version=4)
+
+
+def item_available(index: int, seed: int = 0) -> bool:
+    """Si el ítem ``index`` se genera disponible; el resto (~15 %) ya está intercambiado"""
+    digest = hashlib.blake2b(f"{seed}:{index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >= int(0.15 * 2 ** 64)
+
+
+def bench_email(index: int) -> str:
+    return f"bench{index}@bench.greenloop.dev"
+
+
+@dataclass
+class DatasetSpec:
+    """Tamaños del conjunto de datos; los no indicados se derivan de ``users``"""
+    users: int = 10_000
+    seed: int = 42
+    items: Optional[int] = None
+    images_per_item: int = 2
+    exchanges: Optional[int] = None
+    messages_per_exchange: int = 4
+    feed_posts: Optional[int] = None
+    completed_ratio: float = 0.4
+
+    def __post_init__(self):
+        if self.items is None:
+            self.items = self.users * 3
+        if self.exchanges is None:
+            self.exchanges = self.users
+        if self.feed_posts is None:
+            self.feed_posts = max(self.users // 2, 1)
+        if self.items < self.users:
+            raise ValueError("Se necesita al menos un ítem por usuario")
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "users": self.users,
+            "items": self.items,
+            "images": self.items * self.images_per_item,
+            "exchanges": self.exchanges,
+            "messages": self.exchanges * self.messages_per_exchange,
+            "feed_posts": self.feed_posts,
+        }
+
+
+class DatasetGenerator:
+    """Produce lotes ``(tabla, filas)`` en orden compatible con las claves foráneas"""
+
+    def __init__(self, spec: DatasetSpec, batch_size: int = 5000):
+        self.spec = spec
+        self.batch_size = batch_size
+        self.now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.hashed_password = get_password_hash(BENCH_PASSWORD)
+        self.categories = Category.get_default_categories()
+
+    def _id(self, kind: str, index: int) -> uuid.UUID:
+        return entity_id(kind, index, self.spec.seed)
+
+    def _rng(self, kind: str) -> random.Random:
+        return random.Random(f"{self.spec.seed}:{kind}")
+
+    def _ago(self, rng: random.Random, max_days: int = 365) -> datetime:
+        return self.now - timedelta(seconds=rng.randint(0, max_days * 86400))
+
+    def _text(self, rng: random.Random, words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    def _batched(self, table, rows: Iterator[dict]) -> Iterator[Tuple[object, List[dict]]]:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield table, batch
+                batch = []
+        if batch:
+            yield table, batch
+
+    # Filas por entidad
+
+    def _categories(self) -> Iterator[dict]:
+        for i, category in enumerate(self.categories):
+            yield {
+                **category,
+                "id": self._id("category", i),
+                "is_active": True,
+                "own_items_count": 0,
+                "items_count": 0,
+            }
+
+    def _users(self) -> Iterator[dict]:
+        rng = self._rng("users")
+        for i in range(self.spec.users):
+            city, state, country = rng.choice(_CITIES)
+            created = self._ago(rng, 720)
+            total = rng.randint(0, 40)
+            yield {
+                "id": self._id("user", i),
+                "email": bench_email(i),
+                "username": f"bench_user_{i}",
+                "hashed_password": self.hashed_password,
+                "first_name": "Bench",
+                "last_name": f"Usuario {i}",
+                "city": city,
+                "state": state,
+                "country": country,
+                "is_active": True,
+                "email_verified": True,
+                "reputation_score": round(rng.uniform(0, 5), 2),
+                "total_exchanges": total,
+                "successful_exchanges": rng.randint(0, total),
+                "reward_points": rng.randint(0, 5000),
+                "created_at": created,
+                "updated_at": created,
+            }
+
+    def _items(self) -> Iterator[dict]:
+        rng = self._rng("items")
+        categories = len(self.categories)
+        conditions = list(ItemCondition)
+        for i in range(self.spec.items):
+            created = self._ago(rng)
+            yield {
+                "id": self._id("item", i),
+                "title": self._text(rng, 3).capitalize(),
+                "description": self._text(rng, 25),
+                "owner_id": self._id("user", i % self.spec.users),
+                "category_id": self._id("category", rng.randrange(categories)),
+                "condition": rng.choice(conditions),
+                "status": ItemStatus.AVAILABLE if item_available(i, self.spec.seed) else ItemStatus.EXCHANGED,
+                "estimated_value": round(rng.uniform(1, 500), 2),
+                "location_description": rng.choice(_CITIES)[0],
+                "is_active": True,
+                "views_count": rng.randint(0, 2000),
+                "created_at": created,
+                "updated_at": created,
+            }
+
+    def _images(self) -> Iterator[dict]:
+        per_item = self.spec.images_per_item
+        for i in range(self.spec.items):
+            item_id = self._id("item", i)
+            for n in range(per_item):
+                yield {
+                    "id": self._id("image", i * per_item + n),
+                    "item_id": item_id,
+                    "image_url": f"/uploads/items/bench/{i}_{n}.jpg",
+                    "is_primary": n == 0,
+                    "sort_order": n,
+                }
+
+    def _exchange_graph(self) -> Iterator[Tuple[object, List[dict]]]:
+        """Intercambios junto con sus mensajes y calificaciones"""
+        rng = self._rng("exchanges")
+        users = self.spec.users
+        statuses = [ExchangeStatus.PENDING, ExchangeStatus.ACCEPTED, ExchangeStatus.REJECTED, ExchangeStatus.CANCELLED]
+        exchanges, ratings, messages = [], [], []
+        rating_index = 0
+
+        def flush():
+            if exchanges:
+                yield Exchange.__table__, list(exchanges)
+            if ratings:
+                yield Rating.__table__, list(ratings)
+            if messages:
+                yield Message.__table__, list(messages)
+            exchanges.clear()
+            ratings.clear()
+            messages.clear()
+
+        for k in range(self.spec.exchanges):
+            requested = rng.randrange(self.spec.items)
+            owner = requested % users
+            requester = (owner + rng.randrange(1, users)) % users if users > 1 else owner
+            completed = rng.random() < self.spec.completed_ratio
+            status = ExchangeStatus.COMPLETED if completed else rng.choice(statuses)
+            created = self._ago(rng, 180)
+            exchange_id = self._id("exchange", k)
+            exchanges.append({
+                "id": exchange_id,
+                "requester_id": self._id("user", requester),
+                "owner_id": self._id("user", owner),
+                "requested_item_id": self._id("item", requested),
+                "offered_item_id": self._id("item", requester),
+                "status": status,
+                "initial_message": self._text(rng, 8),
+                "completed_by_requester": completed,
+                "completed_by_owner": completed,
+                "created_at": created,
+                "updated_at": created + timedelta(days=2) if completed else created,
+                "completed_at": created + timedelta(days=2) if completed else None,
+            })
+
+            if completed and requester != owner:
+                # El solicitante siempre califica; el dueño sólo a veces
+                raters = [(requester, owner)]
+                if rng.random() < 0.5:
+                    raters.append((owner, requester))
+                for rater, rated in raters:
+                    ratings.append({
+                        "id": self._id("rating", rating_index),
+                        "rater_id": self._id("user", rater),
+                        "rated_id": self._id("user", rated),
+                        "exchange_id": exchange_id,
+                        "overall_rating": float(rng.randint(1, 5)),
+                        "communication_rating": float(rng.randint(1, 5)),
+                        "comment": self._text(rng, 6),
+                        "created_at": created + timedelta(days=3),
+                        "updated_at": created + timedelta(days=3),
+                    })
+                    rating_index += 1
+
+            for m in range(self.spec.messages_per_exchange):
+                sender, receiver = (requester, owner) if m % 2 == 0 else (owner, requester)
+                sent_at = created + timedelta(minutes=m * 7)
+                messages.append({
+                    "id": self._id("message", k * self.spec.messages_per_exchange + m),
+                    "sender_id": self._id("user", sender),
+                    "receiver_id": self._id("user", receiver),
+                    "exchange_id": exchange_id,
+                    "message_type": MessageType.TEXT,
+                    "content": self._text(rng, 12),
+                    "is_read": rng.random() < 0.7,
+                    "created_at": sent_at,
+                    "updated_at": sent_at,
+                })
+
+            if len(exchanges) >= self.batch_size:
+                yield from flush()
+        yield from flush()
+
+    def _feed_posts(self) -> Iterator[dict]:
+        rng = self._rng("feed_posts")
+        post_types = list(PostType)
+        for i in range(self.spec.feed_posts):
+            created = self._ago(rng, 90)
+            yield {
+                "id": self._id("feed_post", i),
+                "author_type": CommunityActorType.USER,
+                "author_id": self._id("user", rng.randrange(self.spec.users)),
+                "content": self._text(rng, 30),
+                "post_type": rng.choice(post_types),
+                "media_type": CommunityMediaType.NONE,
+                "likes_count": rng.randint(0, 300),
+                "comments_count": rng.randint(0, 40),
+                "shares_count": rng.randint(0, 20),
+                "is_active": True,
+                "created_at": created,
+                "updated_at": created,
+            }
+
+    def batches(self) -> Iterator[Tuple[object, List[dict]]]:
+        yield from self._batched(Category.__table__, self._categories())
+        yield from self._batched(User.__table__, self._users())
+        yield from self._batched(Item.__table__, self._items())
+        yield from self._batched(ItemImage.__table__, self._images())
+        yield from self._exchange_graph()
+        yield from self._batched(CommunityFeedPost.__table__, self._feed_posts())
+
+    def manifest(self) -> dict:
+        """Descripción del conjunto generado que consumen los escenarios"""
+        return {
+            "spec": asdict(self.spec),
+            "counts": {**self.spec.counts(), "categories": len(self.categories)},
+            "password": BENCH_PASSWORD,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+async def _reset_schema(engine: AsyncEngine) -> None:
+    _, heads = read_revisions()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        # Equivale a ``alembic stamp head``: la app comprueba la revisión al arrancar
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"
+        ))
+        await conn.execute(text("DELETE FROM alembic_version"))
+        for head in sorted(heads):
+            await conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:head)"), {"head": head})
+
+
+async def seed_database(engine: AsyncEngine, spec: DatasetSpec, batch_size: int = 5000, reset: bool = False, log=print) -> dict:
+    """Poblar la base de datos de ``engine`` y devolver el manifiesto
+
+    Con ``reset`` borra y recrea antes todo el esquema.
+    """
+    if reset:
+        await _reset_schema(engine)
+
+    generator = DatasetGenerator(spec, batch_size=batch_size)
+    totals: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    async with engine.begin() as conn:
+        await sqlite_fast_path(conn)
+        for table, rows in generator.batches():
+            await bulk_insert(conn, table, rows, batch_size=batch_size)
+            totals[table.name] = totals.get(table.name, 0) + len(rows)
+            if totals[table.name] % (batch_size * 20) < len(rows):
+                log(f"  {table.name}: {totals[table.name]:,} filas")
+
+        # Ni los agregados de calificaciones ni los contadores de ítems por
+        # categoría se mantienen en la inserción directa
+        await rating_summary.rebuild(conn)
+        await category_counts.reconcile(conn)
+
+    elapsed = time.perf_counter() - started
+    manifest = generator.manifest()
+    manifest["rows"] = totals
+    manifest["seconds"] = round(elapsed, 2)
+    log(f"✅ {sum(totals.values()):,} filas insertadas en {elapsed:.1f}s")
+    return manifest
+
+
+def write_manifest(manifest: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, ensure_ascii=False, default=str)
+
+
+def read_manifest(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
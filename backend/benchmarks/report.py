@@ -0,0 +1,163 @@
+"""Agregación de latencias y comparación contra una línea base"""
+import json
+import math
+import platform
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def succeeded(status: Optional[int]) -> bool:
+    """Respuesta válida: 2xx o 3xx (los 4xx, 5xx y errores de red son fallos)"""
+    return status is not None and 200 <= status < 400
+
+
+class Recorder:
+    """Acumula latencias y códigos de estado por nombre de paso.
+
+    Las latencias sólo se guardan para las respuestas válidas: un 429 o un 500
+    rápido no debe mejorar los percentiles. El throughput también cuenta sólo
+    las válidas.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, name: str, seconds: float, status: Optional[int], error: Optional[str] = None) -> None:
+        if status is None:
+            self.errors[name][error or "error"] += 1
+        else:
+            self.statuses[name][status] += 1
+        if succeeded(status):
+            self.latencies[name].append(seconds)
+
+    def _step_stats(self, values: List[float], statuses: Counter, errors: Counter, elapsed: float) -> dict:
+        ordered = sorted(values)
+        count = sum(statuses.values()) + sum(errors.values())
+        failed = count - len(ordered)
+        return {
+            "count": count,
+            "failed": failed,
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            "errors": dict(errors),
+        }
+
+    def build_report(self, scenario: str, elapsed: float, settings: dict) -> dict:
+        steps = {
+            name: self._step_stats(self.latencies[name], self.statuses[name], self.errors[name], elapsed)
+            for name in sorted(set(self.statuses) | set(self.errors))
+        }
+        all_values: List[float] = [v for values in self.latencies.values() for v in values]
+        total = self._step_stats(
+            all_values,
+            sum(self.statuses.values(), Counter()),
+            sum(self.errors.values(), Counter()),
+            elapsed,
+        )
+        return {
+            "scenario": scenario,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_seconds": round(elapsed, 3),
+            "settings": settings,
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "total": total,
+            "steps": steps,
+        }
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float = 0.10) -> List[dict]:
+    """Comparar p95/p99 y throughput paso a paso.
+
+    Devuelve una fila por paso con los deltas relativos y ``regression=True``
+    cuando la latencia empeora o el throughput cae más que ``tolerance``.
+    """
+    rows = []
+    names = sorted(set(current["steps"]) | set(baseline["steps"]))
+    for name in names + ["TOTAL"]:
+        now = current["total"] if name == "TOTAL" else current["steps"].get(name)
+        base = baseline["total"] if name == "TOTAL" else baseline["steps"].get(name)
+        if now is None or base is None:
+            rows.append({"step": name, "missing": "current" if now is None else "baseline", "regression": False})
+            continue
+
+        row = {"step": name, "regression": False}
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            delta = _relative(now[metric], base[metric])
+            row[metric] = now[metric]
+            row[f"{metric}_delta"] = delta
+            if metric != "p50_ms" and delta is not None and delta > tolerance:
+                row["regression"] = True
+        delta = _relative(now["throughput_rps"], base["throughput_rps"])
+        row["throughput_rps"] = now["throughput_rps"]
+        row["throughput_rps_delta"] = delta
+        if delta is not None and delta < -tolerance:
+            row["regression"] = True
+        rows.append(row)
+    return rows
+
+
+def _relative(now: float, base: float) -> Optional[float]:
+    if not base:
+        return None
+    return round((now - base) / base, 4)
+
+
+def _fmt_delta(delta: Optional[float]) -> str:
+    return "   n/a" if delta is None else f"{delta * 100:+6.1f}%"
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Escenario: {report['scenario']}  ({report['elapsed_seconds']}s)",
+        f"{'paso':<28}{'n':>8}{'fallos':>8}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}",
+    ]
+    for name, stats in list(report["steps"].items()) + [("TOTAL", report["total"])]:
+        lines.append(
+            f"{name:<28}{stats['count']:>8}{stats['failed']:>8}{stats['throughput_rps']:>10}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[dict]) -> str:
+    lines = [f"{'paso':<28}{'p95 ms':>10}{'Δp95':>9}{'p99 ms':>10}{'Δp99':>9}{'rps':>10}{'Δrps':>9}"]
+    for row in rows:
+        if "missing" in row:
+            lines.append(f"{row['step']:<28}  (sin datos en {row['missing']})")
+            continue
+        flag = "  ⚠️ regresión" if row["regression"] else ""
+        lines.append(
+            f"{row['step']:<28}{row['p95_ms']:>10}{_fmt_delta(row['p95_ms_delta']):>9}"
+            f"{row['p99_ms']:>10}{_fmt_delta(row['p99_ms_delta']):>9}"
+            f"{row['throughput_rps']:>10}{_fmt_delta(row['throughput_rps_delta']):>9}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_report(report: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
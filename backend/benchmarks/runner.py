@@ -0,0 +1,98 @@
+"""Ejecución de escenarios con usuarios virtuales concurrentes"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from benchmarks.report import Recorder
+from benchmarks.scenarios import SCENARIOS, TokenCache, VirtualUser
+
+
+@asynccontextmanager
+async def _build_client(base_url: Optional[str], timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    """Cliente contra un servidor vivo o, sin ``base_url``, contra la app en proceso
+
+    En proceso se ejecuta el lifespan de la app (comprobación del esquema,
+    bus, cola de escrituras, tareas de fondo), como en un worker real, y se
+    desactiva el rate limiting; contra un servidor vivo se aplican los límites
+    que tenga configurados.
+    """
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+            yield client
+        return
+
+    from app.core.config import settings
+    from app.main import app
+
+    # Todos los usuarios virtuales llegan desde la misma IP del transporte: con
+    # el limitador activo casi todo serían 429 en lugar de trabajo medido
+    settings.RATE_LIMIT_ENABLED = False
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout) as client:
+            yield client
+
+
+async def _drive(vu: VirtualUser, scenario, deadline: float, max_iterations: Optional[int]) -> int:
+    iterations = 0
+    while time.perf_counter() < deadline:
+        if max_iterations is not None and iterations >= max_iterations:
+            break
+        await scenario(vu)
+        iterations += 1
+    return iterations
+
+
+async def run_scenario(
+    name: str,
+    manifest: dict,
+    base_url: Optional[str] = None,
+    duration: float = 30.0,
+    concurrency: int = 10,
+    warmup: float = 5.0,
+    iterations: Optional[int] = None,
+    seed: int = 1,
+    timeout: float = 30.0,
+) -> dict:
+    """Ejecutar ``name`` y devolver el informe de latencias/throughput"""
+    scenario = SCENARIOS[name]
+    rng = random.Random(seed)
+    users = manifest["counts"]["users"]
+    indexes = rng.sample(range(users), min(concurrency, users))
+    tokens = TokenCache(manifest["password"])
+
+    async with _build_client(base_url, timeout) as client:
+        # Calentamiento: logins y primeras iteraciones fuera de la medición
+        warmup_recorder = Recorder()
+        vus = [
+            VirtualUser(i, client, warmup_recorder, manifest, tokens, random.Random(f"{seed}:{i}"))
+            for i in indexes
+        ]
+        await asyncio.gather(*(tokens.token_for(vu, vu.index) for vu in vus))
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(_drive(vu, scenario, deadline, None) for vu in vus))
+
+        recorder = Recorder()
+        for vu in vus:
+            vu.recorder = recorder
+
+        started = time.perf_counter()
+        deadline = started + duration
+        done = await asyncio.gather(*(_drive(vu, scenario, deadline, iterations) for vu in vus))
+        elapsed = time.perf_counter() - started
+
+    return recorder.build_report(name, elapsed, {
+        "mode": "live" if base_url else "in-process",
+        "base_url": base_url,
+        "duration": duration,
+        "concurrency": len(vus),
+        "warmup": warmup,
+        "iterations": sum(done),
+        "seed": seed,
+        "dataset": manifest["counts"],
+    })
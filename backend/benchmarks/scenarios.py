@@ -0,0 +1,177 @@
+"""Perfiles de carga por escenario.
+
+Cada escenario es una corrutina que ejecuta una "iteración" de un usuario
+virtual: una secuencia corta de peticiones que imita un uso real de la
+aplicación. Las peticiones se cronometran con ``VirtualUser.request`` bajo un
+nombre de paso estable (``items.search``, ``feed.like``...), que es la clave
+con la que se comparan los informes.
+"""
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.datagen import WORDS, bench_email, entity_id, item_available
+from benchmarks.report import Recorder
+
+API = "/api/v1"
+
+
+class TokenCache:
+    """Tokens de acceso por índice de usuario, compartidos entre usuarios virtuales"""
+
+    def __init__(self, password: str):
+        self.password = password
+        self._tokens: Dict[int, str] = {}
+
+    async def token_for(self, vu: "VirtualUser", index: int) -> Optional[str]:
+        token = self._tokens.get(index)
+        if token is None:
+            response = await vu.request(
+                "auth.login", "POST", f"{API}/auth/login",
+                json={"email": bench_email(index), "password": self.password},
+                authenticated=False,
+            )
+            if response is None or response.status_code != 200:
+                return None
+            token = response.json()["tokens"]["access_token"]
+            self._tokens[index] = token
+        return token
+
+
+class VirtualUser:
+    """Usuario sintético que lanza peticiones cronometradas"""
+
+    def __init__(self, index: int, client: httpx.AsyncClient, recorder: Recorder, manifest: dict, tokens: TokenCache, rng: random.Random):
+        self.index = index
+        self.client = client
+        self.recorder = recorder
+        self.manifest = manifest
+        self.tokens = tokens
+        self.rng = rng
+        self.seed = manifest["spec"]["seed"]
+        self.counts = manifest["counts"]
+        self._own_items: Optional[List[int]] = None
+        self._next_own_item = 0
+
+    def id(self, kind: str, index: int) -> str:
+        return str(entity_id(kind, index, self.seed))
+
+    def random_index(self, count_key: str, exclude: Optional[int] = None) -> int:
+        total = self.counts[count_key]
+        value = self.rng.randrange(total)
+        if exclude is not None and value == exclude and total > 1:
+            value = (value + 1) % total
+        return value
+
+    def next_own_item(self) -> Optional[int]:
+        """Siguiente ítem disponible del propio usuario, rotando entre todos ellos"""
+        if self._own_items is None:
+            users, items = self.counts["users"], self.counts["items"]
+            self._own_items = [i for i in range(self.index, items, users) if item_available(i, self.seed)]
+        if not self._own_items:
+            return None
+        item = self._own_items[self._next_own_item % len(self._own_items)]
+        self._next_own_item += 1
+        return item
+
+    def random_available_item(self, attempts: int = 20) -> Optional[int]:
+        """Ítem disponible al azar de otro usuario"""
+        users = self.counts["users"]
+        for _ in range(attempts):
+            index = self.random_index("items")
+            if index % users != self.index and item_available(index, self.seed):
+                return index
+        return None
+
+    async def headers_for(self, index: int) -> Dict[str, str]:
+        token = await self.tokens.token_for(self, index)
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+    async def request(self, name: str, method: str, url: str, authenticated: bool = True, as_user: Optional[int] = None, **kwargs) -> Optional[httpx.Response]:
+        headers = kwargs.pop("headers", {})
+        if authenticated:
+            headers.update(await self.headers_for(self.index if as_user is None else as_user))
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except Exception as exc:  # errores de red o excepciones no controladas de la app en modo in-process
+            self.recorder.record(name, time.perf_counter() - started, None, error=type(exc).__name__)
+            return None
+        self.recorder.record(name, time.perf_counter() - started, response.status_code)
+        return response
+
+
+async def browse_search(vu: VirtualUser) -> None:
+    """Explorar el catálogo: búsqueda, filtro por categoría y detalle de ítem"""
+    await vu.request("items.search", "GET", f"{API}/items/", authenticated=False, params={
+        "query": vu.rng.choice(WORDS),
+        "page": vu.rng.randint(1, 5),
+    })
+    await vu.request("categories.list", "GET", f"{API}/categories/", authenticated=False)
+    await vu.request("items.by_category", "GET", f"{API}/items/", authenticated=False, params={
+        "category_id": vu.id("category", vu.random_index("categories")),
+    })
+    await vu.request("items.detail", "GET", f"{API}/items/{vu.id('item', vu.random_index('items'))}", authenticated=False)
+
+
+async def inbox(vu: VirtualUser) -> None:
+    """Bandeja de mensajes: conversaciones, hilo y envío de respuesta"""
+    await vu.request("messages.conversations", "GET", f"{API}/messages/conversations")
+    partner = vu.random_index("users", exclude=vu.index)
+    await vu.request("messages.thread", "GET", f"{API}/messages/conversation/{vu.id('user', partner)}")
+    if vu.rng.random() < 0.3:
+        await vu.request("messages.send", "POST", f"{API}/messages/send", json={
+            "receiver_id": vu.id("user", partner),
+            "content": "Mensaje de benchmark",
+        })
+    await vu.request("notifications.list", "GET", f"{API}/notifications/")
+
+
+async def exchange_lifecycle(vu: VirtualUser) -> None:
+    """Ciclo de vida de un intercambio entre el usuario virtual y otro usuario"""
+    offered = vu.next_own_item()
+    requested = vu.random_available_item()
+    if offered is None or requested is None:
+        return
+    owner = requested % vu.counts["users"]
+
+    response = await vu.request("exchanges.create", "POST", f"{API}/exchanges/", json={
+        "requester_item_id": vu.id("item", offered),
+        "owner_item_id": vu.id("item", requested),
+        "message": "Propuesta de benchmark",
+    })
+    if response is None or response.status_code >= 400:
+        return
+    exchange_id = response.json().get("id")
+    if not exchange_id:
+        return
+
+    await vu.request("exchanges.detail", "GET", f"{API}/exchanges/{exchange_id}")
+    await vu.request("exchanges.accept", "POST", f"{API}/exchanges/{exchange_id}/accept", as_user=owner)
+    await vu.request("exchanges.timeline", "GET", f"{API}/exchanges/{exchange_id}/timeline")
+    await vu.request("exchanges.list", "GET", f"{API}/exchanges/")
+    await vu.request("exchanges.cancel", "POST", f"{API}/exchanges/{exchange_id}/cancel", json={"reason": "Cancelado por el benchmark"})
+
+
+async def feed(vu: VirtualUser) -> None:
+    """Feed de comunidad: lectura paginada, likes, comentarios y compartidos"""
+    await vu.request("feed.list", "GET", f"{API}/community/feed", params={"page": vu.rng.randint(1, 5)})
+    post_id = vu.id("feed_post", vu.random_index("feed_posts"))
+    await vu.request("feed.like", "POST", f"{API}/community/feed/{post_id}/like")
+    await vu.request("feed.comments", "GET", f"{API}/community/feed/{post_id}/comments")
+    roll = vu.rng.random()
+    if roll < 0.2:
+        await vu.request("feed.comment", "POST", f"{API}/community/feed/{post_id}/comments", json={"content": "Comentario de benchmark"})
+    elif roll < 0.3:
+        await vu.request("feed.share", "POST", f"{API}/community/feed/{post_id}/share")
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], Awaitable[None]]] = {
+    "browse": browse_search,
+    "inbox": inbox,
+    "exchange": exchange_lifecycle,
+    "feed": feed,
+}
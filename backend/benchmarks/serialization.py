@@ -0,0 +1,245 @@
+"""Coste de CPU de serializar una página de listado.
+
+Compara, para las mismas filas SQL sintéticas, el camino anterior de los
+listados (modelos validados fila a fila, revalidación contra ``response_model``
+en FastAPI y ``JSONResponse``) con el actual (diccionarios construidos desde
+las tuplas y ``TrustedJSONResponse``). Antes de medir se comprueba que ambos
+caminos producen exactamente el mismo JSON. No necesita base de datos.
+"""
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.responses import TrustedJSONResponse
+from app.models.item import ItemCondition, ItemStatus
+from app.models.message import MessageType
+from app.schemas.community import ActorType, FeedAuthor, FeedPost, FeedPostList, MediaType, PostType
+from app.schemas.item import ItemListItem, ItemSearchResponse
+from app.schemas.message import ConversationListResponse, ConversationResponse, MessageListItem
+from benchmarks.datagen import WORDS
+
+_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+# Filas con la forma que devuelven las consultas de los endpoints
+
+def item_rows(rng: random.Random, count: int) -> List[tuple]:
+    return [
+        (
+            uuid.UUID(int=rng.getrandbits(128)), _text(rng, 4), rng.choice(list(ItemCondition)),
+            round(rng.uniform(5, 500), 2), ItemStatus.AVAILABLE, rng.randint(0, 500), rng.randint(0, 50),
+            _NOW - timedelta(minutes=i), f"user{i}", round(rng.uniform(0, 5), 2), "Bogotá", "Cundinamarca",
+            "Libros", "📚", "#2E7D32", f"/uploads/items/{i}.jpg",
+        )
+        for i in range(count)
+    ]
+
+
+def feed_rows(rng: random.Random, count: int) -> List[tuple]:
+    return [
+        (
+            str(uuid.UUID(int=rng.getrandbits(128))), _text(rng, 5), _text(rng, 60),
+            rng.choice(["general", "tip", "success_story"]), "image", f"/uploads/feed/{i}.jpg",
+            rng.randint(0, 300), rng.randint(0, 40), rng.randint(0, 10), _NOW - timedelta(minutes=i),
+            str(uuid.UUID(int=rng.getrandbits(128))), f"Nombre {i}", f"user{i}", None, "Medellín, Antioquia",
+            rng.random() < 0.3,
+        )
+        for i in range(count)
+    ]
+
+
+def conversation_rows(rng: random.Random, count: int) -> List[tuple]:
+    return [
+        (
+            uuid.UUID(int=rng.getrandbits(128)), f"Nombre {i}", f"user{i}", None,
+            uuid.UUID(int=rng.getrandbits(128)), _text(rng, 20), MessageType.TEXT,
+            uuid.UUID(int=rng.getrandbits(128)), rng.random() < 0.5, _NOW - timedelta(minutes=i),
+            rng.randint(1, 200), rng.randint(0, 5),
+        )
+        for i in range(count)
+    ]
+
+
+# Camino anterior: validación por fila y de nuevo contra response_model
+
+_RESPONSE_FIELDS: Dict[type, object] = {}
+
+
+def _validated_response(response_model, content) -> bytes:
+    field = _RESPONSE_FIELDS.get(response_model)
+    if field is None:
+        field = _RESPONSE_FIELDS[response_model] = create_response_field(name="response", type_=response_model)
+    # serialize_response no espera nada para estos modelos: se avanza la corrutina sin bucle de eventos
+    coroutine = serialize_response(field=field, response_content=content, is_coroutine=True)
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return JSONResponse(done.value).body
+    raise RuntimeError("serialize_response quedó a la espera")
+
+
+def items_validated(rows: List[tuple]) -> bytes:
+    items = [
+        ItemListItem(
+            id=r[0], title=r[1], condition=r[2], estimated_value=r[3], city=r[10], state=r[11],
+            status=r[4], view_count=r[5], interest_count=r[6], created_at=r[7], primary_image_url=r[15],
+            owner_username=r[8], owner_rating=r[9], category_name=r[12], category_icon=r[13],
+            category_color=r[14], condition_display=r[2].value.replace("_", " ").title(),
+            status_display=r[4].value.replace("_", " ").title(),
+        )
+        for r in rows
+    ]
+    response = ItemSearchResponse(
+        items=items, total=len(items), page=1, page_size=len(items), total_pages=1,
+        has_next=False, has_prev=False, search_params={},
+    )
+    return _validated_response(ItemSearchResponse, response)
+
+
+def feed_validated(rows: List[tuple]) -> bytes:
+    posts = [
+        FeedPost(
+            id=r[0], title=r[1], content=r[2], post_type=r[3], media_type=r[4], media_url=r[5],
+            author=FeedAuthor(id=r[10], actor_type=ActorType.user, name=r[11], username=r[12],
+                              avatar=r[13] or "/api/placeholder/48/48", location=r[14]),
+            likes_count=r[6], comments_count=r[7], shares_count=r[8], created_at=r[9], is_liked=r[15],
+        )
+        for r in rows
+    ]
+    response = FeedPostList(posts=posts, total=len(posts), page=1, page_size=len(posts),
+                            total_pages=1, has_next=False, has_prev=False)
+    return _validated_response(FeedPostList, response)
+
+
+def conversations_validated(rows: List[tuple]) -> bytes:
+    conversations = [
+        ConversationResponse(
+            conversation_id=str(r[0]),
+            other_user={"id": r[0], "name": r[1], "username": r[2], "avatar": r[3], "is_online": False},
+            last_message=MessageListItem(
+                id=r[4], content=r[5], message_type=r[6], sender_id=r[7], sender_username=r[2],
+                sender_avatar=r[3], is_read=r[8], created_at=r[9],
+            ),
+            total_messages=r[10], unread_count=r[11], created_at=r[9], updated_at=r[9],
+        )
+        for r in rows
+    ]
+    response = ConversationListResponse(conversations=conversations, total=len(conversations),
+                                        unread_conversations=0, total_unread_messages=0)
+    return _validated_response(ConversationListResponse, response)
+
+
+# Camino actual: diccionarios construidos directamente desde las tuplas
+
+_CONDITION_DISPLAY = {c: c.value.replace("_", " ").title() for c in ItemCondition}
+_STATUS_DISPLAY = {s: s.value.replace("_", " ").title() for s in ItemStatus}
+_POST_TYPES = {t.value: t for t in PostType}
+
+
+def items_trusted(rows: List[tuple]) -> bytes:
+    items = [
+        {
+            "id": r[0], "title": r[1], "condition": r[2], "estimated_value": Decimal(str(r[3])),
+            "city": r[10], "state": r[11], "status": r[4], "view_count": r[5], "interest_count": r[6],
+            "created_at": r[7], "primary_image_url": r[15], "owner_username": r[8], "owner_rating": r[9],
+            "category_name": r[12], "category_icon": r[13], "category_color": r[14], "distance_km": None,
+            "condition_display": _CONDITION_DISPLAY[r[2]], "status_display": _STATUS_DISPLAY[r[4]],
+        }
+        for r in rows
+    ]
+    return TrustedJSONResponse({
+        "items": items, "total": len(items), "page": 1, "page_size": len(items), "total_pages": 1,
+        "has_next": False, "has_prev": False, "search_params": {}, "suggested_categories": [], "nearby_cities": [],
+    }).body
+
+
+def feed_trusted(rows: List[tuple]) -> bytes:
+    posts = [
+        {
+            "id": r[0], "title": r[1], "content": r[2], "post_type": _POST_TYPES[r[3]],
+            "media_type": MediaType.image, "media_url": r[5],
+            "author": {"id": r[10], "actor_type": ActorType.user, "name": r[11], "username": r[12],
+                       "avatar": r[13] or "/api/placeholder/48/48", "location": r[14]},
+            "likes_count": r[6], "comments_count": r[7], "shares_count": r[8], "created_at": r[9],
+            "is_liked": r[15],
+        }
+        for r in rows
+    ]
+    return TrustedJSONResponse({
+        "posts": posts, "total": len(posts), "page": 1, "page_size": len(posts),
+        "total_pages": 1, "has_next": False, "has_prev": False,
+    }).body
+
+
+def conversations_trusted(rows: List[tuple]) -> bytes:
+    conversations = [
+        {
+            "conversation_id": str(r[0]),
+            "other_user": {"id": r[0], "name": r[1], "username": r[2], "avatar": r[3], "is_online": False},
+            "exchange": None,
+            "last_message": {
+                "id": r[4], "content": r[5], "message_type": r[6], "sender_id": r[7], "sender_username": r[2],
+                "sender_avatar": r[3], "is_read": r[8], "created_at": r[9], "reply_to_content": None,
+            },
+            "total_messages": r[10], "unread_count": r[11], "created_at": r[9], "updated_at": r[9],
+        }
+        for r in rows
+    ]
+    return TrustedJSONResponse({
+        "conversations": conversations, "total": len(conversations),
+        "unread_conversations": 0, "total_unread_messages": 0,
+    }).body
+
+
+CASES: Dict[str, tuple] = {
+    "items": (item_rows, items_validated, items_trusted),
+    "feed": (feed_rows, feed_validated, feed_trusted),
+    "conversations": (conversation_rows, conversations_validated, conversations_trusted),
+}
+
+
+def _cpu_ms(build: Callable[[List[tuple]], bytes], rows: List[tuple], iterations: int) -> float:
+    build(rows)  # calentamiento
+    started = time.process_time()
+    for _ in range(iterations):
+        build(rows)
+    return (time.process_time() - started) * 1000 / iterations
+
+
+def run_serialization(rows: int = 100, iterations: int = 200, seed: int = 42) -> List[dict]:
+    """CPU (ms) por página de ``rows`` filas en cada camino, por endpoint"""
+    results = []
+    for name, (make_rows, validated, trusted) in CASES.items():
+        data = make_rows(random.Random(seed), rows)
+        if validated(data) != trusted(data):
+            raise AssertionError(f"{name}: el camino rápido no produce el mismo JSON")
+        before = _cpu_ms(validated, data, iterations)
+        after = _cpu_ms(trusted, data, iterations)
+        results.append({
+            "case": name,
+            "rows": rows,
+            "before_ms": round(before, 3),
+            "after_ms": round(after, 3),
+            "speedup": round(before / after, 2) if after else None,
+        })
+    return results
+
+
+def format_serialization(results: List[dict]) -> str:
+    lines = [f"{'caso':<15}{'filas':>7}{'antes ms':>11}{'ahora ms':>11}{'mejora':>9}"]
+    for r in results:
+        lines.append(
+            f"{r['case']:<15}{r['rows']:>7}{r['before_ms']:>11.3f}{r['after_ms']:>11.3f}{r['speedup']:>8.2f}x"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,135 @@
+"""SQLite: conexión única compartida frente al perfil WAL de ``app.core.sqlite``.
+
+Cada perfil trabaja sobre su propio fichero temporal con las mismas tablas:
+
+- ``compartida``: lo que había antes, ``StaticPool`` (todas las corrutinas
+  por una conexión) y el journal por defecto; un ``commit`` por escritura.
+- ``wal``: WAL, pool de lectores, conexión de escritura con ``BEGIN
+  IMMEDIATE`` y las escrituras pequeñas por la cola de escrituras.
+
+Mide lecturas concurrentes (una consulta de agregación con filtro por
+petición), escrituras pequeñas concurrentes (incrementar un contador) y una
+carga mixta (una escritura de cada cuatro operaciones). Las lecturas en
+paralelo necesitan más de un núcleo para notarse.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import create_engine_for
+from app.core.sqlite import SQLiteSession
+from app.core.write_queue import WriteQueue
+from benchmarks.report import percentile
+
+_metadata = MetaData()
+
+_rows = Table(
+    "bench_sqlite_rows", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", String(200), nullable=False),
+    Column("views", Integer, nullable=False),
+)
+
+PROFILES = ("compartida", "wal")
+
+
+def _engines(profile: str, url: str):
+    """(engines a cerrar, sessionmaker) del perfil"""
+    if profile == "compartida":
+        engine = create_async_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        return [engine], async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    writer = create_engine_for(url, writer=True)
+    reader = create_engine_for(url)
+    sessions = async_sessionmaker(
+        writer, class_=AsyncSession, sync_session_class=SQLiteSession,
+        reader=reader.sync_engine, expire_on_commit=False,
+    )
+    return [writer, reader], sessions
+
+
+async def _timed(operation, total: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    queue = iter(range(total))
+
+    async def worker():
+        for index in queue:
+            started = time.perf_counter()
+            await operation(index)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "ops": len(ordered),
+        "throughput_ops": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+    }
+
+
+async def _run_profile(profile: str, path: str, rows: int, reads: int, writes: int, concurrency: int) -> List[dict]:
+    url = f"sqlite+aiosqlite:///{path}"
+    engines, sessions = _engines(profile, url)
+    queue = WriteQueue(sessions, enabled=profile == "wal")
+    try:
+        async with engines[0].begin() as conn:
+            await conn.run_sync(_metadata.create_all)
+            await conn.execute(insert(_rows), [
+                {"id": i, "title": f"Artículo de prueba {i} {'bicicleta' if i % 7 == 0 else 'libro'}", "views": 0}
+                for i in range(rows)
+            ])
+
+        async def read(index: int) -> None:
+            async with sessions() as db:
+                await db.execute(
+                    select(func.count(), func.sum(_rows.c.views))
+                    .where(_rows.c.title.like(f"%{index % 10}%bicicleta%"))
+                )
+
+        async def bump(db: AsyncSession, row_id: int) -> None:
+            await db.execute(update(_rows).where(_rows.c.id == row_id).values(views=_rows.c.views + 1))
+
+        async def write(index: int) -> None:
+            await queue.submit(lambda db: bump(db, index % rows))
+
+        async def mixed(index: int) -> None:
+            # Una de cada cuatro operaciones escribe
+            await (write(index) if index % 4 == 0 else read(index))
+
+        queue.start()
+        results = []
+        for kind, operation, total in (("lectura", read, reads), ("escritura", write, writes), ("mixta", mixed, reads)):
+            await _timed(operation, min(total, concurrency * 2), concurrency)  # calentamiento
+            results.append({"profile": profile, "kind": kind, **await _timed(operation, total, concurrency)})
+        await queue.stop()
+        return results
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+
+async def run_sqlite_profile(rows: int = 20000, reads: int = 500, writes: int = 2000, concurrency: int = 20) -> List[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in PROFILES:
+            path = os.path.join(directory, f"{profile}.db")
+            results.extend(await _run_profile(profile, path, rows, reads, writes, concurrency))
+    return results
+
+
+def format_sqlite_profile(results: List[dict]) -> str:
+    lines = [f"{'perfil':<12}{'carga':<11}{'ops':>7}{'ops/s':>10}{'p50 ms':>9}{'p95 ms':>9}"]
+    for r in results:
+        lines.append(
+            f"{r['profile']:<12}{r['kind']:<11}{r['ops']:>7}{r['throughput_ops']:>10.1f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
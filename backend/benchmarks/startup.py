@@ -0,0 +1,100 @@
+"""Tiempo de arranque de un worker: importar la aplicación y ejecutar su lifespan.
+
+Cada medición es un proceso nuevo, como un worker recién lanzado, con
+``-X importtime``. Mide la importación de la aplicación, el arranque del
+lifespan hasta que acepta peticiones y la parada. También reparte el tiempo
+de importación por paquete (suma de tiempos propios), para ver qué
+dependencias pesan al arrancar.
+
+La base de datos es la de DATABASE_URL: el arranque incluye la comprobación
+de la versión del esquema (``app.core.schema``).
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.report import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+_CHILD = """
+import asyncio, importlib, json, sys, time
+started = time.perf_counter()
+module_name, _, attribute = sys.argv[1].partition(":")
+app = getattr(importlib.import_module(module_name), attribute or "app")
+imported = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+    return ready, time.perf_counter()
+
+ready, stopped = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "boot_ms": (ready - imported) * 1000,
+    "shutdown_ms": (stopped - ready) * 1000,
+}))
+"""
+
+
+def _import_times(stderr: str) -> Dict[str, float]:
+    """Milisegundos propios de importación por paquete de primer nivel"""
+    totals: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            own, _, name = line[len("import time:"):].split("|")
+            own_us = int(own)
+        except ValueError:
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] += own_us / 1000
+    return dict(totals)
+
+
+def measure_once(app: str) -> dict:
+    """Un arranque en un proceso nuevo"""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(BACKEND_DIR), os.environ.get("PYTHONPATH")]))}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, app],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if completed.returncode != 0 or not lines:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("El arranque falló:\n" + "\n".join(errors[-15:]))
+    return {**json.loads(lines[-1]), "packages": _import_times(completed.stderr)}
+
+
+def run_startup(app: str = "app.main:app", runs: int = 5) -> dict:
+    samples = [measure_once(app) for _ in range(runs)]
+    summary = {"app": app, "runs": runs}
+    for key in ("import_ms", "boot_ms", "shutdown_ms"):
+        ordered = sorted(sample[key] for sample in samples)
+        summary[key] = {"p50": round(percentile(ordered, 50), 1), "max": round(ordered[-1], 1)}
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for sample in samples:
+        for package, ms in sample["packages"].items():
+            packages[package].append(ms)
+    summary["packages"] = sorted(
+        ((package, round(sum(times) / runs, 1)) for package, times in packages.items()),
+        key=lambda item: item[1], reverse=True,
+    )
+    return summary
+
+
+def format_startup(summary: dict, top: int = 15) -> str:
+    lines = [f"{summary['app']} ({summary['runs']} arranques)", f"{'fase':<14}{'p50 ms':>9}{'max ms':>9}"]
+    for key, label in (("import_ms", "importación"), ("boot_ms", "arranque"), ("shutdown_ms", "parada")):
+        lines.append(f"{label:<14}{summary[key]['p50']:>9.1f}{summary[key]['max']:>9.1f}")
+    lines.append("")
+    lines.append(f"{'paquete':<24}{'ms':>8}")
+    for package, ms in summary["packages"][:top]:
+        lines.append(f"{package:<24}{ms:>8.1f}")
+    return "\n".join(lines)
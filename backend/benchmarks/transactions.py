@@ -0,0 +1,122 @@
+"""Rendimiento de escrituras según cuántas veces se confirma por petición.
+
+Reproduce la forma de los endpoints de escritura (p. ej. ``create_exchange``
+o ``create_rating``): insertar un registro, insertar otro que depende de él y
+ajustar un contador compartido. Se ejecuta en dos modos sobre las mismas
+tablas temporales:
+
+- ``por_paso``: un ``commit`` tras cada paso (3 por operación), como hacían
+  los endpoints antes de ``get_uow``.
+- ``unidad``: ``flush`` entre pasos y un único ``commit`` al final, como con
+  la dependencia ``get_uow``.
+
+Las tablas (``bench_tx_*``) se crean al empezar y se eliminan al terminar;
+no toca los datos de la aplicación.
+"""
+import asyncio
+import time
+import uuid
+from typing import List
+
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table, insert, update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import create_engine_for
+from benchmarks.report import percentile
+
+_metadata = MetaData()
+
+_parents = Table(
+    "bench_tx_parents", _metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("title", String(200), nullable=False),
+)
+_children = Table(
+    "bench_tx_children", _metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("parent_id", UUID(as_uuid=True), ForeignKey("bench_tx_parents.id"), nullable=False),
+    Column("content", String(500), nullable=False),
+)
+_counters = Table(
+    "bench_tx_counters", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+MODES = {"por_paso": 3, "unidad": 1}  # modo -> commits por operación
+
+
+async def _operation(db: AsyncSession, mode: str, counter_id: int) -> None:
+    per_step = mode == "por_paso"
+    parent_id = uuid.uuid4()
+    await db.execute(insert(_parents).values(id=parent_id, title="Intercambio de prueba"))
+    if per_step:
+        await db.commit()
+    await db.execute(insert(_children).values(id=uuid.uuid4(), parent_id=parent_id, content="Mensaje inicial"))
+    if per_step:
+        await db.commit()
+    await db.execute(update(_counters).where(_counters.c.id == counter_id).values(value=_counters.c.value + 1))
+    await db.commit()
+
+
+async def _run_mode(sessions: async_sessionmaker, mode: str, operations: int, concurrency: int, counters: int) -> dict:
+    latencies: List[float] = []
+    queue = iter(range(operations))
+
+    async def worker():
+        async with sessions() as db:
+            for index in queue:
+                started = time.perf_counter()
+                await _operation(db, mode, index % counters)
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "mode": mode,
+        "commits_per_op": MODES[mode],
+        "operations": len(ordered),
+        "throughput_ops": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+    }
+
+
+async def run_transactions(url: str, operations: int = 2000, concurrency: int = 10, counters: int = 10) -> List[dict]:
+    """Operaciones por segundo y latencias de cada modo contra la BD de ``url``"""
+    if "sqlite" in url:
+        # Una conexión por sesión (el engine de la app comparte una sola en SQLite)
+        engine = create_async_engine(url, connect_args={"timeout": 30})
+    else:
+        engine = create_engine_for(url)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(_metadata.drop_all)
+            await conn.run_sync(_metadata.create_all)
+            await conn.execute(insert(_counters), [{"id": i, "value": 0} for i in range(counters)])
+        results = []
+        for mode in MODES:
+            # Calentamiento: conexiones abiertas y sentencias preparadas
+            await _run_mode(sessions, mode, min(operations, concurrency * 5), concurrency, counters)
+            results.append(await _run_mode(sessions, mode, operations, concurrency, counters))
+        return results
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(_metadata.drop_all)
+        await engine.dispose()
+
+
+def format_transactions(results: List[dict]) -> str:
+    lines = [f"{'modo':<10}{'commits/op':>11}{'ops':>8}{'ops/s':>10}{'p50 ms':>9}{'p95 ms':>9}"]
+    for r in results:
+        lines.append(
+            f"{r['mode']:<10}{r['commits_per_op']:>11}{r['operations']:>8}{r['throughput_ops']:>10.1f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+        )
+    if len(results) == 2 and results[0]["throughput_ops"]:
+        lines.append(f"mejora: {results[1]['throughput_ops'] / results[0]['throughput_ops']:.2f}x")
+    return "\n".join(lines)
@@ -0,0 +1,182 @@
+"""
+Importación, exportación y limpieza masiva de datos.
+
+Ejemplos (desde backend/):
+    python bulk_data.py tables
+    python bulk_data.py import users:datos/users.ndjson items:datos/items.csv.gz --truncate
+    python bulk_data.py export items salida/items.ndjson
+    python bulk_data.py truncate users items
+    python bulk_data.py truncate --all
+
+Las importaciones de varios ficheros se ejecutan en una sola transacción y en
+orden de dependencias (primero las tablas referenciadas).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.services import category_counts, rating_summary
+from app.utils.bulk import (
+    FORMATS,
+    BulkDataError,
+    bulk_insert,
+    dependency_order,
+    detect_format,
+    export_table,
+    get_table,
+    open_text,
+    read_rows,
+    sqlite_fast_path,
+    truncate_tables,
+    with_dependents,
+)
+
+
+def _parse_sources(specs):
+    sources = []
+    for spec in specs:
+        table_name, sep, path = spec.partition(":")
+        if not sep or not path:
+            raise BulkDataError(f"Formato esperado tabla:ruta, recibido '{spec}'")
+        sources.append((get_table(table_name), path))
+    order = {table: i for i, table in enumerate(dependency_order())}
+    return sorted(sources, key=lambda source: order[source[0]])
+
+
+async def import_data(engine, args) -> None:
+    sources = _parse_sources(args.sources)
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await sqlite_fast_path(conn)
+        if args.truncate:
+            names = await truncate_tables(conn, [table for table, _ in sources])
+            print(f"🧹 Tablas vaciadas: {', '.join(names)}")
+
+        for table, path in sources:
+            fmt = args.format or detect_format(path)
+            table_started = time.perf_counter()
+            with open_text(path) as fh:
+                total = await bulk_insert(
+                    conn,
+                    table,
+                    read_rows(fh, fmt),
+                    batch_size=args.batch_size,
+                    use_copy=not args.no_copy,
+                )
+            elapsed = time.perf_counter() - table_started
+            rate = total / elapsed if elapsed else 0
+            print(f"📥 {table.name}: {total:,} filas en {elapsed:.1f}s ({rate:,.0f} filas/s)")
+
+        if any(table.name == "ratings" for table, _ in sources):
+            # Los agregados de calificaciones no se mantienen en la importación directa
+            await rating_summary.rebuild(conn)
+            print("📊 Resumen de calificaciones recalculado")
+
+        if any(table.name in ("items", "categories") for table, _ in sources):
+            # Tampoco los contadores de ítems por categoría
+            fixed = await category_counts.reconcile(conn)
+            print(f"🗂️  Contadores de ítems por categoría recalculados ({fixed} categorías corregidas)")
+
+    print(f"✅ Importación completada en {time.perf_counter() - started:.1f}s")
+
+
+async def export_data(engine, args) -> None:
+    table = get_table(args.table)
+    fmt = args.format or detect_format(args.path)
+    directory = os.path.dirname(args.path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        with open_text(args.path, "w") as fh:
+            total = await export_table(conn, table, fh, fmt, batch_size=args.batch_size)
+    print(f"📤 {table.name}: {total:,} filas exportadas a {args.path} en {time.perf_counter() - started:.1f}s")
+
+
+async def truncate_data(engine, args) -> None:
+    if args.all:
+        tables = dependency_order()
+    elif args.tables:
+        tables = [get_table(name) for name in args.tables]
+    else:
+        raise BulkDataError("Indique las tablas a vaciar o use --all")
+
+    affected = [t.name for t in with_dependents(tables)]
+    if not args.yes:
+        answer = input(f"Se vaciarán {len(affected)} tablas: {', '.join(affected)}. ¿Continuar? [s/N] ")
+        if answer.strip().lower() not in ("s", "si", "sí", "y", "yes"):
+            print("Operación cancelada")
+            return
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await sqlite_fast_path(conn)
+        names = await truncate_tables(conn, tables)
+    print(f"🧹 {len(names)} tablas vaciadas en {time.perf_counter() - started:.2f}s")
+
+
+def list_tables(args) -> None:
+    for table in dependency_order():
+        refs = sorted({fk.column.table.name for fk in table.foreign_keys})
+        suffix = f"  → {', '.join(refs)}" if refs else ""
+        print(f"{table.name}{suffix}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Carga y limpieza masiva de datos de GreenLoop")
+    parser.add_argument("--database-url", help="URL de la BD (por defecto DATABASE_URL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("tables", help="Listar tablas en orden de dependencias")
+
+    imp = sub.add_parser("import", help="Importar ficheros NDJSON/CSV")
+    imp.add_argument("sources", nargs="+", help="Pares tabla:ruta (admite .gz)")
+    imp.add_argument("--format", choices=FORMATS, help="Formato de todos los ficheros")
+    imp.add_argument("--batch-size", type=int, default=5000)
+    imp.add_argument("--truncate", action="store_true", help="Vaciar antes las tablas destino (y dependientes)")
+    imp.add_argument("--no-copy", action="store_true", help="Usar executemany también en PostgreSQL")
+
+    exp = sub.add_parser("export", help="Exportar una tabla a NDJSON/CSV")
+    exp.add_argument("table")
+    exp.add_argument("path", help="Fichero destino (.ndjson, .csv, opcionalmente .gz)")
+    exp.add_argument("--format", choices=FORMATS)
+    exp.add_argument("--batch-size", type=int, default=5000)
+
+    trunc = sub.add_parser("truncate", help="Vaciar tablas y sus dependientes")
+    trunc.add_argument("tables", nargs="*")
+    trunc.add_argument("--all", action="store_true")
+    trunc.add_argument("--yes", action="store_true", help="No pedir confirmación")
+
+    return parser
+
+
+async def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "tables":
+        list_tables(args)
+        return 0
+
+    engine = create_async_engine(args.database_url or settings.DATABASE_URL)
+    try:
+        if args.command == "import":
+            await import_data(engine, args)
+        elif args.command == "export":
+            await export_data(engine, args)
+        else:
+            await truncate_data(engine, args)
+    except BulkDataError as exc:
+        print(f"❌ {exc}")
+        return 1
+    finally:
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,6 +1,6 @@
 import asyncio
 import uuid
-from app.core.database import get_db
+from app.core.database import engine, get_db
 from app.models.user import User
 from app.models.item import Item
 from app.models.item_image import ItemImage
@@ -10,49 +10,39 @@ from app.models.notification import Notification
 from app.models.rating import Rating
 from app.models.user_session import UserSession
 from app.models.category import Category
-from sqlalchemy import select, delete
-from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.admin_user import AdminUser
+from app.services import rating_summary
+from app.utils.bulk import bulk_insert, sqlite_fast_path
+from sqlalchemy import select, delete, func
 
 async def clean_test_data():
     """
     Limpia todos los datos de prueba de la base de datos manteniendo:
     - La estructura de las tablas
+    - Las cuentas de administrador (admin_users y sus usuarios)
     - Las categorías básicas necesarias para el funcionamiento
+    
+    Sólo toca las tablas de datos de prueba: no vacía en cascada otras
+    tablas (comunidad, empresas, trabajos...).
     """
     print("🧹 Iniciando limpieza de datos de prueba...")
     
-    async for db in get_db():
+    async with engine.begin() as conn:
         try:
-            # 1. Eliminar en orden correcto para respetar las foreign keys
-            print("📝 Eliminando mensajes...")
-            await db.execute(delete(Message))
-            
-            print("🔔 Eliminando notificaciones...")
-            await db.execute(delete(Notification))
-            
-            print("⭐ Eliminando calificaciones...")
-            await db.execute(delete(Rating))
-            
-            print("🔄 Eliminando intercambios...")
-            await db.execute(delete(Exchange))
-            
-            print("🖼️ Eliminando imágenes de items...")
-            await db.execute(delete(ItemImage))
-            
-            print("📦 Eliminando items...")
-            await db.execute(delete(Item))
-            
-            print("🔐 Eliminando sesiones de usuario...")
-            await db.execute(delete(UserSession))
-            
-            print("👥 Eliminando usuarios...")
-            await db.execute(delete(User))
+            # 1. Eliminar en una sola transacción, en orden de foreign keys
+            await sqlite_fast_path(conn)
+            for table in (Message, Notification, Rating, Exchange, ItemImage, Item, UserSession):
+                await conn.execute(delete(table))
+            await conn.execute(delete(User).where(User.id.not_in(select(AdminUser.user_id))))
+            await conn.execute(delete(Category))
+            print("🗑️ Tablas vaciadas: messages, notifications, ratings, exchanges, item_images, items, user_sessions, categories")
+            print("👤 Usuarios eliminados salvo los administradores")
+            
+            # Los agregados de calificaciones se recalculan desde ratings (ya vacía)
+            await rating_summary.rebuild(conn)
             
             # 2. Mantener solo categorías esenciales
-            print("🏷️ Limpiando categorías y manteniendo solo las esenciales...")
-            
-            # Eliminar todas las categorías existentes
-            await db.execute(delete(Category))
+            print("🏷️ Recreando categorías esenciales...")
             
             # Crear categorías básicas esenciales
             essential_categories = [
@@ -138,16 +128,11 @@ async def clean_test_data():
                 }
             ]
             
-            for cat_data in essential_categories:
-                category = Category(**cat_data)
-                db.add(category)
-            
-            # 3. Confirmar todos los cambios
-            await db.commit()
+            await bulk_insert(conn, Category.__table__, essential_categories)
             
             print("✅ Limpieza completada exitosamente!")
             print("📊 Resumen:")
-            print("   - Todos los usuarios de prueba eliminados")
+            print("   - Todos los usuarios de prueba eliminados (se conservan los administradores)")
             print("   - Todos los items eliminados")
             print("   - Todos los intercambios eliminados")
             print("   - Todos los mensajes eliminados")
@@ -164,11 +149,9 @@ async def clean_test_data():
             print("   4. Probar toda la funcionalidad")
             
         except Exception as e:
+            # engine.begin() revierte la transacción al propagarse la excepción
             print(f"❌ Error durante la limpieza: {e}")
-            await db.rollback()
             raise
-        finally:
-            break
 
 async def verify_cleanup():
     """
@@ -179,29 +162,32 @@ async def verify_cleanup():
     async for db in get_db():
         try:
             # Contar registros en cada tabla
-            user_count = await db.execute(select(User.id))
-            users = len(user_count.fetchall())
+            user_count = await db.execute(select(func.count(User.id)))
+            users = user_count.scalar() or 0
+            
+            item_count = await db.execute(select(func.count(Item.id)))
+            items = item_count.scalar() or 0
             
-            item_count = await db.execute(select(Item.id))
-            items = len(item_count.fetchall())
+            exchange_count = await db.execute(select(func.count(Exchange.id)))
+            exchanges = exchange_count.scalar() or 0
             
-            exchange_count = await db.execute(select(Exchange.id))
-            exchanges = len(exchange_count.fetchall())
+            message_count = await db.execute(select(func.count(Message.id)))
+            messages = message_count.scalar() or 0
             
-            message_count = await db.execute(select(Message.id))
-            messages = len(message_count.fetchall())
+            category_count = await db.execute(select(func.count(Category.id)))
+            categories = category_count.scalar() or 0
             
-            category_count = await db.execute(select(Category.id))
-            categories = len(category_count.fetchall())
+            admin_count = await db.execute(select(func.count(AdminUser.id)))
+            admins = admin_count.scalar() or 0
             
             print(f"📊 Estado actual de la base de datos:")
-            print(f"   - Usuarios: {users}")
+            print(f"   - Usuarios: {users} ({admins} administradores)")
             print(f"   - Items: {items}")
             print(f"   - Intercambios: {exchanges}")
             print(f"   - Mensajes: {messages}")
             print(f"   - Categorías: {categories}")
             
-            if users == 0 and items == 0 and exchanges == 0 and messages == 0 and categories > 0:
+            if users == admins and items == 0 and exchanges == 0 and messages == 0 and categories > 0:
                 print("✅ Limpieza verificada correctamente!")
             else:
                 print("⚠️ La limpieza puede no haberse completado correctamente.")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Prueba de la paginación por cursor de los listados de administración en SQLite
+
+En SQLite las fechas son texto: ``server_default=func.now()`` guarda
+``2026-10-19 02:21:49`` y el cursor se enlaza como ``...49.000000``. Comprueba
+que recorrer el listado de usuarios (``app.services.moderation.USERS``) con
+``next_cursor`` devuelve cada fila una sola vez y termina:
+1. Crear en un fichero SQLite temporal más de PAGE_SIZE usuarios con la misma
+   fecha de alta (un único INSERT con la fecha por defecto del servidor)
+2. Añadir otros tantos con la fecha escrita por el driver (con microsegundos)
+3. Recorrer las páginas siguiendo next_cursor
+
+Uso (desde backend/, no necesita servidor)::
+
+    python test_admin_listing_cursor.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import User
+from app.services.moderation import USERS
+
+PAGE_SIZE = 3
+SAME_SECOND = 2 * PAGE_SIZE + 1
+
+def log_test(message: str, success: bool = True):
+    """Función para logging de pruebas"""
+    status = "✅" if success else "❌"
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] {status} {message}")
+
+def user_row(prefix: str, index: int, **extra) -> dict:
+    username = f"{prefix}_{index}"
+    return {
+        "username": username,
+        "email": f"{username}@example.com",
+        "hashed_password": "x",
+        "first_name": "Cursor",
+        "last_name": "Prueba",
+        **extra,
+    }
+
+async def walk(db: AsyncSession, limit_pages: int) -> list:
+    """Recorrer el listado siguiendo next_cursor; como mucho limit_pages páginas"""
+    seen, cursor = [], None
+    for _ in range(limit_pages):
+        page = await USERS.page(db, ["id"], USERS.conditions({}, cursor), PAGE_SIZE)
+        seen.extend(row["id"] for row in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+    log_test(f"El listado no termina tras {limit_pages} páginas", False)
+    return seen
+
+async def run(path: str) -> bool:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(User.__table__.create)
+            # Un solo INSERT: CURRENT_TIMESTAMP es el mismo para todas las filas
+            await conn.execute(insert(User).values([user_row("servidor", i) for i in range(SAME_SECOND)]))
+            driver_time = datetime.utcnow().replace(microsecond=0)
+            await conn.execute(insert(User).values([
+                user_row("driver", i, created_at=driver_time) for i in range(SAME_SECOND)
+            ]))
+
+        total = 2 * SAME_SECOND
+        async with AsyncSession(engine) as db:
+            seen = await walk(db, limit_pages=total)
+
+        checks = [
+            ("todas las filas", len(seen) == total),
+            ("ninguna repetida", len(set(seen)) == len(seen)),
+        ]
+        log_test(f"{len(seen)} filas en páginas de {PAGE_SIZE} ({len(set(seen))} distintas de {total})", all(p for _, p in checks))
+        for name, passed in checks:
+            log_test(f"Paginación por cursor: {name}", passed)
+        return all(passed for _, passed in checks)
+    finally:
+        await engine.dispose()
+
+def main():
+    print("📄 Prueba de la paginación por cursor en SQLite")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = asyncio.run(run(os.path.join(tmp, "listing.db")))
+
+    print("\n" + "=" * 60)
+    if not ok:
+        print("⚠️  El cursor repite filas o no termina con fechas iguales")
+        sys.exit(1)
+    print("🎉 El cursor recorre el listado sin repetir filas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Prueba de regresión de concurrencia contra un servidor de GreenLoop
+
+Lanza a la vez más peticiones autenticadas que conexiones tiene el pool de
+lectura de SQLite (SQLITE_READ_POOL_SIZE, 4 por defecto). Con dos sesiones
+por petición (la de autenticación y la del endpoint) o sin lectores extra
+para las sesiones internas, las peticiones se quedan esperando unas a otras
+hasta DB_POOL_TIMEOUT_SECONDS y fallan todas a la vez.
+
+Este script prueba, con N peticiones simultáneas (8 por defecto):
+1. GET /users/profile/stats (sesión de lectura, get_read_db)
+2. POST /exchanges/ (unidad de trabajo, get_uow)
+3. PUT /items/{id}/status (get_uow y recarga del árbol de categorías)
+
+Uso (el registro de N usuarios desde una IP supera el límite de "auth", así
+que el servidor se arranca sin rate limiting)::
+
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app
+    python test_concurrency.py [N]
+"""
+
+import sys
+import time
+import uuid
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional
+
+# Configuración
+BASE_URL = "http://localhost:8000/api/v1"
+HEADERS = {"Content-Type": "application/json"}
+PASSWORD = "Concurrencia123!"
+# Muy por debajo de DB_POOL_TIMEOUT_SECONDS (30 s): un bloqueo del pool se nota
+MAX_SECONDS = 10.0
+
+def log_test(message: str, success: bool = True):
+    """Función para logging de pruebas"""
+    status = "✅" if success else "❌"
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] {status} {message}")
+
+def auth_headers(token: str) -> dict:
+    return {**HEADERS, "Authorization": f"Bearer {token}"}
+
+def register_and_login_user(index: int, run_id: str) -> Optional[str]:
+    """Registrar y hacer login de un usuario de la prueba"""
+    username = f"conc_{run_id}_{index}"
+    email = f"{username}@example.com"
+    register_data = {
+        "username": username,
+        "email": email,
+        "password": PASSWORD,
+        "confirm_password": PASSWORD,
+        "first_name": "Usuario",
+        "last_name": username,
+        "city": "Bogotá",
+        "country": "Colombia",
+        "accept_terms": True,
+        "accept_privacy": True
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", headers=HEADERS, json=register_data)
+    if response.status_code not in [200, 201]:
+        log_test(f"Error al registrar {username}: {response.text}", False)
+        return None
+    return response.json()["tokens"]["access_token"]
+
+def create_item(token: str, category_id: str, index: int) -> Optional[str]:
+    item_data = {
+        "title": f"Artículo de concurrencia {index}",
+        "description": "Artículo creado por la prueba de concurrencia",
+        "category_id": category_id,
+        "condition": "good",
+        "estimated_value": 10.0
+    }
+    response = requests.post(f"{BASE_URL}/items/", headers=auth_headers(token), json=item_data)
+    if response.status_code not in [200, 201]:
+        log_test(f"Error al crear artículo {index}: {response.text}", False)
+        return None
+    return response.json()["id"]
+
+def run_parallel(name: str, calls: List[Callable[[], requests.Response]]) -> bool:
+    """Ejecutar todas las peticiones a la vez; todas deben responder 2xx a tiempo"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = [pool.submit(call) for call in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result().status_code)
+            except Exception as e:
+                results.append(type(e).__name__)
+    elapsed = time.perf_counter() - started
+
+    ok = all(isinstance(code, int) and 200 <= code < 300 for code in results) and elapsed < MAX_SECONDS
+    log_test(f"{name}: {len(calls)} peticiones simultáneas en {elapsed:.2f}s -> {results}", ok)
+    return ok
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    run_id = uuid.uuid4().hex[:8]
+    print(f"🔀 Prueba de concurrencia con {concurrency} peticiones simultáneas")
+    print("=" * 60)
+
+    response = requests.get(f"{BASE_URL}/categories/")
+    categories = response.json().get("categories", []) if response.status_code == 200 else []
+    if not categories:
+        log_test("No hay categorías disponibles", False)
+        sys.exit(1)
+    category_id = categories[0]["id"]
+
+    tokens = [register_and_login_user(i, run_id) for i in range(concurrency)]
+    items = [create_item(token, category_id, i) if token else None for i, token in enumerate(tokens)]
+    if not all(tokens) or not all(items):
+        log_test("No se pudieron preparar usuarios y artículos", False)
+        sys.exit(1)
+    log_test(f"{concurrency} usuarios con un artículo cada uno")
+
+    tests = [
+        ("GET /users/profile/stats", [
+            lambda token=token: requests.get(f"{BASE_URL}/users/profile/stats", headers=auth_headers(token), timeout=60)
+            for token in tokens
+        ]),
+        # Cada usuario propone su artículo a cambio del del siguiente
+        ("POST /exchanges/", [
+            lambda i=i: requests.post(f"{BASE_URL}/exchanges/", headers=auth_headers(tokens[i]), timeout=60, json={
+                "requester_item_id": items[i],
+                "owner_item_id": items[(i + 1) % concurrency],
+                "message": "Propuesta de la prueba de concurrencia"
+            })
+            for i in range(concurrency)
+        ]),
+        ("PUT /items/{id}/status", [
+            lambda i=i: requests.put(f"{BASE_URL}/items/{items[i]}/status", headers=auth_headers(tokens[i]), timeout=60, json={
+                "status": "reserved"
+            })
+            for i in range(concurrency)
+        ]),
+    ]
+
+    passed = sum(run_parallel(name, calls) for name, calls in tests)
+
+    print("\n" + "=" * 60)
+    print(f"📊 Resumen: {passed}/{len(tests)} pruebas de concurrencia superadas")
+    if passed != len(tests):
+        print("⚠️  Alguna petición falló o tardó más de lo esperado: revisa el tamaño de los pools")
+        sys.exit(1)
+    print("🎉 Ninguna petición se quedó esperando conexiones")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Prueba del ciclo de vida de un intercambio contra un servidor de GreenLoop
+
+Comprueba que completar un intercambio suma un intercambio a ambas partes en
+la clasificación de la comunidad (leaderboard):
+1. Crear, aceptar y organizar el encuentro de un intercambio
+2. Confirmarlo por ambas partes (POST /exchanges/{id}/confirm)
+3. Completar otro directamente (POST /exchanges/{id}/complete)
+4. Completar otro con varias peticiones a la vez: sólo una debe contar
+5. Confirmar otro por ambas partes a la vez: debe quedar completado
+6. Consultar GET /community/top-users/me antes y después
+
+Uso (el registro de usuarios desde una IP cuenta para el límite de "auth")::
+
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app
+    python test_exchange_leaderboard.py
+"""
+
+import sys
+import uuid
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Configuración
+BASE_URL = "http://localhost:8000/api/v1"
+HEADERS = {"Content-Type": "application/json"}
+PASSWORD = "Intercambio123!"
+
+def log_test(message: str, success: bool = True):
+    """Función para logging de pruebas"""
+    status = "✅" if success else "❌"
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] {status} {message}")
+
+def auth_headers(token: str) -> dict:
+    return {**HEADERS, "Authorization": f"Bearer {token}"}
+
+def register_and_login_user(name: str, run_id: str) -> Optional[str]:
+    """Registrar un usuario de la prueba y devolver su token"""
+    username = f"lb_{name}_{run_id}"
+    register_data = {
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+        "confirm_password": PASSWORD,
+        "first_name": name.capitalize(),
+        "last_name": "Prueba",
+        "city": "Bogotá",
+        "country": "Colombia",
+        "accept_terms": True,
+        "accept_privacy": True
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", headers=HEADERS, json=register_data)
+    if response.status_code not in [200, 201]:
+        log_test(f"Error al registrar {username}: {response.text}", False)
+        return None
+    return response.json()["tokens"]["access_token"]
+
+def create_item(token: str, category_id: str, title: str) -> Optional[str]:
+    item_data = {
+        "title": title,
+        "description": "Artículo creado por la prueba de clasificación",
+        "category_id": category_id,
+        "condition": "good",
+        "estimated_value": 20.0
+    }
+    response = requests.post(f"{BASE_URL}/items/", headers=auth_headers(token), json=item_data)
+    if response.status_code not in [200, 201]:
+        log_test(f"Error al crear artículo {title}: {response.text}", False)
+        return None
+    return response.json()["id"]
+
+def total_exchanges(token: str) -> Optional[int]:
+    """Intercambios completados del usuario según la clasificación global"""
+    response = requests.get(f"{BASE_URL}/community/top-users/me", headers=auth_headers(token))
+    if response.status_code != 200:
+        log_test(f"Error al consultar la clasificación: {response.text}", False)
+        return None
+    global_rank = response.json().get("global_rank")
+    return global_rank["total_exchanges"] if global_rank else 0
+
+def step(name: str, response: requests.Response) -> Optional[dict]:
+    ok = 200 <= response.status_code < 300
+    log_test(f"{name}: {response.status_code}", ok)
+    if not ok:
+        print(f"   {response.text}")
+        return None
+    return response.json()
+
+def prepare_exchange(requester: str, owner: str, requester_item: str, owner_item: str) -> Optional[str]:
+    """Crear, aceptar y organizar el encuentro; devuelve el id del intercambio"""
+    created = step("Crear intercambio", requests.post(f"{BASE_URL}/exchanges/", headers=auth_headers(requester), json={
+        "requester_item_id": requester_item,
+        "owner_item_id": owner_item,
+        "message": "Propuesta de la prueba de clasificación"
+    }))
+    if not created:
+        return None
+    exchange_id = created["id"]
+    if not step("Aceptar intercambio", requests.post(f"{BASE_URL}/exchanges/{exchange_id}/accept", headers=auth_headers(owner))):
+        return None
+    meeting = step("Organizar encuentro", requests.post(f"{BASE_URL}/exchanges/{exchange_id}/meeting", headers=auth_headers(requester), json={
+        "meeting_date": (datetime.now() + timedelta(days=1)).isoformat(),
+        "meeting_location": "Parque de la 93, Bogotá"
+    }))
+    return exchange_id if meeting else None
+
+def post_concurrently(calls: list) -> list:
+    """Lanzar a la vez los POST ``(url, token, body)`` y devolver sus respuestas"""
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = [pool.submit(requests.post, url, headers=auth_headers(token), json=body) for url, token, body in calls]
+        return [future.result() for future in futures]
+
+def main():
+    run_id = uuid.uuid4().hex[:8]
+    print("🏆 Prueba de intercambios completados y clasificación")
+    print("=" * 60)
+
+    response = requests.get(f"{BASE_URL}/categories/")
+    categories = response.json().get("categories", []) if response.status_code == 200 else []
+    if not categories:
+        log_test("No hay categorías disponibles", False)
+        sys.exit(1)
+    category_id = categories[0]["id"]
+
+    ana = register_and_login_user("ana", run_id)
+    luis = register_and_login_user("luis", run_id)
+    if not ana or not luis:
+        sys.exit(1)
+    items = [create_item(token, category_id, f"Artículo {n}") for n, token in enumerate([ana, luis] * 4)]
+    if not all(items):
+        sys.exit(1)
+
+    before = (total_exchanges(ana), total_exchanges(luis))
+    log_test(f"Intercambios antes: ana={before[0]}, luis={before[1]}")
+
+    # 1. Confirmado por ambas partes
+    exchange_id = prepare_exchange(ana, luis, items[0], items[1])
+    if not exchange_id:
+        sys.exit(1)
+    first = step("Confirmar (ana)", requests.post(f"{BASE_URL}/exchanges/{exchange_id}/confirm", headers=auth_headers(ana), json={}))
+    second = step("Confirmar (luis)", requests.post(f"{BASE_URL}/exchanges/{exchange_id}/confirm", headers=auth_headers(luis), json={}))
+    if not first or not second or second["status"] != "completed":
+        log_test("El intercambio no quedó completado tras confirmar ambas partes", False)
+        sys.exit(1)
+
+    # 2. Completado directamente
+    exchange_id = prepare_exchange(luis, ana, items[3], items[2])
+    if not exchange_id:
+        sys.exit(1)
+    completed = step("Completar", requests.post(f"{BASE_URL}/exchanges/{exchange_id}/complete", headers=auth_headers(luis), json={
+        "completed": True,
+        "completion_notes": "Todo correcto"
+    }))
+    if not completed or completed["status"] != "completed":
+        sys.exit(1)
+
+    # 3. Varias peticiones de completar a la vez: una gana, el resto da 400
+    exchange_id = prepare_exchange(ana, luis, items[4], items[5])
+    if not exchange_id:
+        sys.exit(1)
+    url = f"{BASE_URL}/exchanges/{exchange_id}/complete"
+    body = {"completed": True, "completion_notes": "Completado a la vez"}
+    codes = sorted(r.status_code for r in post_concurrently([(url, token, body) for token in [ana, luis] * 3]))
+    single = codes == [200] + [400] * 5
+    log_test(f"Completar a la vez: {codes}", single)
+    if not single:
+        sys.exit(1)
+
+    # 4. Ambas partes confirman a la vez: alguna de las dos lo completa
+    exchange_id = prepare_exchange(luis, ana, items[7], items[6])
+    if not exchange_id:
+        sys.exit(1)
+    url = f"{BASE_URL}/exchanges/{exchange_id}/confirm"
+    responses = post_concurrently([(url, ana, {}), (url, luis, {})])
+    statuses = [r.json().get("status") if r.status_code == 200 else r.status_code for r in responses]
+    both = "completed" in statuses and all(r.status_code == 200 for r in responses)
+    log_test(f"Confirmar a la vez: {statuses}", both)
+    if not both:
+        sys.exit(1)
+
+    after = (total_exchanges(ana), total_exchanges(luis))
+    ok = None not in before and after == (before[0] + 4, before[1] + 4)
+    log_test(f"Intercambios después: ana={after[0]}, luis={after[1]} (esperado +4 cada uno)", ok)
+
+    print("\n" + "=" * 60)
+    if not ok:
+        print("⚠️  La clasificación no refleja los intercambios completados")
+        sys.exit(1)
+    print("🎉 Los intercambios completados suben en la clasificación")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Prueba del perfil público de usuarios contra un servidor de GreenLoop
+
+Comprueba que GET /users/{id} responde con el perfil público:
+1. Registrar un usuario de prueba
+2. Consultar su perfil público y validar los campos calculados
+3. Verificar que no expone datos de contacto
+4. Repetir la consulta con If-None-Match y esperar 304 sin cuerpo
+5. Actualizar el perfil (PUT /users/profile) y comprobar que cambia el ETag
+
+Uso (el registro de usuarios desde una IP cuenta para el límite de "auth")::
+
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app
+    python test_public_profile.py
+"""
+
+import sys
+import uuid
+import time
+import requests
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Configuración
+BASE_URL = "http://localhost:8000/api/v1"
+HEADERS = {"Content-Type": "application/json"}
+PASSWORD = "Perfil123!"
+
+def log_test(message: str, success: bool = True):
+    """Función para logging de pruebas"""
+    status = "✅" if success else "❌"
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] {status} {message}")
+
+def register_user(run_id: str) -> Optional[Tuple[str, str]]:
+    """Registrar un usuario de la prueba y devolver (id, token)"""
+    username = f"perfil_{run_id}"
+    register_data = {
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+        "confirm_password": PASSWORD,
+        "first_name": "Marta",
+        "last_name": "Prueba",
+        "phone": "+573001234567",
+        "city": "Medellín",
+        "country": "Colombia",
+        "accept_terms": True,
+        "accept_privacy": True
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", headers=HEADERS, json=register_data)
+    if response.status_code not in [200, 201]:
+        log_test(f"Error al registrar {username}: {response.text}", False)
+        return None
+    body = response.json()
+    return body["user"]["id"], body["tokens"]["access_token"]
+
+def main():
+    run_id = uuid.uuid4().hex[:8]
+    print("👤 Prueba del perfil público de usuarios")
+    print("=" * 60)
+
+    registered = register_user(run_id)
+    if not registered:
+        sys.exit(1)
+    user_id, token = registered
+
+    response = requests.get(f"{BASE_URL}/users/{user_id}")
+    ok = response.status_code == 200
+    log_test(f"GET /users/{{id}}: {response.status_code}", ok)
+    if not ok:
+        print(f"   {response.text}")
+        sys.exit(1)
+
+    profile = response.json()
+    checks = [
+        ("id", profile.get("id") == user_id),
+        ("full_name", profile.get("full_name") == "Marta Prueba"),
+        ("success_rate", profile.get("success_rate") == 0.0),
+        ("member_since", bool(profile.get("member_since"))),
+        ("sin datos de contacto", profile.get("email") is None and profile.get("phone") is None),
+    ]
+    for name, passed in checks:
+        log_test(f"Perfil público: {name}", passed)
+
+    missing = requests.get(f"{BASE_URL}/users/{uuid.uuid4()}")
+    checks.append(("usuario inexistente da 404", missing.status_code == 404))
+    log_test(f"Usuario inexistente: {missing.status_code}", missing.status_code == 404)
+
+    # GET condicional con el ETag recibido
+    etag = response.headers.get("ETag")
+    log_test(f"ETag del perfil: {etag}", bool(etag))
+    cached = requests.get(f"{BASE_URL}/users/{user_id}", headers={"If-None-Match": etag or ""})
+    not_modified = cached.status_code == 304 and not cached.content
+    checks.append(("304 con If-None-Match", not_modified))
+    log_test(f"If-None-Match: {cached.status_code}, cuerpo de {len(cached.content)} bytes", not_modified)
+
+    # updated_at puede tener resolución de segundos (SQLite)
+    time.sleep(1.1)
+    update = requests.put(
+        f"{BASE_URL}/users/profile",
+        headers={**HEADERS, "Authorization": f"Bearer {token}"},
+        json={"bio": "Perfil actualizado por la prueba"}
+    )
+    log_test(f"Actualizar perfil: {update.status_code}", update.status_code == 200)
+    refreshed = requests.get(f"{BASE_URL}/users/{user_id}", headers={"If-None-Match": etag or ""})
+    new_etag = refreshed.headers.get("ETag")
+    changed = (
+        update.status_code == 200
+        and refreshed.status_code == 200
+        and bool(new_etag) and new_etag != etag
+        and refreshed.json().get("bio") == "Perfil actualizado por la prueba"
+    )
+    checks.append(("ETag nuevo tras actualizar", changed))
+    log_test(f"Tras actualizar: {refreshed.status_code}, ETag {new_etag}", changed)
+
+    print("\n" + "=" * 60)
+    if not all(passed for _, passed in checks):
+        print("⚠️  El perfil público no responde como se espera")
+        sys.exit(1)
+    print("🎉 El perfil público responde correctamente")
+
+if __name__ == "__main__":
+    main()